@@ -7,7 +7,10 @@ import pytest
 collect_ignore = ["src/mx_bluesky/hyperion/blueapi/plans.py"]
 
 
-pytest_plugins = ["dodal.testing.fixtures.run_engine"]
+pytest_plugins = [
+    "dodal.testing.fixtures.run_engine",
+    "mx_bluesky.common.simulation.pytest_plugin",
+]
 
 
 def pytest_addoption(parser):
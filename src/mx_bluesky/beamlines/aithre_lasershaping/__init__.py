@@ -1,5 +1,6 @@
 from mx_bluesky.beamlines.aithre_lasershaping.beamline_safe import (
     go_to_zero,
+    monitor_beamline_safe,
     set_beamline_safe_on_robot,
 )
 from mx_bluesky.beamlines.aithre_lasershaping.check_goniometer_performance import (
@@ -14,6 +15,7 @@ from mx_bluesky.beamlines.aithre_lasershaping.goniometer_controls import (
 
 __all__ = [
     "set_beamline_safe_on_robot",
+    "monitor_beamline_safe",
     "check_omega_performance",
     "change_goniometer_turn_speed",
     "go_to_furthest_maximum",
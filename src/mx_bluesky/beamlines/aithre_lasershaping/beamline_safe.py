@@ -1,12 +1,47 @@
+import asyncio
+from dataclasses import dataclass, field
+
 import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
 from bluesky.utils import MsgGenerator
 from dodal.common import inject
 from dodal.devices.aithre_lasershaping.goniometer import Goniometer
 from dodal.devices.aithre_lasershaping.laser_robot import ForceBit, LaserRobot
+from ophyd_async.epics.motor import Motor
+
+from mx_bluesky.common.utils.log import LOGGER
+
+DEFAULT_ZERO_TOLERANCE = 0.0005
+DEFAULT_HYSTERESIS = 0.0005
+
+BEAMLINE_SAFE_MONITOR_RUN = "BEAMLINE SAFE MONITOR RUN"
+# Each axis is monitored in its own stream, named with this prefix
+BEAMLINE_SAFE_READBACKS_STREAM = "beamline_safe_readbacks"
+
+
+def _safe_axes(goniometer: Goniometer) -> list[Motor]:
+    return [
+        goniometer.x,
+        goniometer.y,
+        goniometer.z,
+        goniometer.sampy,
+        goniometer.sampz,
+        goniometer.omega,
+    ]
+
+
+def is_at_zero(values: list[float], tolerance: float = DEFAULT_ZERO_TOLERANCE) -> bool:
+    return all(abs(value) <= tolerance for value in values)
+
+
+def _force_bit(safe: bool) -> str:
+    return ForceBit.ON.value if safe else ForceBit.NO.value
 
 
 def set_beamline_safe_on_robot(
-    robot: LaserRobot = inject("robot"), goniometer: Goniometer = inject("goniometer")
+    robot: LaserRobot = inject("robot"),
+    goniometer: Goniometer = inject("goniometer"),
+    tolerance: float = DEFAULT_ZERO_TOLERANCE,
 ) -> MsgGenerator:
     """
     The beamline safe PV is used in the Aithre laser shaping system to indicate whether
@@ -14,26 +49,131 @@ def set_beamline_safe_on_robot(
     is trained to load at the goniometer zero position, so if the translation and
     rotation axes of the goniometer are at zero, then the beamline safe PV bit is forced
     on.
+
+    This only sets the bit from the positions when it is run, see
+    monitor_beamline_safe to keep it up to date.
     """
-    pvs = [
-        goniometer.x,
-        goniometer.y,
-        goniometer.z,
-        goniometer.sampy,
-        goniometer.sampz,
-        goniometer.omega,
-    ]
+    locations = yield from bps.locate(*_safe_axes(goniometer), squeeze=False)
+    values = [location["readback"] for location in locations]
+    yield from bps.abs_set(
+        robot.set_beamline_safe, _force_bit(is_at_zero(values, tolerance)), wait=True
+    )
+
+
+@dataclass
+class BeamlineSafeState:
+    """Whether the goniometer is at the robot load position, with hysteresis so that
+    noise on the readbacks doesn't toggle the beamline safe bit.
+
+    Becoming safe needs every axis within tolerance of zero, and staying safe needs
+    them all within tolerance + hysteresis.
+
+    Attributes:
+        axes: Names of the readbacks which must all be at zero.
+        tolerance: How close to zero each axis must be to become safe.
+        hysteresis: How much further from zero each axis may go before no longer
+            being safe.
+        safe: Whether it is safe, None until every axis has been read.
+    """
+
+    axes: list[str]
+    tolerance: float = DEFAULT_ZERO_TOLERANCE
+    hysteresis: float = DEFAULT_HYSTERESIS
+    safe: bool | None = None
+    readbacks: dict[str, float] = field(default_factory=dict)
+
+    def update(self, axis: str, value: float) -> bool:
+        """Record a new readback.
+
+        Returns:
+            True if this changed whether it is safe.
+        """
+        self.readbacks[axis] = value
+        if any(name not in self.readbacks for name in self.axes):
+            return False
+        limit = self.tolerance + (self.hysteresis if self.safe else 0)
+        safe = is_at_zero([self.readbacks[name] for name in self.axes], limit)
+        changed = safe != self.safe
+        self.safe = safe
+        return changed
+
+
+class _BeamlineSafeMonitor:
+    """Updates the beamline safe state from the events of the monitored readbacks,
+    and wakes the plan whenever it changes."""
 
-    values: list[float] = []
-    for pv in pvs:
-        values.append((yield from bps.rd(pv)))
+    def __init__(self, state: BeamlineSafeState):
+        self.state = state
+        self._descriptors: set[str] = set()
+        self._changed = asyncio.Event()
 
-    set_value = (
-        ForceBit.ON.value
-        if all(round(value, 3) == 0 for value in values)
-        else ForceBit.NO.value
+    def __call__(self, name: str, doc: dict):
+        stream = doc.get("name", "") if name == "descriptor" else ""
+        if stream.startswith(BEAMLINE_SAFE_READBACKS_STREAM):
+            self._descriptors.add(doc["uid"])
+        elif name == "event" and doc["descriptor"] in self._descriptors:
+            for axis, value in doc["data"].items():
+                if axis in self.state.axes and self.state.update(axis, value):
+                    self._changed.set()
+
+    async def wait_for_change(self):
+        await self._changed.wait()
+        self._changed.clear()
+
+
+def monitor_beamline_safe(
+    robot: LaserRobot = inject("robot"),
+    goniometer: Goniometer = inject("goniometer"),
+    tolerance: float = DEFAULT_ZERO_TOLERANCE,
+    hysteresis: float = DEFAULT_HYSTERESIS,
+) -> MsgGenerator:
+    """Keep the beamline safe bit on the robot up to date with the goniometer
+    position, see set_beamline_safe_on_robot.
+
+    All six axes are monitored and the bit is forced on when they are all at zero,
+    and back off when any moves away, see BeamlineSafeState. This runs until the
+    RunEngine is stopped or aborted, at which point the monitors are removed and the
+    bit is set back off, as the goniometer is no longer being watched.
+    """
+    axes = _safe_axes(goniometer)
+    monitor = _BeamlineSafeMonitor(
+        BeamlineSafeState(
+            [axis.user_readback.name for axis in axes], tolerance, hysteresis
+        )
     )
-    yield from bps.abs_set(robot.set_beamline_safe, set_value, wait=True)
+
+    def _update_robot():
+        written: bool | None = None
+        while True:
+            yield from bps.wait_for([monitor.wait_for_change])
+            safe = monitor.state.safe
+            if safe is not None and safe != written:
+                LOGGER.info(f"Goniometer {'is' if safe else 'is not'} beamline safe")
+                yield from bps.abs_set(
+                    robot.set_beamline_safe, _force_bit(safe), wait=True
+                )
+                written = safe
+
+    @bpp.run_decorator(md={"subplan_name": BEAMLINE_SAFE_MONITOR_RUN})
+    def _monitor():
+        token = yield from bps.subscribe("all", monitor)
+        for axis in axes:
+            yield from bps.monitor(
+                axis.user_readback,
+                name=f"{BEAMLINE_SAFE_READBACKS_STREAM}-{axis.name}",
+            )
+
+        def _stop_monitoring():
+            for axis in axes:
+                yield from bps.unmonitor(axis.user_readback)
+            yield from bps.unsubscribe(token)
+            yield from bps.abs_set(
+                robot.set_beamline_safe, _force_bit(False), wait=True
+            )
+
+        yield from bpp.finalize_wrapper(_update_robot(), _stop_monitoring())
+
+    yield from _monitor()
 
 
 def go_to_zero(
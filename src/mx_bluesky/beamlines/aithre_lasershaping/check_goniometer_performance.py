@@ -1,6 +1,20 @@
+import csv
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
 import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
+import numpy as np
+from bluesky.callbacks import CallbackBase
 from bluesky.utils import MsgGenerator
 from dodal.devices.aithre_lasershaping.goniometer import Goniometer
+from ophyd_async.epics.motor import Motor
+
+from mx_bluesky.common.utils.log import LOGGER
 
 DEFAULT_VELOCITIES = [5.0, 10.0, 20.0, 40.0, 80.0, 90.0]
 DEFAULT_POSITIONS = [
@@ -15,15 +29,430 @@ DEFAULT_POSITIONS = [
     3600.0,
     -3600.0,
 ]
+DEFAULT_SETTLE_TOLERANCE_DEG = 0.01
+DEFAULT_SETTLE_WINDOW_S = 0.5
+
+GONIOMETER_PERFORMANCE_RUN = "GONIOMETER PERFORMANCE RUN"
+MOVE_PERFORMANCE_STREAM = "move_performance"
+AXIS_READBACK_STREAM = "axis_readback"
+
+
+@dataclass(frozen=True)
+class MovePerformance:
+    """How well a single move followed the ideal trapezoidal velocity profile.
+
+    Attributes:
+        move: Index of the move in the characterisation.
+        start_deg: Readback before the move.
+        target_deg: Commanded position.
+        commanded_velocity_deg_s: Velocity the axis was set to.
+        acceleration_time_s: Acceleration time the axis was set to.
+        achieved_velocity_deg_s: Velocity fitted to the readback over the middle
+            half of the move, nan if there weren't enough samples.
+        duration_s: Time from the move being started until it reported done.
+        ideal_duration_s: Time the ideal trapezoidal profile takes for the move.
+        max_following_error_deg: Largest difference between the readback and the
+            ideal profile while moving.
+        overshoot_deg: Furthest the readback went past the target.
+        settle_time_s: Time after the ideal profile finished until the readback
+            stayed within tolerance of the target, nan if it never did.
+        samples: Number of readback updates received during the move.
+    """
+
+    move: int
+    start_deg: float
+    target_deg: float
+    commanded_velocity_deg_s: float
+    acceleration_time_s: float
+    achieved_velocity_deg_s: float
+    duration_s: float
+    ideal_duration_s: float
+    max_following_error_deg: float
+    overshoot_deg: float
+    settle_time_s: float
+    samples: int
+
+    @property
+    def distance_deg(self) -> float:
+        return abs(self.target_deg - self.start_deg)
+
+
+def ideal_profile(
+    distance: float, velocity: float, acceleration_time: float
+) -> tuple[float, float, float]:
+    """The trapezoidal profile of a move, which ramps up to velocity over the
+    acceleration time, cruises, then ramps down over the same time. Moves too short
+    to reach velocity have a triangular profile.
+
+    Returns:
+        The peak velocity, ramp time and total time of the move.
+    """
+    distance, velocity = abs(distance), abs(velocity)
+    if distance == 0 or velocity == 0:
+        return velocity, 0.0, 0.0
+    if acceleration_time <= 0:
+        return velocity, 0.0, distance / velocity
+    if velocity * acceleration_time >= distance:
+        peak_velocity = np.sqrt(distance * velocity / acceleration_time)
+        ramp_time = distance / peak_velocity
+        return peak_velocity, ramp_time, 2 * ramp_time
+    return velocity, acceleration_time, distance / velocity + acceleration_time
+
+
+def ideal_position(
+    elapsed: np.ndarray,
+    start: float,
+    target: float,
+    velocity: float,
+    acceleration_time: float,
+) -> np.ndarray:
+    """Position along the ideal trapezoidal profile at the given times after the
+    start of the move."""
+    peak_velocity, ramp_time, move_time = ideal_profile(
+        target - start, velocity, acceleration_time
+    )
+    sign = np.sign(target - start)
+    t = np.clip(elapsed, 0, move_time)
+    if ramp_time == 0:
+        travelled = peak_velocity * t
+    else:
+        acceleration = peak_velocity / ramp_time
+        ramp_up = 0.5 * acceleration * np.minimum(t, ramp_time) ** 2
+        cruise = peak_velocity * np.clip(t - ramp_time, 0, move_time - 2 * ramp_time)
+        ramp_down_t = np.clip(t - (move_time - ramp_time), 0, ramp_time)
+        ramp_down = peak_velocity * ramp_down_t - 0.5 * acceleration * ramp_down_t**2
+        travelled = ramp_up + cruise + ramp_down
+    return start + sign * np.minimum(travelled, abs(target - start))
+
+
+def analyse_move(
+    move: int,
+    samples: np.ndarray,
+    start: float,
+    target: float,
+    velocity: float,
+    acceleration_time: float,
+    started_at: float,
+    done_at: float,
+    tolerance: float = DEFAULT_SETTLE_TOLERANCE_DEG,
+) -> MovePerformance:
+    """Compare the readback sampled during a move with the ideal profile.
+
+    Args:
+        samples: (timestamp, readback) of each update, in time order.
+        started_at: When the move was started.
+        done_at: When the move reported done.
+        tolerance: How close to the target the readback must stay to be settled.
+    """
+    _, _, ideal_duration = ideal_profile(target - start, velocity, acceleration_time)
+    sign = np.sign(target - start) or 1
+    times = samples[:, 0] if len(samples) else np.empty(0)
+    positions = samples[:, 1] if len(samples) else np.empty(0)
+
+    # Fit the cruise velocity away from the ramps at either end
+    travelled = sign * (positions - start)
+    cruising = (travelled > 0.25 * abs(target - start)) & (
+        travelled < 0.75 * abs(target - start)
+    )
+    achieved_velocity = np.nan
+    if np.count_nonzero(cruising) >= 2 and np.ptp(times[cruising]) > 0:
+        slope = np.polyfit(times[cruising], positions[cruising], 1)[0]
+        achieved_velocity = abs(slope)
+
+    moving = times <= started_at + ideal_duration
+    following_error = np.abs(
+        positions
+        - ideal_position(times - started_at, start, target, velocity, acceleration_time)
+    )
+    max_following_error = (
+        float(following_error[moving].max()) if moving.any() else np.nan
+    )
+    overshoot = float(max(0.0, (sign * (positions - target)).max(initial=0.0)))
+
+    settle_time = np.nan
+    outside = np.abs(positions - target) > tolerance
+    if len(positions) and not outside[-1]:
+        last_outside = np.flatnonzero(outside)
+        settled_at = times[last_outside[-1] + 1] if len(last_outside) else started_at
+        settle_time = max(0.0, settled_at - (started_at + ideal_duration))
+
+    return MovePerformance(
+        move=move,
+        start_deg=start,
+        target_deg=target,
+        commanded_velocity_deg_s=velocity,
+        acceleration_time_s=acceleration_time,
+        achieved_velocity_deg_s=achieved_velocity,
+        duration_s=done_at - started_at,
+        ideal_duration_s=ideal_duration,
+        max_following_error_deg=max_following_error,
+        overshoot_deg=overshoot,
+        settle_time_s=settle_time,
+        samples=len(samples),
+    )
+
+
+@dataclass(frozen=True)
+class AccelerationModel:
+    """How long a trapezoidal move of the axis takes beyond cruising the whole
+    distance, fitted as linear in velocity. Drives configured with a fixed
+    acceleration time only have an offset, while acceleration limited drives have
+    a slope of 1 / acceleration.
+
+    Attributes:
+        offset_s: Time each move takes regardless of velocity, which includes the
+            latency of starting and finishing a move.
+        slope_s2_per_deg: Extra time per unit of velocity.
+        r_squared: Goodness of the fit.
+        moves: Number of moves fitted.
+    """
+
+    offset_s: float
+    slope_s2_per_deg: float
+    r_squared: float
+    moves: int
+
+    def acceleration_time_s(self, velocity: float) -> float:
+        """The effective time taken to ramp up to, and down from, velocity."""
+        return self.offset_s + self.slope_s2_per_deg * velocity
+
+    def acceleration_deg_s2(self, velocity: float) -> float:
+        return velocity / self.acceleration_time_s(velocity)
+
+    def duration_s(self, distance: float, velocity: float) -> float:
+        """Predicted duration of a move long enough to reach velocity."""
+        return abs(distance) / velocity + self.acceleration_time_s(velocity)
+
+
+def fit_acceleration_model(moves: list[MovePerformance]) -> AccelerationModel | None:
+    """Fit the acceleration model to the moves which were long enough to reach their
+    commanded velocity.
+
+    Returns:
+        The model, or None if there weren't moves at enough different velocities.
+    """
+    trapezoidal = [
+        m
+        for m in moves
+        if m.commanded_velocity_deg_s > 0
+        and m.commanded_velocity_deg_s * m.acceleration_time_s < m.distance_deg
+    ]
+    velocities = np.array([m.commanded_velocity_deg_s for m in trapezoidal])
+    if len(np.unique(velocities)) < 2:
+        return None
+    overheads = np.array(
+        [
+            m.duration_s - m.distance_deg / m.commanded_velocity_deg_s
+            for m in trapezoidal
+        ]
+    )
+    slope, offset = np.polyfit(velocities, overheads, 1)
+    residuals = overheads - (slope * velocities + offset)
+    total = np.sum((overheads - overheads.mean()) ** 2)
+    r_squared = 1 - np.sum(residuals**2) / total if total > 0 else 1.0
+    return AccelerationModel(
+        offset_s=float(offset),
+        slope_s2_per_deg=float(slope),
+        r_squared=float(r_squared),
+        moves=len(trapezoidal),
+    )
+
+
+class _ReadbackSampler:
+    """Collects the readback of an axis from the events of its monitored stream.
+
+    Args:
+        axis: The axis whose user_readback is monitored in AXIS_READBACK_STREAM.
+    """
+
+    def __init__(self, axis: Motor):
+        self._key = axis.user_readback.name
+        self._descriptors: set[str] = set()
+        self._samples: list[tuple[float, float]] = []
+
+    def __call__(self, name: str, doc: dict):
+        if name == "descriptor" and doc.get("name") == AXIS_READBACK_STREAM:
+            self._descriptors.add(doc["uid"])
+        elif name == "event" and doc["descriptor"] in self._descriptors:
+            self._samples.append((doc["timestamps"][self._key], doc["data"][self._key]))
+
+    def since(self, started_at: float) -> np.ndarray:
+        """The samples from started_at, including the last one before it.
+
+        Returns:
+            Array of (timestamp, readback).
+        """
+        samples = np.array(self._samples, dtype=float).reshape(-1, 2)
+        first = max(np.searchsorted(samples[:, 0], started_at) - 1, 0)
+        return samples[first:]
+
+
+class _MovePerformanceReadable:
+    """Presents the latest move to the RunEngine as a readable device, so that it can
+    be emitted in an event document."""
+
+    def __init__(self):
+        self.name = MOVE_PERFORMANCE_STREAM
+        self.parent = None
+        self.latest: MovePerformance | None = None
+
+    def describe(self) -> dict[str, Any]:
+        source = "mx_bluesky.aithre.check_goniometer_performance"
+        return {
+            f.name: {"source": source, "dtype": "number", "shape": []}
+            for f in fields(MovePerformance)
+        }
+
+    def read(self) -> dict[str, Any]:
+        assert self.latest is not None
+        timestamp = time.time()
+        return {
+            key: {"value": value, "timestamp": timestamp}
+            for key, value in asdict(self.latest).items()
+        }
+
+
+class GoniometerPerformanceReport(CallbackBase):
+    """Writes the moves of a goniometer characterisation to a CSV file, and the
+    acceleration model fitted to them to a JSON file alongside it.
+
+    Args:
+        directory: Where to write the report.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.moves: list[MovePerformance] = []
+        self.model: AccelerationModel | None = None
+        self.csv_path: Path | None = None
+        self._stream_descriptors: set[str] = set()
+        super().__init__()
+
+    def start(self, doc: dict):  # type: ignore
+        if doc.get("subplan_name") == GONIOMETER_PERFORMANCE_RUN:
+            self.moves = []
+            self.model = None
+            self._stream_descriptors = set()
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.csv_path = self.directory / f"goniometer_performance_{stamp}.csv"
+
+    def descriptor(self, doc: dict):  # type: ignore
+        if doc.get("name") == MOVE_PERFORMANCE_STREAM:
+            self._stream_descriptors.add(doc["uid"])
+
+    def event(self, doc: dict):  # type: ignore
+        if doc["descriptor"] in self._stream_descriptors:
+            self.moves.append(MovePerformance(**doc["data"]))
+
+    def stop(self, doc: dict):  # type: ignore
+        if self.csv_path is None or not self.moves:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, [f.name for f in fields(MovePerformance)])
+            writer.writeheader()
+            writer.writerows(asdict(move) for move in self.moves)
+        self.model = fit_acceleration_model(self.moves)
+        with open(self.csv_path.with_suffix(".json"), "w") as f:
+            json.dump(asdict(self.model) if self.model else None, f, indent=4)
+        LOGGER.info(
+            f"Wrote goniometer performance report to {self.csv_path}, "
+            f"acceleration model: {self.model}"
+        )
+        self.csv_path = None
+
+
+def characterise_axis(
+    axis: Motor,
+    velocities: list[float],
+    positions: list[float],
+    settle_tolerance_deg: float = DEFAULT_SETTLE_TOLERANCE_DEG,
+    settle_window_s: float = DEFAULT_SETTLE_WINDOW_S,
+) -> MsgGenerator:
+    """Move the axis to each position at each velocity, emitting how each move
+    performed in the MOVE_PERFORMANCE_STREAM. The readback is monitored throughout
+    in the AXIS_READBACK_STREAM, so this must be run inside an open run.
+
+    Args:
+        settle_tolerance_deg: How close to the target the readback must stay to be
+            considered settled.
+        settle_window_s: How long to keep sampling after each move reports done, to
+            catch the axis ringing about the target.
+    """
+    sampler = _ReadbackSampler(axis)
+    readable = _MovePerformanceReadable()
+
+    def _moves():
+        move = 0
+        for velocity in velocities:
+            yield from bps.abs_set(axis.velocity, velocity, wait=True)
+            acceleration_time = yield from bps.rd(axis.acceleration_time)
+            for position in positions:
+                start = yield from bps.rd(axis.user_readback)
+                started_at = time.time()
+                yield from bps.abs_set(axis, position, wait=True)
+                done_at = time.time()
+                yield from bps.sleep(settle_window_s)
+                readable.latest = analyse_move(
+                    move,
+                    sampler.since(started_at),
+                    start,
+                    position,
+                    velocity,
+                    acceleration_time,
+                    started_at,
+                    done_at,
+                    settle_tolerance_deg,
+                )
+                yield from bps.create(MOVE_PERFORMANCE_STREAM)
+                yield from bps.read(readable)
+                yield from bps.save()
+                move += 1
+
+    token = yield from bps.subscribe("all", sampler)
+    yield from bps.monitor(axis.user_readback, name=AXIS_READBACK_STREAM)
+
+    def _stop_sampling():
+        yield from bps.unmonitor(axis.user_readback)
+        yield from bps.unsubscribe(token)
+
+    yield from bpp.finalize_wrapper(_moves(), _stop_sampling())
 
 
 def check_omega_performance(
     goniometer: Goniometer,
     velocities: list[float] = DEFAULT_VELOCITIES,
     values: list[float] = DEFAULT_POSITIONS,
+    settle_tolerance_deg: float = DEFAULT_SETTLE_TOLERANCE_DEG,
+    settle_window_s: float = DEFAULT_SETTLE_WINDOW_S,
+    report_directory: str | None = None,
 ) -> MsgGenerator:
-    """Move the goniometer from positive to negative to check omega performance"""
-    for omega_velocity in velocities:
-        yield from bps.abs_set(goniometer.omega.velocity, omega_velocity, wait=True)
-        for omega_value in values:
-            yield from bps.abs_set(goniometer.omega, omega_value, wait=True)
+    """Move the goniometer from positive to negative to characterise omega.
+
+    Every move is emitted with its achieved velocity, duration against the ideal
+    trapezoidal profile, following error, overshoot and settle time. If a report
+    directory is given these are also written there, along with the acceleration
+    model fitted to them, see GoniometerPerformanceReport.
+    """
+    callbacks = (
+        [GoniometerPerformanceReport(report_directory)] if report_directory else []
+    )
+
+    @bpp.subs_decorator(callbacks)
+    @bpp.run_decorator(
+        md={
+            "subplan_name": GONIOMETER_PERFORMANCE_RUN,
+            "velocities": velocities,
+            "positions": values,
+        }
+    )
+    def _characterise():
+        yield from characterise_axis(
+            goniometer.omega,
+            velocities,
+            values,
+            settle_tolerance_deg,
+            settle_window_s,
+        )
+
+    yield from _characterise()
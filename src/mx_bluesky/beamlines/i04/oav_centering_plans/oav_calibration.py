@@ -0,0 +1,125 @@
+"""Models of how the image of the beam on the scintillator seen by the OAV changes with
+transmission and zoom, so that the optimal transmission and the beam centre at each
+zoom can be predicted rather than searched for."""
+
+import os
+from typing import Self
+
+from pydantic import BaseModel, Field
+
+
+def zoom_magnification(zoom: str) -> float:
+    """The magnification of a zoom level named like "7.5x"."""
+    try:
+        return float(zoom.removesuffix("x"))
+    except ValueError as e:
+        raise ValueError(f"Cannot get magnification from zoom level {zoom}") from e
+
+
+class OavIntensityCalibration(BaseModel):
+    """Calibration of the brightest pixel in the OAV image of the beam against
+    transmission at each zoom level.
+
+    The brightest pixel is proportional to transmission until the OAV saturates. The
+    beam is spread over more pixels at higher zoom, so the brightness of zoom levels
+    which have not been calibrated is scaled from the nearest calibrated level by the
+    inverse square of their magnification.
+
+    Attributes:
+        max_pixel_per_transmission: The brightest pixel at full transmission, if the
+            OAV did not saturate, for each zoom level
+        saturated_max_pixel: The value of a saturated pixel
+    """
+
+    max_pixel_per_transmission: dict[str, float] = Field(default_factory=dict)
+    saturated_max_pixel: float = 255
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        """Load the calibration stored at path, or an empty calibration if there is
+        none."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.model_dump_json(indent=2))
+
+    def can_predict(self, zoom: str) -> bool:
+        if zoom in self.max_pixel_per_transmission:
+            return True
+        try:
+            zoom_magnification(zoom)
+        except ValueError:
+            return False
+        return bool(self.max_pixel_per_transmission)
+
+    def _max_pixel_per_transmission(self, zoom: str) -> float:
+        if zoom in self.max_pixel_per_transmission:
+            return self.max_pixel_per_transmission[zoom]
+        magnification = zoom_magnification(zoom)
+        nearest = min(
+            self.max_pixel_per_transmission,
+            key=lambda level: abs(zoom_magnification(level) - magnification),
+        )
+        return (
+            self.max_pixel_per_transmission[nearest]
+            * (zoom_magnification(nearest) / magnification) ** 2
+        )
+
+    def predict_max_pixel(self, zoom: str, transmission: float) -> float:
+        return min(
+            self._max_pixel_per_transmission(zoom) * transmission,
+            self.saturated_max_pixel,
+        )
+
+    def transmission_for(self, zoom: str, max_pixel: float) -> float:
+        """The transmission predicted to give the brightest pixel, capped at full
+        transmission."""
+        return min(max_pixel / self._max_pixel_per_transmission(zoom), 1)
+
+    def with_reading(
+        self, zoom: str, transmission: float, max_pixel: float
+    ) -> "OavIntensityCalibration":
+        """A copy of the calibration updated with a reading at the zoom level. Readings
+        which are saturated or have no beam say nothing about the slope, so are
+        ignored."""
+        if not 0 < max_pixel < self.saturated_max_pixel or transmission <= 0:
+            return self
+        return self.model_copy(
+            update={
+                "max_pixel_per_transmission": self.max_pixel_per_transmission
+                | {zoom: max_pixel / transmission}
+            }
+        )
+
+
+def predict_beam_centre(
+    previous_centre: tuple[float, float],
+    zoom: str,
+    previous_reference_centre: tuple[float, float],
+    reference_centre: tuple[float, float],
+    reference_zoom: str,
+) -> tuple[float, float]:
+    """Predict the beam centre at a zoom level from how far the beam has moved at the
+    reference zoom level since both were last found. The same movement of the beam is
+    scaled by the ratio of magnifications in the image, so differences in the optical
+    axis of each zoom level are kept from the previous centres.
+
+    Args:
+        previous_centre: The previously found beam centre at the zoom level
+        zoom: The zoom level to predict the centre at
+        previous_reference_centre: The previously found beam centre at the reference
+            zoom level
+        reference_centre: The beam centre just found at the reference zoom level
+        reference_zoom: The zoom level the beam centre was just found at
+    """
+    ratio = zoom_magnification(zoom) / zoom_magnification(reference_zoom)
+    return (
+        previous_centre[0]
+        + ratio * (reference_centre[0] - previous_reference_centre[0]),
+        previous_centre[1]
+        + ratio * (reference_centre[1] - previous_reference_centre[1]),
+    )
@@ -2,6 +2,7 @@ import os
 import time
 
 import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
 import pydantic
 from bluesky.utils import MsgGenerator
 from dodal.common import inject
@@ -21,6 +22,10 @@ from dodal.devices.zebra.zebra_controlled_shutter import (
 )
 from ophyd_async.core import InOut as core_INOUT
 
+from mx_bluesky.beamlines.i04.oav_centering_plans.oav_calibration import (
+    OavIntensityCalibration,
+    predict_beam_centre,
+)
 from mx_bluesky.common.utils.exceptions import BeamlineStateError
 from mx_bluesky.common.utils.log import LOGGER
 
@@ -250,6 +255,80 @@ def optimise_transmission_with_oav(
     raise StopIteration("Max iterations reached")
 
 
+def optimise_transmission_with_oav_model(
+    zoom: str,
+    calibration: OavIntensityCalibration,
+    target_brightness_fraction: float = 0.75,
+    max_brightness_error: float = 0.1,
+    max_iterations: int = 3,
+    max_pixel: MaxPixel = inject("max_pixel"),
+    attenuator: BinaryFilterAttenuator = inject("attenuator"),
+    xbpm_feedback: XBPMFeedback = inject("xbpm_feedback"),
+) -> MsgGenerator[OavIntensityCalibration]:
+    """
+    Plan to set the optimal oav transmission using a calibrated model of the brightest
+    pixel against transmission. The target is the same fraction of the brightest pixel
+    at 100% transmission as optimise_transmission_with_oav, but is predicted from the
+    calibration rather than measured. The transmission predicted to reach it is then
+    set and checked with a single measurement, which also updates the calibration. If
+    the measurement is not close enough to the target, the prediction is repeated with
+    the updated calibration. If the zoom level cannot be predicted, the OAV saturates
+    or the target is not reached within max_iterations the binary search of
+    optimise_transmission_with_oav is used instead.
+    Args:
+        zoom: The current zoom level.
+        calibration: The calibration to predict transmission from.
+        target_brightness_fraction: Fraction of the brightest pixel at 100%
+                    transmission which should be used as the target max pixel brightness.
+        max_brightness_error: The largest difference between the brightest pixel and
+                    the target, as a fraction of the target, which is accepted.
+        max_iterations: Maximum amount of predictions before searching instead.
+    Returns:
+        The calibration updated with the measurements made.
+    """
+
+    def search() -> MsgGenerator[OavIntensityCalibration]:
+        LOGGER.info("Searching for optimal transmission instead")
+        yield from optimise_transmission_with_oav(
+            max_pixel=max_pixel, attenuator=attenuator, xbpm_feedback=xbpm_feedback
+        )
+        transmission = yield from bps.rd(attenuator.actual_transmission)
+        brightest_pixel = yield from bps.rd(max_pixel.max_pixel_val)
+        return calibration.with_reading(zoom, transmission, brightest_pixel)
+
+    if not calibration.can_predict(zoom):
+        LOGGER.info(f"No intensity calibration for zoom level {zoom}")
+        return (yield from search())
+
+    for iteration in range(max_iterations):
+        target_pixel_brightness = (
+            calibration.predict_max_pixel(zoom, 1) * target_brightness_fraction
+        )
+        transmission = calibration.transmission_for(zoom, target_pixel_brightness)
+        brightest_pixel = yield from _max_pixel_at_transmission(
+            max_pixel, attenuator, xbpm_feedback, transmission
+        )
+        LOGGER.info(
+            f"On iteration {iteration} predicted transmission {transmission} for max pixel {target_pixel_brightness}, brightest pixel found {brightest_pixel}"
+        )
+        if not 0 < brightest_pixel < calibration.saturated_max_pixel:
+            LOGGER.info("OAV saturated or no beam found at predicted transmission")
+            return (yield from search())
+        # The brightest pixel at 100% transmission, so the target, is corrected
+        # along with the calibration
+        calibration = calibration.with_reading(zoom, transmission, brightest_pixel)
+        target_pixel_brightness = (
+            calibration.predict_max_pixel(zoom, 1) * target_brightness_fraction
+        )
+        if (
+            abs(brightest_pixel - target_pixel_brightness)
+            <= max_brightness_error * target_pixel_brightness
+        ):
+            LOGGER.info(f"Optimal transmission found: {transmission}")
+            return calibration
+    return (yield from search())
+
+
 def _get_all_zoom_levels(
     zoom_controller: ZoomControllerWithBeamCentres,
 ) -> MsgGenerator[tuple[str]]:
@@ -268,6 +347,8 @@ def _get_all_zoom_levels(
 def find_beam_centres(
     zoom_levels_to_centre: tuple[str, ...] | None = None,
     zoom_levels_to_optimise_transmission: tuple[str, ...] = ("1.0x", "7.5x"),
+    intensity_calibration_file: str | None = None,
+    refine_roi_box_size: int | None = None,
     composite: FindBeamCentresComposite = inject(""),
 ) -> MsgGenerator:
     """
@@ -282,6 +363,14 @@ def find_beam_centres(
                            zoom levels.
     zoom_levels_to_optimise_transmission: The levels to optimise transmission at,
                            defaults to 1x and 7.5x
+    intensity_calibration_file: If given, transmission is optimised by
+                           optimise_transmission_with_oav_model using the
+                           OavIntensityCalibration stored in this file, which is then
+                           updated with the measurements made.
+    refine_roi_box_size: If given, the beam centre at each level after the first is
+                           predicted from how far the beam moved at the first level,
+                           then refined within an ROI box of this size around the
+                           prediction.
     """
 
     all_zooms = yield from _get_all_zoom_levels(composite.zoom_controller)
@@ -292,6 +381,12 @@ def find_beam_centres(
         if zoom not in all_zooms:
             raise ValueError(f"Unknown zoom ({zoom}). Known zooms are {all_zooms}")
 
+    calibration = (
+        OavIntensityCalibration.load(intensity_calibration_file)
+        if intensity_calibration_file
+        else None
+    )
+
     LOGGER.info("Preparing beamline for images...")
     yield from _prepare_beamline_for_scintillator_images(
         composite.robot,
@@ -305,33 +400,87 @@ def find_beam_centres(
     LOGGER.info("Waiting for prepare beamline plan to complete...")
     yield from bps.wait(OAV_PREPARE_BEAMLINE_FOR_SCINT_WAIT)
 
-    for centring_device in composite.zoom_controller.beam_centres.values():
-        zoom_name = yield from bps.rd(centring_device.level_name)
-        if zoom_name in zoom_levels_to_centre:
-            LOGGER.info(f"Moving to zoom level {zoom_name}")
-            yield from bps.abs_set(composite.zoom_controller, zoom_name, wait=True)
-            if zoom_name in zoom_levels_to_optimise_transmission:
-                LOGGER.info(f"Optimising transmission at zoom level {zoom_name}")
-                yield from optimise_transmission_with_oav(
-                    100,
-                    0,
-                    max_pixel=composite.max_pixel,
-                    attenuator=composite.attenuator,
-                    xbpm_feedback=composite.xbpm_feedback,
+    initial_roi_box_size = yield from bps.rd(composite.beam_centre.roi_box_size)
+
+    def centre_at_each_zoom():
+        nonlocal calibration
+        # The previous and new beam centres at the first level centred, and its name
+        reference: tuple[tuple[float, float], tuple[float, float], str] | None = None
+
+        for centring_device in composite.zoom_controller.beam_centres.values():
+            zoom_name = yield from bps.rd(centring_device.level_name)
+            if zoom_name in zoom_levels_to_centre:
+                previous_centre = None
+                if refine_roi_box_size is not None:
+                    previous_x = yield from bps.rd(centring_device.x_centre)
+                    previous_y = yield from bps.rd(centring_device.y_centre)
+                    previous_centre = (previous_x, previous_y)
+                    if reference is not None:
+                        # The overlay is moved to these when the zoom level changes, so
+                        # the ROI box is drawn around the prediction
+                        predicted_x, predicted_y = predict_beam_centre(
+                            previous_centre, zoom_name, *reference
+                        )
+                        LOGGER.info(
+                            f"Predicted beam centre ({predicted_x}, {predicted_y}) at zoom level {zoom_name}"
+                        )
+                        yield from bps.mv(
+                            centring_device.x_centre,
+                            round(predicted_x),
+                            centring_device.y_centre,
+                            round(predicted_y),
+                            composite.beam_centre.roi_box_size,
+                            refine_roi_box_size,
+                        )
+                LOGGER.info(f"Moving to zoom level {zoom_name}")
+                yield from bps.abs_set(composite.zoom_controller, zoom_name, wait=True)
+                if zoom_name in zoom_levels_to_optimise_transmission:
+                    LOGGER.info(f"Optimising transmission at zoom level {zoom_name}")
+                    if calibration is None:
+                        yield from optimise_transmission_with_oav(
+                            100,
+                            0,
+                            max_pixel=composite.max_pixel,
+                            attenuator=composite.attenuator,
+                            xbpm_feedback=composite.xbpm_feedback,
+                        )
+                    else:
+                        calibration = yield from optimise_transmission_with_oav_model(
+                            zoom_name,
+                            calibration,
+                            max_pixel=composite.max_pixel,
+                            attenuator=composite.attenuator,
+                            xbpm_feedback=composite.xbpm_feedback,
+                        )
+
+                yield from bps.trigger(composite.beam_centre, wait=True)
+                centre_x = yield from bps.rd(composite.beam_centre.center_x_val)
+                centre_y = yield from bps.rd(composite.beam_centre.center_y_val)
+                centre_x = round(centre_x)
+                centre_y = round(centre_y)
+                if previous_centre is not None and reference is None:
+                    reference = (previous_centre, (centre_x, centre_y), zoom_name)
+                LOGGER.info(
+                    f"Writing centre values ({centre_x}, {centre_y}) to OAV PVs at zoom level {zoom_name}"
+                )
+                yield from bps.mv(
+                    centring_device.x_centre,
+                    centre_x,
+                    centring_device.y_centre,
+                    centre_y,
                 )
 
-            yield from bps.trigger(composite.beam_centre, wait=True)
-            centre_x = yield from bps.rd(composite.beam_centre.center_x_val)
-            centre_y = yield from bps.rd(composite.beam_centre.center_y_val)
-            centre_x = round(centre_x)
-            centre_y = round(centre_y)
-            LOGGER.info(
-                f"Writing centre values ({centre_x}, {centre_y}) to OAV PVs at zoom level {zoom_name}"
-            )
-            yield from bps.mv(
-                centring_device.x_centre, centre_x, centring_device.y_centre, centre_y
-            )
+    def restore_roi_and_save_calibration():
+        # Also done if centring fails, so that the measurements made are kept
+        if refine_roi_box_size is not None:
+            yield from bps.mv(composite.beam_centre.roi_box_size, initial_roi_box_size)
+        if calibration is not None and intensity_calibration_file:
+            LOGGER.info(f"Saving OAV intensity calibration {calibration}")
+            calibration.save(intensity_calibration_file)
 
+    yield from bpp.finalize_wrapper(
+        centre_at_each_zoom(), restore_roi_and_save_calibration()
+    )
     LOGGER.info("Find beam centre plan completed!")
 
 
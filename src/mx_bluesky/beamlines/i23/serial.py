@@ -1,20 +1,123 @@
+import time
+from dataclasses import dataclass, field
 from functools import partial
+from typing import Any
 
 from bluesky import plan_stubs as bps
 from bluesky.plans import rel_grid_scan
-from bluesky.utils import short_uid
+from bluesky.utils import MsgGenerator, short_uid
 from dodal.beamlines.i23 import I23DetectorPositions
 from dodal.common import inject
 from dodal.devices.motors import SixAxisGonio
 from dodal.devices.positioner import Positioner1D
 from ophyd_async.epics.motor import Motor
 
+OMEGA_WEDGES_STREAM = "omega_wedges"
+
 
 def set_axis_to_max_velocity(axis: Motor):
     max_vel = yield from bps.rd(axis.max_velocity)
     yield from bps.mv(axis.velocity, max_vel)
 
 
+@dataclass(frozen=True)
+class OmegaWedge:
+    """The rotation done at a single point of the grid.
+
+    Attributes:
+        point: Index of the point in the order the grid is collected.
+        start_deg: Omega at the start of the rotation.
+        end_deg: Omega at the end of the rotation.
+    """
+
+    point: int
+    start_deg: float
+    end_deg: float
+
+    @property
+    def direction(self) -> int:
+        return 1 if self.end_deg >= self.start_deg else -1
+
+
+@dataclass
+class OmegaRotations:
+    """Keeps track of the rotations done at each point of a serial collection.
+
+    Unidirectional rotations start from 0 at every point, so omega is rewound at max
+    velocity while moving to each point. Bidirectional rotations alternate direction,
+    starting each rotation from where the last one finished, so omega only needs to
+    be rewound before the first point.
+
+    Attributes:
+        rotation_deg: Size of the rotation at each point.
+        bidirectional: Whether to alternate the direction of rotation.
+        wedges: The rotations done so far.
+    """
+
+    rotation_deg: float
+    bidirectional: bool = False
+    wedges: list[OmegaWedge] = field(default_factory=list)
+    # The velocity this plan last set omega to, None if not yet set
+    _velocity: float | None = field(default=None, init=False, repr=False)
+    # The stream must be read from the same object at every point
+    _readable: "_OmegaWedgeReadable" = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._readable = _OmegaWedgeReadable(self)
+
+    def next_wedge(self) -> OmegaWedge:
+        point = len(self.wedges)
+        if self.bidirectional and point % 2:
+            return OmegaWedge(point, self.rotation_deg, 0)
+        return OmegaWedge(point, 0, self.rotation_deg)
+
+    def needs_rewind(self, wedge: OmegaWedge) -> bool:
+        return not self.wedges or self.wedges[-1].end_deg != wedge.start_deg
+
+    def record(self, wedge: OmegaWedge) -> MsgGenerator:
+        """Add a finished rotation and emit it in the OMEGA_WEDGES_STREAM."""
+        self.wedges.append(wedge)
+        yield from bps.create(OMEGA_WEDGES_STREAM)
+        yield from bps.read(self._readable)
+        yield from bps.save()
+
+    def set_velocity(self, axis: Motor, velocity: float) -> MsgGenerator:
+        if velocity != self._velocity:
+            yield from bps.mv(axis.velocity, velocity)
+            self._velocity = velocity
+
+
+class _OmegaWedgeReadable:
+    """Presents the latest wedge to the RunEngine as a readable device, so that it
+    can be emitted in an event document."""
+
+    def __init__(self, rotations: OmegaRotations):
+        self.name = OMEGA_WEDGES_STREAM
+        self.parent = None
+        self._rotations = rotations
+
+    def describe(self) -> dict[str, Any]:
+        source = "mx_bluesky.i23.serial"
+        return {
+            key: {"source": source, "dtype": "number", "shape": []}
+            for key in ("point", "omega_start_deg", "omega_end_deg", "direction")
+        }
+
+    def read(self) -> dict[str, Any]:
+        timestamp = time.time()
+        wedge = self._rotations.wedges[-1]
+        values = {
+            "point": wedge.point,
+            "omega_start_deg": wedge.start_deg,
+            "omega_end_deg": wedge.end_deg,
+            "direction": wedge.direction,
+        }
+        return {
+            key: {"value": value, "timestamp": timestamp}
+            for key, value in values.items()
+        }
+
+
 def one_nd_step(
     detectors,
     step,
@@ -22,19 +125,33 @@ def one_nd_step(
     omega_axis: Motor,
     omega_rotation: float,
     omega_velocity: float,
+    rotations: OmegaRotations | None = None,
 ):
+    """Move to a point of the grid and rotate omega there. The start and end of the
+    rotation are emitted in the OMEGA_WEDGES_STREAM.
+
+    Args:
+        rotations: The rotations of the collection so far, which decides where the
+            rotation starts. If not given omega is rewound to 0 and rotated forwards.
+    """
+    rotations = rotations or OmegaRotations(omega_rotation)
+    wedge = rotations.next_wedge()
+
     def move():
         yield from bps.checkpoint()
         grp = short_uid("set")
         for motor, pos in step.items():
             yield from bps.abs_set(motor, pos, group=grp)
-        yield from set_axis_to_max_velocity(omega_axis)
-        yield from bps.abs_set(omega_axis, 0, group=grp)
+        if rotations.needs_rewind(wedge):
+            max_vel = yield from bps.rd(omega_axis.max_velocity)
+            yield from rotations.set_velocity(omega_axis, max_vel)
+            yield from bps.abs_set(omega_axis, wedge.start_deg, group=grp)
         yield from bps.wait(group=grp)
 
     yield from move()
-    yield from bps.mv(omega_axis.velocity, omega_velocity)
-    yield from bps.mv(omega_axis, omega_rotation)
+    yield from rotations.set_velocity(omega_axis, omega_velocity)
+    yield from bps.mv(omega_axis, wedge.end_deg)
+    yield from rotations.record(wedge)
 
 
 def serial_collection(
@@ -46,9 +163,13 @@ def serial_collection(
     omega_velocity: float,
     detector_motion: Positioner1D = inject("detector_motion"),
     gonio: SixAxisGonio = inject("gonio"),
+    bidirectional: bool = False,
 ):
     """This plan runs a software controlled serial collection. i.e it moves in a snaked
-    grid and does a small rotation collection at each point."""
+    grid and does a small rotation collection at each point.
+
+    If bidirectional, the rotation alternates direction at successive points rather
+    than rewinding omega to 0 before each one."""
 
     yield from bps.mv(detector_motion.stage_position, I23DetectorPositions.IN)
     yield from rel_grid_scan(
@@ -66,6 +187,7 @@ def serial_collection(
             omega_axis=gonio.omega,
             omega_rotation=omega_rotation,
             omega_velocity=omega_velocity,
+            rotations=OmegaRotations(omega_rotation, bidirectional),
         ),
         snake_axes=True,
     )
@@ -10,12 +10,14 @@ from .serial.extruder.i24ssx_extruder_collect_py3v2 import (
 from .serial.fixed_target.i24ssx_chip_manager_py3v1 import (
     block_check,
     cs_maker,
+    cs_maker_from_fiducials,
     fiducial,
     initialise_stages,
     moveto,
     moveto_preset,
 )
 from .web_gui_plans.general_plans import (
+    gui_estimate_chip_collection_time,
     gui_gonio_move_on_click,
     gui_move_backlight,
     gui_move_detector,
@@ -40,6 +42,7 @@ __all__ = [
     "gui_gonio_move_on_click",
     "gui_move_detector",
     "gui_run_chip_collection",
+    "gui_estimate_chip_collection_time",
     "gui_move_backlight",
     "gui_set_zoom_level",
     "gui_set_fiducial_0",
@@ -51,6 +54,7 @@ __all__ = [
     "moveto_preset",
     "block_check",
     "cs_maker",
+    "cs_maker_from_fiducials",
     "fiducial",
     "initialise_stages",
     "focus_on_oav_view",
@@ -0,0 +1,101 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from bluesky.callbacks import CallbackBase
+
+from mx_bluesky.beamlines.i24.jungfrau_commissioning.darks_processing import (
+    BadPixelThresholds,
+    process_darks,
+)
+from mx_bluesky.beamlines.i24.parameters.constants import PlanNameConstants
+from mx_bluesky.common.utils.log import LOGGER
+
+# Shared by every DarksProcessor, as one is made for each plan run in a long running
+# worker, so darks are processed one at a time on a single thread
+_DARKS_EXECUTOR = ThreadPoolExecutor(1, thread_name_prefix="darks-processor")
+
+
+class DarksProcessor(CallbackBase):
+    """Callback which computes the pedestal, noise and bad pixel maps once a darks run
+    has stopped, see darks_processing.
+
+    The location of the darks is taken from the jungfrau writer, which must be read
+    in the PlanNameConstants.DARKS_DEVICE_READ event. Processing is done in a
+    background thread so that it doesn't hold up the RunEngine.
+
+    Args:
+        darks_runs: subplan_name of the runs whose darks are processed.
+        thresholds: Limits for flagging bad pixels.
+        output_directory: Where to write the maps, by default alongside the darks.
+    """
+
+    def __init__(
+        self,
+        darks_runs: tuple[str, ...],
+        thresholds: BadPixelThresholds | None = None,
+        output_directory: str | Path | None = None,
+    ):
+        self.darks_runs = darks_runs
+        self.thresholds = thresholds
+        self.output_directory = output_directory
+        self.run_start_uid: str | None = None
+        self.descriptors: dict[str, dict] = {}
+        self.data_path: Path | None = None
+        self.futures: list[Future[Path]] = []
+        super().__init__()
+
+    def start(self, doc: dict):  # type: ignore
+        if doc.get("subplan_name") in self.darks_runs:
+            self.run_start_uid = doc.get("uid")
+            self.data_path = None
+
+    def descriptor(self, doc: dict):  # type: ignore
+        self.descriptors[doc["uid"]] = doc
+
+    def event(self, doc: dict):  # type: ignore
+        # Events may arrive from other runs described before this was subscribed
+        descriptor = self.descriptors.get(doc["descriptor"], {})
+        if (
+            self.run_start_uid is None
+            or descriptor.get("run_start") != self.run_start_uid
+            or descriptor.get("name") != PlanNameConstants.DARKS_DEVICE_READ
+        ):
+            return
+        # Keys are prefixed with the name of the jungfrau device
+        data = {key.rsplit("-", 1)[-1]: value for key, value in doc["data"].items()}
+        file_path, file_name = data.get("file_path"), data.get("file_name")
+        if file_path and file_name:
+            self.data_path = Path(file_path) / f"{file_name}.h5"
+
+    def stop(self, doc: dict):  # type: ignore
+        if self.run_start_uid is None or doc.get("run_start") != self.run_start_uid:
+            return
+        self.run_start_uid = None
+        if doc.get("exit_status") != "success":
+            LOGGER.info("Darks run did not succeed, so the darks won't be processed")
+            return
+        if self.data_path is None or not self.data_path.is_file():
+            LOGGER.warning(f"Could not find darks to process at {self.data_path}")
+            return
+        LOGGER.info(f"Processing darks from {self.data_path} in the background")
+        future = _DARKS_EXECUTOR.submit(
+            process_darks, self.data_path, self.output_directory, **self._options()
+        )
+        future.add_done_callback(_log_failure)
+        self.futures.append(future)
+
+    def _options(self) -> dict:
+        return {"thresholds": self.thresholds} if self.thresholds else {}
+
+    def wait(self, timeout: float | None = None) -> list[Path]:
+        """Wait for all submitted processing to finish.
+
+        Returns:
+            The files written.
+        """
+        return [future.result(timeout) for future in self.futures]
+
+
+def _log_failure(future: Future[Path]) -> None:
+    if (error := future.exception()) is not None:
+        LOGGER.error(f"Failed to process Jungfrau darks: {error}", exc_info=error)
@@ -0,0 +1,303 @@
+"""
+Computation of Jungfrau pedestal, noise and bad pixel maps from dark frames.
+
+Each raw Jungfrau pixel value holds the gain stage the pixel was in in its top two
+bits and the ADC reading in the remaining 14 bits. For each pixel and gain stage the
+mean (the pedestal) and RMS (the noise) of the ADC readings are accumulated using
+Welford's algorithm, combining one chunk of frames at a time, so memory use depends on
+the size of the detector but not on the number of frames.
+
+The maps are written to an HDF5 file with:
+    /pedestal_adu: (3, *pixel_shape) float32, mean ADC value for gain stages 0, 1, 2,
+        NaN where a pixel never reported that stage.
+    /rms_adu: (3, *pixel_shape) float32, RMS of the ADC value about the pedestal.
+    /frame_count: (3, *pixel_shape) uint32, frames each pixel reported each stage.
+    /mask: pixel_shape uint32, a PixelFlag for each pixel, 0 for good pixels.
+and attributes recording the format version, source data and thresholds used.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import re
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from enum import IntFlag
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from mx_bluesky import __version__
+from mx_bluesky.common.utils.log import LOGGER
+
+# Increment if the layout of the output file changes
+PEDESTAL_FILE_FORMAT_VERSION = 1
+
+DEFAULT_DATASET = "/data"
+DEFAULT_MAX_CHUNK_BYTES = 256 * 1024**2
+
+NUM_GAIN_STAGES = 3
+ADC_MASK = 0x3FFF
+GAIN_BITS_SHIFT = 14
+# Gain bits of each gain stage, 0b10 is never reported by a working pixel
+GAIN_STAGE_BITS = (0b00, 0b01, 0b11)
+INVALID_GAIN_BITS = 0b10
+
+
+class PixelFlag(IntFlag):
+    NO_DATA_G0 = 1 << 0
+    NO_DATA_G1 = 1 << 1
+    NO_DATA_G2 = 1 << 2
+    NOISY_G0 = 1 << 3
+    NOISY_G1 = 1 << 4
+    NOISY_G2 = 1 << 5
+    NO_NOISE_G0 = 1 << 6
+    NO_NOISE_G1 = 1 << 7
+    NO_NOISE_G2 = 1 << 8
+    PEDESTAL_OUT_OF_RANGE = 1 << 9
+    INVALID_GAIN = 1 << 10
+
+
+_NO_DATA = (PixelFlag.NO_DATA_G0, PixelFlag.NO_DATA_G1, PixelFlag.NO_DATA_G2)
+_NOISY = (PixelFlag.NOISY_G0, PixelFlag.NOISY_G1, PixelFlag.NOISY_G2)
+_NO_NOISE = (PixelFlag.NO_NOISE_G0, PixelFlag.NO_NOISE_G1, PixelFlag.NO_NOISE_G2)
+
+
+@dataclass(frozen=True)
+class BadPixelThresholds:
+    """Limits outside which a pixel is flagged as bad.
+
+    Attributes:
+        min_frames: Fewest frames in a gain stage for its pedestal to be trusted. Only
+            checked for gain stages which are present in the darks.
+        noise_factor: A pixel is noisy if its RMS is more than this multiple of the
+            median RMS of all pixels in the same gain stage.
+        pedestal_range_adu: Range of acceptable pedestals, in any gain stage.
+        min_present_fraction: A gain stage is present in the darks if at least this
+            fraction of pixels reported it.
+    """
+
+    min_frames: int = 10
+    noise_factor: float = 5.0
+    pedestal_range_adu: tuple[float, float] = (100, 16000)
+    min_present_fraction: float = 0.5
+
+
+class PedestalAccumulator:
+    """Running per pixel, per gain stage count, mean and sum of squared deviations of
+    the ADC readings, updated with Chan's parallel form of Welford's algorithm.
+
+    Args:
+        pixel_shape: Shape of a single frame.
+    """
+
+    def __init__(self, pixel_shape: tuple[int, ...]):
+        self.pixel_shape = pixel_shape
+        self.count = np.zeros((NUM_GAIN_STAGES, *pixel_shape), dtype=np.int64)
+        self.mean = np.zeros((NUM_GAIN_STAGES, *pixel_shape), dtype=np.float64)
+        self.m2 = np.zeros((NUM_GAIN_STAGES, *pixel_shape), dtype=np.float64)
+        self.invalid_gain_count = np.zeros(pixel_shape, dtype=np.int64)
+        self.frames = 0
+
+    def add_frames(self, raw: np.ndarray) -> None:
+        """Add a chunk of raw frames, of shape (frames, *pixel_shape)."""
+        if raw.shape[1:] != self.pixel_shape:
+            raise ValueError(
+                f"Frames of shape {raw.shape[1:]} do not match {self.pixel_shape}"
+            )
+        raw = raw.astype(np.uint16, copy=False)
+        gain_bits = raw >> GAIN_BITS_SHIFT
+        adc = (raw & ADC_MASK).astype(np.float64)
+        self.invalid_gain_count += np.count_nonzero(
+            gain_bits == INVALID_GAIN_BITS, axis=0
+        )
+        for stage, bits in enumerate(GAIN_STAGE_BITS):
+            in_stage = gain_bits == bits
+            n_b = np.count_nonzero(in_stage, axis=0)
+            if not n_b.any():
+                continue
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean_b = np.where(in_stage, adc, 0).sum(axis=0) / n_b
+                m2_b = np.where(in_stage, np.square(adc - mean_b), 0).sum(axis=0)
+            self._combine(stage, n_b, np.nan_to_num(mean_b), m2_b)
+        self.frames += raw.shape[0]
+
+    def _combine(
+        self, stage: int, n_b: np.ndarray, mean_b: np.ndarray, m2_b: np.ndarray
+    ) -> None:
+        n_a, mean_a = self.count[stage], self.mean[stage]
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight_b = np.where(n > 0, n_b / n, 0)
+        self.m2[stage] += m2_b + np.square(delta) * n_a * weight_b
+        self.mean[stage] = mean_a + delta * weight_b
+        self.count[stage] = n
+
+    @property
+    def pedestal(self) -> np.ndarray:
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    @property
+    def rms(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 0, np.sqrt(self.m2 / self.count), np.nan)
+
+
+def flag_bad_pixels(
+    accumulator: PedestalAccumulator, thresholds: BadPixelThresholds
+) -> np.ndarray:
+    """Flag the bad pixels in the accumulated darks.
+
+    Returns:
+        Array of PixelFlag values, the shape of a frame.
+    """
+    mask = np.zeros(accumulator.pixel_shape, dtype=np.uint32)
+
+    def flag(pixels: np.ndarray, pixel_flag: PixelFlag):
+        mask[pixels] |= np.uint32(pixel_flag)
+
+    pedestal, rms = accumulator.pedestal, accumulator.rms
+    low, high = thresholds.pedestal_range_adu
+    for stage in range(NUM_GAIN_STAGES):
+        count = accumulator.count[stage]
+        if np.mean(count > 0) < thresholds.min_present_fraction:
+            continue
+        flag(count < thresholds.min_frames, _NO_DATA[stage])
+        trusted = count >= thresholds.min_frames
+        if not trusted.any():
+            continue
+        median_rms = np.median(rms[stage][trusted])
+        with np.errstate(invalid="ignore"):
+            flag(
+                trusted & (rms[stage] > thresholds.noise_factor * median_rms),
+                _NOISY[stage],
+            )
+            flag(trusted & (rms[stage] == 0), _NO_NOISE[stage])
+            out_of_range = (pedestal[stage] < low) | (pedestal[stage] > high)
+        flag(trusted & out_of_range, PixelFlag.PEDESTAL_OUT_OF_RANGE)
+    flag(accumulator.invalid_gain_count > 0, PixelFlag.INVALID_GAIN)
+    return mask
+
+
+@dataclass
+class PedestalMaps:
+    pedestal_adu: np.ndarray
+    rms_adu: np.ndarray
+    frame_count: np.ndarray
+    mask: np.ndarray
+    frames: int
+    thresholds: BadPixelThresholds
+
+    @property
+    def bad_pixel_fraction(self) -> float:
+        return float(np.count_nonzero(self.mask) / self.mask.size)
+
+
+def iter_frame_chunks(
+    dataset: h5py.Dataset, max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES
+) -> Iterator[np.ndarray]:
+    """Read a dataset of frames a whole number of frames at a time."""
+    frame_bytes = int(np.prod(dataset.shape[1:])) * dataset.dtype.itemsize
+    # The float64 copy of the ADC values dominates the memory used for each chunk
+    chunk_frames = max(1, max_chunk_bytes // (frame_bytes * 8))
+    for start in range(0, dataset.shape[0], chunk_frames):
+        yield dataset[start : start + chunk_frames]
+
+
+def compute_pedestal_maps(
+    data_path: str | Path,
+    dataset: str = DEFAULT_DATASET,
+    thresholds: BadPixelThresholds | None = None,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+) -> PedestalMaps:
+    """Compute the pedestal, noise and bad pixel maps from a file of raw darks.
+
+    Args:
+        data_path: HDF5 file containing the raw frames.
+        dataset: Path of the dataset in the file, of shape (frames, *pixel_shape).
+        thresholds: Limits for flagging bad pixels.
+        max_chunk_bytes: Approximate memory to use for each chunk of frames.
+    """
+    thresholds = thresholds or BadPixelThresholds()
+    with h5py.File(data_path, "r") as f:
+        frames = f[dataset]
+        assert isinstance(frames, h5py.Dataset)
+        if frames.ndim < 2:
+            raise ValueError(
+                f"{data_path}{dataset} of shape {frames.shape} has no frames"
+            )
+        accumulator = PedestalAccumulator(frames.shape[1:])
+        for chunk in iter_frame_chunks(frames, max_chunk_bytes):
+            accumulator.add_frames(chunk)
+    return PedestalMaps(
+        pedestal_adu=accumulator.pedestal.astype(np.float32),
+        rms_adu=accumulator.rms.astype(np.float32),
+        frame_count=accumulator.count.astype(np.uint32),
+        mask=flag_bad_pixels(accumulator, thresholds),
+        frames=accumulator.frames,
+        thresholds=thresholds,
+    )
+
+
+def next_pedestal_file_path(directory: str | Path, stem: str) -> Path:
+    """The next unused path of the form {stem}_pedestal_{version:03d}.h5, so that
+    earlier maps made from the same darks are kept."""
+    pattern = re.compile(rf"{re.escape(stem)}_pedestal_(\d+)\.h5")
+    existing = [
+        int(match.group(1))
+        for path in Path(directory).glob(f"{stem}_pedestal_*.h5")
+        if (match := pattern.fullmatch(path.name))
+    ]
+    return Path(directory) / f"{stem}_pedestal_{max(existing, default=0) + 1:03d}.h5"
+
+
+def write_pedestal_file(
+    maps: PedestalMaps, output_path: str | Path, source: str | Path = ""
+) -> None:
+    with h5py.File(output_path, "x") as f:
+        f.attrs["format_version"] = PEDESTAL_FILE_FORMAT_VERSION
+        f.attrs["software"] = f"mx-bluesky {__version__}"
+        f.attrs["created"] = datetime.datetime.now().astimezone().isoformat()
+        f.attrs["source"] = str(source)
+        f.attrs["frames"] = maps.frames
+        f.attrs["thresholds"] = json.dumps(asdict(maps.thresholds))
+        f.attrs["mask_flags"] = json.dumps(
+            {flag.name: flag.value for flag in PixelFlag}
+        )
+        for name, data in (
+            ("pedestal_adu", maps.pedestal_adu),
+            ("rms_adu", maps.rms_adu),
+            ("frame_count", maps.frame_count),
+            ("mask", maps.mask),
+        ):
+            f.create_dataset(name, data=data, compression="gzip", chunks=True)
+
+
+def process_darks(
+    data_path: str | Path,
+    output_directory: str | Path | None = None,
+    dataset: str = DEFAULT_DATASET,
+    thresholds: BadPixelThresholds | None = None,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+) -> Path:
+    """Compute the maps from a file of darks and write them to a new versioned file,
+    by default alongside the darks.
+
+    Returns:
+        The path of the file written.
+    """
+    data_path = Path(data_path)
+    LOGGER.info(f"Computing Jungfrau pedestals from {data_path}")
+    maps = compute_pedestal_maps(data_path, dataset, thresholds, max_chunk_bytes)
+    output_path = next_pedestal_file_path(
+        output_directory or data_path.parent, data_path.stem
+    )
+    write_pedestal_file(maps, output_path, data_path)
+    LOGGER.info(
+        f"Wrote Jungfrau pedestals from {maps.frames} frames to {output_path}, "
+        f"{maps.bad_pixel_fraction:.3%} of pixels flagged as bad"
+    )
+    return output_path
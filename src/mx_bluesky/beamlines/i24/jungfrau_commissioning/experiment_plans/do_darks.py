@@ -1,3 +1,5 @@
+from functools import partial
+
 import bluesky.preprocessors as bpp
 from bluesky import plan_stubs as bps
 from bluesky.utils import MsgGenerator
@@ -13,21 +15,38 @@ from ophyd_async.fastcs.jungfrau import (
 )
 from pydantic import PositiveInt
 
+from mx_bluesky.beamlines.i24.jungfrau_commissioning.callbacks.darks_processor import (
+    DarksProcessor,
+)
 from mx_bluesky.beamlines.i24.jungfrau_commissioning.plan_stubs.plan_utils import (
     fly_jungfrau,
 )
+from mx_bluesky.beamlines.i24.parameters.constants import PlanNameConstants
+from mx_bluesky.common.experiment_plans.inner_plans.read_hardware import (
+    read_hardware_plan,
+)
 from mx_bluesky.common.utils.log import LOGGER
 
 PEDESTAL_DARKS_RUN = "PEDESTAL DARKS RUN"
 STANDARD_DARKS_RUN = "STANDARD DARKS RUN"
 
 
+def _read_darks_file(jungfrau: CommissioningJungfrauDetector):
+    # The file path is only known once the jungfrau has been prepared
+    return partial(
+        read_hardware_plan,
+        [jungfrau.writer.file_path, jungfrau.writer.file_name],
+        PlanNameConstants.DARKS_DEVICE_READ,
+    )
+
+
 def do_pedestal_darks(
     exp_time_s: float = 0.001,
     pedestal_frames: PositiveInt = 20,
     pedestal_loops: PositiveInt = 200,
     filename: str = "pedestal_darks",
     jungfrau: CommissioningJungfrauDetector = inject("jungfrau"),
+    process: bool = True,
 ) -> MsgGenerator:
     """Acquire darks in pedestal mode, using dynamic gain mode. This calibrates the offsets
     for the jungfrau, and must be performed before acquiring real data in dynamic gain mode.
@@ -49,8 +68,11 @@ def do_pedestal_darks(
         pedestal_loops: Number of times to acquire a set of pedestal_frames
         filename: Name of output file
         jungfrau: Jungfrau device
+        process: Whether to compute the pedestal, noise and bad pixel maps from the \
+            darks once they have been acquired, see darks_processing.
     """
 
+    @bpp.subs_decorator([DarksProcessor((PEDESTAL_DARKS_RUN,))] if process else [])
     @bpp.set_run_key_decorator(PEDESTAL_DARKS_RUN)
     @bpp.run_decorator(
         md={
@@ -78,6 +100,7 @@ def do_pedestal_darks(
             GainMode.DYNAMIC,
             wait=True,
             log_on_percentage_prefix="Jungfrau pedestal dynamic gain mode darks triggers received",
+            read_hardware_after_prepare_plan=_read_darks_file(jungfrau),
         )
 
     yield from _do_decorated_plan()
@@ -89,6 +112,7 @@ def do_non_pedestal_darks(
     total_triggers: PositiveInt = 1000,
     filename: str = "darks",
     jungfrau: CommissioningJungfrauDetector = inject("jungfrau"),
+    process: bool = True,
 ) -> MsgGenerator:
     """Internally take a set of images at a given gain mode.
 
@@ -100,8 +124,11 @@ def do_non_pedestal_darks(
         total_triggers: Total triggers for the dark scan.
         jungfrau: Jungfrau device
         filename: Name of output file
+        process: Whether to compute the pedestal, noise and bad pixel maps from the \
+            darks once they have been acquired, see darks_processing.
     """
 
+    @bpp.subs_decorator([DarksProcessor((STANDARD_DARKS_RUN,))] if process else [])
     @bpp.set_run_key_decorator(STANDARD_DARKS_RUN)
     @bpp.run_decorator(
         md={
@@ -121,6 +148,7 @@ def do_non_pedestal_darks(
             gain_mode,
             wait=True,
             log_on_percentage_prefix=f"Jungfrau {gain_mode} gain mode darks triggers received",
+            read_hardware_after_prepare_plan=_read_darks_file(jungfrau),
         )
 
     yield from _do_decorated_plan()
@@ -7,3 +7,4 @@ class PlanNameConstants:
     SINGLE_ROTATION_SCAN = "OUTER SINGLE ROTATION SCAN"
     MULTI_ROTATION_SCAN = "OUTER MULTI ROTATION SCAN"
     ROTATION_MAIN = "ROTATION MAIN"
+    DARKS_DEVICE_READ = "DARKS DEVICE READ"
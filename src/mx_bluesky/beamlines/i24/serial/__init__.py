@@ -8,6 +8,7 @@ from .fixed_target.i24ssx_chip_collect_py3v1 import run_fixed_target_plan
 from .fixed_target.i24ssx_chip_manager_py3v1 import (
     block_check,
     cs_maker,
+    cs_maker_from_fiducials,
     cs_reset,
     define_current_chip,
     fiducial,
@@ -35,6 +36,7 @@ __all__ = [
     "moveto_preset",
     "block_check",
     "cs_maker",
+    "cs_maker_from_fiducials",
     "cs_reset",
     "define_current_chip",
     "fiducial",
@@ -2,8 +2,11 @@ import datetime
 import json
 import math
 import os
-import subprocess
+import sqlite3
+import tempfile
+import uuid
 from functools import lru_cache
+from pathlib import Path
 
 import bluesky.plan_stubs as bps
 import requests
@@ -12,6 +15,11 @@ from dodal.devices.beamlines.i24.beam_center import DetectorBeamCenter
 from dodal.devices.beamlines.i24.dcm import DCM
 from dodal.devices.beamlines.i24.focus_mirrors import FocusMirrorsMode
 
+from mx_bluesky.beamlines.i24.serial.dcid_outbox import (
+    DEFAULT_OUTBOX_LOCATION,
+    DcidOutbox,
+    MessageKind,
+)
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import PumpProbeSetting
 from mx_bluesky.beamlines.i24.serial.log import SSX_LOGGER
 from mx_bluesky.beamlines.i24.serial.parameters import (
@@ -45,6 +53,25 @@ def get_auth_header() -> dict:
     return {"Authorization": "Bearer " + token}
 
 
+@lru_cache(maxsize=1)
+def get_default_outbox() -> DcidOutbox:
+    """Open the outbox shared by every collection in this process and start sending
+    from it in the background."""
+    try:
+        outbox = DcidOutbox(DEFAULT_OUTBOX_LOCATION, headers=get_auth_header)
+    except (OSError, sqlite3.Error) as e:
+        fallback = Path(tempfile.gettempdir()) / Path(DEFAULT_OUTBOX_LOCATION).name
+        SSX_LOGGER.warning(
+            "Could not open %s (%s); using %s instead",
+            DEFAULT_OUTBOX_LOCATION,
+            e,
+            fallback,
+        )
+        outbox = DcidOutbox(fallback, headers=get_auth_header)
+    outbox.start()
+    return outbox
+
+
 def read_beam_info_from_hardware(
     dcm: DCM,
     mirrors: FocusMirrorsMode,
@@ -91,6 +118,13 @@ class DCID:
             giving up. Defaults to 10 s.
         expt_parameters (ExtruderParameters | FixedTargetParameters): Collection \
             parameters input by user.
+        outbox (DcidOutbox, optional): Where notifications are queued until they are \
+            delivered. Defaults to the outbox shared by the whole process.
+
+    Every notification is stored in the outbox before it is sent. If it cannot be \
+    sent straight away it is retried in the background, after any earlier \
+    notifications of the same collection, unless emit_errors is set, in which case \
+    it is abandoned as the error is raised.
 
 
     Attributes:
@@ -105,6 +139,7 @@ class DCID:
         emit_errors: bool = True,
         timeout: float = 10,
         expt_params: ExtruderParameters | FixedTargetParameters,
+        outbox: DcidOutbox | None = None,
     ):
         self.parameters = expt_params
         self.detector: Detector
@@ -119,7 +154,30 @@ class DCID:
         self.emit_errors = emit_errors
         self.error = False
         self.timeout = timeout
-        self.dcid = None
+        self.outbox = outbox or get_default_outbox()
+        self.collection = uuid.uuid4().hex
+
+    @property
+    def dcid(self) -> int | None:
+        return self.outbox.dcid_for(self.collection)
+
+    def _send(self, kind: MessageKind, target: str, body: dict | None = None):
+        try:
+            self.outbox.send(
+                self.collection,
+                kind,
+                target,
+                body,
+                timeout=self.timeout,
+                # The error stops the collection, so the message must not be sent later
+                abandon_on_failure=self.emit_errors,
+            )
+        except Exception:
+            if not self.emit_errors:
+                SSX_LOGGER.warning(
+                    "Message will be retried from the outbox %s", self.outbox.path
+                )
+            raise
 
     def generate_dcid(
         self,
@@ -233,15 +291,7 @@ class DCID:
                 )
                 raise
 
-            resp = requests.post(
-                f"{self.server}/dc",
-                json=data,
-                timeout=self.timeout,
-                headers=get_auth_header(),
-            )
-            resp.raise_for_status()
-            self.dcid = resp.json()["dataCollectionId"]
-            SSX_LOGGER.info("Generated DCID %s", self.dcid)
+            self._send(MessageKind.CREATE, self.server, data)
         except requests.HTTPError as e:
             self.error = True
             SSX_LOGGER.error(
@@ -261,12 +311,10 @@ class DCID:
 
     def notify_start(self):
         """Send notifications that the collection is now starting"""
-        if self.dcid is None:
+        if not self.outbox.has_collection(self.collection):
             return None
         try:
-            command = [COLLECTION_START_SCRIPT, str(self.dcid)]
-            SSX_LOGGER.info("Running %s", " ".join(command))
-            subprocess.Popen(command)
+            self._send(MessageKind.RUN_SCRIPT, COLLECTION_START_SCRIPT)
         except Exception as e:
             self.error = True
             if self.emit_errors:
@@ -275,12 +323,10 @@ class DCID:
 
     def notify_end(self):
         """Send notifications that the collection has now ended"""
-        if self.dcid is None:
+        if not self.outbox.has_collection(self.collection):
             return
         try:
-            command = [COLLECTION_END_SCRIPT, str(self.dcid)]
-            SSX_LOGGER.info("Running %s", " ".join(command))
-            subprocess.Popen(command)
+            self._send(MessageKind.RUN_SCRIPT, COLLECTION_END_SCRIPT)
         except Exception as e:
             self.error = True
             if self.emit_errors:
@@ -316,7 +362,7 @@ class DCID:
                 "endTime": end_time.isoformat(),
                 "runStatus": status,
             }
-            if self.dcid is None:
+            if not self.outbox.has_collection(self.collection):
                 # Print what we would have sent. This means that if something is failing,
                 # we still have the data to upload in the log files.
                 SSX_LOGGER.info(
@@ -325,17 +371,7 @@ class DCID:
                 )
                 return
 
-            SSX_LOGGER.info(
-                'BRIDGE: PATCH "/dc/%s" --data=%s', self.dcid, repr(json.dumps(data))
-            )
-            response = requests.patch(
-                f"{self.server}/dc/{self.dcid}",
-                json=data,
-                timeout=self.timeout,
-                headers=get_auth_header(),
-            )
-            response.raise_for_status()
-            SSX_LOGGER.info("Successfully updated end time for DCID %d", self.dcid)
+            self._send(MessageKind.UPDATE, self.server, data)
         except Exception as e:
             resp_obj = getattr(e, "response", None)
             try:
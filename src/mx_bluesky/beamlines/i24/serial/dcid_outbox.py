@@ -0,0 +1,664 @@
+"""
+A durable outbox for the notifications sent to the ssx-dcserver for each collection.
+
+Every notification is written to a local SQLite database before it is sent, so that
+nothing is lost if the server cannot be reached during a collection. Messages are
+sent in order within a collection: a message is only sent once every earlier message
+of the same collection has been delivered, which means the end of a collection is
+never recorded before its start, and messages which need the DCID wait until the
+DCID has been created. Failed messages are retried by a background worker with
+exponential backoff, unless they are abandoned because the collection was given up.
+
+Pending messages can be inspected and replayed from the command line with
+
+    python -m mx_bluesky.beamlines.i24.serial.dcid_outbox list
+    python -m mx_bluesky.beamlines.i24.serial.dcid_outbox replay [ID ...] --send
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import sqlite3
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import closing
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests import HTTPError
+
+from mx_bluesky.beamlines.i24.serial.log import SSX_LOGGER
+
+DEFAULT_OUTBOX_LOCATION = "/scratch/ssx_dcserver_outbox.sqlite"
+
+DEFAULT_BACKOFF_S = 2.0
+MAX_BACKOFF_S = 600.0
+MAX_ATTEMPTS = 20
+# A message left in sending for longer than this was abandoned by a process which
+# exited mid send, and is sent again
+STALE_SENDING_S = 300.0
+
+# Client errors which are worth retrying
+_RETRYABLE_HTTP_CODES = {408, 425, 429}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    body TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    dcid INTEGER
+);
+CREATE INDEX IF NOT EXISTS messages_by_collection ON messages (collection, id);
+"""
+
+# The first unsent message of each collection which is due to be sent
+_NEXT_DUE = """
+SELECT * FROM messages AS m
+WHERE status = 'pending' AND next_attempt_at <= ?
+AND NOT EXISTS (
+    SELECT 1 FROM messages AS e
+    WHERE e.collection = m.collection AND e.id < m.id
+    AND e.status NOT IN ('sent', 'abandoned')
+)
+ORDER BY next_attempt_at, id LIMIT 1
+"""
+
+
+class MessageKind(StrEnum):
+    CREATE = "create"  # POST {target}/dc, which returns the DCID
+    UPDATE = "update"  # PATCH {target}/dc/{dcid}
+    RUN_SCRIPT = "run_script"  # Run {target} with the DCID as its argument
+
+
+class MessageStatus(StrEnum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    ABANDONED = "abandoned"  # Never sent, as the collection was given up
+
+
+class OutboxError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    """A notification in the outbox.
+
+    Attributes:
+        id: Position of the message in the outbox, increasing with time.
+        collection: Key of the collection the message belongs to.
+        kind: What is done to send the message.
+        target: The server URL, or the script to run.
+        body: JSON body of the request, if any.
+        status: Whether the message is waiting, being sent, sent, has failed or has
+            been abandoned.
+        attempts: The number of times sending has been tried.
+        next_attempt_at: Unix time before which the message will not be sent.
+        last_error: The error from the last attempt, if it failed.
+        dcid: For a create message which has been sent, the DCID it created.
+    """
+
+    id: int
+    collection: str
+    kind: MessageKind
+    target: str
+    body: dict[str, Any] | None
+    status: MessageStatus
+    attempts: int
+    created_at: float
+    next_attempt_at: float
+    last_error: str | None
+    dcid: int | None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> OutboxMessage:
+        return cls(
+            id=row["id"],
+            collection=row["collection"],
+            kind=MessageKind(row["kind"]),
+            target=row["target"],
+            body=json.loads(row["body"]) if row["body"] is not None else None,
+            status=MessageStatus(row["status"]),
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            next_attempt_at=row["next_attempt_at"],
+            last_error=row["last_error"],
+            dcid=row["dcid"],
+        )
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Whether sending again could not succeed, e.g. the server rejected the body."""
+    if isinstance(error, HTTPError) and error.response is not None:
+        code = error.response.status_code
+        return 400 <= code < 500 and code not in _RETRYABLE_HTTP_CODES
+    return isinstance(error, KeyError | FileNotFoundError | PermissionError)
+
+
+class DcidOutbox:
+    """SQLite backed queue of the notifications to the ssx-dcserver.
+
+    The database can be shared by several processes; each message is claimed before
+    it is sent so that it is only sent once.
+
+    Args:
+        path: Location of the SQLite database, which is created if needed.
+        timeout: Time in s to wait for the server on each request.
+        headers: Returns the headers for each request, e.g. for authorisation. These
+            are never stored in the database.
+        backoff_s: Delay before the first retry, doubling with every failure.
+        max_backoff_s: Longest delay between retries.
+        max_attempts: Attempts after which a message is marked as failed. It can
+            then only be sent by replaying it.
+        poll_interval_s: How often the background worker looks for due messages.
+        clock: Returns the current unix time.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        timeout: float = 10,
+        headers: Callable[[], dict[str, str]] = dict,
+        backoff_s: float = DEFAULT_BACKOFF_S,
+        max_backoff_s: float = MAX_BACKOFF_S,
+        max_attempts: int = MAX_ATTEMPTS,
+        poll_interval_s: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_attempts = max_attempts
+        self.poll_interval_s = poll_interval_s
+        self._headers = headers
+        self._clock = clock
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._worker: threading.Thread | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _insert(
+        self,
+        collection: str,
+        kind: MessageKind,
+        target: str,
+        body: dict[str, Any] | None,
+        claim: bool,
+    ) -> OutboxMessage:
+        now = self._clock()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if kind is not MessageKind.CREATE and not self._has_create(
+                    connection, collection
+                ):
+                    raise OutboxError(
+                        f"Cannot queue {kind} for collection {collection} before its "
+                        "DCID has been requested"
+                    )
+                # Claimed in the same transaction so the worker cannot send it first
+                claimed = claim and not self._has_unsent(connection, collection)
+                cursor = connection.execute(
+                    "INSERT INTO messages (collection, kind, target, body, status, "
+                    "created_at, updated_at, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        collection,
+                        str(kind),
+                        target,
+                        json.dumps(body) if body is not None else None,
+                        MessageStatus.SENDING if claimed else MessageStatus.PENDING,
+                        now,
+                        now,
+                        now,
+                    ),
+                )
+                row = connection.execute(
+                    "SELECT * FROM messages WHERE id = ?", (cursor.lastrowid,)
+                ).fetchone()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return OutboxMessage.from_row(row)
+
+    def enqueue(
+        self,
+        collection: str,
+        kind: MessageKind,
+        target: str,
+        body: dict[str, Any] | None = None,
+    ) -> int:
+        """Persist a message to be sent by the background worker, after the earlier
+        messages of the collection.
+
+        Raises:
+            OutboxError: If the message needs a DCID but no create message has been
+                queued for the collection.
+
+        Returns:
+            The id of the message.
+        """
+        message = self._insert(collection, kind, target, body, claim=False)
+        self._wake.set()
+        return message.id
+
+    def send(
+        self,
+        collection: str,
+        kind: MessageKind,
+        target: str,
+        body: dict[str, Any] | None = None,
+        *,
+        timeout: float | None = None,
+        abandon_on_failure: bool = False,
+    ) -> int | None:
+        """Persist a message and send it immediately, if every earlier message of its
+        collection has been sent. Otherwise it is left for the background worker.
+
+        Args:
+            abandon_on_failure: If sending fails, abandon the message rather than
+                retry it, for when the collection is given up because of the error.
+
+        Raises:
+            OutboxError: If the message needs a DCID but no create message has been
+                queued for the collection.
+            Any error from sending the message, after scheduling the retry.
+
+        Returns:
+            The DCID of the collection, if known.
+        """
+        message = self._insert(collection, kind, target, body, claim=True)
+        try:
+            if message.status is not MessageStatus.SENDING:
+                SSX_LOGGER.info(
+                    "Message %d is queued behind earlier messages of its collection",
+                    message.id,
+                )
+                return self.dcid_for(collection)
+            return self._send(message, timeout, abandon_on_failure)
+        finally:
+            # Only now, so that the worker doesn't take the message from the caller
+            self._wake.set()
+
+    @staticmethod
+    def _has_create(connection: sqlite3.Connection, collection: str) -> bool:
+        return (
+            connection.execute(
+                "SELECT 1 FROM messages WHERE collection = ? AND kind = ? "
+                "AND status != ?",
+                (collection, MessageKind.CREATE, MessageStatus.ABANDONED),
+            ).fetchone()
+            is not None
+        )
+
+    @staticmethod
+    def _has_unsent(connection: sqlite3.Connection, collection: str) -> bool:
+        return (
+            connection.execute(
+                "SELECT 1 FROM messages WHERE collection = ? AND status NOT IN (?, ?)",
+                (collection, MessageStatus.SENT, MessageStatus.ABANDONED),
+            ).fetchone()
+            is not None
+        )
+
+    def has_collection(self, collection: str) -> bool:
+        """Whether a DCID has been requested for the collection."""
+        with closing(self._connect()) as connection:
+            return self._has_create(connection, collection)
+
+    def dcid_for(self, collection: str) -> int | None:
+        """The DCID of the collection, once the server has created it."""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT dcid FROM messages WHERE collection = ? AND kind = ? "
+                "AND status = ?",
+                (collection, MessageKind.CREATE, MessageStatus.SENT),
+            ).fetchone()
+        return row["dcid"] if row else None
+
+    def messages(
+        self,
+        statuses: Iterable[MessageStatus] | None = None,
+        collection: str | None = None,
+    ) -> list[OutboxMessage]:
+        """The messages in the outbox, oldest first."""
+        query, args = "SELECT * FROM messages WHERE 1", []
+        if statuses is not None:
+            statuses = list(statuses)
+            query += f" AND status IN ({', '.join('?' * len(statuses))})"
+            args += [str(s) for s in statuses]
+        if collection is not None:
+            query += " AND collection = ?"
+            args.append(collection)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query + " ORDER BY id", args).fetchall()
+        return [OutboxMessage.from_row(row) for row in rows]
+
+    def unsent(self) -> list[OutboxMessage]:
+        return self.messages(
+            [MessageStatus.PENDING, MessageStatus.SENDING, MessageStatus.FAILED]
+        )
+
+    def replay(self, ids: Sequence[int] | None = None) -> int:
+        """Make pending and failed messages due to be sent now, resetting their
+        attempts. Messages abandoned mid send are replayed too.
+
+        Args:
+            ids: The messages to replay, or None to replay every unsent message.
+
+        Returns:
+            The number of messages replayed.
+        """
+        now = self._clock()
+        query = (
+            "UPDATE messages SET status = ?, attempts = 0, next_attempt_at = ?, "
+            "updated_at = ? WHERE (status IN (?, ?) OR (status = ? AND updated_at < ?))"
+        )
+        args: list[Any] = [
+            MessageStatus.PENDING,
+            now,
+            now,
+            MessageStatus.PENDING,
+            MessageStatus.FAILED,
+            MessageStatus.SENDING,
+            now - STALE_SENDING_S,
+        ]
+        if ids is not None:
+            query += f" AND id IN ({', '.join('?' * len(ids))})"
+            args += list(ids)
+        with closing(self._connect()) as connection:
+            replayed = connection.execute(query, args).rowcount
+        self._wake.set()
+        return replayed
+
+    def _claim(self) -> OutboxMessage | None:
+        now = self._clock()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Recover messages claimed by a process which exited mid send
+                connection.execute(
+                    "UPDATE messages SET status = ? WHERE status = ? AND updated_at < ?",
+                    (
+                        MessageStatus.PENDING,
+                        MessageStatus.SENDING,
+                        now - STALE_SENDING_S,
+                    ),
+                )
+                row = connection.execute(_NEXT_DUE, (now,)).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE messages SET status = ?, updated_at = ? WHERE id = ?",
+                        (MessageStatus.SENDING, now, row["id"]),
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return OutboxMessage.from_row(row) if row is not None else None
+
+    def _deliver(self, message: OutboxMessage, timeout: float) -> int | None:
+        dcid = message.dcid
+        if message.kind is not MessageKind.CREATE:
+            dcid = self.dcid_for(message.collection)
+        match message.kind:
+            case MessageKind.CREATE:
+                response = requests.post(
+                    f"{message.target}/dc",
+                    json=message.body,
+                    timeout=timeout,
+                    headers=self._headers(),
+                )
+                response.raise_for_status()
+                dcid = response.json()["dataCollectionId"]
+                SSX_LOGGER.info("Generated DCID %s", dcid)
+            case MessageKind.UPDATE:
+                SSX_LOGGER.info(
+                    'BRIDGE: PATCH "/dc/%s" --data=%s',
+                    dcid,
+                    repr(json.dumps(message.body)),
+                )
+                response = requests.patch(
+                    f"{message.target}/dc/{dcid}",
+                    json=message.body,
+                    timeout=timeout,
+                    headers=self._headers(),
+                )
+                response.raise_for_status()
+                SSX_LOGGER.info("Successfully updated DCID %s", dcid)
+            case MessageKind.RUN_SCRIPT:
+                command = [message.target, str(dcid)]
+                SSX_LOGGER.info("Running %s", " ".join(command))
+                subprocess.Popen(command)
+        return dcid
+
+    def _send(
+        self,
+        message: OutboxMessage,
+        timeout: float | None = None,
+        abandon_on_failure: bool = False,
+    ) -> int | None:
+        try:
+            dcid = self._deliver(message, self.timeout if timeout is None else timeout)
+        except Exception as e:
+            self._record_failure(message, e, abandon_on_failure)
+            raise
+        now = self._clock()
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE messages SET status = ?, attempts = attempts + 1, "
+                "updated_at = ?, last_error = NULL, dcid = ? WHERE id = ?",
+                (MessageStatus.SENT, now, dcid, message.id),
+            )
+        return dcid
+
+    def _record_failure(
+        self, message: OutboxMessage, error: Exception, abandon: bool = False
+    ) -> None:
+        attempts = message.attempts + 1
+        now = self._clock()
+        response = getattr(error, "response", None)
+        reason = f"{type(error).__name__}: {error}"
+        if response is not None and response.text:
+            reason += f" ({response.text})"
+        if abandon:
+            status, next_attempt_at = MessageStatus.ABANDONED, now
+            SSX_LOGGER.error(
+                "Abandoning %s message %d for collection %s: %s",
+                message.kind,
+                message.id,
+                message.collection,
+                reason,
+            )
+        elif is_permanent_failure(error) or attempts >= self.max_attempts:
+            status, next_attempt_at = MessageStatus.FAILED, now
+            SSX_LOGGER.error(
+                "Giving up on %s message %d for collection %s after %d attempts: %s",
+                message.kind,
+                message.id,
+                message.collection,
+                attempts,
+                reason,
+            )
+        else:
+            delay = min(self.max_backoff_s, self.backoff_s * 2 ** (attempts - 1))
+            status, next_attempt_at = MessageStatus.PENDING, now + delay
+            SSX_LOGGER.warning(
+                "Failed to send %s message %d, retrying in %.0f s: %s",
+                message.kind,
+                message.id,
+                delay,
+                reason,
+            )
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE messages SET status = ?, attempts = ?, updated_at = ?, "
+                "next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, now, next_attempt_at, reason, message.id),
+            )
+
+    def deliver_due(self) -> int:
+        """Send every message which is due, in order within each collection.
+
+        Returns:
+            The number of messages sent.
+        """
+        sent = 0
+        while (message := self._claim()) is not None:
+            try:
+                self._send(message)
+                sent += 1
+            except Exception:
+                # Recorded for retry; later messages of the collection now wait
+                pass
+        return sent
+
+    def _next_attempt_in(self) -> float:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM messages WHERE status = ?",
+                (MessageStatus.PENDING,),
+            ).fetchone()
+        if row["due"] is None:
+            return self.poll_interval_s
+        return min(self.poll_interval_s, max(0.0, row["due"] - self._clock()))
+
+    def _run_worker(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                self.deliver_due()
+                wait_s = self._next_attempt_in()
+            except Exception as e:
+                SSX_LOGGER.exception("Error in DCID outbox worker: %s", e)
+                wait_s = self.poll_interval_s
+            self._wake.wait(wait_s)
+
+    def start(self) -> None:
+        """Start sending messages in a background thread."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stopping.clear()
+        self._worker = threading.Thread(
+            target=self._run_worker, name="dcid-outbox", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the background worker. Unsent messages stay in the outbox."""
+        self._stopping.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+def format_messages(messages: Sequence[OutboxMessage]) -> str:
+    lines = [
+        f"{'ID':>6}  {'COLLECTION':<32}  {'KIND':<10}  {'STATUS':<8}  {'TRIES':>5}  "
+        f"{'NEXT ATTEMPT':<19}  LAST ERROR"
+    ]
+    for m in messages:
+        lines.append(
+            f"{m.id:>6}  {m.collection:<32}  {m.kind:<10}  {m.status:<8}  "
+            f"{m.attempts:>5}  {_format_time(m.next_attempt_at):<19}  "
+            f"{m.last_error or ''}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Inspect and replay notifications to the ssx-dcserver"
+    )
+    parser.add_argument("--db", default=DEFAULT_OUTBOX_LOCATION, help="Outbox database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="List unsent messages")
+    list_parser.add_argument(
+        "--all", action="store_true", help="Include messages which have been sent"
+    )
+    show_parser = commands.add_parser("show", help="Show a message in full")
+    show_parser.add_argument("id", type=int)
+    replay_parser = commands.add_parser(
+        "replay", help="Retry pending and failed messages now"
+    )
+    replay_parser.add_argument(
+        "ids", type=int, nargs="*", help="Messages to replay, by default all unsent"
+    )
+    replay_parser.add_argument(
+        "--send",
+        action="store_true",
+        help="Send the messages from this process rather than leave them to the "
+        "worker of a running collection",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "replay" and args.send:
+        # Only needed to send, and slow to import
+        from mx_bluesky.beamlines.i24.serial.dcid import get_auth_header
+
+        outbox = DcidOutbox(args.db, headers=get_auth_header)
+    else:
+        outbox = DcidOutbox(args.db)
+
+    match args.command:
+        case "list":
+            print(format_messages(outbox.messages() if args.all else outbox.unsent()))
+        case "show":
+            matching = [m for m in outbox.messages() if m.id == args.id]
+            if not matching:
+                print(f"No message {args.id} in {args.db}")
+                return 1
+            message = matching[0]
+            print(format_messages(matching))
+            print(f"Target: {message.target}")
+            print(f"Body: {json.dumps(message.body, indent=2)}")
+        case "replay":
+            replayed = outbox.replay(args.ids or None)
+            print(f"Replayed {replayed} messages")
+            if args.send:
+                print(f"Sent {outbox.deliver_due()} messages")
+                remaining = outbox.unsent()
+                if remaining:
+                    print(format_messages(remaining))
+                    return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
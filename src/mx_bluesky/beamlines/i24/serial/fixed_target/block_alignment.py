@@ -0,0 +1,208 @@
+"""
+Verification of the chip alignment from the block check.
+
+During the block check the stage visits the start of every block on the chip. At
+each block the position reached is recorded and, optionally, an OAV snapshot is
+taken and the fiducial mark at the block start is located in it by template
+matching. The offset of the mark from the beam centre is where the block start
+actually appeared relative to where the coordinate system put it. From these offsets
+an affine correction to the chip coordinate system is suggested.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+DEFAULT_IN_POSITION_TOLERANCE_MM = 0.005
+DEFAULT_MIN_MATCH_SCORE = 0.6
+# The translation alone is suggested if fewer blocks than this were located
+MIN_BLOCKS_FOR_AFFINE_CORRECTION = 3
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    """The best match of a template in an image.
+
+    Attributes:
+        x_px: Column of the centre of the template in the image, to sub-pixel
+            precision.
+        y_px: Row of the centre of the template in the image.
+        score: Normalised correlation coefficient of the match, 1 for a perfect match.
+    """
+
+    x_px: float
+    y_px: float
+    score: float
+
+
+@dataclass(frozen=True)
+class BlockAlignment:
+    """The result of visiting a single block.
+
+    Attributes:
+        block: The block number, as in the pvar file.
+        target_mm: The block start in chip coordinates.
+        reached_mm: The position reached, in chip coordinates.
+        in_position: Whether the readback was within tolerance of the target.
+        match: The fiducial mark found on the OAV, if the OAV was used.
+        offset_mm: Offset in chip coordinates of the fiducial mark from the beam
+            centre, or None if the mark was not found.
+    """
+
+    block: str
+    target_mm: tuple[float, float]
+    reached_mm: tuple[float, float]
+    in_position: bool
+    match: TemplateMatch | None = None
+    offset_mm: tuple[float, float] | None = None
+
+
+@dataclass(frozen=True)
+class AlignmentCorrection:
+    """Suggested correction to the chip coordinate system, which maps the nominal
+    block starts onto the positions they were found at.
+
+    Attributes:
+        translation_mm: Shift of the chip origin.
+        rotation_deg: Rotation of the chip about the beam axis.
+        scale: Scale of the chip x and y axes.
+        rms_residual_mm: RMS distance of the located blocks from their corrected
+            positions.
+        num_blocks: The number of blocks the correction was fitted to.
+    """
+
+    translation_mm: tuple[float, float]
+    rotation_deg: float
+    scale: tuple[float, float]
+    rms_residual_mm: float
+    num_blocks: int
+
+
+def load_greyscale_image(path: str | Path) -> np.ndarray:
+    with Image.open(path) as image:
+        return np.asarray(image.convert("L"))
+
+
+def _subpixel_peak(values: np.ndarray, index: int) -> float:
+    # Vertex of the parabola through the peak and its neighbours
+    if index == 0 or index == len(values) - 1:
+        return float(index)
+    left, centre, right = values[index - 1 : index + 2]
+    curvature = left - 2 * centre + right
+    if curvature >= 0:
+        return float(index)
+    return index + 0.5 * float(left - right) / float(curvature)
+
+
+def locate_template(image: np.ndarray, template: np.ndarray) -> TemplateMatch:
+    """Find the best match of the template in the image by normalised cross
+    correlation.
+
+    Raises:
+        ValueError: If the template is larger than the image.
+    """
+    if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+        raise ValueError(
+            f"Template of shape {template.shape} is larger than image of shape "
+            f"{image.shape}"
+        )
+    correlation = cv.matchTemplate(
+        image.astype(np.float32), template.astype(np.float32), cv.TM_CCOEFF_NORMED
+    )
+    row, column = np.unravel_index(np.argmax(correlation), correlation.shape)
+    height, width = template.shape[:2]
+    return TemplateMatch(
+        x_px=_subpixel_peak(correlation[row, :], int(column)) + (width - 1) / 2,
+        y_px=_subpixel_peak(correlation[:, column], int(row)) + (height - 1) / 2,
+        score=float(correlation[row, column]),
+    )
+
+
+def fit_alignment_correction(
+    blocks: Sequence[BlockAlignment],
+) -> AlignmentCorrection | None:
+    """Fit a correction to the blocks whose fiducial mark was located.
+
+    With fewer than MIN_BLOCKS_FOR_AFFINE_CORRECTION blocks, or blocks which all lie
+    on a line, only the mean offset is suggested.
+
+    Returns:
+        The correction, or None if no blocks were located.
+    """
+    located = [b for b in blocks if b.offset_mm is not None]
+    if not located:
+        return None
+    nominal = np.array([b.target_mm for b in located], dtype=float)
+    found = nominal + np.array([b.offset_mm for b in located], dtype=float)
+
+    design = np.column_stack([nominal, np.ones(len(located))])
+    if (
+        len(located) >= MIN_BLOCKS_FOR_AFFINE_CORRECTION
+        and np.linalg.matrix_rank(design) == 3
+    ):
+        solution, *_ = np.linalg.lstsq(design, found, rcond=None)
+        axes, translation = solution[:2].T, solution[2]
+    else:
+        axes, translation = np.eye(2), np.mean(found - nominal, axis=0)
+
+    residuals = np.linalg.norm(nominal @ axes.T + translation - found, axis=1)
+    scale_x, scale_y = np.linalg.norm(axes, axis=0)
+    rotation = np.arctan2(axes[1, 0] - axes[0, 1], axes[0, 0] + axes[1, 1])
+    return AlignmentCorrection(
+        translation_mm=(float(translation[0]), float(translation[1])),
+        rotation_deg=float(np.degrees(rotation)),
+        scale=(float(scale_x), float(scale_y)),
+        rms_residual_mm=float(np.sqrt(np.mean(np.square(residuals)))),
+        num_blocks=len(located),
+    )
+
+
+@dataclass(frozen=True)
+class BlockCheckReport:
+    """The per block results of a block check.
+
+    Attributes:
+        blocks: The blocks visited, in order.
+        aborted: Whether the block check was aborted before visiting every block.
+    """
+
+    blocks: tuple[BlockAlignment, ...]
+    aborted: bool = False
+
+    @property
+    def correction(self) -> AlignmentCorrection | None:
+        return fit_alignment_correction(self.blocks)
+
+    def format(self) -> str:
+        lines = ["Block  target (mm)      reached (mm)     offset (mm)      score"]
+        for b in self.blocks:
+            flag = " " if b.in_position else "*"
+            offset = (
+                f"{b.offset_mm[0]:+7.4f} {b.offset_mm[1]:+7.4f}"
+                if b.offset_mm is not None
+                else f"{'not found' if b.match else '-':<15}"
+            )
+            lines.append(
+                f"{b.block:<6} {b.target_mm[0]:7.3f} {b.target_mm[1]:7.3f}  "
+                f"{b.reached_mm[0]:7.3f} {b.reached_mm[1]:7.3f}{flag} "
+                f"{offset}  {b.match.score if b.match else float('nan'):.2f}"
+            )
+        not_in_position = sum(not b.in_position for b in self.blocks)
+        if not_in_position:
+            lines.append(f"* {not_in_position} blocks were not reached")
+        if self.aborted:
+            lines.append("Block check was aborted")
+        if correction := self.correction:
+            lines.append(
+                f"Suggested correction from {correction.num_blocks} blocks: shift "
+                f"({correction.translation_mm[0]:+.4f}, "
+                f"{correction.translation_mm[1]:+.4f}) mm, rotation "
+                f"{correction.rotation_deg:+.4f} deg, scale "
+                f"({correction.scale[0]:.5f}, {correction.scale[1]:.5f}), residual "
+                f"{correction.rms_residual_mm:.4f} mm"
+            )
+        return "\n".join(lines)
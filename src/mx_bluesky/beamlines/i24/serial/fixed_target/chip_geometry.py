@@ -0,0 +1,364 @@
+"""
+Geometry of a fixed target chip, mapping between well addresses, block and window
+indices and positions on the chip.
+
+A chip is a grid of blocks, each of which is a grid of windows (wells). A well
+address is made of the block name, a letter for the block row and a number for the
+block column, and the window name, a letter for the window row and one for the window
+column, e.g. "B3_ca". Positions are in mm from the first window of the first block.
+
+All the mappings operate on NumPy arrays so that the whole chip can be handled in a
+single call.
+"""
+
+import string
+from dataclasses import dataclass
+from enum import StrEnum
+from functools import cached_property
+
+import numpy as np
+
+from mx_bluesky.beamlines.i24.serial.parameters import ChipDescription
+
+BLOCK_ROW_NAMES = string.ascii_uppercase
+WINDOW_NAMES = string.ascii_lowercase + string.ascii_uppercase + "0"
+
+
+def _name_index(names: str) -> np.ndarray:
+    """Lookup table from a character code to the index of the character in names."""
+    index = np.full(128, -1)
+    index[[ord(name) for name in names]] = np.arange(len(names))
+    return index
+
+
+_BLOCK_ROW_INDEX = _name_index(BLOCK_ROW_NAMES)
+_WINDOW_INDEX = _name_index(WINDOW_NAMES)
+
+
+def _char_codes(strings: np.ndarray, length: int) -> np.ndarray:
+    """The character codes of the first length characters of each string."""
+    fixed = np.char.ljust(strings, length).astype(f"<U{length}")
+    return np.clip(fixed.view(np.uint32).reshape(*strings.shape, length), 0, 127)
+
+
+class Traversal(StrEnum):
+    """Order in which the cells of a grid are visited.
+
+    TYPEWRITER visits each line in the same direction, SNAKE reverses the direction
+    on alternate lines.
+    """
+
+    TYPEWRITER = "typewriter"
+    SNAKE = "snake"
+
+
+def _grid_order(
+    num_lines: int, line_length: int, traversal: Traversal
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the line index and the index along the line of each cell of a grid, in
+    the order they are visited."""
+    lines, along = np.divmod(np.arange(num_lines * line_length), line_length)
+    if traversal == Traversal.SNAKE:
+        along = np.where(lines % 2 == 1, line_length - 1 - along, along)
+    return lines, along
+
+
+@dataclass(frozen=True)
+class ChipIndices:
+    """Block and window indices of a set of wells, each an array of the same shape."""
+
+    block_row: np.ndarray
+    block_column: np.ndarray
+    window_row: np.ndarray
+    window_column: np.ndarray
+
+
+@dataclass(frozen=True)
+class CollectionOrder:
+    """The wells of a chip in the order they are collected.
+
+    Attributes:
+        geometry: The chip collected.
+        indices: Block and window indices of each well in collection order.
+        addresses: Address of each well in collection order.
+        x_mm: Position of each well in collection order.
+        y_mm: Position of each well in collection order.
+        block_numbers: The 1-based block number, as used in the chip map, of each
+            well in collection order.
+    """
+
+    geometry: "ChipGeometry"
+    indices: ChipIndices
+    addresses: np.ndarray
+    x_mm: np.ndarray
+    y_mm: np.ndarray
+    block_numbers: np.ndarray
+
+    @cached_property
+    def _image_of_well(self) -> np.ndarray:
+        image_of_well = np.full(self.geometry.num_wells, -1)
+        image_of_well[self.geometry.well_index(self.indices)] = np.arange(
+            len(self.addresses)
+        )
+        return image_of_well
+
+    def image_index(self, addresses: np.ndarray | list[str]) -> np.ndarray:
+        """The 0-based index in the collection of the image of each given address.
+
+        Raises:
+            KeyError: If any address is not collected.
+        """
+        images = self._image_of_well[
+            self.geometry.well_index(self.geometry.indices(addresses))
+        ]
+        if np.any(images < 0):
+            raise KeyError(f"Addresses not collected in {addresses}")
+        return images
+
+
+@dataclass(frozen=True)
+class ChipGeometry:
+    """The layout of the blocks and windows on a chip.
+
+    Attributes:
+        x_blocks: Number of block columns.
+        y_blocks: Number of block rows.
+        x_num_steps: Number of window columns in each block.
+        y_num_steps: Number of window rows in each block.
+        x_step_size: Distance between window columns, in mm.
+        y_step_size: Distance between window rows, in mm.
+        x_block_size: Distance between block columns, in mm.
+        y_block_size: Distance between block rows, in mm.
+    """
+
+    x_blocks: int
+    y_blocks: int
+    x_num_steps: int
+    y_num_steps: int
+    x_step_size: float
+    y_step_size: float
+    x_block_size: float
+    y_block_size: float
+
+    @classmethod
+    def from_chip(cls, chip: ChipDescription) -> "ChipGeometry":
+        return cls(
+            x_blocks=chip.x_blocks,
+            y_blocks=chip.y_blocks,
+            x_num_steps=chip.x_num_steps,
+            y_num_steps=chip.y_num_steps,
+            x_step_size=chip.x_step_size,
+            y_step_size=chip.y_step_size,
+            x_block_size=chip.x_block_size,
+            y_block_size=chip.y_block_size,
+        )
+
+    def __post_init__(self):
+        if self.y_blocks > len(BLOCK_ROW_NAMES):
+            raise ValueError(f"At most {len(BLOCK_ROW_NAMES)} block rows are named")
+        if max(self.x_num_steps, self.y_num_steps) > len(WINDOW_NAMES):
+            raise ValueError(f"At most {len(WINDOW_NAMES)} windows per row are named")
+
+    @property
+    def num_blocks(self) -> int:
+        return self.x_blocks * self.y_blocks
+
+    @property
+    def windows_per_block(self) -> int:
+        return self.x_num_steps * self.y_num_steps
+
+    @property
+    def num_wells(self) -> int:
+        return self.num_blocks * self.windows_per_block
+
+    def block_indices(
+        self, traversal: Traversal = Traversal.SNAKE
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Row and column of each block, ordered by block number.
+
+        Blocks are numbered down each block column in turn, by default snaking so
+        that alternate columns are numbered from the bottom up.
+        """
+        columns, rows = _grid_order(self.x_blocks, self.y_blocks, traversal)
+        return rows, columns
+
+    def block_numbers(
+        self,
+        block_row: np.ndarray,
+        block_column: np.ndarray,
+        traversal: Traversal = Traversal.SNAKE,
+    ) -> np.ndarray:
+        """The 1-based block number of each block, see block_indices."""
+        block_row, block_column = np.asarray(block_row), np.asarray(block_column)
+        along = block_row
+        if traversal == Traversal.SNAKE:
+            along = np.where(
+                block_column % 2 == 1, self.y_blocks - 1 - block_row, block_row
+            )
+        return block_column * self.y_blocks + along + 1
+
+    def block_names(
+        self, block_row: np.ndarray, block_column: np.ndarray
+    ) -> np.ndarray:
+        rows = np.array(list(BLOCK_ROW_NAMES))[np.asarray(block_row)]
+        return np.char.add(rows, (np.asarray(block_column) + 1).astype(str))
+
+    def addresses(self, indices: ChipIndices) -> np.ndarray:
+        """The address of each well, e.g. "B3_ca"."""
+        windows = np.array(list(WINDOW_NAMES))
+        window_names = np.char.add(
+            windows[indices.window_row], windows[indices.window_column]
+        )
+        return np.char.add(
+            np.char.add(self.block_names(indices.block_row, indices.block_column), "_"),
+            window_names,
+        )
+
+    def indices(self, addresses: np.ndarray | list[str]) -> ChipIndices:
+        """The block and window indices of each address.
+
+        Raises:
+            ValueError: If an address is malformed or outside the chip.
+        """
+        addresses = np.asarray(addresses, dtype=str)
+        blocks, separators, windows = np.moveaxis(
+            np.char.partition(addresses, "_"), -1, 0
+        )
+        block_columns = np.char.lstrip(blocks, BLOCK_ROW_NAMES)
+        if (
+            np.any(separators != "_")
+            or np.any(np.char.str_len(windows) != 2)
+            or np.any(np.char.str_len(blocks) - np.char.str_len(block_columns) != 1)
+            or not np.all(np.char.isdigit(block_columns))
+        ):
+            raise ValueError(f"Malformed addresses in {addresses}")
+        window_codes = _char_codes(windows, 2)
+        block_row = _BLOCK_ROW_INDEX[_char_codes(blocks, 1)[..., 0]]
+        block_column = block_columns.astype(int) - 1
+        window_row = _WINDOW_INDEX[window_codes[..., 0]]
+        window_column = _WINDOW_INDEX[window_codes[..., 1]]
+        indices = ChipIndices(block_row, block_column, window_row, window_column)
+        if not self._contains(indices):
+            raise ValueError(f"Addresses outside the chip in {addresses}")
+        return indices
+
+    def _contains(self, indices: ChipIndices) -> bool:
+        return bool(
+            np.all((indices.block_row >= 0) & (indices.block_row < self.y_blocks))
+            and np.all(
+                (indices.block_column >= 0) & (indices.block_column < self.x_blocks)
+            )
+            and np.all(
+                (indices.window_row >= 0) & (indices.window_row < self.y_num_steps)
+            )
+            and np.all(
+                (indices.window_column >= 0)
+                & (indices.window_column < self.x_num_steps)
+            )
+        )
+
+    def positions_mm(self, indices: ChipIndices) -> tuple[np.ndarray, np.ndarray]:
+        """The (x, y) position of each well in mm from the first well of the chip."""
+        x_mm = (
+            indices.block_column * self.x_block_size
+            + indices.window_column * self.x_step_size
+        )
+        y_mm = (
+            indices.block_row * self.y_block_size
+            + indices.window_row * self.y_step_size
+        )
+        return x_mm, y_mm
+
+    def well_index(self, indices: ChipIndices) -> np.ndarray:
+        """A unique 0-based index of each well on the chip."""
+        return np.ravel_multi_index(
+            (
+                indices.block_row,
+                indices.block_column,
+                indices.window_row,
+                indices.window_column,
+            ),
+            (self.y_blocks, self.x_blocks, self.y_num_steps, self.x_num_steps),
+        )
+
+    def collection_order(
+        self,
+        blocks: list[int] | None = None,
+        block_traversal: Traversal = Traversal.SNAKE,
+        window_traversal: Traversal = Traversal.SNAKE,
+        per_block: bool = True,
+    ) -> CollectionOrder:
+        """The wells of the chip in the order they are collected.
+
+        Args:
+            blocks (list[int], optional): The 1-based numbers of the blocks to collect,
+                e.g. a chip map. Defaults to all the blocks.
+            block_traversal (Traversal, optional): How the blocks are numbered, see
+                block_indices. Defaults to snake.
+            window_traversal (Traversal, optional): How the windows are visited, row
+                by row. Defaults to snake.
+            per_block (bool, optional): If True, each block is collected in turn, in
+                the order given by blocks. Otherwise the rows of windows are
+                traversed across the whole chip, skipping any blocks not collected.
+                Defaults to True.
+        """
+        block_rows, block_columns = self.block_indices(block_traversal)
+        block_numbers = (
+            np.arange(1, self.num_blocks + 1) if blocks is None else np.asarray(blocks)
+        )
+        if per_block:
+            window_rows, window_columns = _grid_order(
+                self.y_num_steps, self.x_num_steps, window_traversal
+            )
+            block_index = np.repeat(block_numbers - 1, len(window_rows))
+            indices = ChipIndices(
+                block_row=block_rows[block_index],
+                block_column=block_columns[block_index],
+                window_row=np.tile(window_rows, len(block_numbers)),
+                window_column=np.tile(window_columns, len(block_numbers)),
+            )
+        else:
+            rows, columns = _grid_order(
+                self.y_blocks * self.y_num_steps,
+                self.x_blocks * self.x_num_steps,
+                window_traversal,
+            )
+            block_row, window_row = np.divmod(rows, self.y_num_steps)
+            block_column, window_column = np.divmod(columns, self.x_num_steps)
+            block_index = (
+                self.block_numbers(block_row, block_column, block_traversal) - 1
+            )
+            collected = np.isin(block_index, block_numbers - 1)
+            block_index = block_index[collected]
+            indices = ChipIndices(
+                block_row=block_row[collected],
+                block_column=block_column[collected],
+                window_row=window_row[collected],
+                window_column=window_column[collected],
+            )
+        x_mm, y_mm = self.positions_mm(indices)
+        return CollectionOrder(
+            geometry=self,
+            indices=indices,
+            addresses=self.addresses(indices),
+            x_mm=x_mm,
+            y_mm=y_mm,
+            block_numbers=block_index + 1,
+        )
+
+    def alphanumeric_addresses(self) -> np.ndarray:
+        """All the well addresses of the chip, with blocks in typewriter order by
+        block row and windows in typewriter order by window row."""
+        block_rows, block_columns = _grid_order(
+            self.x_blocks, self.x_blocks, Traversal.TYPEWRITER
+        )
+        window_rows, window_columns = _grid_order(
+            self.x_num_steps, self.x_num_steps, Traversal.TYPEWRITER
+        )
+        indices = ChipIndices(
+            block_row=np.repeat(block_rows, len(window_rows)),
+            block_column=np.repeat(block_columns, len(window_rows)),
+            window_row=np.tile(window_rows, len(block_rows)),
+            window_column=np.tile(window_columns, len(block_rows)),
+        )
+        return self.addresses(indices)
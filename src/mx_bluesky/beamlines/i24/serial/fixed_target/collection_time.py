@@ -0,0 +1,326 @@
+"""
+Timing model of a fixed target chip collection, to estimate how long a collection
+will take before it is started.
+
+The collection is modelled as a sequence of visits to the windows of the chip, in
+the order given by the chip geometry. At each visit the laser pumps the window, the
+X-rays probe it, or both. Between visits the stages move, taking a time given by a
+trapezoidal velocity profile plus a settle time.
+
+In the repeat pump probe settings the windows are pumped in chunks: every window of
+a chunk is pumped, then the stages return to the start of the chunk and probe each
+window in turn, giving a pump probe delay of roughly the time to visit the chunk
+twice. Run as a script to estimate the duration of the collection described by a
+parameter file::
+
+    python -m mx_bluesky.beamlines.i24.serial.fixed_target.collection_time params.json
+"""
+
+import argparse
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.chip_geometry import ChipGeometry
+from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import (
+    MappingType,
+    PumpProbeSetting,
+)
+from mx_bluesky.beamlines.i24.serial.parameters import (
+    ChipDescription,
+    FixedTargetParameters,
+)
+
+# Number of rows of windows pumped before they are probed, for the repeat settings
+REPEAT_ROWS = {
+    PumpProbeSetting.Repeat1: 2,
+    PumpProbeSetting.Repeat2: 4,
+    PumpProbeSetting.Repeat3: 6,
+    PumpProbeSetting.Repeat5: 10,
+    PumpProbeSetting.Repeat10: 20,
+}
+# Number of windows pumped before they are probed, for the short repeat settings
+SHORT_REPEAT_WINDOWS = {
+    PumpProbeSetting.ShortRepeat1: 2 * 2,
+    PumpProbeSetting.ShortRepeat2: 2 * 4,
+    PumpProbeSetting.ShortRepeat3: 4 * 4,
+    PumpProbeSetting.ShortRepeat4: 5 * 5,
+}
+# Time for the fast shutter to open before each probe in Medium1, see
+# load_motion_program_data
+MEDIUM1_SHUTTER_OPEN_S = 0.05
+
+
+@dataclass(frozen=True)
+class MotionModel:
+    """Time taken by the chip stages to move between windows.
+
+    Each axis accelerates at a constant rate up to its maximum velocity, and the
+    axes move simultaneously. The defaults give a move between neighbouring windows
+    of an Oxford chip of 0.014 s.
+
+    Attributes:
+        acceleration_mm_s2: Acceleration of each axis.
+        max_velocity_mm_s: Maximum velocity of each axis.
+        settle_time_s: Time to settle after each move.
+    """
+
+    acceleration_mm_s2: float = 5000.0
+    max_velocity_mm_s: float = 40.0
+    settle_time_s: float = 0.004
+
+    def move_time_s(
+        self, dx_mm: np.ndarray | float, dy_mm: np.ndarray | float
+    ) -> np.ndarray:
+        """The time for each of the given moves, zero for no move."""
+        distance = np.maximum(np.abs(dx_mm), np.abs(dy_mm))
+        # Distance travelled while accelerating to, then decelerating from, full speed
+        ramp_mm = self.max_velocity_mm_s**2 / self.acceleration_mm_s2
+        travel_s = np.where(
+            distance < ramp_mm,
+            2 * np.sqrt(distance / self.acceleration_mm_s2),
+            distance / self.max_velocity_mm_s
+            + self.max_velocity_mm_s / self.acceleration_mm_s2,
+        )
+        return np.where(distance > 0, travel_s + self.settle_time_s, 0.0)
+
+
+@dataclass(frozen=True)
+class CollectionSettings:
+    """The settings of a fixed target collection which determine how long it takes.
+
+    Attributes:
+        chip: The chip collected.
+        blocks: The 1-based numbers of the blocks collected, in order.
+        exposure_time_s: Duration of each X-ray exposure.
+        num_exposures: Number of exposures of each window.
+        pump_repeat: The pump probe setting.
+        laser_dwell_s: Duration of the laser pump.
+        laser_delay_s: Delay between the end of the pump and the probe, for the
+            settings which probe each window immediately after pumping it.
+        pre_pump_exposure_s: For Short2, the time from the start of the pump to the
+            start of the probe.
+        checker_pattern: If True, only alternate windows are pumped.
+    """
+
+    chip: ChipDescription
+    blocks: tuple[int, ...]
+    exposure_time_s: float
+    num_exposures: int = 1
+    pump_repeat: PumpProbeSetting = PumpProbeSetting.NoPP
+    laser_dwell_s: float = 0.0
+    laser_delay_s: float = 0.0
+    pre_pump_exposure_s: float = 0.0
+    checker_pattern: bool = False
+
+    @classmethod
+    def from_parameters(cls, parameters: FixedTargetParameters) -> "CollectionSettings":
+        if parameters.map_type == MappingType.Lite:
+            blocks = tuple(parameters.chip_map)
+        else:
+            blocks = tuple(range(1, parameters.chip.tot_num_blocks + 1))
+        return cls(
+            chip=parameters.chip,
+            blocks=blocks,
+            exposure_time_s=parameters.exposure_time_s,
+            num_exposures=parameters.num_exposures,
+            pump_repeat=parameters.pump_repeat,
+            laser_dwell_s=parameters.laser_dwell_s,
+            laser_delay_s=parameters.laser_delay_s,
+            pre_pump_exposure_s=parameters.pre_pump_exposure_s or 0.0,
+            checker_pattern=parameters.checker_pattern,
+        )
+
+
+@dataclass(frozen=True)
+class CollectionTimeline:
+    """The predicted timeline of a collection, with times in seconds from the start.
+
+    Windows are in collection order, as given by ChipGeometry.collection_order. Pump
+    times are NaN for windows which are not pumped.
+
+    Attributes:
+        addresses: Address of each window.
+        pump_start_s: Time at which the pump of each window starts.
+        pump_end_s: Time at which the pump of each window ends.
+        probe_start_s: Time at which the first exposure of each window starts.
+        probe_end_s: Time at which the last exposure of each window ends.
+    """
+
+    addresses: np.ndarray
+    pump_start_s: np.ndarray
+    pump_end_s: np.ndarray
+    probe_start_s: np.ndarray
+    probe_end_s: np.ndarray
+
+    @property
+    def total_s(self) -> float:
+        return float(self.probe_end_s.max(initial=0.0))
+
+    @property
+    def pump_probe_delay_s(self) -> np.ndarray:
+        """Time from the end of the pump to the start of the probe of each window."""
+        return self.probe_start_s - self.pump_end_s
+
+
+def _chunk_windows(settings: CollectionSettings) -> int | None:
+    if settings.pump_repeat in REPEAT_ROWS:
+        return REPEAT_ROWS[settings.pump_repeat] * settings.chip.x_num_steps
+    return SHORT_REPEAT_WINDOWS.get(settings.pump_repeat)
+
+
+def nominal_pump_probe_delay_s(
+    pump_repeat: PumpProbeSetting,
+    exposure_time_s: float,
+    laser_dwell_s: float,
+    move_time_s: float,
+    windows_per_row: int = 20,
+) -> float:
+    """The approximate delay between pump and probe for a repeat pump probe setting,
+    assuming that every move takes the same time.
+
+    Raises:
+        ValueError: If the setting does not pump in chunks.
+    """
+    if pump_repeat in REPEAT_ROWS:
+        chunk = REPEAT_ROWS[pump_repeat] * windows_per_row
+    elif pump_repeat in SHORT_REPEAT_WINDOWS:
+        chunk = SHORT_REPEAT_WINDOWS[pump_repeat]
+    else:
+        raise ValueError(f"{pump_repeat} does not pump windows in chunks")
+    return chunk * (move_time_s + (laser_dwell_s + exposure_time_s) / 2)
+
+
+def simulate_collection(
+    settings: CollectionSettings, motion: MotionModel | None = None
+) -> CollectionTimeline:
+    """Predict the timeline of a collection with the given settings."""
+    motion = motion or MotionModel()
+    order = ChipGeometry.from_chip(settings.chip).collection_order(
+        list(settings.blocks)
+    )
+    num_windows = len(order.addresses)
+    windows = np.arange(num_windows)
+    probe_s = settings.num_exposures * settings.exposure_time_s
+    pumped = np.full(num_windows, settings.pump_repeat != PumpProbeSetting.NoPP)
+    if settings.checker_pattern:
+        pumped &= (order.indices.window_row + order.indices.window_column) % 2 == 0
+
+    # Each visit pumps (0) or probes (1) a window. The probe of a window may start a
+    # given time after the start of the visit, which may overlap a preceding pump
+    chunk = _chunk_windows(settings)
+    if chunk:
+        # Pump every window of a chunk, then probe every window of the chunk. Chunks
+        # do not span blocks, so the last chunk of a block may be smaller
+        windows_per_block = settings.chip.x_num_steps * settings.chip.y_num_steps
+        block, in_block = np.divmod(windows, windows_per_block)
+        chunk_of_window = block * windows_per_block + in_block // chunk
+        visit_window = np.concatenate([windows[pumped], windows])
+        kind = np.concatenate([np.zeros(pumped.sum(), int), np.ones(num_windows, int)])
+        visit_order = np.lexsort((visit_window, kind, chunk_of_window[visit_window]))
+        visit_window, kind = visit_window[visit_order], kind[visit_order]
+        duration = np.where(kind == 0, settings.laser_dwell_s, probe_s)
+        offset = np.zeros(len(kind))
+    elif settings.pump_repeat == PumpProbeSetting.NoPP:
+        visit_window, kind = windows, np.ones(num_windows, int)
+        duration, offset = np.full(num_windows, probe_s), np.zeros(num_windows)
+    else:
+        # Each window is pumped, if it is in the pattern, then probed
+        kind = np.tile([0, 1], num_windows)
+        visited = (kind == 1) | np.repeat(pumped, 2)
+        visit_window, kind = np.repeat(windows, 2)[visited], kind[visited]
+        duration = np.where(kind == 0, settings.laser_dwell_s, probe_s)
+        offset = np.zeros(len(kind))
+        after_pump = (kind == 1) & pumped[visit_window]
+        match settings.pump_repeat:
+            case PumpProbeSetting.Short2:
+                # The probe starts during the pump, and lasts until the pump has ended
+                offset[after_pump] = (
+                    settings.pre_pump_exposure_s - settings.laser_dwell_s
+                )
+                duration[after_pump] = np.maximum(
+                    probe_s, settings.laser_dwell_s - settings.pre_pump_exposure_s
+                )
+            case PumpProbeSetting.Medium1:
+                offset[after_pump] = settings.laser_delay_s + MEDIUM1_SHUTTER_OPEN_S
+            case _:
+                offset[after_pump] = settings.laser_delay_s
+
+    x_mm, y_mm = order.x_mm[visit_window], order.y_mm[visit_window]
+    moves_s = motion.move_time_s(np.diff(x_mm, prepend=0.0), np.diff(y_mm, prepend=0.0))
+    # Each visit starts once the previous one has finished and the stages have moved
+    previous_s = np.zeros_like(duration)
+    previous_s[1:] = duration[:-1]
+    start_s = np.cumsum(moves_s + offset + previous_s)
+    end_s = start_s + duration
+
+    pump_start_s = np.full(num_windows, np.nan)
+    pump_end_s = np.full(num_windows, np.nan)
+    probe_start_s = np.empty(num_windows)
+    probe_end_s = np.empty(num_windows)
+    is_pump = kind == 0
+    pump_start_s[visit_window[is_pump]] = start_s[is_pump]
+    pump_end_s[visit_window[is_pump]] = end_s[is_pump]
+    probe_start_s[visit_window[~is_pump]] = start_s[~is_pump]
+    probe_end_s[visit_window[~is_pump]] = end_s[~is_pump]
+    return CollectionTimeline(
+        addresses=order.addresses,
+        pump_start_s=pump_start_s,
+        pump_end_s=pump_end_s,
+        probe_start_s=probe_start_s,
+        probe_end_s=probe_end_s,
+    )
+
+
+def format_estimate(timeline: CollectionTimeline) -> str:
+    lines = [
+        f"Estimated collection time: {timeline.total_s:.1f} s "
+        f"for {len(timeline.addresses)} windows"
+    ]
+    delays = timeline.pump_probe_delay_s[~np.isnan(timeline.pump_probe_delay_s)]
+    if len(delays):
+        lines.append(
+            f"Pump probe delay: {delays.min():.4f} s to {delays.max():.4f} s, "
+            f"mean {delays.mean():.4f} s"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None):
+    defaults = MotionModel()
+    parser = argparse.ArgumentParser(
+        description="Estimate the duration of a fixed target collection."
+    )
+    parser.add_argument(
+        "parameters", type=Path, help="Fixed target parameter file, as json"
+    )
+    parser.add_argument(
+        "--acceleration",
+        type=float,
+        default=defaults.acceleration_mm_s2,
+        help="Stage acceleration, in mm/s^2",
+    )
+    parser.add_argument(
+        "--max-velocity",
+        type=float,
+        default=defaults.max_velocity_mm_s,
+        help="Maximum stage velocity, in mm/s",
+    )
+    parser.add_argument(
+        "--settle-time",
+        type=float,
+        default=defaults.settle_time_s,
+        help="Time for the stages to settle after each move, in s",
+    )
+    args = parser.parse_args(argv)
+    settings = CollectionSettings.from_parameters(
+        FixedTargetParameters.from_file(args.parameters)
+    )
+    motion = MotionModel(args.acceleration, args.max_velocity, args.settle_time)
+    print(format_estimate(simulate_collection(settings, motion)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Least-squares fit of the chip coordinate system from measured fiducials.
+
+The stage position of each fiducial, measured relative to fiducial 0 (the chip
+origin), is modelled as a linear function of its nominal position on the chip:
+
+    measured = A @ [x, y]
+
+where A is a 3x2 matrix whose columns are the chip x and y axes in stage coordinates.
+These include the rotation, scale and skew of the chip on the stage, so no hand
+tuned scale or skew factors are needed. Two fiducials determine A exactly; any more
+allow the fit to be checked and badly measured fiducials to be rejected.
+"""
+
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import ChipType
+
+# Distance from fiducial 0 to fiducials 1 (along x) and 2 (along y) for each chip
+FIDUCIAL_SPACING_MM: dict[ChipType, tuple[float, float]] = {
+    ChipType.Oxford: (25.400, 25.400),
+    ChipType.OxfordInner: (24.600, 24.600),
+    ChipType.Custom: (25.400, 25.400),
+    ChipType.Minichip: (18.25, 18.25),
+}
+
+DEFAULT_COUNTS_PER_MM = 10000.0
+DEFAULT_OUTLIER_TOLERANCE_MM = 0.05
+MAX_CONDITION_NUMBER = 100.0
+
+_NUMBER = r"([+-]?\d+(?:\.\d*)?)"
+_CS_STRING = re.compile(rf"#\d+->{_NUMBER}X{_NUMBER}Y{_NUMBER}Z")
+
+
+@dataclass(frozen=True)
+class MeasuredFiducial:
+    """A fiducial with its nominal position on the chip and the stage position it
+    was measured at, both in mm relative to fiducial 0."""
+
+    nominal_mm: tuple[float, float]
+    measured_mm: tuple[float, float, float]
+
+
+@dataclass(frozen=True)
+class ChipCoordinateSystem:
+    """The result of fitting the chip coordinate system.
+
+    Attributes:
+        matrix: 3x3 matrix mapping chip coordinates in mm to stage coordinates in mm.
+            The third column is the unit normal to the chip.
+        scale: The length of the chip x and y axes in stage mm per chip mm.
+        skew_deg: The deviation of the angle between the chip axes from 90 degrees.
+        rotation_deg: Rotations about x, y and z, applied in the order z, y, x, of
+            the orthonormal frame closest to the fitted axes.
+        residuals_mm: Distance from each fiducial to its fitted position, including
+            rejected fiducials.
+        rejected: Indices of the fiducials rejected as outliers.
+        condition_number: Condition number of the nominal fiducial positions. Large
+            values mean the fiducials are close to collinear and the fit is poorly
+            constrained.
+    """
+
+    matrix: np.ndarray
+    scale: tuple[float, float]
+    skew_deg: float
+    rotation_deg: tuple[float, float, float]
+    residuals_mm: tuple[float, ...]
+    rejected: tuple[int, ...]
+    condition_number: float
+
+    @property
+    def rms_residual_mm(self) -> float:
+        inliers = [r for i, r in enumerate(self.residuals_mm) if i not in self.rejected]
+        return float(np.sqrt(np.mean(np.square(inliers))))
+
+
+def nominal_fiducials(chip_type: ChipType) -> list[tuple[float, float]]:
+    """Nominal positions of fiducials 1 and 2 of a chip."""
+    spacing_x, spacing_y = FIDUCIAL_SPACING_MM[chip_type]
+    return [(spacing_x, 0.0), (0.0, spacing_y)]
+
+
+def _fit_axes(nominal: np.ndarray, measured: np.ndarray) -> np.ndarray:
+    axes, *_ = np.linalg.lstsq(nominal, measured, rcond=None)
+    return axes.T
+
+
+def _leave_one_out_errors(
+    nominal: np.ndarray, measured: np.ndarray, indices: list[int]
+) -> dict[int, float]:
+    errors = {}
+    for i in indices:
+        others = [j for j in indices if j != i]
+        axes = _fit_axes(nominal[others], measured[others])
+        errors[i] = float(np.linalg.norm(axes @ nominal[i] - measured[i]))
+    return errors
+
+
+def _rotation_deg(axes: np.ndarray) -> tuple[float, float, float]:
+    # Closest orthonormal frame to the fitted axes, by polar decomposition
+    u, _, vt = np.linalg.svd(axes, full_matrices=False)
+    frame = u @ vt
+    rotation = np.column_stack([frame, np.cross(frame[:, 0], frame[:, 1])])
+    rot_y = np.arcsin(np.clip(rotation[0, 2], -1, 1))
+    rot_x = np.arctan2(-rotation[1, 2], rotation[2, 2])
+    rot_z = np.arctan2(-rotation[0, 1], rotation[0, 0])
+    return tuple(float(np.degrees(angle)) for angle in (rot_x, rot_y, rot_z))  # type: ignore
+
+
+def fit_chip_coordinate_system(
+    fiducials: Sequence[MeasuredFiducial],
+    outlier_tolerance_mm: float = DEFAULT_OUTLIER_TOLERANCE_MM,
+    max_condition_number: float = MAX_CONDITION_NUMBER,
+) -> ChipCoordinateSystem:
+    """Fit the chip coordinate system to the measured fiducials by least squares.
+
+    While more than two fiducials remain, the fiducial that is worst predicted by a
+    fit to all the others is rejected if its prediction error exceeds
+    outlier_tolerance_mm. At least four fiducials are needed to reliably identify
+    a single bad one.
+
+    Raises:
+        ValueError: If fewer than two fiducials are given or their nominal positions
+            are too close to collinear to constrain the fit.
+    """
+    if len(fiducials) < 2:
+        raise ValueError(f"At least 2 fiducials are needed, got {len(fiducials)}")
+    nominal = np.array([f.nominal_mm for f in fiducials], dtype=float)
+    measured = np.array([f.measured_mm for f in fiducials], dtype=float)
+    condition_number = float(np.linalg.cond(nominal))
+    if condition_number > max_condition_number:
+        raise ValueError(
+            f"Fiducials are too close to collinear, condition number "
+            f"{condition_number:.1f} > {max_condition_number}"
+        )
+
+    inliers = list(range(len(fiducials)))
+    rejected = []
+    while len(inliers) > 2:
+        errors = _leave_one_out_errors(nominal, measured, inliers)
+        worst = max(errors, key=errors.__getitem__)
+        remaining = [i for i in inliers if i != worst]
+        if (
+            errors[worst] <= outlier_tolerance_mm
+            or np.linalg.cond(nominal[remaining]) > max_condition_number
+        ):
+            break
+        inliers = remaining
+        rejected.append(worst)
+
+    axes = _fit_axes(nominal[inliers], measured[inliers])
+    residuals = np.linalg.norm(nominal @ axes.T - measured, axis=1)
+    normal = np.cross(axes[:, 0], axes[:, 1])
+    scale_x, scale_y = np.linalg.norm(axes, axis=0)
+    cos_angle = axes[:, 0] @ axes[:, 1] / (scale_x * scale_y)
+    return ChipCoordinateSystem(
+        matrix=np.column_stack([axes, normal / np.linalg.norm(normal)]),
+        scale=(float(scale_x), float(scale_y)),
+        skew_deg=float(np.degrees(np.arcsin(np.clip(cos_angle, -1, 1)))),
+        rotation_deg=_rotation_deg(axes),
+        residuals_mm=tuple(float(r) for r in residuals),
+        rejected=tuple(sorted(rejected)),
+        condition_number=condition_number,
+    )
+
+
+def pmac_cs_strings(
+    coordinate_system: ChipCoordinateSystem,
+    motor_directions: tuple[float, float, float] = (1, -1, -1),
+    counts_per_mm: float = DEFAULT_COUNTS_PER_MM,
+) -> dict[str, str]:
+    """Generate the strings for set_pmac_strings_for_cs which define the chip
+    coordinate system on the PMAC, for motors 5, 6 and 7.
+
+    Args:
+        coordinate_system: The fitted coordinate system.
+        motor_directions: Sign of each stage motor relative to the stage coordinates,
+            as read by scrape_mtr_directions.
+        counts_per_mm: Motor counts per mm of stage motion.
+    """
+    factors = np.diag(motor_directions) @ coordinate_system.matrix * counts_per_mm
+    # Adding zero avoids formatting -0.0, from values that round to zero, as "-0.000"
+    factors = np.round(factors, 3) + 0.0
+    return {
+        f"cs{axis + 1}": f"#{axis + 5}->{x:+1.3f}X{y:+1.3f}Y{z:+1.3f}Z"
+        for axis, (x, y, z) in enumerate(factors)
+    }
+
+
+def pmac_cs_factors(cs_str: dict[str, str]) -> np.ndarray:
+    """The 3x3 matrix of motor counts per chip mm defined by the strings given to
+    set_pmac_strings_for_cs, with a row for each of the motors in cs1, cs2 and cs3.
+
+    Raises:
+        ValueError: If any of the strings is not of the form "#5->+1.0X-2.0Y+3.0Z".
+    """
+    factors = []
+    for axis in ("cs1", "cs2", "cs3"):
+        match = _CS_STRING.fullmatch(cs_str[axis].strip())
+        if not match:
+            raise ValueError(f"Unable to read coordinate system string {cs_str[axis]}")
+        factors.append([float(factor) for factor in match.groups()])
+    return np.array(factors)
+
+
+def chip_position_from_stage(
+    cs_str: dict[str, str],
+    stage_mm: tuple[float, float, float],
+    motor_directions: tuple[float, float, float] = (1, -1, -1),
+    counts_per_mm: float = DEFAULT_COUNTS_PER_MM,
+) -> tuple[float, float, float]:
+    """Convert the readback of the stage motors into chip coordinates, using the
+    coordinate system defined on the PMAC by cs_str.
+
+    Args:
+        cs_str: The strings the coordinate system was set with.
+        stage_mm: The x, y and z motor readbacks.
+        motor_directions: Sign of each stage motor relative to the stage coordinates,
+            as read by scrape_mtr_directions.
+        counts_per_mm: Motor counts per mm of stage motion.
+    """
+    counts = np.asarray(motor_directions) * np.asarray(stage_mm) * counts_per_mm
+    chip = np.linalg.solve(pmac_cs_factors(cs_str), counts)
+    return tuple(float(value) for value in chip)  # type: ignore
@@ -17,7 +17,29 @@ from dodal.devices.beamlines.i24.beamstop import Beamstop, BeamstopPositions
 from dodal.devices.beamlines.i24.dual_backlight import BacklightPositions, DualBacklight
 from dodal.devices.beamlines.i24.pmac import CS_STR, PMAC, EncReset, LaserSettings
 from dodal.devices.motors import YZStage
-
+from dodal.devices.oav.oav_detector import OAVBeamCentreFile
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.block_alignment import (
+    DEFAULT_IN_POSITION_TOLERANCE_MM,
+    DEFAULT_MIN_MATCH_SCORE,
+    BlockAlignment,
+    BlockCheckReport,
+    load_greyscale_image,
+    locate_template,
+)
+from mx_bluesky.beamlines.i24.serial.fixed_target.chip_geometry import ChipGeometry
+from mx_bluesky.beamlines.i24.serial.fixed_target.collection_time import (
+    MotionModel,
+    nominal_pump_probe_delay_s,
+)
+from mx_bluesky.beamlines.i24.serial.fixed_target.cs_solver import (
+    DEFAULT_OUTLIER_TOLERANCE_MM,
+    MeasuredFiducial,
+    chip_position_from_stage,
+    fit_chip_coordinate_system,
+    nominal_fiducials,
+    pmac_cs_strings,
+)
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import (
     ChipType,
     Fiducials,
@@ -55,6 +77,11 @@ CHIP_MOVES = {
 }
 OXFORD_CHIP_WIDTH = 8
 PVAR_TEMPLATE = f"P3%0{2}d1"
+CS_STRINGS_FILE = "cs_strings.json"
+# The PMAC has no in-position signal for the coordinate system, so during the block
+# check the motors are polled until they reach the block start.
+CS_MOVE_POLL_S = 0.05
+DEFAULT_CS_MOVE_TIMEOUT_S = 5.0
 CHIPTYPE_PV = pv.ioc13_gp1
 MAPTYPE_PV = pv.ioc13_gp2
 NUM_EXPOSURES_PV = pv.ioc13_gp3
@@ -474,31 +501,12 @@ def load_lite_map() -> MsgGenerator:
     chip_type = int(caget(CHIPTYPE_PV))
     if chip_type in [ChipType.Oxford, ChipType.OxfordInner]:
         SSX_LOGGER.info("Oxford Block Order")
-        rows = ["A", "B", "C", "D", "E", "F", "G", "H"]
-        columns = list(range(1, 10))
-        btn_names = {}
-        flip = True
-        for x, column in enumerate(columns):
-            for y, row in enumerate(rows):
-                i = x * 8 + y
-                if i % 8 == 0 and flip is False:
-                    flip = True
-                    z = 8 - (y + 1)
-                elif i % 8 == 0 and flip is True:
-                    flip = False
-                    z = y
-                elif flip is False:
-                    z = y
-                elif flip is True:
-                    z = 8 - (y + 1)
-                else:
-                    SSX_LOGGER.warning("Problem in Chip Grid Creation")
-                    break
-                button_name = str(row) + str(column)
-                lab_num = x * 8 + z
-                label = f"{lab_num + 1:02d}"
-                btn_names[button_name] = label
-        block_dict = btn_names
+        geometry = ChipGeometry.from_chip(get_chip_format(ChipType(chip_type)))
+        block_names = geometry.block_names(*geometry.block_indices())
+        block_dict = {
+            name: f"{number:02d}"
+            for number, name in enumerate(block_names.tolist(), start=1)
+        }
     else:
         raise ValueError(f"{chip_type=} unrecognised")
 
@@ -818,10 +826,38 @@ def cs_maker(pmac: PMAC = inject("pmac")) -> MsgGenerator:
     sqfact2 = np.sqrt(x2factor**2 + y2factor**2 + z2factor**2) / scaley
     sqfact3 = np.sqrt(x3factor**2 + y3factor**2 + z3factor**2) / scalez
     SSX_LOGGER.info(f"{sqfact1:1.4f} \n {sqfact2:1.4f} \n {sqfact3:1.4f}")
+    yield from _apply_cs(pmac, {"cs1": cs1, "cs2": cs2, "cs3": cs3}, chip_type)
+
+
+def write_cs_strings(cs_str: dict, param_path: Path = PARAM_FILE_PATH_FT):
+    """Record the coordinate system set on the PMAC, which cannot be read back."""
+    param_path.mkdir(parents=True, exist_ok=True)
+    with open(param_path / CS_STRINGS_FILE, "w") as f:
+        json.dump(cs_str, f, indent=4)
+
+
+def scrape_cs_strings(param_path: Path = PARAM_FILE_PATH_FT) -> dict[str, str] | None:
+    """Read the coordinate system last set on the PMAC by cs_maker, or None if no
+    coordinate system has been recorded."""
+    try:
+        with open(param_path / CS_STRINGS_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def clear_cs_strings(param_path: Path = PARAM_FILE_PATH_FT):
+    """Forget the recorded coordinate system, once it is no longer the one set."""
+    (param_path / CS_STRINGS_FILE).unlink(missing_ok=True)
+
+
+def _apply_cs(pmac: PMAC, cs_str: dict, chip_type: int) -> MsgGenerator:
+    """Zero the stages, set the coordinate system on the PMAC and home."""
     SSX_LOGGER.debug("Long wait, please be patient")
+    write_cs_strings(cs_str)
     yield from bps.trigger(pmac.to_xyz_zero)
     yield from bps.sleep(2.5)
-    yield from set_pmac_strings_for_cs(pmac, {"cs1": cs1, "cs2": cs2, "cs3": cs3})
+    yield from set_pmac_strings_for_cs(pmac, cs_str)
     yield from bps.trigger(pmac.to_xyz_zero)
     yield from bps.sleep(2.5)
     yield from bps.trigger(pmac.home, wait=True)
@@ -840,6 +876,57 @@ def cs_maker(pmac: PMAC = inject("pmac")) -> MsgGenerator:
     yield from bps.null()
 
 
+@log_on_entry
+def cs_maker_from_fiducials(
+    pmac: PMAC = inject("pmac"),
+    extra_fiducials: dict[int, tuple[float, float]] | None = None,
+    outlier_tolerance_mm: float = DEFAULT_OUTLIER_TOLERANCE_MM,
+) -> MsgGenerator:
+    """
+    Coordinate system, fitted by least squares to the measured fiducials.
+
+    Unlike cs_maker, the rotation, scale and skew of the chip are all fitted from the
+    fiducial positions so the values in cs_maker.json are not used. Fiducials 1 and 2
+    are always used. Further fiducials, set with the fiducial plan, can be added to
+    check the fit and allow a badly centred fiducial to be rejected.
+
+    Args:
+        pmac (PMAC): PMAC device
+        extra_fiducials (dict, optional): Nominal (x, y) position on the chip in mm,
+            relative to fiducial 0, of any further fiducials keyed by fiducial number.
+        outlier_tolerance_mm (float, optional): Fiducials that are further than this
+            from the position predicted by the others are rejected.
+    """
+    chip_type = int(caget(CHIPTYPE_PV))
+    nominal = dict(enumerate(nominal_fiducials(ChipType(chip_type)), start=1))
+    nominal.update(extra_fiducials or {})
+    SSX_LOGGER.info(f"Chip type is {chip_type} with fiducials {nominal}")
+
+    motor_directions = scrape_mtr_directions()
+    fiducials = [
+        MeasuredFiducial(tuple(position), scrape_mtr_fiducials(point))  # type: ignore
+        for point, position in nominal.items()
+    ]
+    chip_cs = fit_chip_coordinate_system(fiducials, outlier_tolerance_mm)
+    for point, residual in zip(nominal, chip_cs.residuals_mm, strict=True):
+        SSX_LOGGER.info(f"Fiducial {point} residual: {residual:1.4f} mm")
+    rejected = [list(nominal)[i] for i in chip_cs.rejected]
+    if rejected:
+        SSX_LOGGER.warning(f"Fiducials {rejected} rejected as outliers, re-measure")
+    if len(fiducials) - len(rejected) == 2:
+        SSX_LOGGER.warning("Only 2 fiducials used, the fit cannot be checked")
+    SSX_LOGGER.info(
+        f"Scale: {chip_cs.scale[0]:1.5f} {chip_cs.scale[1]:1.5f}, "
+        f"skew: {chip_cs.skew_deg:1.4f} deg, rotation (x, y, z): "
+        f"{', '.join(f'{angle:1.4f}' for angle in chip_cs.rotation_deg)} deg, "
+        f"condition number: {chip_cs.condition_number:1.2f}"
+    )
+
+    cs_str = pmac_cs_strings(chip_cs, motor_directions)  # type: ignore
+    SSX_LOGGER.info(f"PMAC strings. \n{pformat(cs_str)}")
+    yield from _apply_cs(pmac, cs_str, chip_type)
+
+
 def cs_reset(pmac: PMAC = inject("pmac")) -> MsgGenerator:
     """Used to clear CS when using Custom Chip"""
     cs1 = "#5->10000X+0Y+0Z"
@@ -847,6 +934,7 @@ def cs_reset(pmac: PMAC = inject("pmac")) -> MsgGenerator:
     cs3 = "#7->0X+0Y-10000Z"
     strg = "\n".join([cs1, cs2, cs3])
     print(strg)
+    clear_cs_strings()
     yield from set_pmac_strings_for_cs(pmac, {"cs1": cs1, "cs2": cs2, "cs3": cs3})
     SSX_LOGGER.debug("CSreset Done")
     yield from bps.null()
@@ -879,29 +967,24 @@ def pumpprobe_calc() -> MsgGenerator:
     SSX_LOGGER.info("Calculate and show exposure and dwell time for each option.")
     exptime = float(caget(pv.me14e_exptime))
     pumpexptime = float(caget(pv.ioc13_gp103))
-    movetime = 0.014
+    chip = get_chip_format(ChipType.Oxford)
+    movetime = float(MotionModel().move_time_s(chip.x_step_size, 0))
     SSX_LOGGER.info(f"X-ray exposure time {exptime}")
     SSX_LOGGER.info(f"Laser dwell time {pumpexptime}")
-    repeat1 = 2 * 20 * (movetime + (pumpexptime + exptime) / 2)
-    repeat2 = 4 * 20 * (movetime + (pumpexptime + exptime) / 2)
-    repeat3 = 6 * 20 * (movetime + (pumpexptime + exptime) / 2)
-    repeat5 = 10 * 20 * (movetime + (pumpexptime + exptime) / 2)
-    repeat10 = 20 * 20 * (movetime + (pumpexptime + exptime) / 2)
-    shortrepeat1 = 2 * 2 * (movetime + (pumpexptime + exptime) / 2)
-    shortrepeat2 = 2 * 4 * (movetime + (pumpexptime + exptime) / 2)
-    shortrepeat3 = 4 * 4 * (movetime + (pumpexptime + exptime) / 2)
-    shortrepeat4 = 5 * 5 * (movetime + (pumpexptime + exptime) / 2)
-    for pv_name, repeat in (
-        (pv.ioc13_gp104, repeat1),
-        (pv.ioc13_gp105, repeat2),
-        (pv.ioc13_gp106, repeat3),
-        (pv.ioc13_gp107, repeat5),
-        (pv.ioc13_gp108, repeat10),
-        (pv.ioc13_gp113, shortrepeat1),
-        (pv.ioc13_gp114, shortrepeat2),
-        (pv.ioc13_gp115, shortrepeat3),
-        (pv.ioc13_gp116, shortrepeat4),
+    for pv_name, setting in (
+        (pv.ioc13_gp104, PumpProbeSetting.Repeat1),
+        (pv.ioc13_gp105, PumpProbeSetting.Repeat2),
+        (pv.ioc13_gp106, PumpProbeSetting.Repeat3),
+        (pv.ioc13_gp107, PumpProbeSetting.Repeat5),
+        (pv.ioc13_gp108, PumpProbeSetting.Repeat10),
+        (pv.ioc13_gp113, PumpProbeSetting.ShortRepeat1),
+        (pv.ioc13_gp114, PumpProbeSetting.ShortRepeat2),
+        (pv.ioc13_gp115, PumpProbeSetting.ShortRepeat3),
+        (pv.ioc13_gp116, PumpProbeSetting.ShortRepeat4),
     ):
+        repeat = nominal_pump_probe_delay_s(
+            setting, exptime, pumpexptime, movetime, chip.x_num_steps
+        )
         rounded = round(repeat, 4)
         caput(pv_name, rounded)
         SSX_LOGGER.info(f"Repeat ({pv_name}): {rounded} s")
@@ -909,39 +992,193 @@ def pumpprobe_calc() -> MsgGenerator:
     yield from bps.null()
 
 
+def _read_oav_calibration(oav: OAVBeamCentreFile) -> MsgGenerator:
+    """Read the beam centre in pixels and the size of a pixel along the chip x and y
+    axes in mm."""
+    beam_x = yield from bps.rd(oav.beam_centre_i)
+    beam_y = yield from bps.rd(oav.beam_centre_j)
+    microns_per_pixel_x = yield from bps.rd(oav.microns_per_pixel_x)
+    microns_per_pixel_y = yield from bps.rd(oav.microns_per_pixel_y)
+    x_direction = yield from bps.rd(oav.x_direction)
+    y_direction = yield from bps.rd(oav.y_direction)
+    return (beam_x, beam_y), (
+        x_direction * microns_per_pixel_x / 1000,
+        y_direction * microns_per_pixel_y / 1000,
+    )
+
+
+def _locate_block_fiducial(
+    oav: OAVBeamCentreFile,
+    block: str,
+    template: np.ndarray,
+    snapshot_directory: Path,
+    beam_centre_px: tuple[float, float],
+    mm_per_pixel: tuple[float, float],
+    min_match_score: float,
+) -> MsgGenerator:
+    yield from bps.abs_set(oav.snapshot.directory, str(snapshot_directory))
+    yield from bps.abs_set(oav.snapshot.filename, f"block_{block}")
+    yield from bps.trigger(oav.snapshot, wait=True)
+    snapshot_path = yield from bps.rd(oav.snapshot.last_saved_path)
+    match = locate_template(load_greyscale_image(snapshot_path), template)
+    if match.score < min_match_score:
+        SSX_LOGGER.warning(
+            f"Fiducial mark not found for block {block}, best match score "
+            f"{match.score:.2f} < {min_match_score}"
+        )
+        return match, None
+    offset_mm = (
+        (match.x_px - beam_centre_px[0]) * mm_per_pixel[0],
+        (match.y_px - beam_centre_px[1]) * mm_per_pixel[1],
+    )
+    return match, offset_mm
+
+
+def _wait_for_cs_move(
+    pmac: PMAC,
+    target: tuple[float, float],
+    cs_str: dict[str, str] | None,
+    motor_directions: tuple[float, float, float],
+    in_position_tolerance_mm: float,
+    timeout_s: float,
+) -> MsgGenerator:
+    """Wait for a coordinate system move to the target on the chip to finish.
+
+    If no coordinate system is recorded the position reached cannot be converted
+    into chip coordinates, so the stage readback is used as it is and the wait only
+    lasts until the motors report that they are done.
+
+    Returns:
+        The position reached in chip coordinates, and whether it is within tolerance
+        of the target. If the stage has not stopped at the target within the timeout
+        it is reported as not in position.
+    """
+    for poll in range(int(np.ceil(timeout_s / CS_MOVE_POLL_S)) + 1):
+        if poll:
+            yield from bps.sleep(CS_MOVE_POLL_S)
+        stopped = True
+        for motor in (pmac.x, pmac.y, pmac.z):
+            stopped &= bool((yield from bps.rd(motor.motor_done_move)))
+        stage = (
+            (yield from bps.rd(pmac.x.user_readback)),
+            (yield from bps.rd(pmac.y.user_readback)),
+            (yield from bps.rd(pmac.z.user_readback)),
+        )
+        if cs_str is None:
+            reached = stage[:2]
+        else:
+            reached = chip_position_from_stage(cs_str, stage, motor_directions)[:2]
+        in_position = bool(
+            np.hypot(reached[0] - target[0], reached[1] - target[1])
+            <= in_position_tolerance_mm
+        )
+        if stopped and (in_position or cs_str is None):
+            break
+    return reached, in_position
+
+
 @log_on_entry
-def block_check(pmac: PMAC = inject("pmac")) -> MsgGenerator:
+def block_check(
+    pmac: PMAC = inject("pmac"),
+    oav: OAVBeamCentreFile = inject("oav"),
+    fiducial_template: str = "",
+    snapshot_directory: str = "",
+    in_position_tolerance_mm: float = DEFAULT_IN_POSITION_TOLERANCE_MM,
+    min_match_score: float = DEFAULT_MIN_MATCH_SCORE,
+    move_timeout_s: float = DEFAULT_CS_MOVE_TIMEOUT_S,
+) -> MsgGenerator:
+    """Visit the start of every block on the chip to check the alignment.
+
+    Each block start is moved to in the chip coordinate system set by cs_maker, and
+    the move waits until the stage has stopped there, rather than for a fixed time.
+    The position reached is converted back into chip coordinates using the recorded
+    coordinate system, or if there is none the stage readback is used once the
+    motors are done. If a fiducial template is given, an OAV snapshot is taken at
+    each block and the fiducial mark located in it, giving the offset of each block
+    start from the beam centre and a suggested correction to the chip coordinate
+    system. The check can be aborted by setting GP9 to a non-zero value.
+
+    Args:
+        fiducial_template: Path to an image of the fiducial mark at the block start,
+            as it appears on the OAV. If empty the OAV is not used.
+        snapshot_directory: Where to save the OAV snapshots. Defaults to a
+            block_check directory next to the fixed target parameters.
+        in_position_tolerance_mm: Maximum distance on the chip of the readback from
+            the block start for the block to be reported as reached.
+        min_match_score: Minimum correlation score for the fiducial mark to be
+            considered found.
+        move_timeout_s: How long to wait for the stage to stop at each block start
+            before reporting the block as not reached.
+
+    Returns:
+        The BlockCheckReport, which is also logged.
+    """
     # TODO See https://github.com/DiamondLightSource/mx_bluesky/issues/117
     caput(pv.ioc13_gp9, 0)
-    while True:
-        if int(caget(pv.ioc13_gp9)) == 0:
-            chip_type = int(caget(CHIPTYPE_PV))
-            if chip_type == ChipType.Minichip:
-                SSX_LOGGER.info("Oxford mini chip in use.")
-                block_start_list = scrape_pvar_file("minichip_oxford.pvar")
-            elif chip_type == ChipType.Custom:
-                SSX_LOGGER.error("This is a custom chip, no block check available!")
-                raise ValueError(
-                    "Chip type set to 'custom', which has no block check."
-                    "If not using a custom chip, please double check chip in the GUI."
-                )
-            else:
-                SSX_LOGGER.warning("Default is Oxford chip block start list.")
-                block_start_list = scrape_pvar_file("oxford.pvar")
-            for entry in block_start_list:
-                if int(caget(pv.ioc13_gp9)) != 0:
-                    SSX_LOGGER.warning("Block Check Aborted")
-                    yield from bps.sleep(1.0)
-                    break
-                block, x, y = entry
-                SSX_LOGGER.debug(f"Block: {block} -> (x={x} y={y})")
-                yield from bps.abs_set(
-                    pmac.pmac_string, f"{CS_STR}!x{x}y{y}", wait=True
-                )
-                yield from bps.sleep(0.5)
-        else:
-            SSX_LOGGER.warning("Block Check Aborted due to GP 9 not equalling 0")
+    chip_type = int(caget(CHIPTYPE_PV))
+    if chip_type == ChipType.Minichip:
+        SSX_LOGGER.info("Oxford mini chip in use.")
+        block_start_list = scrape_pvar_file("minichip-oxford.pvar")
+    elif chip_type == ChipType.Custom:
+        SSX_LOGGER.error("This is a custom chip, no block check available!")
+        raise ValueError(
+            "Chip type set to 'custom', which has no block check."
+            "If not using a custom chip, please double check chip in the GUI."
+        )
+    else:
+        SSX_LOGGER.warning("Default is Oxford chip block start list.")
+        block_start_list = scrape_pvar_file("oxford.pvar")
+    cs_str = scrape_cs_strings()
+    if cs_str is None:
+        SSX_LOGGER.warning(
+            "No coordinate system recorded, run cs_maker. Positions reached are "
+            "checked on the stage motors."
+        )
+    motor_directions = scrape_mtr_directions()
+
+    template = load_greyscale_image(fiducial_template) if fiducial_template else None
+    if template is not None:
+        snapshot_path = (
+            Path(snapshot_directory)
+            if snapshot_directory
+            else PARAM_FILE_PATH_FT / "block_check"
+        )
+        snapshot_path.mkdir(parents=True, exist_ok=True)
+        beam_centre_px, mm_per_pixel = yield from _read_oav_calibration(oav)
+
+    blocks = []
+    aborted = False
+    for block, x, y in block_start_list:
+        if int(caget(pv.ioc13_gp9)) != 0:
+            SSX_LOGGER.warning("Block Check Aborted")
+            aborted = True
             break
-        break
-    SSX_LOGGER.debug("Block check done")
-    yield from bps.null()
+        target = (float(x), float(y))
+        SSX_LOGGER.debug(f"Block: {block} -> (x={x} y={y})")
+        yield from bps.abs_set(pmac.pmac_string, f"{CS_STR}!x{x}y{y}", wait=True)
+        reached, in_position = yield from _wait_for_cs_move(
+            pmac,
+            target,
+            cs_str,
+            motor_directions,
+            in_position_tolerance_mm,
+            move_timeout_s,
+        )
+        match, offset_mm = None, None
+        if template is not None:
+            match, offset_mm = yield from _locate_block_fiducial(
+                oav,
+                block,
+                template,
+                snapshot_path,
+                beam_centre_px,
+                mm_per_pixel,
+                min_match_score,
+            )
+        blocks.append(
+            BlockAlignment(block, target, reached, in_position, match, offset_mm)
+        )
+
+    report = BlockCheckReport(tuple(blocks), aborted)
+    SSX_LOGGER.info(f"Block check done\n{report.format()}")
+    return report
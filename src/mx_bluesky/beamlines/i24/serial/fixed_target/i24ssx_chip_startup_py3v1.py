@@ -2,8 +2,7 @@
 Startup utilities for chip
 """
 
-import string
-
+from mx_bluesky.beamlines.i24.serial.fixed_target.chip_geometry import ChipGeometry
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import ChipType
 from mx_bluesky.beamlines.i24.serial.log import SSX_LOGGER, log_on_entry
 from mx_bluesky.beamlines.i24.serial.parameters import get_chip_format
@@ -79,23 +78,10 @@ def zippum(list_1_args, list_2_args):
 
 
 def get_alphanumeric(chip_type: ChipType):
-    cell_format = get_chip_format(chip_type)
-    blk_num = cell_format.x_blocks
-    wnd_num = cell_format.x_num_steps
-    uppercase_list = list(string.ascii_uppercase)[:blk_num]
-    lowercase_list = list(string.ascii_lowercase + string.ascii_uppercase + "0")[
-        :wnd_num
-    ]
-    number_list = [str(x) for x in range(1, blk_num + 1)]
-
-    block_list = zippum([uppercase_list, "expand", 0], [number_list, "typewriter", 0])
-    window_list = zippum(
-        [lowercase_list, "expand", 0], [lowercase_list, "typewriter", 0]
+    alphanumeric_list = (
+        ChipGeometry.from_chip(get_chip_format(chip_type))
+        .alphanumeric_addresses()
+        .tolist()
     )
-
-    alphanumeric_list = []
-    for block in block_list:
-        for window in window_list:
-            alphanumeric_list.append(block + "_" + window)
     SSX_LOGGER.info(f"Length of alphanumeric list = {len(alphanumeric_list)}")
     return alphanumeric_list
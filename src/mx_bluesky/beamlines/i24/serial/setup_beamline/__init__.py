@@ -1,10 +1,11 @@
 from . import pv, setup_beamline
-from .ca import caget, cagetstring, caput
+from .ca import caget, cagetstring, cagetvalue, caput
 from .pv_abstract import Detector, Eiger
 
 __all__ = [
     "caget",
     "cagetstring",
+    "cagetvalue",
     "caput",
     "Detector",
     "Eiger",
@@ -1,4 +1,4 @@
-from subprocess import PIPE, Popen
+from subprocess import PIPE, Popen, run
 
 
 def cagetstring(pv):
@@ -28,6 +28,22 @@ def caget(pv):
     return val
 
 
+def cagetvalue(pv: str, timeout: float = 5.0) -> str:
+    """Get the whole value of a PV as a string, including any spaces.
+
+    Unlike caget, this does not retry forever: it raises TimeoutError if the PV can
+    not be read within the timeout.
+    """
+    result = run(
+        ["caget", "-t", "-S", "-w", str(timeout), pv],
+        capture_output=True,
+        timeout=timeout + 1,
+    )
+    if result.returncode != 0:
+        raise TimeoutError(f"Could not read {pv}: {result.stderr.decode().strip()}")
+    return result.stdout.decode("ascii").strip()
+
+
 def caput(pv, new_val):
     check = Popen(["cainfo", pv], stdout=PIPE, stderr=PIPE)
     # print('check', check)
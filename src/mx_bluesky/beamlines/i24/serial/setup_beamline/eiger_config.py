@@ -0,0 +1,411 @@
+"""
+Declarative configuration of the Eiger and Odin for serial collections.
+
+The state the detector should be in for a collection is described by one of the
+EigerCollectionConfig models, which list the PV settings for the detector and for
+Odin. apply_pv_settings reads the current values, writes the settings that differ
+concurrently and then polls the readbacks until every one has converged on its
+requested value. This replaces fixed sleeps between groups of caputs, and a setting
+that is not applied is reported rather than silently ignored.
+"""
+
+import math
+import time
+from abc import abstractmethod
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Protocol
+
+import bluesky.plan_stubs as bps
+from bluesky.utils import MsgGenerator
+from pydantic import BaseModel, ConfigDict, PositiveFloat, PositiveInt
+
+from mx_bluesky.beamlines.i24.serial.log import SSX_LOGGER
+from mx_bluesky.beamlines.i24.serial.setup_beamline import pv
+from mx_bluesky.beamlines.i24.serial.setup_beamline.ca import cagetvalue, caput
+
+DEFAULT_READBACK_TIMEOUT_S = 5.0
+POLL_INTERVAL_S = 0.05
+# The Eiger rounds times and distances, so readbacks are compared to this precision
+READBACK_RELATIVE_TOLERANCE = 1e-4
+# Acquire time is set just below the acquire period to allow for readout
+ACQUIRE_TIME_OFFSET_S = 0.0000001
+MAX_CONCURRENT_PVS = 16
+
+
+class EigerCollectionMode(StrEnum):
+    QUICKSHOT = "quickshot"  # A single trigger starts a series of images
+    TRIGGERED = "triggered"  # An image is recorded for every trigger
+
+
+class PvBackend(Protocol):
+    """Reads and writes PVs by name, with values as strings."""
+
+    def get(self, pv_name: str) -> str: ...
+
+    def put(self, pv_name: str, value: str) -> None: ...
+
+
+class ChannelAccessBackend:
+    """Reads and writes PVs with the channel access command line tools."""
+
+    def __init__(self, timeout: float = DEFAULT_READBACK_TIMEOUT_S):
+        self._timeout = timeout
+
+    def get(self, pv_name: str) -> str:
+        return cagetvalue(pv_name, self._timeout)
+
+    def put(self, pv_name: str, value: str) -> None:
+        caput(pv_name, value)
+
+
+@dataclass(frozen=True)
+class PvSetting:
+    """The value a PV should be set to.
+
+    Attributes:
+        pv: The PV to write.
+        value: The value to write.
+        readback: The PV to check the value was applied on, or None for PVs which
+            trigger an action or have no known readback, and so are written whatever
+            their current value.
+        timeout_s: How long to wait for the readback to reach the value.
+    """
+
+    pv: str
+    value: str | int | float
+    readback: str | None
+    timeout_s: float = DEFAULT_READBACK_TIMEOUT_S
+
+
+# The settings with an _RBV readback in the areaDetector ADEiger and NDFileHDF5
+# databases which the Eiger and Odin IOCs serve, as in ophyd's EigerDetectorCam and
+# dodal's OdinFileWriter
+_SETTINGS_WITH_RBV = [
+    pv.eiger_detdist,
+    pv.eiger_wavelength,
+    pv.eiger_omegaincr,
+    pv.eiger_filewriter,
+    pv.eiger_stream,
+    pv.eiger_monitor,
+    pv.eiger_roi_mode,
+    pv.eiger_ff,
+    pv.eiger_compresstype,
+    pv.eiger_hdrdetail,
+    pv.eiger_acquiretime,
+    pv.eiger_acquireperiod,
+    pv.eiger_numimages,
+    pv.eiger_imagemode,
+    pv.eiger_triggermode,
+    pv.eiger_numtriggers,
+    pv.eiger_manualtrigger,
+    pv.eiger_od_filepath,
+    pv.eiger_od_num_capture,
+    pv.eiger_od_datatype,
+    pv.eiger_od_compress,
+]
+# Where each setting can be read back. A setting without a known readback is written
+# every time, without waiting for it to be applied.
+READBACKS: dict[str, str] = {name: f"{name}_RBV" for name in _SETTINGS_WITH_RBV} | {
+    pv.eiger_statuspoll: pv.eiger_statuspoll,
+    pv.eiger_od_filename: pv.eiger_od_filename_rbv,
+}
+
+
+def _setting(
+    pv_name: str,
+    value: str | int | float,
+    timeout_s: float = DEFAULT_READBACK_TIMEOUT_S,
+) -> PvSetting:
+    return PvSetting(pv_name, value, READBACKS.get(pv_name), timeout_s)
+
+
+def values_match(requested: str | int | float, readback: str) -> bool:
+    """Whether a readback shows the requested value. Numbers are compared to
+    READBACK_RELATIVE_TOLERANCE, anything else as case insensitive strings."""
+    try:
+        return math.isclose(
+            float(requested), float(readback), rel_tol=READBACK_RELATIVE_TOLERANCE
+        )
+    except ValueError:
+        return str(requested).strip().lower() == readback.strip().lower()
+
+
+class EigerCollectionConfig(BaseModel):
+    """The detector configuration for a serial collection.
+
+    Attributes:
+        filepath: Directory for Odin to write the data to.
+        filename: Name of the data file, including the sequence id.
+        num_images: Total number of images to collect.
+        exposure_time_s: Exposure time of each image.
+        detector_distance_mm: Detector distance recorded in the image headers.
+        wavelength_a: Wavelength recorded in the image headers.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    filepath: str
+    filename: str
+    num_images: PositiveInt
+    exposure_time_s: PositiveFloat
+    detector_distance_mm: float
+    wavelength_a: float
+
+    @property
+    @abstractmethod
+    def mode(self) -> EigerCollectionMode: ...
+
+    @property
+    @abstractmethod
+    def trigger_mode(self) -> str: ...
+
+    @property
+    @abstractmethod
+    def images_per_trigger(self) -> int: ...
+
+    @property
+    @abstractmethod
+    def num_triggers(self) -> int: ...
+
+    def detector_settings(self) -> list[PvSetting]:
+        """Settings on the Eiger itself."""
+        return [
+            _setting(pv.eiger_detdist, self.detector_distance_mm / 1000),
+            _setting(pv.eiger_wavelength, self.wavelength_a),
+            _setting(pv.eiger_omegaincr, 0.0),
+            _setting(pv.eiger_filewriter, "No"),
+            _setting(pv.eiger_stream, "Yes"),
+            _setting(pv.eiger_monitor, "No"),
+            _setting(pv.eiger_statuspoll, "1 second"),
+            _setting(pv.eiger_roi_mode, "Disabled"),
+            _setting(pv.eiger_ff, "Enabled"),
+            _setting(pv.eiger_compresstype, "bslz4"),
+            _setting(pv.eiger_countmode, "Retrigger"),
+            _setting(pv.eiger_autosum, "Enabled"),
+            _setting(pv.eiger_hdrdetail, "All"),
+            _setting(
+                pv.eiger_acquiretime, self.exposure_time_s - ACQUIRE_TIME_OFFSET_S
+            ),
+            _setting(pv.eiger_acquireperiod, self.exposure_time_s),
+            _setting(pv.eiger_numimages, self.images_per_trigger),
+            _setting(pv.eiger_imagemode, "Continuous"),
+            _setting(pv.eiger_triggermode, self.trigger_mode),
+            _setting(pv.eiger_numtriggers, self.num_triggers),
+            _setting(pv.eiger_manualtrigger, "Yes"),
+        ]
+
+    def odin_settings(self, bit_depth: int) -> list[PvSetting]:
+        """Settings on Odin, which depend on the bit depth of the Eiger images."""
+        return [
+            _setting(pv.eiger_od_filepath, self.filepath),
+            _setting(pv.eiger_od_filename, self.filename),
+            _setting(pv.eiger_od_num_capture, self.num_images),
+            _setting(pv.eiger_od_datatype, f"UInt{bit_depth}"),
+            _setting(pv.eiger_od_compress, "BSL24"),
+        ]
+
+
+class EigerQuickshotConfig(EigerCollectionConfig):
+    @property
+    def mode(self) -> EigerCollectionMode:
+        return EigerCollectionMode.QUICKSHOT
+
+    @property
+    def trigger_mode(self) -> str:
+        return "Internal Series"
+
+    @property
+    def images_per_trigger(self) -> int:
+        return self.num_images
+
+    @property
+    def num_triggers(self) -> int:
+        return 1
+
+
+class EigerTriggeredConfig(EigerCollectionConfig):
+    @property
+    def mode(self) -> EigerCollectionMode:
+        return EigerCollectionMode.TRIGGERED
+
+    @property
+    def trigger_mode(self) -> str:
+        return "External Enable"
+
+    @property
+    def images_per_trigger(self) -> int:
+        return 1
+
+    @property
+    def num_triggers(self) -> int:
+        return self.num_images
+
+
+EIGER_CONFIGS: dict[EigerCollectionMode, type[EigerCollectionConfig]] = {
+    EigerCollectionMode.QUICKSHOT: EigerQuickshotConfig,
+    EigerCollectionMode.TRIGGERED: EigerTriggeredConfig,
+}
+
+
+@dataclass(frozen=True)
+class PvChange:
+    pv: str
+    old: str | None
+    new: str
+
+
+@dataclass(frozen=True)
+class PvMismatch:
+    pv: str
+    requested: str
+    readback: str | None
+
+
+@dataclass
+class ConfigReport:
+    """What applying a set of PV settings did.
+
+    Attributes:
+        changed: Settings which were written, with the value read beforehand.
+        unchanged: PVs which already had the requested value and were not written.
+        failed: Readbacks which did not reach the requested value in time.
+    """
+
+    changed: list[PvChange] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    failed: list[PvMismatch] = field(default_factory=list)
+
+    def extend(self, other: "ConfigReport"):
+        self.changed.extend(other.changed)
+        self.unchanged.extend(other.unchanged)
+        self.failed.extend(other.failed)
+
+    def format(self) -> str:
+        lines = [f"{len(self.changed)} changed, {len(self.unchanged)} unchanged"]
+        lines.extend(f"  {c.pv}: {c.old} -> {c.new}" for c in self.changed)
+        lines.extend(
+            f"  FAILED {f.pv}: requested {f.requested}, read back {f.readback}"
+            for f in self.failed
+        )
+        return "\n".join(lines)
+
+
+class EigerConfigError(Exception):
+    def __init__(self, report: ConfigReport):
+        self.report = report
+        super().__init__(
+            "Detector settings not applied:\n"
+            + "\n".join(
+                f"{f.pv}: requested {f.requested}, read back {f.readback}"
+                for f in report.failed
+            )
+        )
+
+
+def _read_all(
+    backend: PvBackend, executor: ThreadPoolExecutor, pvs: Sequence[str]
+) -> dict[str, str | None]:
+    def read(pv_name: str) -> str | None:
+        try:
+            return backend.get(pv_name)
+        except TimeoutError as e:
+            SSX_LOGGER.warning(str(e))
+            return None
+
+    return dict(zip(pvs, executor.map(read, pvs), strict=True))
+
+
+def _readbacks(settings: Sequence[PvSetting]) -> list[str]:
+    return [s.readback for s in settings if s.readback is not None]
+
+
+def apply_pv_settings(
+    settings: Sequence[PvSetting],
+    backend: PvBackend,
+    poll_interval_s: float = POLL_INTERVAL_S,
+    clock: Callable[[], float] = time.monotonic,
+) -> MsgGenerator:
+    """Apply the settings concurrently and wait for their readbacks to converge.
+
+    Settings whose readback already shows the requested value are not written.
+
+    Returns:
+        A ConfigReport of what was changed and which settings, if any, failed to
+        converge within their timeout.
+    """
+    report = ConfigReport()
+    with ThreadPoolExecutor(MAX_CONCURRENT_PVS) as executor:
+        current = _read_all(backend, executor, _readbacks(settings))
+        to_write = []
+        for setting in settings:
+            old = current.get(setting.readback) if setting.readback else None
+            if old is not None and values_match(setting.value, old):
+                report.unchanged.append(setting.pv)
+            else:
+                to_write.append(setting)
+                report.changed.append(PvChange(setting.pv, old, str(setting.value)))
+        list(executor.map(lambda s: backend.put(s.pv, str(s.value)), to_write))
+
+        start = clock()
+        pending = [s for s in to_write if s.readback is not None]
+        while pending:
+            readbacks = _read_all(backend, executor, _readbacks(pending))
+            elapsed_s = clock() - start
+            still_pending = []
+            for setting in pending:
+                readback = readbacks[setting.readback]  # type: ignore[index]
+                if readback is not None and values_match(setting.value, readback):
+                    continue
+                if elapsed_s >= setting.timeout_s:
+                    report.failed.append(
+                        PvMismatch(setting.pv, str(setting.value), readback)
+                    )
+                else:
+                    still_pending.append(setting)
+            pending = still_pending
+            if pending:
+                yield from bps.sleep(poll_interval_s)
+    return report
+
+
+def configure_eiger(
+    config: EigerCollectionConfig,
+    backend: PvBackend,
+    poll_interval_s: float = POLL_INTERVAL_S,
+    clock: Callable[[], float] = time.monotonic,
+) -> MsgGenerator:
+    """Configure the Eiger and Odin for a collection, then start Odin capturing and
+    arm the Eiger, which will wait for triggers.
+
+    Raises:
+        EigerConfigError: If any setting was not applied, in which case the detector
+            is not armed.
+
+    Returns:
+        A ConfigReport of the settings changed.
+    """
+    SSX_LOGGER.info(f"Configuring Eiger for {config.mode} collection: {config}")
+    report = yield from apply_pv_settings(
+        config.detector_settings(), backend, poll_interval_s, clock
+    )
+    if not report.failed:
+        bit_depth = int(float(backend.get(pv.eiger_bitdepthrbv)))
+        report.extend(
+            (
+                yield from apply_pv_settings(
+                    config.odin_settings(bit_depth), backend, poll_interval_s, clock
+                )
+            )
+        )
+    SSX_LOGGER.info(f"Eiger configuration: {report.format()}")
+    if report.failed:
+        raise EigerConfigError(report)
+
+    SSX_LOGGER.info("Done: Odin waiting for data")
+    backend.put(pv.eiger_od_capture, "Capture")
+    SSX_LOGGER.info("Arming Eiger")
+    backend.put(pv.eiger_acquire, "1")
+    return report
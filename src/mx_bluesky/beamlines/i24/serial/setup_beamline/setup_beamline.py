@@ -16,7 +16,15 @@ from dodal.devices.util.lookup_tables import (
 
 from mx_bluesky.beamlines.i24.serial.log import SSX_LOGGER
 from mx_bluesky.beamlines.i24.serial.setup_beamline import pv
-from mx_bluesky.beamlines.i24.serial.setup_beamline.ca import caget, caput
+from mx_bluesky.beamlines.i24.serial.setup_beamline.eiger_config import (
+    EIGER_CONFIGS,
+    ChannelAccessBackend,
+    EigerCollectionMode,
+    PvBackend,
+    PvSetting,
+    apply_pv_settings,
+    configure_eiger,
+)
 
 
 def compute_beam_center_position_from_lut(
@@ -59,13 +67,15 @@ def setup_beamline_for_collection_plan(
 ):
     SSX_LOGGER.debug("Setup beamline: collect.")
     yield from bps.abs_set(aperture.position, AperturePositions.IN, group=group)
-    yield from bps.abs_set(backlight, BacklightPositions.OUT, group=group)
-    yield from bps.sleep(3)  # Not sure needed - to test
+    # The backlight must be out of the way before the beamstop moves in
+    yield from bps.abs_set(
+        backlight, BacklightPositions.OUT, group=f"{group}_backlight"
+    )
+    yield from bps.wait(group=f"{group}_backlight")
     yield from bps.abs_set(
         beamstop.pos_select, BeamstopPositions.DATA_COLLECTION, group=group
     )
     yield from bps.abs_set(beamstop.y_rotation, 0, group=group)
-    yield from bps.sleep(4)  # Not sure needed - to test
 
     if wait:
         yield from bps.wait(group=group)
@@ -104,120 +114,42 @@ def eiger(
     args_list,
     dcm: DCM,
     detector_stage: YZStage,
+    backend: PvBackend | None = None,
 ):
+    """Set up the Eiger for a collection, or return it to its normal state.
+
+    Args:
+        action: One of the EigerCollectionMode values, or "return-to-normal".
+        args_list: For a collection, the filepath, filename, number of images and
+            exposure time.
+        backend: Used to read and write the detector PVs, defaults to channel access.
+
+    Returns:
+        A ConfigReport of the settings that were changed.
+    """
     SSX_LOGGER.debug("***** Entering Eiger")
     SSX_LOGGER.info(f"Setup eiger - {action}")
-    if args_list:
-        for arg in args_list:
-            SSX_LOGGER.debug(f"Argument: {arg}")
+    backend = backend or ChannelAccessBackend()
+    if action == "return-to-normal":
+        # Put it all back to GDA acceptable defaults
+        report = yield from apply_pv_settings(
+            [PvSetting(pv.eiger_manualtrigger, "No", f"{pv.eiger_manualtrigger}_RBV")],
+            backend,
+        )
+        SSX_LOGGER.debug("***** leaving Eiger")
+        return report
+
+    [filepath, filename, num_imgs, exptime] = args_list
     det_z = yield from bps.rd(detector_stage.z.user_readback)
-    caput(pv.eiger_detdist, str(det_z / 1000))
     dcm_wavelength_a = yield from bps.rd(dcm.wavelength_in_a.user_readback)
-    caput(pv.eiger_wavelength, dcm_wavelength_a)
-    caput(pv.eiger_omegaincr, 0.0)
-    yield from bps.sleep(0.1)
-    # Setup common to all collections ###
-    caput(pv.eiger_filewriter, "No")
-    caput(pv.eiger_stream, "Yes")
-    caput(pv.eiger_monitor, "No")
-    # caput(pv.eiger_datasource, 'None')
-    caput(pv.eiger_statuspoll, "1 second")
-    caput(pv.eiger_roi_mode, "Disabled")
-    caput(pv.eiger_ff, "Enabled")
-    caput(pv.eiger_compresstype, "bslz4")
-    caput(pv.eiger_countmode, "Retrigger")
-    caput(pv.eiger_autosum, "Enabled")
-    caput(pv.eiger_hdrdetail, "All")
-
-    # Quick set of images no coordinated motion
-    if action == "quickshot":
-        # Sends a single trigger to start data collection
-        SSX_LOGGER.debug("Eiger quickshot")
-        [filepath, filename, num_imgs, exptime] = args_list
-        filename = filename + "_" + str(caget(pv.eiger_seq_id))
-        caput(pv.eiger_od_filepath, filepath)
-        yield from bps.sleep(0.1)
-        caput(pv.eiger_od_filename, filename)
-        yield from bps.sleep(0.1)
-        acqtime = float(exptime) - 0.0000001
-        caput(pv.eiger_acquiretime, str(acqtime))
-        SSX_LOGGER.debug(f"Filepath was set as {filepath}")
-        SSX_LOGGER.debug(f"Filename set as {filename}")
-        SSX_LOGGER.debug(f"num_imgs {num_imgs}")
-        SSX_LOGGER.debug(f"Exposure time set as {exptime} s")
-        SSX_LOGGER.debug(f"Acquire time set as {acqtime} s")
-        caput(pv.eiger_acquireperiod, str(exptime))
-        caput(pv.eiger_numimages, str(num_imgs))
-        caput(pv.eiger_imagemode, "Continuous")
-        caput(pv.eiger_triggermode, "Internal Series")
-        caput(pv.eiger_numtriggers, 1)
-        caput(pv.eiger_manualtrigger, "Yes")
-        yield from bps.sleep(1.0)
-        # ODIN setup
-        SSX_LOGGER.info("Setting up Odin")
-        caput(pv.eiger_od_filename, filename)
-        caput(pv.eiger_od_filepath, filepath)
-        caput(pv.eiger_od_num_capture, str(num_imgs))
-        caput(pv.eiger_od_filepath, filepath)
-        eigerbdrbv = "UInt" + str(caget(pv.eiger_bitdepthrbv))
-        caput(pv.eiger_od_datatype, eigerbdrbv)
-        caput(pv.eiger_od_compress, "BSL24")
-        yield from bps.sleep(1.0)
-        # All done. Now get Odin to wait for data and start Eiger
-        SSX_LOGGER.info("Done: Odin waiting for data")
-        caput(pv.eiger_od_capture, "Capture")
-        # If detector fails to arm first time can try twice with a sleep inbetween
-        SSX_LOGGER.info("Arming Eiger")
-        caput(pv.eiger_acquire, "1")
-        # Will now wait for Manual trigger. Add the below line to your DAQ script ###
-        # caput(pv.eiger_trigger, 1)
-
-    if action == "triggered":
-        # Send a trigger for every image. Records while TTL is high
-        SSX_LOGGER.info("Eiger triggered")
-        [filepath, filename, num_imgs, exptime] = args_list
-        filename = filename + "_" + str(caget(pv.eiger_seq_id))
-        caput(pv.eiger_od_filepath, filepath)
-        yield from bps.sleep(0.1)
-        caput(pv.eiger_od_filename, filename)
-        yield from bps.sleep(0.1)
-        acqtime = float(exptime) - 0.0000001
-        caput(pv.eiger_acquiretime, str(acqtime))
-        SSX_LOGGER.debug(f"Filepath was set as {filepath}")
-        SSX_LOGGER.debug(f"Filename set as {filename}")
-        SSX_LOGGER.debug(f"num_imgs {num_imgs}")
-        SSX_LOGGER.debug(f"Exposure time set as {exptime} s")
-        SSX_LOGGER.debug(f"Acquire time set as {acqtime} s")
-        caput(pv.eiger_acquireperiod, str(exptime))
-        caput(pv.eiger_numimages, 1)
-        caput(pv.eiger_imagemode, "Continuous")
-        caput(pv.eiger_triggermode, "External Enable")
-        caput(pv.eiger_numtriggers, str(num_imgs))
-        caput(pv.eiger_manualtrigger, "Yes")
-        yield from bps.sleep(1.0)
-        # ODIN setup #
-        SSX_LOGGER.info("Setting up Odin")
-        caput(pv.eiger_od_filename, filename)
-        caput(pv.eiger_od_filepath, filepath)
-        caput(pv.eiger_od_num_capture, str(num_imgs))
-        caput(pv.eiger_od_filepath, filepath)
-        eigerbdrbv = "UInt" + str(caget(pv.eiger_bitdepthrbv))
-        caput(pv.eiger_od_datatype, eigerbdrbv)
-        caput(pv.eiger_od_compress, "BSL24")
-        yield from bps.sleep(1.0)
-        # All done. Now get Odin to wait for data and start Eiger
-        SSX_LOGGER.info("Done: Odin waiting for data")
-        caput(pv.eiger_od_capture, "Capture")
-        # If detector fails to arm first time can try twice with a sleep inbetween
-        SSX_LOGGER.info("Arming Eiger")
-        caput(pv.eiger_acquire, "1")
-        # Will now wait for Manual trigger. Add the below line to your DAQ script
-        # caput(pv.eiger_trigger, 1)
-
-    # Put it all back to GDA acceptable defaults
-    elif action == "return-to-normal":
-        caput(pv.eiger_manualtrigger, "No")
-        # caput(pv.eiger_seq_id, int(caget(pv.eiger_seq_id))+1)
+    config = EIGER_CONFIGS[EigerCollectionMode(action)](
+        filepath=filepath,
+        filename=f"{filename}_{backend.get(pv.eiger_seq_id)}",
+        num_images=int(num_imgs),
+        exposure_time_s=float(exptime),
+        detector_distance_mm=det_z,
+        wavelength_a=dcm_wavelength_a,
+    )
+    report = yield from configure_eiger(config, backend)
     SSX_LOGGER.debug("***** leaving Eiger")
-    yield from bps.sleep(0.1)
-    return 0
+    return report
@@ -24,6 +24,11 @@ from mx_bluesky.beamlines.i24.serial.dcid import DCID
 from mx_bluesky.beamlines.i24.serial.extruder.i24ssx_extruder_collect_py3v2 import (
     run_plan_in_wrapper as run_ex_collection_plan,
 )
+from mx_bluesky.beamlines.i24.serial.fixed_target.collection_time import (
+    CollectionSettings,
+    format_estimate,
+    simulate_collection,
+)
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import (
     ChipType,
     MappingType,
@@ -43,6 +48,7 @@ from mx_bluesky.beamlines.i24.serial.log import (
     _read_visit_directory_from_file,
 )
 from mx_bluesky.beamlines.i24.serial.parameters import (
+    ChipDescription,
     FixedTargetParameters,
     get_chip_format,
 )
@@ -118,6 +124,23 @@ def gui_set_fiducial_0(pmac: PMAC = inject("PMAC")) -> MsgGenerator:
     yield from bps.trigger(pmac.home, wait=True)
 
 
+def _get_chip_and_map(
+    chip_type: str, map_type: str, chip_format: list[int | float]
+) -> tuple[ChipDescription, MappingType, list[int | float]]:
+    _format = chip_format if ChipType[chip_type] is ChipType.Custom else None
+    chip_params = get_chip_format(ChipType[chip_type], _format)
+    if ChipType[chip_type] in [ChipType.Oxford, ChipType.OxfordInner]:
+        mapping = MappingType.Lite if map_type == "Lite" else MappingType.NoMap
+        if mapping is MappingType.Lite and len(chip_format) == 0:
+            # this logic should go in the gui with error message.
+            raise EmptyMapError("No blocks chosen")
+        chip_map = chip_format
+    else:
+        mapping = MappingType.NoMap
+        chip_map = []
+    return chip_params, mapping, chip_map
+
+
 @bpp.run_decorator()
 def gui_run_chip_collection(
     sub_dir: str,
@@ -177,17 +200,7 @@ def gui_run_chip_collection(
     # get_detector_type temporarily disabled as pilatus went away, and for now only eiger in use
     # for this.
     # det_type = yield from get_detector_type(detector_stage)
-    _format = chip_format if ChipType[chip_type] is ChipType.Custom else None
-    chip_params = get_chip_format(ChipType[chip_type], _format)
-    if ChipType[chip_type] in [ChipType.Oxford, ChipType.OxfordInner]:
-        mapping = MappingType.Lite if map_type == "Lite" else MappingType.NoMap
-        if mapping is MappingType.Lite and len(chip_format) == 0:
-            # this logic should go in the gui with error message.
-            raise EmptyMapError("No blocks chosen")
-        chip_map = chip_format
-    else:
-        mapping = MappingType.NoMap
-        chip_map = []
+    chip_params, mapping, chip_map = _get_chip_and_map(chip_type, map_type, chip_format)
 
     # NOTE. For now setting attenuation here in place of the edms doing a caput
     yield from bps.abs_set(attenuator, transmission, wait=True)
@@ -240,6 +253,45 @@ def gui_run_chip_collection(
     )
 
 
+def gui_estimate_chip_collection_time(
+    exp_time: float,
+    n_shots: int,
+    chip_type: str,
+    map_type: str,
+    chip_format: list[int | float],
+    checker_pattern: bool,
+    pump_probe: str,
+    laser_dwell: float,
+    laser_delay: float,
+    pre_pump: float,
+) -> MsgGenerator:
+    """Estimate how long a chip collection will take, without moving anything. \
+    The arguments are as for gui_run_chip_collection.
+
+    Returns:
+        The estimated duration of the collection, in s.
+    """
+    chip_params, mapping, chip_map = _get_chip_and_map(chip_type, map_type, chip_format)
+    blocks = chip_map if mapping is MappingType.Lite else None
+    settings = CollectionSettings(
+        chip=chip_params,
+        blocks=tuple(
+            int(block) for block in blocks or range(1, chip_params.tot_num_blocks + 1)
+        ),
+        exposure_time_s=exp_time,
+        num_exposures=n_shots,
+        pump_repeat=PumpProbeSetting[pump_probe],
+        laser_dwell_s=laser_dwell,
+        laser_delay_s=laser_delay,
+        pre_pump_exposure_s=pre_pump,
+        checker_pattern=checker_pattern,
+    )
+    timeline = simulate_collection(settings)
+    SSX_LOGGER.info(format_estimate(timeline))
+    yield from bps.null()
+    return timeline.total_s
+
+
 @bpp.run_decorator()
 def gui_run_extruder_collection(
     sub_dir: str,
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import dataclasses
+
+import numpy as np
+
+from mx_bluesky.common.experiment_plans.rotation.rotation_utils import (
+    RotationMotionProfile,
+)
+from mx_bluesky.common.parameters.rotation import SingleRotationScan
+from mx_bluesky.common.utils.log import LOGGER
+from mx_bluesky.common.utils.xrc_result import XRayCentreResult
+
+
+@dataclasses.dataclass
+class HelicalVector:
+    """The line along which the sample is translated during a helical rotation.
+
+    Attributes:
+        start_um: x, y, z of the goniometer in microns at the first image
+        end_um: x, y, z of the goniometer in microns at the last image
+    """
+
+    start_um: np.ndarray
+    end_um: np.ndarray
+
+    @property
+    def length_um(self) -> float:
+        return float(np.linalg.norm(self.end_um - self.start_um))
+
+
+@dataclasses.dataclass
+class HelicalMotionProfile:
+    """The translation which accompanies the omega motion of a helical rotation.
+
+    The translation starts and stops with omega, so the start and end are extrapolated
+    beyond the helical vector to cover the omega acceleration and shutter opening.
+
+    Attributes:
+        start_motion_mm: x, y, z of the goniometer in mm when omega starts moving
+        end_motion_mm: x, y, z of the goniometer in mm when omega stops moving
+        velocity_mm_s: The speed of each of x, y and z during the rotation
+    """
+
+    start_motion_mm: np.ndarray
+    end_motion_mm: np.ndarray
+    velocity_mm_s: np.ndarray
+
+
+def helical_vector_from_xrc_result(
+    result: XRayCentreResult, margin_um: float, min_length_um: float
+) -> HelicalVector | None:
+    """Calculates a helical vector which runs through the centre of mass of a crystal
+    along its principal axis.
+
+    Only an axis-aligned bounding box is known about the crystal, so the principal axis
+    is taken to be the longest edge of the box. The vector is shortened by margin_um at
+    each end to keep the beam away from the edges of the crystal.
+
+    Args:
+        result: The X-ray centring result for the crystal
+        margin_um: Distance in microns from each end of the crystal to leave uncollected
+        min_length_um: The shortest vector worth collecting helically
+
+    Returns:
+        The helical vector in microns, or None if the crystal is too short for a
+        helical collection.
+    """
+    centre_um = np.asarray(result.centre_of_mass_mm, dtype=float) * 1000
+    corners_um = np.asarray(result.bounding_box_mm, dtype=float) * 1000
+    low_um, high_um = corners_um.min(axis=0), corners_um.max(axis=0)
+    principal_axis = int(np.argmax(high_um - low_um))
+    start_um, end_um = centre_um.copy(), centre_um.copy()
+    start_um[principal_axis] = low_um[principal_axis] + margin_um
+    end_um[principal_axis] = high_um[principal_axis] - margin_um
+    vector = HelicalVector(start_um, end_um)
+    if end_um[principal_axis] - start_um[principal_axis] < min_length_um:
+        LOGGER.info(
+            f"Crystal at {centre_um} is too short for a helical collection, {vector}"
+        )
+        return None
+    return vector
+
+
+def calculate_helical_motion_profile(
+    params: SingleRotationScan, motion_values: RotationMotionProfile
+) -> HelicalMotionProfile:
+    """Calculates the translation to accompany the rotation so that the goniometer
+    moves linearly from the start to the end of the helical vector while images are
+    collected.
+
+    Args:
+        params (SingleRotationScan): Rotation parameters which include a helical vector
+        motion_values (RotationMotionProfile): The omega motion for the rotation
+    """
+    assert params.is_helical, "Rotation is not helical"
+    start_um = [params.x_start_um, params.y_start_um, params.z_start_um]
+    end_um = [params.x_end_um, params.y_end_um, params.z_end_um]
+    start_mm = np.array(start_um, dtype=float) / 1000
+    end_mm = np.array(end_um, dtype=float) / 1000
+    per_scan_width = (end_mm - start_mm) / motion_values.scan_width_deg
+    # Images start once omega has reached speed and the shutter has opened
+    lead_in_deg = (
+        motion_values.acceleration_offset_deg + motion_values.shutter_opening_deg
+    )
+    lead_out_deg = motion_values.acceleration_offset_deg
+    profile = HelicalMotionProfile(
+        start_motion_mm=start_mm - per_scan_width * lead_in_deg,
+        end_motion_mm=end_mm + per_scan_width * lead_out_deg,
+        velocity_mm_s=np.abs(end_mm - start_mm) / motion_values.total_exposure_s,
+    )
+    LOGGER.info(f"Helical motion profile {profile}")
+    return profile
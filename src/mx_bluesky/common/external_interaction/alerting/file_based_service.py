@@ -0,0 +1,31 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+from threading import Lock
+
+from mx_bluesky.common.external_interaction.alerting._service import (
+    AlertService,
+    ExtraMetadata,
+    Metadata,
+)
+
+
+class FileAlertService(AlertService):
+    """
+    Implement an alert service that appends each alert as a line of JSON to a file,
+    for use where no alerting backend is available or to keep a local record.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self._path = path
+        self._lock = Lock()
+
+    def raise_alert(self, summary: str, content: str, metadata: dict[Metadata, str]):
+        record = {
+            "time": datetime.now(UTC).isoformat(),
+            ExtraMetadata.ALERT_SUMMARY: summary,
+            ExtraMetadata.ALERT_CONTENT: content,
+        } | metadata
+        with self._lock, open(self._path, "a") as f:
+            f.write(json.dumps(record) + "\n")
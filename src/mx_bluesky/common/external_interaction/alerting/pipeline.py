@@ -0,0 +1,232 @@
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from threading import RLock, Timer
+from typing import Protocol
+
+from dodal.log import LOGGER
+
+from mx_bluesky.common.external_interaction.alerting._service import (
+    AlertService,
+    Metadata,
+)
+
+DEFAULT_DEDUPLICATION_WINDOW_S = 300.0
+DEFAULT_DEDUPLICATION_METADATA = (Metadata.VISIT, Metadata.CONTAINER)
+DEFAULT_BURST_SIZE = 5
+DEFAULT_ALERTS_PER_HOUR = 30.0
+# How long an alert is remembered for, after which it is no longer rate limited
+DEFAULT_RECURRENCE_MEMORY_S = 3600.0
+
+AlertKey = tuple[str, str, tuple[str, ...]]
+
+
+class CancellableTimer(Protocol):
+    def cancel(self) -> None: ...
+
+
+def start_daemon_timer(
+    delay_s: float, function: Callable[[], None]
+) -> CancellableTimer:
+    timer = Timer(delay_s, function)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class TokenBucket:
+    """Token bucket rate limiter, which allows bursts of up to capacity events and
+    thereafter a sustained rate of refill_per_s events per second."""
+
+    def __init__(
+        self,
+        capacity: int,
+        refill_per_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._capacity = capacity
+        self._refill_per_s = refill_per_s
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._last_refill = clock()
+
+    def try_acquire(self) -> bool:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._last_refill) * self._refill_per_s,
+        )
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+@dataclass
+class _SuppressedAlerts:
+    window_start: float
+    summary: str
+    metadata: dict[Metadata, str]
+    count: int = 0
+
+
+class AlertPipeline(AlertService):
+    """
+    An alert service that deduplicates and rate limits alerts before forwarding them
+    to one or more sink services, so that a repeatedly occurring error does not flood
+    the alert channel.
+
+    Alerts with the same summary, content and deduplication metadata within the
+    deduplication window of the first are suppressed. An alert that recurs after its
+    window has expired is also suppressed if the overall rate exceeds that allowed by
+    the rate limiter, but the first occurrence of an alert is never rate limited.
+    When the window for a suppressed alert expires, a digest alert reporting the
+    number of identical alerts suppressed is sent by a timer.
+    """
+
+    def __init__(
+        self,
+        sinks: Sequence[AlertService],
+        deduplication_window_s: float = DEFAULT_DEDUPLICATION_WINDOW_S,
+        deduplication_metadata: Iterable[Metadata] = DEFAULT_DEDUPLICATION_METADATA,
+        burst_size: int = DEFAULT_BURST_SIZE,
+        alerts_per_hour: float = DEFAULT_ALERTS_PER_HOUR,
+        recurrence_memory_s: float = DEFAULT_RECURRENCE_MEMORY_S,
+        clock: Callable[[], float] = time.monotonic,
+        start_timer: Callable[
+            [float, Callable[[], None]], CancellableTimer
+        ] = start_daemon_timer,
+    ):
+        """
+        Args:
+            sinks: The services to which alerts that pass through are forwarded.
+            deduplication_window_s: The time in seconds after an alert is forwarded
+                during which similar alerts will be suppressed.
+            deduplication_metadata: The metadata fields which, along with the
+                summary and content, identify identical alerts.
+            burst_size: The maximum number of recurring alerts that can be sent in
+                quick succession.
+            alerts_per_hour: The sustained rate of recurring alerts allowed once the
+                burst has been used.
+            recurrence_memory_s: How long after it was last raised an alert is
+                treated as recurring rather than new.
+            clock: Monotonic time source in seconds, replaceable for testing.
+            start_timer: Starts a timer which calls a function after a delay in
+                seconds, replaceable for testing.
+        """
+        super().__init__()
+        self._sinks = list(sinks)
+        self._window_s = deduplication_window_s
+        self._dedup_metadata = tuple(deduplication_metadata)
+        self._clock = clock
+        self._rate_limiter = TokenBucket(burst_size, alerts_per_hour / 3600, clock)
+        self._recurrence_memory_s = recurrence_memory_s
+        self._start_timer = start_timer
+        self._suppressed: dict[AlertKey, _SuppressedAlerts] = {}
+        self._last_raised: dict[AlertKey, float] = {}
+        self._flush_timer: CancellableTimer | None = None
+        self._flush_due: float | None = None
+        self._lock = RLock()
+
+    @property
+    def sinks(self) -> list[AlertService]:
+        return self._sinks
+
+    def _key(
+        self, summary: str, content: str, metadata: dict[Metadata, str]
+    ) -> AlertKey:
+        return (
+            summary,
+            content,
+            tuple(metadata.get(field, "") for field in self._dedup_metadata),
+        )
+
+    def raise_alert(self, summary: str, content: str, metadata: dict[Metadata, str]):
+        with self._lock:
+            self.flush_digests()
+            now = self._clock()
+            key = self._key(summary, content, metadata)
+            recurring = now - self._last_raised.get(key, -float("inf")) < (
+                self._recurrence_memory_s
+            )
+            self._last_raised[key] = now
+            if (existing := self._suppressed.get(key)) is not None:
+                self._suppress(existing)
+                LOGGER.debug(f"Suppressed duplicate alert {summary}")
+                return
+            suppressed = _SuppressedAlerts(now, summary, metadata)
+            self._suppressed[key] = suppressed
+            # The first occurrence of an alert uses up the burst but is always sent
+            if not self._rate_limiter.try_acquire() and recurring:
+                self._suppress(suppressed)
+                LOGGER.warning(f"Alert rate limit exceeded, suppressed alert {summary}")
+                return
+            self._send(summary, content, metadata)
+
+    def flush_digests(self):
+        """Send a digest for each alert whose deduplication window has expired and
+        for which identical alerts were suppressed. Digests are not rate limited.
+
+        This is called by a timer when the first window with suppressed alerts
+        expires, so it need not be called by hand."""
+        with self._lock:
+            now = self._clock()
+            for key, suppressed in list(self._suppressed.items()):
+                if now - suppressed.window_start >= self._window_s:
+                    del self._suppressed[key]
+                    if suppressed.count:
+                        self._send(
+                            suppressed.summary,
+                            f"{suppressed.count} identical alerts suppressed in the "
+                            f"last {now - suppressed.window_start:.0f}s",
+                            suppressed.metadata,
+                        )
+            self._last_raised = {
+                key: raised
+                for key, raised in self._last_raised.items()
+                if now - raised < self._recurrence_memory_s
+            }
+            self._schedule_flush()
+
+    def close(self):
+        """Cancel the timer for the next digest. Pending digests are not sent."""
+        with self._lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            self._flush_timer = self._flush_due = None
+
+    def _flush_on_timer(self):
+        with self._lock:
+            # Forget the timer, so that one is started again if it fired early
+            self._flush_timer = self._flush_due = None
+            self.flush_digests()
+
+    def _suppress(self, suppressed: _SuppressedAlerts):
+        suppressed.count += 1
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        due = min(
+            (
+                suppressed.window_start + self._window_s
+                for suppressed in self._suppressed.values()
+                if suppressed.count
+            ),
+            default=None,
+        )
+        if due == self._flush_due:
+            return
+        self.close()
+        if due is not None:
+            self._flush_due = due
+            self._flush_timer = self._start_timer(
+                max(due - self._clock(), 0), self._flush_on_timer
+            )
+
+    def _send(self, summary: str, content: str, metadata: dict[Metadata, str]):
+        for sink in self._sinks:
+            try:
+                sink.raise_alert(summary, content, metadata)
+            except Exception:
+                LOGGER.exception(f"Alert sink {sink} failed to raise alert {summary}")
@@ -0,0 +1,32 @@
+import requests
+
+from mx_bluesky.common.external_interaction.alerting._service import (
+    AlertService,
+    ExtraMetadata,
+    Metadata,
+)
+
+DEFAULT_WEBHOOK_TIMEOUT_S = 5.0
+
+
+class WebhookAlertService(AlertService):
+    """
+    Implement an alert service that POSTs each alert as JSON to a webhook URL.
+    """
+
+    def __init__(self, url: str, timeout_s: float = DEFAULT_WEBHOOK_TIMEOUT_S):
+        super().__init__()
+        self._url = url
+        self._timeout_s = timeout_s
+
+    def raise_alert(self, summary: str, content: str, metadata: dict[Metadata, str]):
+        response = requests.post(
+            self._url,
+            json={
+                ExtraMetadata.ALERT_SUMMARY: summary,
+                ExtraMetadata.ALERT_CONTENT: content,
+            }
+            | metadata,
+            timeout=self._timeout_s,
+        )
+        response.raise_for_status()
@@ -25,7 +25,7 @@ from mx_bluesky.common.parameters.components import DiffractionExperimentWithSam
 from mx_bluesky.common.parameters.constants import USE_NUMTRACKER, DocDescriptorNames
 from mx_bluesky.common.utils.log import (
     ISPYB_ZOCALO_CALLBACK_LOGGER,
-    format_doc_for_log,
+    LazyDocFormat,
     set_dcgid_tag,
 )
 from mx_bluesky.common.utils.utils import convert_ev_to_angstrom
@@ -112,8 +112,10 @@ class BaseISPyBCallback(PlanReactiveCallback):
         event_descriptor = self.descriptors.get(doc["descriptor"])
         if event_descriptor is None:
             ISPYB_ZOCALO_CALLBACK_LOGGER.warning(
-                f"Ispyb handler {self} received event doc {format_doc_for_log(doc)} and "
-                "has no corresponding descriptor record"
+                "Ispyb handler %s received event doc %s and has no corresponding "
+                "descriptor record",
+                self,
+                LazyDocFormat(doc),
             )
             return doc
         match event_descriptor.get("name"):
@@ -132,7 +134,7 @@ class BaseISPyBCallback(PlanReactiveCallback):
 
         assert self.params, "Event handled before activity_gated_start received params"
         ISPYB_ZOCALO_CALLBACK_LOGGER.info(
-            f"ISPyB handler received event from read hardware: {doc}"
+            "ISPyB handler received event from read hardware: %s", LazyDocFormat(doc)
         )
         synchrotron_mode = _data["synchrotron-synchrotron_mode"]
 
@@ -247,7 +249,10 @@ class BaseISPyBCallback(PlanReactiveCallback):
             self.ispyb.end_deposition(self.ispyb_ids, exit_status, reason)
         except Exception as e:
             ISPYB_ZOCALO_CALLBACK_LOGGER.warning(
-                f"Failed to finalise ISPyB deposition on stop document: {format_doc_for_log(doc)} with exception: {e}"
+                "Failed to finalise ISPyB deposition on stop document: %s with "
+                "exception: %s",
+                LazyDocFormat(doc),
+                e,
             )
         return self.tag_doc(doc)
 
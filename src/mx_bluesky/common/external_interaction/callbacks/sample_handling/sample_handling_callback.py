@@ -10,6 +10,7 @@ from mx_bluesky.common.external_interaction.callbacks.common.plan_reactive_callb
 from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
     BLSampleStatus,
     ExpeyeInteraction,
+    get_expeye_interaction,
 )
 from mx_bluesky.common.utils.exceptions import CrystalNotFoundError, SampleError
 from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER
@@ -43,7 +44,7 @@ class SampleHandlingCallback(PlanReactiveCallback):
 
     def activity_gated_stop(self, doc: RunStop) -> RunStop:
         if self._run_id == doc.get("run_start"):
-            expeye = ExpeyeInteraction()
+            expeye = get_expeye_interaction()
             if doc["exit_status"] != "success":
                 reason = doc.get("reason", "")
                 exception_type, message = SampleError.type_and_message_from_reason(
@@ -1,4 +1,6 @@
 import configparser
+import os
+import threading
 from dataclasses import dataclass
 from enum import StrEnum
 from typing import Any, Literal
@@ -31,9 +33,9 @@ class BearerAuth(AuthBase):
         return r
 
 
-def _get_base_url_and_token() -> tuple[str, str]:
+def _get_base_url_and_token(config_path: str | None = None) -> tuple[str, str]:
     config = configparser.ConfigParser()
-    conf = get_ispyb_config()
+    conf = config_path or get_ispyb_config()
     config.read(conf)
     expeye_config = config["expeye"]
     return expeye_config["url"], expeye_config["token"]
@@ -92,9 +94,13 @@ class ExpeyeInteraction:
     CREATE_ROBOT_ACTION = "/proposals/{proposal}/sessions/{visit_number}/robot-actions"
     UPDATE_ROBOT_ACTION = "/robot-actions/{action_id}"
 
-    def __init__(self) -> None:
-        url, token = _get_base_url_and_token()
-        self._base_url = url
+    def __init__(self, base_url: str | None = None, token: str | None = None) -> None:
+        if base_url is None or token is None:
+            base_url, token = _get_base_url_and_token()
+        self.update_credentials(base_url, token)
+
+    def update_credentials(self, base_url: str, token: str):
+        self._base_url = base_url
         self._auth = BearerAuth(token)
 
     def start_robot_action(
@@ -251,6 +257,47 @@ class ExpeyeInteraction:
         return response["gridInfoId"]
 
 
+_expeye_clients_lock = threading.Lock()
+_expeye_clients: dict[str, tuple[tuple[int, int], ExpeyeInteraction]] = {}
+
+
+def get_expeye_interaction() -> ExpeyeInteraction:
+    """Get the process-wide ExpeyeInteraction for the current ISPyB config.
+
+    The same client is returned for as long as the config path is unchanged. The
+    credentials file is only re-read if it has been modified since it was last read,
+    in which case the existing client is updated in place so that callers holding a
+    reference to it pick up the new credentials."""
+    config_path = get_ispyb_config()
+    stat = os.stat(config_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _expeye_clients_lock:
+        cached = _expeye_clients.get(config_path)
+        if cached is None:
+            client = ExpeyeInteraction(*_get_base_url_and_token(config_path))
+        else:
+            cached_version, client = cached
+            if cached_version != version:
+                client.update_credentials(*_get_base_url_and_token(config_path))
+        _expeye_clients[config_path] = (version, client)
+        return client
+
+
+def set_expeye_interaction(
+    client: ExpeyeInteraction | None, config_path: str | None = None
+):
+    """Set the process-wide ExpeyeInteraction for an ISPyB config, by default the
+    current one, rather than creating it from the credentials in the config, or remove
+    it if the client is None."""
+    config_path = config_path or get_ispyb_config()
+    with _expeye_clients_lock:
+        if client is None:
+            _expeye_clients.pop(config_path, None)
+        else:
+            stat = os.stat(config_path)
+            _expeye_clients[config_path] = ((stat.st_mtime_ns, stat.st_size), client)
+
+
 def _none_to_absent(json: dict) -> dict:
     for key in [key for key in json if json[key] is None]:
         del json[key]
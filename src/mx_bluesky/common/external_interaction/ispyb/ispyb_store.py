@@ -13,7 +13,9 @@ from mx_bluesky.common.external_interaction.ispyb.data_model import (
     DataCollectionInfo,
     ScanDataInfo,
 )
-from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import ExpeyeInteraction
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    get_expeye_interaction,
+)
 from mx_bluesky.common.external_interaction.ispyb.ispyb_utils import (
     get_current_time_string,
 )
@@ -33,7 +35,7 @@ class IspybIds(BaseModel):
 class StoreInIspyb:
     def __init__(self, ispyb_config: str) -> None:
         self.ISPYB_CONFIG_PATH: str = ispyb_config
-        self._expeye = ExpeyeInteraction()
+        self._expeye = get_expeye_interaction()
 
     def begin_deposition(
         self,
@@ -31,6 +31,8 @@ class DocDescriptorNames:
     SAMPLE_HANDLING_EXCEPTION = "sample_handling_exception"
     ZOCALO_HW_READ = "zocalo_read_hardware_plan"
     FLYSCAN_RESULTS = "flyscan_results_obtained"
+    EDGE_SCAN_POINT = "edge_scan_point"
+    EDGE_SCAN_RESULT = "edge_scan_result"
 
 
 def _get_oav_config_json_path():
@@ -70,6 +72,7 @@ class PlanNameConstants:
     DO_FGS = "do_fgs"
     FLYSCAN_RESULTS = "xray_centre_results"
     PIN_TIP_CENTRE_THEN_XRC = "pin_tip_centre_then_xray_centre"
+    WELL_REGIONS = "well_regions"
     TRIGGER_GRIDSCAN_ISPYB_CALLBACK = "trigger gridscan ispyb callback"
     # Rotation scan
     ROTATION_MULTI = "multi_rotation_wrapper"
@@ -78,6 +81,7 @@ class PlanNameConstants:
     ROTATION_MAIN = "rotation_scan_main"
 
     SET_ENERGY = "set_energy"
+    EDGE_SCAN = "edge_scan"
 
 
 @dataclass(frozen=True)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import math
 import os
 from collections.abc import Iterator
 from itertools import accumulate
@@ -12,7 +13,7 @@ from dodal.devices.zebra.zebra import (
     RotationDirection,
 )
 from dodal.log import LOGGER
-from pydantic import Field, field_validator, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from scanspec.core import AxesPoints
 from scanspec.core import Path as ScanPath
 from scanspec.specs import Line
@@ -44,17 +45,44 @@ class RotationScanPerSweep(OptionalGonioAngleStarts, WithSample):
             the final angle is obtained by adding scan_width_deg, otherwise by subtraction (default NEGATIVE).
             See "Hyperion Coordinate Systems" in the documentation.
         nexus_vds_start_img: The frame number of the first frame captured during the rotation
+        x_end_um, y_end_um, z_end_um: If given along with the start xyz, the sample is
+            translated linearly from the start to the end position during the rotation,
+            making it a helical collection
     """
 
     x_start_um: float | None = None
     y_start_um: float | None = None
     z_start_um: float | None = None
+    x_end_um: float | None = None
+    y_end_um: float | None = None
+    z_end_um: float | None = None
     omega_start_deg: float = Field(default=0)  # type: ignore
     rotation_axis: RotationAxis = Field(default=RotationAxis.OMEGA)
     scan_width_deg: float = Field(default=360, gt=0)
     rotation_direction: RotationDirection = Field(default=RotationDirection.NEGATIVE)
     nexus_vds_start_img: int = Field(default=0, ge=0)
 
+    @property
+    def is_helical(self) -> bool:
+        return None not in (
+            self.x_start_um,
+            self.y_start_um,
+            self.z_start_um,
+            self.x_end_um,
+            self.y_end_um,
+            self.z_end_um,
+        )
+
+    @model_validator(mode="after")
+    def _check_helical_end_has_start(self) -> Self:
+        has_end = any(
+            end is not None for end in (self.x_end_um, self.y_end_um, self.z_end_um)
+        )
+        assert not has_end or self.is_helical, (
+            "A helical rotation needs all of the start and end xyz"
+        )
+        return self
+
 
 class RotationExperiment(DiffractionExperiment):
     shutter_opening_time_s: float = Field(
@@ -108,13 +136,24 @@ class RotationExperiment(DiffractionExperiment):
 class SingleRotationScan(
     RotationExperiment, RotationScanPerSweep, DiffractionExperimentWithSample
 ):
+    @model_validator(mode="after")
+    def _set_helical_experiment_type(self) -> Self:
+        # Other experiment types, e.g. MAD, say more about the collection than this
+        if self.is_helical and self.ispyb_experiment_type in (
+            IspybExperimentType.ROTATION,
+            IspybExperimentType.OSC,
+        ):
+            self.ispyb_experiment_type = IspybExperimentType.HELICAL
+        return self
+
     @property
     def detector_params(self):
         return self._detector_params(self.omega_start_deg)
 
     @property
     def scan_points(self) -> AxesPoints:
-        """The scan points are defined in application space"""
+        """The scan points are defined in application space, for a helical rotation
+        they include the sample position in microns at each image"""
         scan_spec = Line(
             axis="omega",
             start=self.omega_start_deg,
@@ -124,6 +163,18 @@ class SingleRotationScan(
             ),
             num=self.num_images,
         )
+        if self.is_helical:
+            # The end is reached at the end of the final image
+            fraction = (self.num_images - 1) / self.num_images
+            for axis, start, end in (
+                ("sam_x", self.x_start_um, self.x_end_um),
+                ("sam_y", self.y_start_um, self.y_end_um),
+                ("sam_z", self.z_start_um, self.z_end_um),
+            ):
+                assert start is not None and end is not None
+                scan_spec = scan_spec.zip(
+                    Line(axis, start, start + (end - start) * fraction, self.num_images)
+                )
         scan_path = ScanPath(scan_spec.calculate())
         return scan_path.consume().midpoints
 
@@ -132,8 +183,68 @@ class SingleRotationScan(
         return int(self.scan_width_deg / self.rotation_increment_deg)
 
 
+class WedgeSchedule(BaseModel):
+    """
+    Splits each sweep into wedges which are collected interleaved, all in the same
+    detector arm. With inverse beam each wedge is followed by the same wedge rotated by
+    180 degrees, so that Friedel pairs are measured close together in time and dose.
+
+    Attributes:
+        wedge_width_deg: The rotation of each wedge, which must divide the scan width of
+            every sweep
+        inverse_beam: Whether to follow each wedge with its inverse
+    """
+
+    wedge_width_deg: float = Field(gt=0)
+    inverse_beam: bool = True
+
+    def split(self, sweep: RotationScanPerSweep) -> list[RotationScanPerSweep]:
+        """The wedges of a sweep in the order they are collected. A helical sweep is
+        divided into the same number of segments, each wedge and its inverse
+        translating along the same segment."""
+        num_wedges = round(sweep.scan_width_deg / self.wedge_width_deg)
+        assert math.isclose(num_wedges * self.wedge_width_deg, sweep.scan_width_deg), (
+            f"Wedge width {self.wedge_width_deg} does not divide scan width "
+            f"{sweep.scan_width_deg}"
+        )
+        offsets_deg = (0.0, 180.0) if self.inverse_beam else (0.0,)
+        wedges = []
+        for i in range(num_wedges):
+            start_deg = (
+                sweep.omega_start_deg
+                + sweep.rotation_direction.multiplier * i * self.wedge_width_deg
+            )
+            for offset_deg in offsets_deg:
+                wedge = sweep.model_copy(
+                    update={
+                        "omega_start_deg": start_deg + offset_deg,
+                        "scan_width_deg": self.wedge_width_deg,
+                    }
+                )
+                if sweep.is_helical:
+                    _set_helical_segment(
+                        wedge, sweep, i / num_wedges, (i + 1) / num_wedges
+                    )
+                wedges.append(wedge)
+        return wedges
+
+
+def _set_helical_segment(
+    wedge: RotationScanPerSweep,
+    sweep: RotationScanPerSweep,
+    start_fraction: float,
+    end_fraction: float,
+):
+    for axis in ("x", "y", "z"):
+        start = getattr(sweep, f"{axis}_start_um")
+        end = getattr(sweep, f"{axis}_end_um")
+        setattr(wedge, f"{axis}_start_um", start + (end - start) * start_fraction)
+        setattr(wedge, f"{axis}_end_um", start + (end - start) * end_fraction)
+
+
 class RotationScan(RotationExperiment, SplitScan):
     rotation_scans: Annotated[list[RotationScanPerSweep], Len(min_length=1)]
+    wedges: WedgeSchedule | None = None
 
     def _single_rotation_scan(self, scan: RotationScanPerSweep) -> SingleRotationScan:
         # self has everything from RotationExperiment
@@ -158,7 +269,7 @@ class RotationScan(RotationExperiment, SplitScan):
 
     @model_validator(mode="after")
     def _check_valid_for_single_arm_multiple_sweep(self) -> Self:
-        if len(self.rotation_scans) > 0:
+        if len(self.rotation_scans) > 0 and not self.wedges:
             scan_width = self.rotation_scans[0].scan_width_deg
             for scan in self.rotation_scans[1:]:
                 assert scan.scan_width_deg == scan_width, (
@@ -167,15 +278,53 @@ class RotationScan(RotationExperiment, SplitScan):
 
         return self
 
+    @model_validator(mode="after")
+    def _check_valid_for_wedges(self) -> Self:
+        if self.wedges:
+            for scan in self.rotation_scans:
+                self.wedges.split(scan)
+            first = self.rotation_scans[0]
+            assert all(
+                (scan.chi_start_deg, scan.phi_start_deg)
+                == (first.chi_start_deg, first.phi_start_deg)
+                for scan in self.rotation_scans
+            ), "Wedged sweeps are written to one nexus file so must share chi and phi"
+            if self.wedges.inverse_beam:
+                if self.ispyb_experiment_type == IspybExperimentType.SAD:
+                    self.ispyb_experiment_type = IspybExperimentType.SAD_INVERSE_BEAM
+                elif self.ispyb_experiment_type == IspybExperimentType.MAD:
+                    self.ispyb_experiment_type = IspybExperimentType.MAD_INVERSE_BEAM
+        return self
+
+    @property
+    def sweeps(self) -> list[RotationScanPerSweep]:
+        """The sweeps in the order they are collected. Without a wedge schedule these
+        are the rotation scans, otherwise each rotation scan is split into its wedges.
+        Only the first wedge takes snapshots."""
+        if not self.wedges:
+            return self.rotation_scans
+        sweeps = [
+            wedge for scan in self.rotation_scans for wedge in self.wedges.split(scan)
+        ]
+        start_img = 0.0
+        for sweep in sweeps:
+            sweep.nexus_vds_start_img = int(start_img)
+            start_img += sweep.scan_width_deg / self.rotation_increment_deg
+        return sweeps
+
     @property
     def single_rotation_scans(self) -> Iterator[SingleRotationScan]:
-        for scan in self.rotation_scans:
-            yield self._single_rotation_scan(scan)
+        for i, scan in enumerate(self.sweeps):
+            single_scan = self._single_rotation_scan(scan)
+            if self.wedges and i > 0:
+                single_scan.snapshot_omegas_deg = None
+                single_scan.use_grid_snapshots = False
+            yield single_scan
 
     def _num_images_per_scan(self):
         return [
             int(scan.scan_width_deg / self.rotation_increment_deg)
-            for scan in self.rotation_scans
+            for scan in self.sweeps
         ]
 
     @property
@@ -189,7 +338,7 @@ class RotationScan(RotationExperiment, SplitScan):
     @property
     def detector_params(self) -> DetectorParams:
         return self._detector_params_impl(
-            self.rotation_scans[0].omega_start_deg,
+            self.sweeps[0].omega_start_deg,
             self._num_images_per_scan()[0],
             len(self._num_images_per_scan()),
         )
@@ -0,0 +1,223 @@
+"""Measures where the time goes in a plan made up of several phases.
+
+Each run opened with a run key inside the profiled plan is treated as a phase, so
+sub-plans such as robot load, gridscan and each rotation sweep are timed without
+having to be modified. Time spent in ``bps.wait`` is summed per wait group and
+attributed to the innermost phase in progress. Once the profiled plan is complete a
+summary is logged and emitted as a single event in the ``phase_timings`` stream, so
+that it can be aggregated across a session, see
+:mod:`mx_bluesky.common.utils.phase_report`.
+"""
+
+import json
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import bluesky.plan_stubs as bps
+from bluesky import preprocessors as bpp
+from bluesky.utils import Msg, MsgGenerator, make_decorator
+
+from mx_bluesky.common.utils.log import LOGGER
+
+PHASE_TIMINGS_STREAM = "phase_timings"
+PHASE_TIMINGS_KEY = "phase_timings"
+TOTAL_DURATION_KEY = "phase_timings_total_s"
+TOTAL_WAIT_KEY = "phase_timings_wait_s"
+# Name given to the phase covering the whole of the profiled plan
+ROOT_PHASE = "total"
+
+
+@dataclass
+class PhaseTiming:
+    """Timing of a single phase, with times in seconds from the start of profiling.
+
+    Attributes:
+        name: The run key of the phase.
+        parent: Index of the enclosing phase in the list of phases, if any.
+        start_s: Time at which the phase started.
+        end_s: Time at which the phase ended, or None if it did not complete.
+        waits_s: Total time spent in bps.wait within this phase, excluding any
+            nested phases, keyed by wait group. Groups generated by bluesky for
+            ``wait=True`` are replaced by the names of the devices in them.
+    """
+
+    name: str
+    parent: int | None
+    start_s: float
+    end_s: float | None = None
+    waits_s: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def duration_s(self) -> float | None:
+        return None if self.end_s is None else self.end_s - self.start_s
+
+
+class _PhaseTimingsReadable:
+    """Presents the phase timings to the RunEngine as a readable device, so that
+    they can be emitted in an event document."""
+
+    def __init__(self, profiler: "PhaseProfiler"):
+        self.name = PHASE_TIMINGS_STREAM
+        self.parent = None
+        self._profiler = profiler
+
+    def describe(self) -> dict[str, Any]:
+        source = "mx_bluesky.phase_profiler"
+        return {
+            PHASE_TIMINGS_KEY: {"source": source, "dtype": "string", "shape": []},
+            TOTAL_DURATION_KEY: {"source": source, "dtype": "number", "shape": []},
+            TOTAL_WAIT_KEY: {"source": source, "dtype": "number", "shape": []},
+        }
+
+    def read(self) -> dict[str, Any]:
+        timestamp = time.time()
+        root = self._profiler.phases[0]
+        values = {
+            PHASE_TIMINGS_KEY: json.dumps(
+                [asdict(phase) for phase in self._profiler.phases]
+            ),
+            TOTAL_DURATION_KEY: root.duration_s or 0.0,
+            TOTAL_WAIT_KEY: sum(
+                sum(phase.waits_s.values()) for phase in self._profiler.phases
+            ),
+        }
+        return {
+            key: {"value": value, "timestamp": timestamp}
+            for key, value in values.items()
+        }
+
+
+def _is_generated_group(group: str) -> bool:
+    try:
+        uuid.UUID(group)
+    except ValueError:
+        return False
+    return True
+
+
+class PhaseProfiler:
+    """Records the timings of the phases of a plan, see the module docstring.
+
+    A profiler should only be used to profile a single plan.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.phases: list[PhaseTiming] = []
+        self._clock = clock
+        self._t0 = 0.0
+        self._open: list[int] = []
+        self._group_devices: dict[str, set[str]] = defaultdict(set)
+
+    def _now(self) -> float:
+        return self._clock() - self._t0
+
+    def _start_phase(self, name: str):
+        parent = self._open[-1] if self._open else None
+        self.phases.append(PhaseTiming(name, parent, self._now()))
+        self._open.append(len(self.phases) - 1)
+
+    def _end_phase(self):
+        self.phases[self._open.pop()].end_s = self._now()
+
+    def _wait_label(self, group: Any) -> str:
+        if group is None:
+            return "ungrouped"
+        if not isinstance(group, str):
+            return str(group)
+        if _is_generated_group(group) and (devices := self._group_devices.get(group)):
+            return "+".join(sorted(devices))
+        return group
+
+    def _before(self, msg: Msg):
+        if msg.command == "open_run" and msg.run:
+            self._start_phase(msg.run)
+        group = msg.kwargs.get("group")
+        if isinstance(group, str) and msg.obj is not None:
+            self._group_devices[group].add(getattr(msg.obj, "name", str(msg.obj)))
+
+    def _after(self, msg: Msg, duration_s: float):
+        match msg.command:
+            case "wait":
+                label = self._wait_label(msg.kwargs.get("group"))
+                waits_s = self.phases[self._open[-1]].waits_s
+                waits_s[label] = waits_s.get(label, 0.0) + duration_s
+            case "close_run" if msg.run and len(self._open) > 1:
+                if self.phases[self._open[-1]].name == msg.run:
+                    self._end_phase()
+
+    def _profile(self, plan: MsgGenerator) -> MsgGenerator:
+        reply: Any = None
+        error: BaseException | None = None
+        while True:
+            try:
+                msg = plan.throw(error) if error is not None else plan.send(reply)
+            except StopIteration as e:
+                return e.value
+            error = None
+            self._before(msg)
+            sent_at = self._clock()
+            try:
+                reply = yield msg
+            except GeneratorExit:
+                plan.close()
+                raise
+            except BaseException as e:
+                error = e
+                reply = None
+            self._after(msg, self._clock() - sent_at)
+
+    def summary(self) -> str:
+        """A one line summary of the duration and wait time of each phase."""
+
+        def describe(phase: PhaseTiming) -> str:
+            duration = (
+                "incomplete" if phase.duration_s is None else f"{phase.duration_s:.1f}s"
+            )
+            return (
+                f"{phase.name} {duration} (waiting {sum(phase.waits_s.values()):.1f}s)"
+            )
+
+        return ", ".join(describe(phase) for phase in self.phases)
+
+    def _emit_summary(self, description: str) -> MsgGenerator:
+        # Any phases still open did not complete, so only the root phase is ended
+        self.phases[0].end_s = self._now()
+        self._open.clear()
+        LOGGER.info(f"Phase timings for {description}: {self.summary()}")
+        yield from bps.create(PHASE_TIMINGS_STREAM)
+        yield from bps.read(_PhaseTimingsReadable(self))
+        yield from bps.save()
+
+    def profile(self, plan: MsgGenerator, description: str = "plan") -> MsgGenerator:
+        """Profile the given plan, emitting the summary once it has finished, whether
+        or not it succeeded. Must be used within an open run, to which the summary
+        event will be added.
+
+        Args:
+            plan: The plan to profile.
+            description: Describes what was profiled in the log message.
+        """
+        self._t0 = self._clock()
+        self._start_phase(ROOT_PHASE)
+        return (
+            yield from bpp.finalize_wrapper(
+                self._profile(plan), lambda: self._emit_summary(description)
+            )
+        )
+
+
+def phase_profiler_wrapper(
+    plan: MsgGenerator,
+    description: str = "plan",
+    clock: Callable[[], float] = time.monotonic,
+) -> MsgGenerator:
+    """Profile the phases of a plan with a new PhaseProfiler, see
+    PhaseProfiler.profile."""
+    return (yield from PhaseProfiler(clock).profile(plan, description))
+
+
+phase_profiler_decorator = make_decorator(phase_profiler_wrapper)
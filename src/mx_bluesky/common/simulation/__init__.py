@@ -0,0 +1,2 @@
+"""Realistic timing for devices connected in mock mode, so that the time plans take to
+run against a beamline can be estimated and checked for regressions in tests."""
@@ -0,0 +1,158 @@
+"""Timing of plans run against devices with injected latencies, compared against a
+stored baseline so that changes which make plans slower are caught.
+
+The baseline is a JSON file of the simulated duration of each benchmarked plan, in
+seconds, along with the fraction by which a plan may get slower before it is treated
+as a regression::
+
+    {"threshold": 0.1, "durations_s": {"rotation_scan_internal": 20.5}}
+"""
+
+import json
+from collections.abc import Generator, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Self
+
+import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
+from bluesky.run_engine import RunEngine
+from bluesky.utils import Msg
+from pydantic import BaseModel, Field
+
+from mx_bluesky.common.simulation.latency import LatencyInjector
+
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+
+
+class PlanRegressionError(Exception):
+    """Raised when a benchmarked plan is slower than its baseline by more than the
+    threshold."""
+
+    pass
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    duration_s: float
+    baseline_s: float | None
+    threshold: float
+
+    @property
+    def change(self) -> float | None:
+        """The fractional change from the baseline, positive if slower."""
+        if not self.baseline_s:
+            return None
+        return self.duration_s / self.baseline_s - 1
+
+    @property
+    def regressed(self) -> bool:
+        change = self.change
+        return change is not None and change > self.threshold
+
+    def __str__(self) -> str:
+        if self.change is None:
+            return f"{self.name}: {self.duration_s:.2f}s, no baseline"
+        return (
+            f"{self.name}: {self.duration_s:.2f}s against a baseline of "
+            f"{self.baseline_s:.2f}s ({self.change:+.1%})"
+        )
+
+
+class BenchmarkBaseline(BaseModel):
+    """The simulated durations plans are expected to take.
+
+    Attributes:
+        threshold: The fraction by which a plan may be slower than its baseline
+        durations_s: The baseline duration of each plan, by benchmark name
+    """
+
+    threshold: float = Field(default=DEFAULT_REGRESSION_THRESHOLD, ge=0)
+    durations_s: dict[str, float] = Field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Load the baseline, which is empty if none has been stored yet."""
+        if not Path(path).exists():
+            return cls()
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+    def save(self, path: str | Path):
+        with open(path, "w") as f:
+            json.dump(self.model_dump(), f, indent=4, sort_keys=True)
+            f.write("\n")
+
+    def updated_with(self, results: Iterable[BenchmarkResult]) -> Self:
+        """The baseline with the durations of the given results replacing those
+        previously stored."""
+        return self.model_copy(
+            update={
+                "durations_s": self.durations_s
+                | {result.name: round(result.duration_s, 2) for result in results}
+            }
+        )
+
+
+def sleep_on_clock_wrapper(
+    plan: Generator[Msg, Any, Any], injector: LatencyInjector
+) -> Generator[Msg, Any, Any]:
+    """Make the sleeps of a plan wait on the clock of the injector rather than in
+    real time, so that they are counted in its simulated time."""
+
+    def _sleep_on_clock(msg: Msg):
+        if msg.command == "sleep":
+            duration_s = msg.args[0]
+            return bps.wait_for([lambda: injector.delay(duration_s)]), None
+        return None, None
+
+    return (yield from bpp.plan_mutator(plan, _sleep_on_clock))
+
+
+class PlanBenchmark:
+    """Runs plans against devices with injected latencies and records how long they
+    take in simulated time, compared against a baseline. Only time spent waiting for
+    latencies or in the sleeps of the plan is counted, so the durations do not
+    depend on the machine the plans are run on.
+
+    Args:
+        injector: The injector which applied latencies to the devices the plans use
+        baseline: The durations plans are expected to take
+        check: Whether to raise a PlanRegressionError when a plan is slower than its
+            baseline, rather than only recording the result
+    """
+
+    def __init__(
+        self,
+        injector: LatencyInjector,
+        baseline: BenchmarkBaseline,
+        check: bool = True,
+    ):
+        self.injector = injector
+        self.baseline = baseline
+        self.check = check
+        self.results: list[BenchmarkResult] = []
+
+    def run(
+        self,
+        name: str,
+        run_engine: RunEngine,
+        plan: Generator[Msg, Any, Any],
+    ) -> BenchmarkResult:
+        """Run a plan to completion and compare its simulated duration against the
+        baseline stored under the given name."""
+        start = self.injector.clock.now()
+        run_engine(sleep_on_clock_wrapper(plan, self.injector))
+        result = BenchmarkResult(
+            name,
+            self.injector.clock.now() - start,
+            self.baseline.durations_s.get(name),
+            self.baseline.threshold,
+        )
+        self.results.append(result)
+        if self.check and result.regressed:
+            raise PlanRegressionError(
+                f"{result}, which is more than {result.threshold:.0%} slower"
+            )
+        return result
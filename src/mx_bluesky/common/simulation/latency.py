@@ -0,0 +1,339 @@
+"""Injection of realistic latencies into devices connected in mock mode.
+
+Mock signals complete puts instantly and mock motors arrive as soon as they are asked
+to move, so the time a plan spends waiting on hardware, and whether it waits on moves
+one at a time or together, is invisible in tests. A latency profile declares how long
+puts to signals take and how fast motors move, by device name, for example::
+
+    motors:
+      gonio-omega:
+        velocity: 100
+        acceleration_time_s: 0.2
+      gonio-[xyz]:
+        velocity: 2
+        acceleration_time_s: 0.1
+        readback_rate_hz: 20
+    signals:
+      eiger-*:
+        set_latency_s: 0.5
+
+Names are matched with shell-style wildcards and the first matching entry is used.
+
+Latencies are waited for on a clock, by default a VirtualClock which does not really
+wait, so simulated durations do not depend on the speed of the machine running them.
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import math
+from collections.abc import Callable, Iterator
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any, Protocol, Self, TypeVar
+
+import yaml
+from ophyd_async.core import (
+    Device,
+    SignalW,
+    callback_on_mock_put,
+    get_mock_put,
+    set_mock_value,
+)
+from ophyd_async.epics.motor import Motor
+from pydantic import BaseModel, Field
+
+from mx_bluesky.common.utils.log import LOGGER
+
+T = TypeVar("T")
+
+
+class SignalLatency(BaseModel):
+    """The timing of puts to a signal.
+
+    Attributes:
+        set_latency_s: The time from a put being requested to it completing
+    """
+
+    set_latency_s: float = Field(default=0, ge=0)
+
+
+class MotorLatency(BaseModel):
+    """The timing of moves of a motor, which follow a trapezoidal velocity profile.
+
+    Attributes:
+        velocity: The velocity the motor starts with, in engineering units per second.
+            If not given, the velocity the motor already has is kept. Plans which set
+            the velocity themselves, such as rotations, move at the velocity they set.
+        acceleration_time_s: The time taken to reach the velocity, if given
+        settle_time_s: The time after arriving before the move is complete
+        readback_rate_hz: How often the readback is updated whilst moving
+    """
+
+    velocity: float | None = Field(default=None, gt=0)
+    acceleration_time_s: float | None = Field(default=None, ge=0)
+    settle_time_s: float = Field(default=0, ge=0)
+    readback_rate_hz: float = Field(default=10, gt=0)
+
+
+class LatencyProfile(BaseModel):
+    """The latencies of the devices on a beamline.
+
+    Attributes:
+        motors: The latency of each motor, by pattern matching the motor name
+        signals: The latency of each signal, by pattern matching the signal name
+    """
+
+    motors: dict[str, MotorLatency] = Field(default_factory=dict)
+    signals: dict[str, SignalLatency] = Field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        with open(path) as f:
+            return cls.model_validate(yaml.safe_load(f) or {})
+
+    def for_motor(self, name: str) -> MotorLatency | None:
+        return _first_match(self.motors, name)
+
+    def for_signal(self, name: str) -> SignalLatency | None:
+        return _first_match(self.signals, name)
+
+
+def _first_match(latencies: dict[str, T], name: str) -> T | None:
+    return next(
+        (
+            latency
+            for pattern, latency in latencies.items()
+            if fnmatchcase(name, pattern)
+        ),
+        None,
+    )
+
+
+def travel_time_s(
+    distance: float, velocity: float, acceleration_time_s: float
+) -> float:
+    """The time to move a distance from rest to rest, accelerating uniformly for
+    acceleration_time_s to the velocity, or for as long as possible for short moves
+    which never reach it."""
+    distance = abs(distance)
+    if distance == 0 or velocity <= 0:
+        return 0
+    if distance >= velocity * acceleration_time_s:
+        return distance / velocity + acceleration_time_s
+    return 2 * math.sqrt(distance * acceleration_time_s / velocity)
+
+
+def distance_travelled(
+    elapsed_s: float, distance: float, velocity: float, acceleration_time_s: float
+) -> float:
+    """How far a move of the given distance has got after elapsed_s, see
+    travel_time_s."""
+    total_s = travel_time_s(distance, velocity, acceleration_time_s)
+    if elapsed_s >= total_s:
+        return distance
+    direction = math.copysign(1, distance)
+    if acceleration_time_s == 0:
+        return direction * velocity * elapsed_s
+    acceleration = velocity / acceleration_time_s
+    ramp_s = min(acceleration_time_s, total_s / 2)
+    if elapsed_s <= ramp_s:
+        return direction * acceleration * elapsed_s**2 / 2
+    if elapsed_s <= total_s - ramp_s:
+        ramp_distance = acceleration * ramp_s**2 / 2
+        return direction * (
+            ramp_distance + acceleration * ramp_s * (elapsed_s - ramp_s)
+        )
+    return distance - direction * acceleration * (total_s - elapsed_s) ** 2 / 2
+
+
+def _walk(device: Device) -> Iterator[Device]:
+    yield device
+    for _, child in device.children():
+        yield from _walk(child)
+
+
+class LatencyClock(Protocol):
+    """The time latencies are waited for in."""
+
+    def now(self) -> float:
+        """The current time in seconds."""
+        ...
+
+    async def sleep(self, duration_s: float) -> None: ...
+
+
+# Sleeps started within this many iterations of the event loop of each other are
+# treated as starting at the same time
+DEFAULT_IDLE_ITERATIONS = 20
+
+
+class VirtualClock:
+    """A clock whose time only passes whilst tasks sleep on it, and then without
+    really waiting.
+
+    Once no task has started or finished sleeping for idle_iterations of the event
+    loop, time jumps to the end of the earliest sleep. Sleeps which overlap in
+    simulated time, such as moves of several motors waited on together, are
+    therefore only counted once, however long the code between them really takes.
+    Time spent other than in sleeps, for example by the RunEngine, is not counted.
+
+    Args:
+        idle_iterations: How many iterations of the event loop to wait for further
+            sleeps before moving time on
+    """
+
+    def __init__(self, idle_iterations: int = DEFAULT_IDLE_ITERATIONS):
+        self._now = 0.0
+        self._idle_iterations = idle_iterations
+        self._sleepers: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+        self._activity = 0
+        self._advancing: asyncio.Task | None = None
+
+    def now(self) -> float:
+        return self._now
+
+    async def sleep(self, duration_s: float):
+        wake = asyncio.get_running_loop().create_future()
+        sleeper = (self._now + max(duration_s, 0), next(self._order), wake)
+        heapq.heappush(self._sleepers, sleeper)
+        self._activity += 1
+        if self._advancing is None or self._advancing.done():
+            self._advancing = asyncio.create_task(self._advance())
+        try:
+            await wake
+        finally:
+            self._activity += 1
+            if wake.cancelled():
+                self._sleepers.remove(sleeper)
+                heapq.heapify(self._sleepers)
+
+    async def _advance(self):
+        while self._sleepers:
+            activity = self._activity
+            for _ in range(self._idle_iterations):
+                await asyncio.sleep(0)
+            if activity != self._activity or not self._sleepers:
+                continue
+            self._now = max(self._now, self._sleepers[0][0])
+            while self._sleepers and self._sleepers[0][0] <= self._now:
+                _, _, wake = heapq.heappop(self._sleepers)
+                if not wake.done():
+                    wake.set_result(None)
+
+
+class LatencyInjector:
+    """Applies a latency profile to devices connected in mock mode, waiting for the
+    latencies on a clock so that the duration of a plan run against them can be
+    given in simulated time.
+
+    Args:
+        profile: The latencies to inject
+        clock: The clock to wait for latencies on, a VirtualClock by default
+    """
+
+    def __init__(self, profile: LatencyProfile, clock: LatencyClock | None = None):
+        self.profile = profile
+        self.clock = clock or VirtualClock()
+
+    def apply(self, *devices: Any) -> list[str]:
+        """Inject latencies into the matching motors and writable signals of the
+        devices and all their children, replacing any existing mock put behaviour
+        of motor setpoints. Anything which is not an ophyd-async device is left as
+        it is, so all the devices of a composite can be given.
+
+        Returns:
+            The names of the motors and signals given latencies
+        """
+        applied: list[str] = []
+        seen: set[int] = set()
+        for device in devices:
+            if not isinstance(device, Device):
+                continue
+            for child in _walk(device):
+                if id(child) in seen:
+                    continue
+                seen.add(id(child))
+                if isinstance(child, Motor) and (
+                    motor_latency := self.profile.for_motor(child.name)
+                ):
+                    self._simulate_motion(child, motor_latency)
+                    applied.append(child.name)
+                    # The motor's own signals are covered by its motion
+                    seen.update(id(signal) for signal in _walk(child))
+                elif isinstance(child, SignalW) and (
+                    signal_latency := self.profile.for_signal(child.name)
+                ):
+                    self._delay_puts(child, signal_latency)
+                    applied.append(child.name)
+        LOGGER.debug(f"Injected latencies into {applied}")
+        return applied
+
+    async def delay(
+        self,
+        duration_s: float,
+        on_progress: Callable[[float], Any] | None = None,
+        update_period_s: float = math.inf,
+    ):
+        """Wait for a simulated duration on the clock.
+
+        Args:
+            duration_s: The simulated time to wait for
+            on_progress: Called with the simulated time elapsed every update period
+                and at the end of the wait
+            update_period_s: The simulated time between progress updates
+        """
+        start = self.clock.now()
+        elapsed_s = 0.0
+        while elapsed_s < duration_s:
+            elapsed_s = min(elapsed_s + update_period_s, duration_s)
+            await self.clock.sleep(start + elapsed_s - self.clock.now())
+            if on_progress:
+                on_progress(elapsed_s)
+
+    def _delay_puts(self, signal: SignalW, latency: SignalLatency):
+        previous_callback = get_mock_put(signal).side_effect
+
+        async def _delayed_put(value):
+            await self.delay(latency.set_latency_s)
+            new_value = previous_callback(value) if previous_callback else None
+            return await new_value if inspect.isawaitable(new_value) else new_value
+
+        callback_on_mock_put(signal, _delayed_put)
+
+    def _simulate_motion(self, motor: Motor, latency: MotorLatency):
+        if latency.velocity is not None:
+            set_mock_value(motor.velocity, latency.velocity)
+        if latency.acceleration_time_s is not None:
+            set_mock_value(motor.acceleration_time, latency.acceleration_time_s)
+
+        async def _move(demand: float):
+            start, velocity, acceleration_time_s = await asyncio.gather(
+                motor.user_readback.get_value(),
+                motor.velocity.get_value(),
+                motor.acceleration_time.get_value(),
+            )
+            distance = demand - start
+
+            def _update_readback(elapsed_s: float):
+                set_mock_value(
+                    motor.user_readback,
+                    start
+                    + distance_travelled(
+                        elapsed_s, distance, velocity, acceleration_time_s
+                    ),
+                )
+
+            set_mock_value(motor.motor_done_move, 0)
+            await self.delay(
+                travel_time_s(distance, velocity, acceleration_time_s),
+                _update_readback,
+                1 / latency.readback_rate_hz,
+            )
+            set_mock_value(motor.user_readback, demand)
+            await self.delay(latency.settle_time_s)
+            set_mock_value(motor.motor_done_move, 1)
+
+        callback_on_mock_put(motor.user_setpoint, _move)
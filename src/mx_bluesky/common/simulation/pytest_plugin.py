@@ -0,0 +1,120 @@
+"""Pytest plugin for benchmarking plans against devices with injected latencies.
+
+Benchmarks are tests marked with latency_benchmark which inject latencies into their
+devices with the latency_injector fixture and run their plan with the plan_benchmark
+fixture. They are skipped unless --latency-benchmarks is given, and fail if the plan
+is slower than its baseline by more than the threshold. Running them with
+--update-latency-baseline stores their durations as the new baseline instead.
+
+The latency profile and the baseline are given by the latency_profile and
+latency_baseline ini options, relative to the root directory.
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from mx_bluesky.common.simulation.benchmark import (
+    BenchmarkBaseline,
+    BenchmarkResult,
+    PlanBenchmark,
+)
+from mx_bluesky.common.simulation.latency import LatencyInjector, LatencyProfile
+
+RUN_BENCHMARKS_OPTION = "--latency-benchmarks"
+UPDATE_BASELINE_OPTION = "--update-latency-baseline"
+
+_benchmark_results = pytest.StashKey[list[BenchmarkResult]]()
+
+
+def pytest_addoption(parser: pytest.Parser):
+    group = parser.getgroup("latency", "plan benchmarks with device latencies")
+    group.addoption(
+        RUN_BENCHMARKS_OPTION,
+        action="store_true",
+        default=False,
+        help="Run the plan benchmarks and fail any slower than their baseline",
+    )
+    group.addoption(
+        UPDATE_BASELINE_OPTION,
+        action="store_true",
+        default=False,
+        help="Run the plan benchmarks and store their durations as the baseline",
+    )
+    parser.addini("latency_profile", "YAML profile of device latencies", default="")
+    parser.addini("latency_baseline", "JSON baseline of plan durations", default="")
+
+
+def pytest_configure(config: pytest.Config):
+    config.addinivalue_line(
+        "markers",
+        f"latency_benchmark: marks a plan benchmark, run with {RUN_BENCHMARKS_OPTION}",
+    )
+    config.stash[_benchmark_results] = []
+
+
+def _updating_baseline(config: pytest.Config) -> bool:
+    return config.getoption(UPDATE_BASELINE_OPTION)
+
+
+def _baseline_path(config: pytest.Config) -> Path | None:
+    path = config.getini("latency_baseline")
+    return config.rootpath / path if path else None
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]):
+    if config.getoption(RUN_BENCHMARKS_OPTION) or _updating_baseline(config):
+        return
+    skip = pytest.mark.skip(reason=f"plan benchmarks need {RUN_BENCHMARKS_OPTION}")
+    for item in items:
+        if "latency_benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def latency_profile(pytestconfig: pytest.Config) -> LatencyProfile:
+    path = pytestconfig.getini("latency_profile")
+    return (
+        LatencyProfile.load(pytestconfig.rootpath / path) if path else LatencyProfile()
+    )
+
+
+@pytest.fixture
+def latency_injector(latency_profile: LatencyProfile) -> LatencyInjector:
+    return LatencyInjector(latency_profile)
+
+
+@pytest.fixture
+def plan_benchmark(
+    pytestconfig: pytest.Config, latency_injector: LatencyInjector
+) -> Iterator[PlanBenchmark]:
+    path = _baseline_path(pytestconfig)
+    benchmark = PlanBenchmark(
+        latency_injector,
+        BenchmarkBaseline.load(path) if path else BenchmarkBaseline(),
+        check=not _updating_baseline(pytestconfig),
+    )
+    yield benchmark
+    pytestconfig.stash[_benchmark_results].extend(benchmark.results)
+
+
+def pytest_sessionfinish(session: pytest.Session):
+    config = session.config
+    results = config.stash.get(_benchmark_results, [])
+    path = _baseline_path(config)
+    if results and path and _updating_baseline(config):
+        BenchmarkBaseline.load(path).updated_with(results).save(path)
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config):
+    results = config.stash.get(_benchmark_results, [])
+    if not results:
+        return
+    terminalreporter.section("plan benchmarks")
+    for result in results:
+        terminalreporter.write_line(
+            f"{result}{' REGRESSED' if result.regressed else ''}"
+        )
+    if _updating_baseline(config):
+        terminalreporter.write_line(f"Baseline updated in {_baseline_path(config)}")
@@ -1,7 +1,11 @@
+import atexit
+import copy
 import json
 import logging
 import multiprocessing
-from logging.handlers import TimedRotatingFileHandler
+import queue
+from collections.abc import Iterable, Mapping, Sequence
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from os import environ
 from pathlib import Path
 
@@ -29,16 +33,84 @@ NEXUS_LOGGER.setLevel(logging.DEBUG)
 ALL_LOGGERS = [LOGGER, ISPYB_ZOCALO_CALLBACK_LOGGER, NEXUS_LOGGER]
 
 __logger_handlers: DodalLogHandlers | None = None
+_queued_handlers: list["QueuedLogHandlers"] = []
 
+DOC_SUMMARY_MAX_ITEMS = 10
+DOC_SUMMARY_MAX_DEPTH = 4
+DOC_SUMMARY_MAX_STRING_LENGTH = 200
 
-def format_doc_for_log(doc):
-    class _BestEffortEncoder(json.JSONEncoder):
-        def default(self, o):
-            return repr(o)
 
+class _BestEffortEncoder(json.JSONEncoder):
+    def default(self, o):
+        return repr(o)
+
+
+def summarise_doc_for_log(
+    doc,
+    max_items: int = DOC_SUMMARY_MAX_ITEMS,
+    max_depth: int = DOC_SUMMARY_MAX_DEPTH,
+    max_string_length: int = DOC_SUMMARY_MAX_STRING_LENGTH,
+):
+    """A copy of a document capped in size for logging. Sequences and arrays are
+    truncated to their first max_items, long strings are truncated, and mappings
+    nested deeper than max_depth are replaced by a list of their keys."""
+
+    def _summarise(value, depth: int):
+        if isinstance(value, str):
+            if len(value) <= max_string_length:
+                return value
+            return f"{value[:max_string_length]}... ({len(value)} characters)"
+        if isinstance(value, Mapping):
+            if depth >= max_depth:
+                return f"<{type(value).__name__} with keys {list(value.keys())}>"
+            return {key: _summarise(item, depth + 1) for key, item in value.items()}
+        if hasattr(value, "tolist") and getattr(value, "ndim", 0) > 0:
+            value = value.tolist()
+        if isinstance(value, Sequence) and not isinstance(value, bytes):
+            summary = [_summarise(item, depth + 1) for item in value[:max_items]]
+            if len(value) > max_items:
+                summary.append(f"... ({len(value) - max_items} more)")
+            return summary
+        return value
+
+    return _summarise(doc, 0)
+
+
+def format_doc_for_log(doc, summarise: bool = False):
+    if summarise:
+        doc = summarise_doc_for_log(doc)
     return json.dumps(doc, indent=2, cls=_BestEffortEncoder)
 
 
+class LazyDocFormat:
+    """Formats a document for a log message only if the message is emitted, so that
+    logging documents at levels which are disabled costs nothing. Pass it as an
+    argument to the logger rather than formatting it into the message::
+
+        LOGGER.debug("Received event %s", LazyDocFormat(doc))
+
+    The formatted document is cached, so it is only formatted once however many
+    handlers emit it.
+
+    Args:
+        doc: The document to format
+        summarise: Whether to cap the size of the document, see summarise_doc_for_log
+    """
+
+    __slots__ = ("_doc", "_formatted", "_summarise")
+
+    def __init__(self, doc, summarise: bool = True):
+        self._doc = doc
+        self._summarise = summarise
+        self._formatted: str | None = None
+
+    def __str__(self) -> str:
+        if self._formatted is None:
+            self._formatted = format_doc_for_log(self._doc, self._summarise)
+            self._doc = None
+        return self._formatted
+
+
 class ExperimentMetadataTagFilter(logging.Filter):
     """When an instance of this custom filter is added to a logging handler, dc_group_id
     and run_id will be tagged in that handlers' log messages."""
@@ -69,6 +141,88 @@ def set_uid_tag(uid):
     tag_filter.run_uid = uid
 
 
+class QueuedLogHandlers(QueueHandler):
+    """Emits messages through other handlers on a background thread, so that slow
+    handlers such as graylog and files do not hold up the thread logging the message.
+
+    Messages are filtered by the filters of this handler in the logging thread, so
+    that filters which tag records with the current state tag them correctly. Each
+    handler then formats and emits them at its own level in the background thread,
+    with any exception still attached so that graylog gets the traceback. Closing
+    this handler emits every message queued so far and closes the handlers.
+
+    Args:
+        handlers: The handlers to emit messages from the background thread
+    """
+
+    def __init__(self, handlers: Iterable[logging.Handler]):
+        self.handlers = list(handlers)
+        super().__init__(queue.SimpleQueue())
+        self.setLevel(min(handler.level for handler in self.handlers))
+        self.listener = QueueListener(
+            self.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        self._running = True
+        _queued_handlers.append(self)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler, which formats the message and drops the exception, as
+        # the records are never pickled
+        return copy.copy(record)
+
+    def flush(self):
+        """Wait until every message queued so far has been emitted."""
+        if self._running:
+            self.listener.stop()
+            self.listener.start()
+
+    def close(self):
+        if self._running:
+            self._running = False
+            self.listener.stop()
+            for handler in self.handlers:
+                handler.close()
+        if self in _queued_handlers:
+            _queued_handlers.remove(self)
+        super().close()
+
+
+def queue_log_handlers(
+    logger: logging.Logger,
+    handlers: Iterable[logging.Handler],
+    filters: Iterable[logging.Filter] = (),
+) -> QueuedLogHandlers:
+    """Replace handlers of a logger with a single handler emitting through them on a
+    background thread, see QueuedLogHandlers.
+
+    Args:
+        logger: The logger to move the handlers off
+        handlers: The handlers to emit messages from the background thread
+        filters: Filters to apply before messages are queued
+    """
+    queued_handlers = QueuedLogHandlers(handlers)
+    for log_filter in filters:
+        queued_handlers.addFilter(log_filter)
+    for handler in queued_handlers.handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queued_handlers)
+    return queued_handlers
+
+
+def flush_queued_log_handlers():
+    """Wait until every message queued so far has been emitted by its handlers."""
+    for handler in _queued_handlers:
+        handler.flush()
+
+
+@atexit.register
+def stop_queued_log_handlers():
+    """Emit every message queued so far and close the queued handlers."""
+    while _queued_handlers:
+        _queued_handlers[-1].close()
+
+
 def setup_hyperion_blueapi_logging(log_file_name: str):
     """Configure debug logging for hyperion-blueapi.
     Args:
@@ -92,6 +246,7 @@ def do_default_logging_setup(
     dev_mode: bool = False,
     integrate_all_logs: bool = True,
     process_name: str | None = None,
+    queue_handlers: bool = False,
 ):
     """Configures dodal logger so that separate debug and info log files are created,
     info logs are sent to Graylog, info logs are streamed to sys.sterr, and logs from ophyd
@@ -101,7 +256,9 @@ def do_default_logging_setup(
         graylog_port: Port number for graylog
         dev_mode (bool): True if we should not log to production graylog
         integrate_all_logs (bool): True (the default) to include ophyd-async, bluesky logs in the parent dodal logger
-        process_name (str): Set the process name for LogRecord objects for inclusion in graylog."""
+        process_name (str): Set the process name for LogRecord objects for inclusion in graylog.
+        queue_handlers (bool): True to send logs to Graylog and the info file from a
+            background thread, see queue_log_handlers"""
     if process_name:
         multiprocessing.current_process().name = process_name
     logging_path, debug_logging_path = _get_logging_dirs(dev_mode)
@@ -118,7 +275,14 @@ def do_default_logging_setup(
     if integrate_all_logs:
         integrate_bluesky_and_ophyd_logging(DODAL_LOGGER)
 
-    handlers["graylog_handler"].addFilter(tag_filter)
+    if queue_handlers:
+        queue_log_handlers(
+            DODAL_LOGGER,
+            [handlers["graylog_handler"], handlers["info_file_handler"]],
+            [tag_filter],
+        )
+    else:
+        handlers["graylog_handler"].addFilter(tag_filter)
 
     global __logger_handlers
     __logger_handlers = handlers
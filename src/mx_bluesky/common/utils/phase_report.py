@@ -0,0 +1,129 @@
+"""Aggregates the phase timings emitted by the phase profiler across a session into a
+report of where the time went.
+
+Reads recorded documents as JSON lines of ``[name, doc]`` pairs, e.g.::
+
+    python -m mx_bluesky.common.utils.phase_report session1.jsonl session2.jsonl
+
+The self time of each phase is its duration excluding any phases nested within it,
+so the self times of all phases add up to the total time profiled. The self time of
+the root phase is reported as time spent between phases.
+"""
+
+import argparse
+import json
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from mx_bluesky.common.preprocessors.phase_profiler import (
+    PHASE_TIMINGS_KEY,
+    PHASE_TIMINGS_STREAM,
+    ROOT_PHASE,
+)
+
+BETWEEN_PHASES = "(between phases)"
+
+
+@dataclass
+class PhaseStatistics:
+    name: str
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    self_s: float = 0.0
+    wait_s: float = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+
+def load_phase_timings(lines: Iterable[str]) -> list[list[dict[str, Any]]]:
+    """Extract the phase timings of each profiled plan from recorded documents.
+
+    Returns:
+        A list of the phases recorded for each profiled plan, in the order recorded.
+    """
+    descriptors: set[str] = set()
+    samples = []
+    for line in lines:
+        if not line.strip():
+            continue
+        name, doc = json.loads(line)
+        if name == "descriptor" and doc.get("name") == PHASE_TIMINGS_STREAM:
+            descriptors.add(doc["uid"])
+        elif name == "event" and doc["descriptor"] in descriptors:
+            samples.append(json.loads(doc["data"][PHASE_TIMINGS_KEY]))
+    return samples
+
+
+def aggregate_phase_timings(
+    samples: Iterable[Sequence[dict[str, Any]]],
+) -> list[PhaseStatistics]:
+    """Aggregate the timings of each named phase across all the samples, ordered by
+    descending self time. Phases which did not complete are excluded."""
+    statistics: dict[str, PhaseStatistics] = {}
+    for phases in samples:
+        durations = [
+            None if phase["end_s"] is None else phase["end_s"] - phase["start_s"]
+            for phase in phases
+        ]
+        self_s = list(durations)
+        for phase, duration in zip(phases, durations, strict=True):
+            parent = phase["parent"]
+            if duration is not None and parent is not None:
+                parent_self_s = self_s[parent]
+                if parent_self_s is not None:
+                    self_s[parent] = parent_self_s - duration
+        for phase, duration, own_s in zip(phases, durations, self_s, strict=True):
+            if duration is None or own_s is None:
+                continue
+            name = BETWEEN_PHASES if phase["name"] == ROOT_PHASE else phase["name"]
+            stats = statistics.setdefault(name, PhaseStatistics(name))
+            stats.count += 1
+            stats.total_s += duration
+            stats.max_s = max(stats.max_s, duration)
+            stats.self_s += own_s
+            stats.wait_s += sum(phase["waits_s"].values())
+    return sorted(statistics.values(), key=lambda stats: stats.self_s, reverse=True)
+
+
+def format_report(statistics: Sequence[PhaseStatistics], num_samples: int) -> str:
+    total_s = sum(stats.self_s for stats in statistics)
+    lines = [
+        f"{num_samples} profiled plans, {total_s:.1f}s in total",
+        f"{'phase':<40}{'count':>7}{'mean s':>10}{'max s':>10}"
+        f"{'self s':>10}{'wait s':>10}{'self %':>8}",
+    ]
+    for stats in statistics:
+        share = 100 * stats.self_s / total_s if total_s else 0.0
+        lines.append(
+            f"{stats.name:<40}{stats.count:>7}{stats.mean_s:>10.1f}"
+            f"{stats.max_s:>10.1f}{stats.self_s:>10.1f}{stats.wait_s:>10.1f}"
+            f"{share:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Report where time was spent in profiled plans."
+    )
+    parser.add_argument(
+        "documents",
+        type=Path,
+        nargs="+",
+        help="Files of recorded documents, as JSON lines of [name, doc]",
+    )
+    args = parser.parse_args(argv)
+    samples = []
+    for path in args.documents:
+        with open(path) as f:
+            samples.extend(load_phase_timings(f))
+    print(format_report(aggregate_phase_timings(samples), len(samples)))
+
+
+if __name__ == "__main__":
+    main()
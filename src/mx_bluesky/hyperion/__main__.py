@@ -12,11 +12,16 @@ from mx_bluesky.common.external_interaction import alerting
 from mx_bluesky.common.external_interaction.alerting.log_based_service import (
     LoggingAlertService,
 )
+from mx_bluesky.common.external_interaction.alerting.pipeline import AlertPipeline
 from mx_bluesky.common.utils.log import (
     LOGGER,
     do_default_logging_setup,
 )
 from mx_bluesky.hyperion.baton_handler import run_forever
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    ConfigSnapshotCache,
+    set_config_snapshot_cache,
+)
 from mx_bluesky.hyperion.in_process_runner import InProcessRunner
 from mx_bluesky.hyperion.parameters.cli import (
     HyperionArgs,
@@ -43,9 +48,12 @@ def initialise_globals(args: HyperionArgs):
         process_name="hyperion-supervisor"
         if args.mode == HyperionMode.SUPERVISOR
         else "hyperion",
+        queue_handlers=True,
     )
     LOGGER.info(f"Hyperion launched with args:{argv}")
-    alerting.set_alerting_service(LoggingAlertService(CONST.GRAYLOG_STREAM_ID))
+    alerting.set_alerting_service(
+        AlertPipeline([LoggingAlertService(CONST.GRAYLOG_STREAM_ID)])
+    )
 
 
 def initialise_config_server():
@@ -54,6 +62,13 @@ def initialise_config_server():
     set_config_client(client)
 
 
+def initialise_config_snapshot_cache():
+    """Serve configuration to UDC plans from snapshots refreshed in the background."""
+    cache = ConfigSnapshotCache()
+    set_config_snapshot_cache(cache)
+    cache.start_background_refresh()
+
+
 def main():
     """Main application entry point."""
     args = parse_cli_args()
@@ -62,6 +77,7 @@ def main():
     match args.mode:
         case HyperionMode.UDC:
             context = setup_context(dev_mode=args.dev_mode)
+            initialise_config_snapshot_cache()
             plan_runner = InProcessRunner(context, args.dev_mode)
         case HyperionMode.SUPERVISOR:
             if not args.client_config:
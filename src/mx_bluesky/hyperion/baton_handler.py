@@ -30,6 +30,9 @@ from mx_bluesky.hyperion.external_interaction.agamemnon import (
     create_parameters_from_agamemnon,
 )
 from mx_bluesky.hyperion.external_interaction.alerting.constants import Subjects
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    pin_config_snapshot,
+)
 from mx_bluesky.hyperion.plan_runner import PlanError, PlanRunner
 from mx_bluesky.hyperion.utils.context import (
     clear_all_device_caches,
@@ -170,13 +173,15 @@ def _wait_for_hyperion_requested(baton: Baton):
 def _fetch_and_process_agamemnon_instruction(
     baton: Baton, runner: PlanRunner, current_visit: str | None
 ) -> MsgGenerator[str | None]:
-    parameter_list: Sequence[BaseModel] = create_parameters_from_agamemnon()
-    if parameter_list:
-        current_visit = yield from runner.decode_and_execute(
-            current_visit, parameter_list
-        )
-    else:
-        yield from _release_baton_on_completed_alert(baton)
+    # Configuration is pinned for each instruction so that it can't change mid-sample
+    with pin_config_snapshot():
+        parameter_list: Sequence[BaseModel] = create_parameters_from_agamemnon()
+        if parameter_list:
+            current_visit = yield from runner.decode_and_execute(
+                current_visit, parameter_list
+            )
+        else:
+            yield from _release_baton_on_completed_alert(baton)
     return current_visit
 
 
@@ -6,8 +6,16 @@ from pydantic import BaseModel, Field
 
 
 class MultiXtalSelection(BaseModel):
+    """
+    Attributes:
+        ignore_xtal_not_found: Collect at the current position if no crystal is found
+        order_for_travel: Collect the selected crystals in the order which minimises the
+            goniometer travel between them, starting from its current position
+    """
+
     name: str
     ignore_xtal_not_found: bool = False
+    order_for_travel: bool = False
 
 
 class TopNByMaxCountSelection(MultiXtalSelection):
@@ -20,10 +28,50 @@ class TopNByMaxCountForEachSampleSelection(MultiXtalSelection):
     n: int
 
 
+class CrystalScore(BaseModel):
+    """The weights of a score for ranking crystals. Each term is normalised by the
+    largest value amongst the crystals so that the weights are comparable.
+
+    Attributes:
+        max_count_weight: Weight of the maximum spot count in any one grid box
+        total_count_weight: Weight of the total spot count across the crystal
+        volume_weight: Weight of the volume of the bounding box of the crystal
+    """
+
+    max_count_weight: float = Field(default=1, ge=0)
+    total_count_weight: float = Field(default=0, ge=0)
+    volume_weight: float = Field(default=0, ge=0)
+
+
+class NonMaxSuppressionSelection(MultiXtalSelection):
+    """Selects the top n crystals by score, skipping any crystal which overlaps or is
+    close to a better crystal that has already been selected, as these are likely to be
+    parts of the same crystal.
+
+    Attributes:
+        n: The maximum number of crystals to select
+        max_iou: A crystal whose bounding box has an intersection over union greater
+            than this with the box of a selected crystal is skipped
+        min_separation_um: A crystal whose centre is closer than this to the centre of
+            a selected crystal is skipped
+        score: How crystals are ranked
+        for_each_sample: Select up to n crystals for each sample rather than overall
+    """
+
+    name: Literal["NonMaxSuppression"] = "NonMaxSuppression"  #  pyright: ignore [reportIncompatibleVariableOverride]
+    n: int
+    max_iou: float = Field(default=0, ge=0, le=1)
+    min_separation_um: float = Field(default=0, ge=0)
+    score: CrystalScore = CrystalScore()
+    for_each_sample: bool = False
+
+
 class WithCentreSelection(BaseModel):
-    select_centres: TopNByMaxCountSelection | TopNByMaxCountForEachSampleSelection = (
-        Field(discriminator="name", default=TopNByMaxCountSelection(n=1))
-    )
+    select_centres: (
+        TopNByMaxCountSelection
+        | TopNByMaxCountForEachSampleSelection
+        | NonMaxSuppressionSelection
+    ) = Field(discriminator="name", default=TopNByMaxCountSelection(n=1))
 
     @property
     def selection_params(self) -> MultiXtalSelection:
@@ -31,3 +79,21 @@ class WithCentreSelection(BaseModel):
         # only type unions"""
         cast1 = cast(MultiXtalSelection, self.select_centres)
         return cast1
+
+
+class HelicalCollection(BaseModel):
+    """Collect along the principal axis of each selected crystal rather than at its
+    centre of mass.
+
+    Attributes:
+        margin_um: Distance from each end of the crystal to leave uncollected
+        min_length_um: Crystals shorter than this once the margin is removed are
+            collected at their centre of mass instead
+    """
+
+    margin_um: float = Field(default=10, ge=0)
+    min_length_um: float = Field(default=50, gt=0)
+
+
+class WithHelicalCollection(BaseModel):
+    helical: HelicalCollection | None = None
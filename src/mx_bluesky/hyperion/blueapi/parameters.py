@@ -2,16 +2,19 @@
 This module contains the parameter models exported via the hyperion-blueapi REST interface.
 """
 
-from typing import Any, Literal, TypeAlias
+from typing import Any, Literal, Self, TypeAlias
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic.config import ConfigDict
 
 from mx_bluesky.common.parameters.components import (
     get_param_version,
 )
 from mx_bluesky.common.parameters.constants import GridscanParamConstants
-from mx_bluesky.hyperion.blueapi.mixins import WithCentreSelection
+from mx_bluesky.hyperion.blueapi.mixins import (
+    WithCentreSelection,
+    WithHelicalCollection,
+)
 from mx_bluesky.hyperion.parameters.constants import HyperionConstants
 from mx_bluesky.hyperion.parameters.gridscan import PinTipCentreThenXrayCentre
 from mx_bluesky.hyperion.parameters.load_centre_collect import LoadCentreCollect
@@ -27,10 +30,27 @@ class SingleSamplePinTypeParam(BaseModel):
 
 
 class MultiSamplePinTypeParam(BaseModel):
+    """
+    Attributes:
+        well_sample_ids: If given, the sample id of each well starting from the one
+            nearest the tip. Centres are then attributed to wells, selected for each
+            well and collected under the sample id of their well.
+    """
+
     name: Literal["msp"] = "msp"
     wells: int
     well_size_um: float
     tip_to_first_well_um: float
+    well_sample_ids: list[int] | None = None
+
+    @model_validator(mode="after")
+    def _check_sample_id_for_each_well(self) -> Self:
+        assert (
+            self.well_sample_ids is None or len(self.well_sample_ids) == self.wells
+        ), (
+            f"Expected a sample id for each of {self.wells} wells, got {self.well_sample_ids}"
+        )
+        return self
 
 
 PinTypeParam: TypeAlias = SingleSamplePinTypeParam | MultiSamplePinTypeParam
@@ -71,7 +91,9 @@ class MultiRotationScanParams(HyperionParam):
     ispyb_experiment_type: str
 
 
-class LoadCentreCollectParams(WithCentreSelection, HyperionParam):
+class LoadCentreCollectParams(
+    WithCentreSelection, WithHelicalCollection, HyperionParam
+):
     """This model is exposed as the BlueAPI REST parameter model for Hyperion Collections.
     It can represent the full range of operations that are supported by LoadCentreCollect;
     this is a superset of the operations that are actually required to follow Agamemnon instructions.
@@ -105,6 +127,11 @@ def load_centre_collect_to_internal(
     if pin_type.name == "msp":
         params_as_dict["multi_rotation_scan"]["use_grid_snapshots"] = True
         params_as_dict["multi_rotation_scan"]["snapshot_omegas_deg"] = None
+        if isinstance(pin_type, MultiSamplePinTypeParam) and pin_type.well_sample_ids:
+            params_as_dict["robot_load_then_centre"]["wells"] = {
+                "well_size_um": pin_type.well_size_um,
+                "sample_ids": pin_type.well_sample_ids,
+            }
 
     return LoadCentreCollect(**params_as_dict)
 
@@ -5,7 +5,6 @@ from dodal.devices.focusing_mirror import (
     MirrorStripe,
     MirrorVoltages,
 )
-from dodal.devices.util.adjuster_plans import lookup_table_adjuster
 from dodal.devices.util.lookup_tables import (
     linear_interpolation_lut,
 )
@@ -14,16 +13,39 @@ from mx_bluesky.common.utils.log import LOGGER
 from mx_bluesky.common.utils.utils import (
     energy_to_bragg_angle,
 )
+from mx_bluesky.hyperion.device_setup_plans.energy_change_planner import (
+    Action,
+    Constraint,
+    MutuallyExclusive,
+    Precedes,
+    execute_schedule,
+    schedule_actions,
+)
 
-MIRROR_VOLTAGE_GROUP = "MIRROR_VOLTAGE_GROUP"
-DCM_GROUP = "DCM_GROUP"
 YAW_LAT_TIMEOUT_S = 30
 
+# Estimated durations are only used to order the actions, not as timeouts
+DCM_ADJUST_ESTIMATE_S = 1.0
+STRIPE_SELECT_ESTIMATE_S = 0.5
+YAW_LAT_ESTIMATE_S = 15.0
+VOLTAGE_SLEW_ESTIMATE_S = 3.0
+
+ENERGY_CHANGE_CONSTRAINTS: tuple[Constraint, ...] = (
+    Precedes("mirror_stripe", "mirror_apply_stripe"),
+    Precedes("mirror_apply_stripe", "mirror_lat"),
+    Precedes("mirror_apply_stripe", "mirror_yaw"),
+    # yaw, lat cannot be done simultaneously
+    MutuallyExclusive(("mirror_lat", "mirror_yaw")),
+    # Each bimorph mirror slews one channel at a time
+    MutuallyExclusive(("hfm_voltage_*",)),
+    MutuallyExclusive(("vfm_voltage_*",)),
+)
+
 
-def _apply_and_wait_for_voltages_to_settle(
+def _mirror_voltage_actions(
     stripe: MirrorStripe,
     mirror_voltages: MirrorVoltages,
-):
+) -> list[Action]:
     # sample mode is the only mode supported
     sample_data = mirror_voltages.voltage_lookup_table["sample"]
     if stripe == MirrorStripe.BARE:
@@ -33,61 +55,77 @@ def _apply_and_wait_for_voltages_to_settle(
     elif stripe == MirrorStripe.PLATINUM:
         stripe_key = "pt"
 
+    actions = []
     for mirror_key, channels in {
         "hfm": mirror_voltages.horizontal_voltages,
         "vfm": mirror_voltages.vertical_voltages,
     }.items():
         required_voltages = sample_data[stripe_key][mirror_key]
 
-        for voltage_channel, required_voltage in zip(
-            channels.values(), required_voltages, strict=True
+        for index, (voltage_channel, required_voltage) in enumerate(
+            zip(channels.values(), required_voltages, strict=True)
         ):
-            LOGGER.info(
-                f"Applying and waiting for voltage {voltage_channel.name} = {required_voltage}"
-            )
-            yield from bps.abs_set(
-                voltage_channel, required_voltage, group=MIRROR_VOLTAGE_GROUP, wait=True
+            actions.append(
+                Action(
+                    f"{mirror_key}_voltage_{index}",
+                    voltage_channel,
+                    required_voltage,
+                    VOLTAGE_SLEW_ESTIMATE_S,
+                )
             )
+    return actions
 
 
-def adjust_mirror_stripe(
+def _mirror_stripe_actions(
     energy_kev, mirror: FocusingMirrorWithStripes, mirror_voltages: MirrorVoltages
 ):
-    """Adjusts the mirror stripe based on the new energy.
-
-    Changing this takes some time and moves motors that are liable to overheating so we
-    check whether its required first.
-
-    Feedback should be OFF prior to entry, in order to prevent
-    feedback from making unnecessary corrections while beam is being adjusted."""
     mirror_config = mirror.energy_to_stripe(energy_kev)
 
     current_mirror_stripe = yield from bps.rd(mirror.stripe)
     new_stripe = mirror_config["stripe"]
 
-    if current_mirror_stripe != new_stripe:
-        LOGGER.info(
-            f"Adjusting mirror stripe for {energy_kev}keV selecting {new_stripe} stripe"
-        )
-        yield from bps.abs_set(mirror.stripe, new_stripe, wait=True)
-        yield from bps.trigger(mirror.apply_stripe)
-
-        # yaw, lat cannot be done simultaneously
-        LOGGER.info(f"Adjusting {mirror.name} lat to {mirror_config['lat_mm']}")
-        yield from bps.abs_set(
-            mirror.x_mm, mirror_config["lat_mm"], wait=True, timeout=YAW_LAT_TIMEOUT_S
-        )
-
-        LOGGER.info(f"Adjusting {mirror.name} yaw to {mirror_config['yaw_mrad']}")
-        yield from bps.abs_set(
+    if current_mirror_stripe == new_stripe:
+        return []
+
+    LOGGER.info(
+        f"Adjusting mirror stripe for {energy_kev}keV selecting {new_stripe} stripe, "
+        f"{mirror.name} lat {mirror_config['lat_mm']}, yaw {mirror_config['yaw_mrad']}"
+    )
+    return [
+        Action("mirror_stripe", mirror.stripe, new_stripe, STRIPE_SELECT_ESTIMATE_S),
+        Action(
+            "mirror_apply_stripe", mirror.apply_stripe, None, STRIPE_SELECT_ESTIMATE_S
+        ),
+        Action(
+            "mirror_lat",
+            mirror.x_mm,
+            mirror_config["lat_mm"],
+            YAW_LAT_ESTIMATE_S,
+            YAW_LAT_TIMEOUT_S,
+        ),
+        Action(
+            "mirror_yaw",
             mirror.yaw_mrad,
             mirror_config["yaw_mrad"],
-            wait=True,
-            timeout=YAW_LAT_TIMEOUT_S,
-        )
+            YAW_LAT_ESTIMATE_S,
+            YAW_LAT_TIMEOUT_S,
+        ),
+        *_mirror_voltage_actions(new_stripe, mirror_voltages),
+    ]
 
-        LOGGER.info("Adjusting mirror voltages...")
-        yield from _apply_and_wait_for_voltages_to_settle(new_stripe, mirror_voltages)
+
+def adjust_mirror_stripe(
+    energy_kev, mirror: FocusingMirrorWithStripes, mirror_voltages: MirrorVoltages
+):
+    """Adjusts the mirror stripe based on the new energy.
+
+    Changing this takes some time and moves motors that are liable to overheating so we
+    check whether its required first.
+
+    Feedback should be OFF prior to entry, in order to prevent
+    feedback from making unnecessary corrections while beam is being adjusted."""
+    actions = yield from _mirror_stripe_actions(energy_kev, mirror, mirror_voltages)
+    yield from execute_schedule(schedule_actions(actions, ENERGY_CHANGE_CONSTRAINTS))
 
 
 def adjust_dcm_pitch_roll_vfm_from_lut(
@@ -99,10 +137,11 @@ def adjust_dcm_pitch_roll_vfm_from_lut(
     """Beamline energy-change post-adjustments : Adjust DCM and VFM directly from lookup tables.
     Lookups are performed against the Bragg angle which is computed directly from the target energy
     rather than waiting for the EPICS controls PV to reach it.
+    All adjustments are performed in a single schedule which runs them in parallel
+    where ENERGY_CHANGE_CONSTRAINTS allow.
     Feedback should be OFF prior to entry, in order to prevent
     feedback from making unnecessary corrections while beam is being adjusted."""
 
-    # Adjust DCM Pitch
     dcm = undulator_dcm.dcm_ref()
     LOGGER.info(f"Adjusting DCM and VFM for {energy_kev} keV")
     d_spacing_a: float = yield from bps.rd(
@@ -111,22 +150,22 @@ def adjust_dcm_pitch_roll_vfm_from_lut(
 
     bragg_deg = energy_to_bragg_angle(energy_kev, d_spacing_a)
     LOGGER.info(f"Target Bragg angle = {bragg_deg} degrees")
-    dcm_pitch_adjuster = lookup_table_adjuster(
-        linear_interpolation_lut(*undulator_dcm.pitch_energy_table.columns),
-        dcm.xtal_1.pitch_in_mrad,
-        bragg_deg,
-    )
-    yield from dcm_pitch_adjuster(DCM_GROUP)
-    # It's possible we can remove these waits but we need to check
-    LOGGER.info("Waiting for DCM pitch adjust to complete...")
-
-    # DCM Roll
-    dcm_roll_adjuster = lookup_table_adjuster(
-        linear_interpolation_lut(*undulator_dcm.roll_energy_table.columns),
-        dcm.xtal_1.roll_in_mrad,
-        bragg_deg,
-    )
-    yield from dcm_roll_adjuster(DCM_GROUP)
-    LOGGER.info("Waiting for DCM roll adjust to complete...")
-
-    yield from adjust_mirror_stripe(energy_kev, vfm, mirror_voltages)
+    pitch_lut = linear_interpolation_lut(*undulator_dcm.pitch_energy_table.columns)
+    roll_lut = linear_interpolation_lut(*undulator_dcm.roll_energy_table.columns)
+    actions = [
+        Action(
+            "dcm_pitch",
+            dcm.xtal_1.pitch_in_mrad,
+            pitch_lut(bragg_deg),
+            DCM_ADJUST_ESTIMATE_S,
+        ),
+        Action(
+            "dcm_roll",
+            dcm.xtal_1.roll_in_mrad,
+            roll_lut(bragg_deg),
+            DCM_ADJUST_ESTIMATE_S,
+        ),
+    ]
+    actions += yield from _mirror_stripe_actions(energy_kev, vfm, mirror_voltages)
+
+    yield from execute_schedule(schedule_actions(actions, ENERGY_CHANGE_CONSTRAINTS))
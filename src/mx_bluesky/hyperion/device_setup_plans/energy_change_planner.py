@@ -0,0 +1,166 @@
+"""Schedules a set of device moves so that as many as possible run in parallel, subject
+to mechanical constraints which are expressed as data rather than as the order of
+calls in a plan.
+
+Actions are identified by name and constraints refer to those names, optionally using
+shell-style wildcards, e.g. ``MutuallyExclusive(("mirror_lat", "mirror_yaw"))`` or
+``Precedes("mirror_stripe", "hfm_voltage_*")``. Constraints that refer to actions that
+are not present are ignored, so a single set of constraints can describe every
+variant of an energy change.
+"""
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Any
+
+import bluesky.plan_stubs as bps
+
+from mx_bluesky.common.utils.log import LOGGER
+
+ENERGY_CHANGE_GROUP_PREFIX = "ENERGY_CHANGE"
+
+
+@dataclass(frozen=True)
+class Action:
+    """A single move performed as part of an energy change.
+
+    Args:
+        name: Unique name used to refer to this action in constraints.
+        device: The device to set, or to trigger if value is None.
+        value: The value to set the device to.
+        estimated_duration_s: Estimate of how long the action takes, used to order
+            the actions in the schedule.
+        timeout: Timeout passed to the set, if any.
+    """
+
+    name: str
+    device: Any = field(compare=False)
+    value: Any = None
+    estimated_duration_s: float = 1.0
+    timeout: float | None = None
+
+
+@dataclass(frozen=True)
+class Precedes:
+    """Actions matching ``after`` may only start once all actions matching ``before``
+    have completed."""
+
+    before: str
+    after: str
+
+
+@dataclass(frozen=True)
+class MutuallyExclusive:
+    """No two actions matching any of the patterns may be in progress at once."""
+
+    patterns: tuple[str, ...]
+
+
+Constraint = Precedes | MutuallyExclusive
+
+
+@dataclass(frozen=True)
+class ScheduledAction:
+    action: Action
+    start_s: float
+    wait_for: tuple[str, ...]
+    """Names of the actions which must have completed before this one is started."""
+
+    @property
+    def end_s(self) -> float:
+        return self.start_s + self.action.estimated_duration_s
+
+
+def _matching(names: Iterable[str], *patterns: str) -> set[str]:
+    return {
+        name
+        for name in names
+        if any(fnmatchcase(name, pattern) for pattern in patterns)
+    }
+
+
+def schedule_actions(
+    actions: Sequence[Action], constraints: Iterable[Constraint]
+) -> list[ScheduledAction]:
+    """Compute a schedule in which every action starts as early as the constraints
+    allow, given the estimated durations of the actions.
+
+    Actions are scheduled greedily in order of earliest possible start time, with ties
+    broken by the order in which they were supplied, so the returned schedule is
+    ordered by start time.
+
+    Raises:
+        ValueError: If action names are not unique or the constraints are cyclic.
+    """
+    names = [action.name for action in actions]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Action names must be unique, got {names}")
+
+    predecessors: dict[str, set[str]] = {name: set() for name in names}
+    exclusions: dict[str, set[str]] = {name: set() for name in names}
+    for constraint in constraints:
+        if isinstance(constraint, Precedes):
+            before = _matching(names, constraint.before)
+            for name in _matching(names, constraint.after):
+                predecessors[name] |= before - {name}
+        else:
+            exclusive = _matching(names, *constraint.patterns)
+            for name in exclusive:
+                exclusions[name] |= exclusive - {name}
+
+    by_name = {action.name: action for action in actions}
+    end_s: dict[str, float] = {}
+    schedule: list[ScheduledAction] = []
+    remaining = list(names)
+    while remaining:
+        best: tuple[float, str, set[str]] | None = None
+        for name in remaining:
+            if not predecessors[name] <= end_s.keys():
+                continue
+            wait_for = predecessors[name] | (exclusions[name] & end_s.keys())
+            start_s = max((end_s[other] for other in wait_for), default=0.0)
+            if best is None or start_s < best[0]:
+                best = (start_s, name, wait_for)
+        if best is None:
+            raise ValueError(f"Constraints on {remaining} cannot be satisfied")
+        start_s, name, wait_for = best
+        action = by_name[name]
+        schedule.append(
+            ScheduledAction(action, start_s, tuple(n for n in names if n in wait_for))
+        )
+        end_s[name] = start_s + action.estimated_duration_s
+        remaining.remove(name)
+    return schedule
+
+
+def group_for(action_name: str) -> str:
+    return f"{ENERGY_CHANGE_GROUP_PREFIX}_{action_name}"
+
+
+def execute_schedule(schedule: Sequence[ScheduledAction]):
+    """Perform the scheduled actions, starting each one as soon as those it must wait
+    for are complete, and wait for all of them to finish."""
+    if schedule:
+        LOGGER.info(
+            f"Executing {len(schedule)} actions, estimated to take "
+            f"{max(scheduled.end_s for scheduled in schedule):.1f}s"
+        )
+    waited: set[str] = set()
+    for scheduled in schedule:
+        for name in scheduled.wait_for:
+            if name not in waited:
+                yield from bps.wait(group=group_for(name))
+                waited.add(name)
+        action = scheduled.action
+        group = group_for(action.name)
+        if action.value is None:
+            LOGGER.info(f"Triggering {action.device.name}")
+            yield from bps.trigger(action.device, group=group)
+        else:
+            LOGGER.info(f"Setting {action.device.name} to {action.value}")
+            kwargs = {} if action.timeout is None else {"timeout": action.timeout}
+            yield from bps.abs_set(action.device, action.value, group=group, **kwargs)
+    for scheduled in schedule:
+        if scheduled.action.name not in waited:
+            yield from bps.wait(group=group_for(scheduled.action.name))
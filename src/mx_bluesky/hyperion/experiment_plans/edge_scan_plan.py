@@ -0,0 +1,240 @@
+"""Plan that scans the energy across an absorption edge, recording the fluorescence of
+the sample on the Xspress3Mini, and chooses the peak, inflection and remote energies
+of a MAD or SAD experiment from the spectrum.
+
+The attenuation should already be optimised for the sample, e.g. by
+optimise_attenuation_plan at an energy above the edge.
+"""
+
+import time
+from typing import Any
+
+import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
+import numpy as np
+import pydantic
+from blueapi.core import BlueskyContext
+from bluesky.utils import MsgGenerator
+from dodal.devices.beamlines.i03.dcm import DCM
+from dodal.devices.beamlines.i03.undulator_dcm import UndulatorDCM
+from dodal.devices.xspress3.xspress3 import Xspress3
+from dodal.devices.zebra.zebra_controlled_shutter import (
+    MXZebraShutter,
+    ZebraShutterState,
+)
+
+from mx_bluesky.common.parameters.constants import (
+    DocDescriptorNames,
+    PlanNameConstants,
+)
+from mx_bluesky.common.utils.context import device_composite_from_context
+from mx_bluesky.common.utils.log import LOGGER
+from mx_bluesky.hyperion.utils.absorption_edge import (
+    EdgeScanAnalysis,
+    analyse_edge_scan,
+)
+
+EDGE_SCAN_OUTPUT_FILE = "edge_scan_output_file"
+
+
+@pydantic.dataclasses.dataclass(config={"arbitrary_types_allowed": True})
+class EdgeScanComposite:
+    """All devices which are directly or indirectly required by this plan"""
+
+    undulator_dcm: UndulatorDCM
+    dcm: DCM
+    sample_shutter: MXZebraShutter
+    xspress3mini: Xspress3
+
+
+def create_devices(context: BlueskyContext) -> EdgeScanComposite:
+    return device_composite_from_context(context, EdgeScanComposite)
+
+
+def edge_scan_energies(
+    edge_energy_ev: float, below_edge_ev: float, above_edge_ev: float, step_ev: float
+) -> list[float]:
+    """The energies to scan, in steps of step_ev from below_edge_ev below the edge to
+    above_edge_ev above it."""
+    if below_edge_ev <= 0 or above_edge_ev <= 0 or step_ev <= 0:
+        raise ValueError(
+            f"Scan of {below_edge_ev} eV below and {above_edge_ev} eV above the edge "
+            f"in steps of {step_ev} eV must be positive"
+        )
+    steps = np.arange(-below_edge_ev, above_edge_ev + step_ev / 2, step_ev)
+    return (edge_energy_ev + steps).tolist()
+
+
+class _EdgeScanReadable:
+    """Presents values calculated by the plan to the RunEngine as a readable device,
+    so that they can be emitted in an event document. The same readable must be used
+    for every event in a stream."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.parent = None
+        self.values: dict[str, float | list[float]] = {}
+
+    def describe(self) -> dict[str, Any]:
+        source = "mx_bluesky.edge_scan"
+        return {
+            key: {"source": source, "dtype": "array", "shape": [len(value)]}
+            if isinstance(value, list)
+            else {"source": source, "dtype": "number", "shape": []}
+            for key, value in self.values.items()
+        }
+
+    def read(self) -> dict[str, Any]:
+        timestamp = time.time()
+        return {
+            key: {"value": value, "timestamp": timestamp}
+            for key, value in self.values.items()
+        }
+
+    def emit(self, values: dict[str, float | list[float]]) -> MsgGenerator:
+        self.values = values
+        yield from bps.create(self.name)
+        yield from bps.read(self)
+        yield from bps.save()
+
+
+def _measure_fluorescence(
+    composite: EdgeScanComposite,
+    energy_ev: float,
+    low_roi: int,
+    high_roi: int,
+    move_undulator: bool,
+) -> MsgGenerator[tuple[float, float]]:
+    """Move to the energy and take an exposure on the Xspress3Mini, with the shutter
+    only open for the exposure.
+
+    Returns:
+        The energy reached, in eV, and the dead-time corrected counts in the ROI
+    """
+    energy_device = (
+        composite.undulator_dcm if move_undulator else composite.dcm.energy_in_keV
+    )
+    yield from bps.abs_set(energy_device, energy_ev / 1000, wait=True)
+    yield from bps.abs_set(composite.sample_shutter, ZebraShutterState.OPEN, wait=True)
+    yield from bps.stage(composite.xspress3mini, wait=True)
+    yield from bps.unstage(composite.xspress3mini, wait=True)
+    yield from bps.abs_set(composite.sample_shutter, ZebraShutterState.CLOSE, wait=True)
+    energy_kev = yield from bps.rd(composite.dcm.energy_in_keV)
+    data = np.array(
+        (yield from bps.rd(composite.xspress3mini.dt_corrected_latest_mca[1]))
+    )
+    counts = float(np.sum(data[int(low_roi) : int(high_roi)]))
+    return energy_kev * 1000, counts
+
+
+def edge_scan_plan(
+    composite: EdgeScanComposite,
+    edge_energy_ev: float,
+    below_edge_ev: float = 30,
+    above_edge_ev: float = 50,
+    step_ev: float = 0.5,
+    collection_time: float = 1,
+    low_roi: int = 100,
+    high_roi: int = 2048,
+    move_undulator: bool = True,
+    f2_below: float = 0,
+    f2_above: float = 1,
+    remote_offset_ev: float = 100,
+    output_file: str | None = None,
+) -> MsgGenerator[EdgeScanAnalysis]:
+    """Step the energy across an absorption edge, reading the fluorescence at each
+    step, and choose the energies for a MAD or SAD experiment from the spectrum.
+
+    The energy, counts, and the f' and f'' found from them are emitted in the
+    EDGE_SCAN_RESULT stream, and each step in the EDGE_SCAN_POINT stream. The energy
+    is left at the end of the scan.
+
+    Args:
+        composite: Devices required for the scan
+        edge_energy_ev: The tabulated energy of the edge
+        below_edge_ev: How far below the edge to start the scan
+        above_edge_ev: How far above the edge to end the scan
+        step_ev: The energy step between readings
+        collection_time: The exposure time of each reading, in seconds
+        low_roi: The first channel of the emission line of the absorbing element
+        high_roi: The channel after the last channel of the emission line
+        move_undulator: Whether to move the undulator with the DCM at each step, or
+            only the DCM for an undulator with a gap tapered to cover the scan
+        f2_below: f'' below the edge, see analyse_edge_scan
+        f2_above: f'' just above the edge, see analyse_edge_scan
+        remote_offset_ev: How far above the peak to choose the remote energy
+        output_file: If given, the file the EdgeScanCallback writes the spectrum and
+            chosen energies to
+
+    Returns:
+        The f' and f'' found and the energies chosen from them
+
+    Raises:
+        EdgeScanAnalysisError: If no absorption edge is found in the spectrum
+    """
+    energies = edge_scan_energies(edge_energy_ev, below_edge_ev, above_edge_ev, step_ev)
+    md: dict[str, Any] = {"edge_energy_ev": edge_energy_ev}
+    if output_file:
+        md |= {
+            "activate_callbacks": ["EdgeScanCallback"],
+            EDGE_SCAN_OUTPUT_FILE: output_file,
+        }
+    points = _EdgeScanReadable(DocDescriptorNames.EDGE_SCAN_POINT)
+    analysis: EdgeScanAnalysis | None = None
+
+    def close_shutter():
+        yield from bps.abs_set(
+            composite.sample_shutter, ZebraShutterState.CLOSE, wait=True
+        )
+
+    @bpp.finalize_decorator(close_shutter)
+    def scan() -> MsgGenerator[tuple[list[float], list[float]]]:
+        yield from bps.abs_set(
+            composite.xspress3mini.acquire_time, collection_time, wait=True
+        )
+        yield from bps.abs_set(composite.xspress3mini.set_num_images, 1, wait=True)
+        measured_energies, counts = [], []
+        for energy_ev in energies:
+            measured_energy, count = yield from _measure_fluorescence(
+                composite, energy_ev, low_roi, high_roi, move_undulator
+            )
+            measured_energies.append(measured_energy)
+            counts.append(count)
+            yield from points.emit({"energy_ev": measured_energy, "counts": count})
+        return measured_energies, counts
+
+    def scan_and_analyse() -> MsgGenerator:
+        nonlocal analysis
+        measured_energies, counts = yield from scan()
+        analysis = analyse_edge_scan(
+            measured_energies,
+            counts,
+            f2_below=f2_below,
+            f2_above=f2_above,
+            remote_offset_ev=remote_offset_ev,
+        )
+        yield from _EdgeScanReadable(DocDescriptorNames.EDGE_SCAN_RESULT).emit(
+            {
+                "energies_ev": analysis.energies_ev,
+                "counts": analysis.counts,
+                "f_double_prime": analysis.f_double_prime,
+                "f_prime": analysis.f_prime,
+                "edge_energy_ev": analysis.edge_energy_ev,
+                "peak_energy_ev": analysis.peak_energy_ev,
+                "peak_f_prime": analysis.peak_f_prime,
+                "peak_f_double_prime": analysis.peak_f_double_prime,
+                "inflection_energy_ev": analysis.inflection_energy_ev,
+                "inflection_f_prime": analysis.inflection_f_prime,
+                "inflection_f_double_prime": analysis.inflection_f_double_prime,
+                "remote_energy_ev": analysis.remote_energy_ev,
+            }
+        )
+
+    LOGGER.info(
+        f"Scanning {len(energies)} energies from {energies[0]} to {energies[-1]} eV"
+    )
+    yield from bpp.set_run_key_wrapper(
+        bpp.run_wrapper(scan_and_analyse(), md=md), PlanNameConstants.EDGE_SCAN
+    )
+    assert analysis, "Edge scan finished without an analysis"
+    return analysis
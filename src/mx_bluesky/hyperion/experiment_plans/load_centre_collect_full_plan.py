@@ -11,10 +11,12 @@ from dodal.common.beamlines.beamline_utils import get_config_client
 from dodal.devices.baton import Baton
 from dodal.devices.oav.oav_parameters import OAVParameters
 
+from mx_bluesky.common.experiment_plans.rotation.helical_utils import HelicalVector
 from mx_bluesky.common.parameters.components import WithSnapshot
 from mx_bluesky.common.parameters.rotation import (
     RotationScanPerSweep,
 )
+from mx_bluesky.common.preprocessors.phase_profiler import phase_profiler_decorator
 from mx_bluesky.common.utils.context import device_composite_from_context
 from mx_bluesky.common.utils.exceptions import CrystalNotFoundError
 from mx_bluesky.common.utils.log import LOGGER
@@ -30,7 +32,11 @@ from mx_bluesky.hyperion.experiment_plans.rotation_scan_plan import (
 )
 from mx_bluesky.hyperion.parameters.constants import CONST, I03Constants
 from mx_bluesky.hyperion.parameters.load_centre_collect import LoadCentreCollect
-from mx_bluesky.hyperion.utils.centre_selection import samples_and_locations_to_collect
+from mx_bluesky.hyperion.utils.centre_selection import (
+    helical_vector_for_location,
+    samples_and_locations_to_collect,
+)
+from mx_bluesky.hyperion.utils.wells import WellRegionsEventHandler
 
 
 @pydantic.dataclasses.dataclass(config={"arbitrary_types_allowed": True})
@@ -57,6 +63,11 @@ def load_centre_collect_full(
     * If X-ray centring finds one or more diffracting centres then for each centre
      that satisfies the chosen selection function,
      move to that centre and do a collection with the specified parameters.
+     If a helical collection is requested, the collection instead translates along
+     the principal axis of the crystal.
+
+    The time spent in each sub-plan is profiled and emitted as a phase_timings event
+    at the end of the plan.
     """
 
     if not oav_params:
@@ -81,14 +92,16 @@ def load_centre_collect_full(
             ),
         }
     )
+    @phase_profiler_decorator(description=f"sample {parameters.sample_id}")
     def plan_with_callback_subs():
         flyscan_event_handler = XRayCentreEventHandler()
+        well_regions_handler = WellRegionsEventHandler()
         try:
             yield from subs_wrapper(
                 robot_load_then_xray_centre(
                     composite, parameters.robot_load_then_centre, oav_config_file
                 ),
-                flyscan_event_handler,
+                [flyscan_event_handler, well_regions_handler],
             )
         except CrystalNotFoundError:
             if parameters.select_centres.ignore_xtal_not_found:
@@ -102,9 +115,11 @@ def load_centre_collect_full(
                 composite.gonio,
                 parameters.sample_id,
                 flyscan_event_handler.xray_centre_results,
+                well_regions_handler.well_regions,
             )
         )
-        sample_ids_and_locations.sort(key=_x_coordinate)
+        if not parameters.selection_params.order_for_travel:
+            sample_ids_and_locations.sort(key=_x_coordinate)
 
         multi_rotation = parameters.multi_rotation_scan
         rotation_template = multi_rotation.rotation_scans.copy()
@@ -116,8 +131,19 @@ def load_centre_collect_full(
         generator = rotation_scan_generator(is_alternating)
         next(generator)
         for sample_id, location in sample_ids_and_locations:
+            helical_vector = (
+                helical_vector_for_location(
+                    parameters.helical,
+                    flyscan_event_handler.xray_centre_results,
+                    location,
+                )
+                if parameters.helical
+                else None
+            )
             for rot in rotation_template:
                 combination = generator.send((rot, location, sample_id))
+                if helical_vector:
+                    _set_helical_vector(combination, helical_vector)
                 multi_rotation.rotation_scans.append(combination)
         multi_rotation = RotationScan.model_validate(multi_rotation)
 
@@ -130,6 +156,11 @@ def load_centre_collect_full(
     yield from plan_with_callback_subs()
 
 
+def _set_helical_vector(scan: RotationScanPerSweep, vector: HelicalVector):
+    scan.x_start_um, scan.y_start_um, scan.z_start_um = vector.start_um
+    scan.x_end_um, scan.y_end_um, scan.z_end_um = vector.end_um
+
+
 def _x_coordinate(sample_and_location: tuple[int, np.ndarray]) -> float:
     return sample_and_location[1][0]  # type: ignore
 
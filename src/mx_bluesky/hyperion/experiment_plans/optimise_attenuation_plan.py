@@ -1,10 +1,15 @@
+import math
+import time
+from dataclasses import dataclass, field
 from enum import Enum
+from typing import Any
 
 import bluesky.plan_stubs as bps
 import bluesky.preprocessors as bpp
 import numpy as np
 import pydantic
 from blueapi.core import BlueskyContext
+from bluesky.utils import MsgGenerator
 from dodal.devices.attenuator.attenuator import BinaryFilterAttenuator
 from dodal.devices.xspress3.xspress3 import Xspress3
 from dodal.devices.zebra.zebra_controlled_shutter import (
@@ -15,6 +20,8 @@ from dodal.devices.zebra.zebra_controlled_shutter import (
 from mx_bluesky.common.utils.context import device_composite_from_context
 from mx_bluesky.common.utils.log import LOGGER
 
+ATTENUATION_MODEL_STREAM = "attenuation_model"
+
 
 class AttenuationOptimisationFailedError(Exception):
     pass
@@ -158,6 +165,37 @@ def do_device_optimise_iteration(
     yield from open_and_run()
 
 
+def read_deadtime(composite: OptimizeAttenuationComposite) -> MsgGenerator[float]:
+    total_time = yield from bps.rd(composite.xspress3mini.channels[1].total_time)
+    reset_ticks = yield from bps.rd(composite.xspress3mini.channels[1].reset_ticks)
+
+    LOGGER.info(f"Current total time = {total_time}")
+    LOGGER.info(f"Current reset ticks = {reset_ticks}")
+    deadtime = 0
+
+    """
+        The reset ticks PV stops ticking while the detector is unable to process events, so the absolute difference between the total time and the
+        reset ticks time gives the deadtime in unit time. Divide by total time to get it as a percentage.
+    """
+
+    if total_time != reset_ticks:
+        deadtime = 1 - abs(total_time - reset_ticks) / (total_time)
+
+    LOGGER.info(f"Deadtime is now at {deadtime}")
+    return deadtime
+
+
+def read_total_count(
+    composite: OptimizeAttenuationComposite, low_roi: int, high_roi: int
+) -> MsgGenerator[float]:
+    data = np.array(
+        (yield from bps.rd(composite.xspress3mini.dt_corrected_latest_mca[1]))
+    )
+    total_count = sum(data[int(low_roi) : int(high_roi)])
+    LOGGER.info(f"Total count is {total_count}")
+    return total_count
+
+
 def is_deadtime_optimised(
     deadtime: float,
     deadtime_threshold: float,
@@ -235,22 +273,7 @@ def deadtime_optimisation(
     for cycle in range(0, max_cycles):
         yield from do_device_optimise_iteration(composite, transmission)
 
-        total_time = yield from bps.rd(composite.xspress3mini.channels[1].total_time)
-        reset_ticks = yield from bps.rd(composite.xspress3mini.channels[1].reset_ticks)
-
-        LOGGER.info(f"Current total time = {total_time}")
-        LOGGER.info(f"Current reset ticks = {reset_ticks}")
-        deadtime = 0
-
-        """
-            The reset ticks PV stops ticking while the detector is unable to process events, so the absolute difference between the total time and the
-            reset ticks time gives the deadtime in unit time. Divide by total time to get it as a percentage.
-        """
-
-        if total_time != reset_ticks:
-            deadtime = 1 - abs(total_time - reset_ticks) / (total_time)
-
-        LOGGER.info(f"Deadtime is now at {deadtime}")
+        deadtime = yield from read_deadtime(composite)
 
         # Check if new deadtime is OK
 
@@ -344,11 +367,7 @@ def total_counts_optimisation(
 
         yield from do_device_optimise_iteration(composite, transmission)
 
-        data = np.array(
-            (yield from bps.rd(composite.xspress3mini.dt_corrected_latest_mca[1]))
-        )
-        total_count = sum(data[int(low_roi) : int(high_roi)])
-        LOGGER.info(f"Total count is {total_count}")
+        total_count = yield from read_total_count(composite, low_roi, high_roi)
 
         if is_counts_within_target(total_count, lower_count_limit, upper_count_limit):
             optimised_transmission = transmission
@@ -384,6 +403,402 @@ def total_counts_optimisation(
     return optimised_transmission
 
 
+@dataclass(frozen=True)
+class SaturatingResponse:
+    """Model of a response of the Xspress3Mini to the transmission T, which is linear
+    at low transmission and saturates due to detector deadtime at high transmission:
+
+        response = gain * T / (1 + saturation * T)
+
+    The deadtime is described by the model with gain equal to saturation, and the
+    total counts by a gain given by the flux on the sample.
+
+    Attributes:
+        gain: Response per unit transmission at low transmission
+        saturation: Reciprocal of the transmission at which the response is half of
+            what it would be without deadtime
+    """
+
+    gain: float
+    saturation: float
+
+    def predict(self, transmission):
+        return self.gain * transmission / (1 + self.saturation * transmission)
+
+    def transmission_for(self, response: float) -> float | None:
+        """The transmission giving the response, or None if the response is beyond
+        the saturation of the detector."""
+        headroom = self.gain - self.saturation * response
+        return response / headroom if headroom > 0 else None
+
+
+def fit_saturating_response(
+    transmissions: list[float], responses: list[float]
+) -> tuple[SaturatingResponse, float] | None:
+    """Fit a SaturatingResponse to readings taken at two or more transmissions.
+
+    The model is linear in the reciprocals of transmission and response, so is fitted
+    by least squares in those.
+
+    Returns:
+        The fitted model and the largest error in its prediction of a reading, as a
+        fraction of the reading, or None if the readings cannot be described by it
+    """
+    t = np.array(transmissions, dtype=float)
+    r = np.array(responses, dtype=float)
+    if len(np.unique(t)) < 2 or np.any(r <= 0):
+        return None
+    slope, intercept = np.polyfit(1 / t, 1 / r, 1)
+    if slope <= 0:
+        return None
+    model = SaturatingResponse(gain=1 / slope, saturation=max(intercept / slope, 0))
+    fit_error = float(np.max(np.abs(model.predict(t) - r) / r))
+    return model, fit_error
+
+
+@dataclass
+class AttenuationModelFit:
+    """The readings taken by a model based optimisation and the model fitted to them.
+
+    Attributes:
+        transmissions: The transmission of each iteration
+        responses: The deadtime or total count read at each iteration
+        model: The most recent model fitted to the readings
+        fit_error: The largest error of the model as a fraction of a reading
+        fell_back: Whether the model was abandoned for the cycle of the non-model
+            based optimisation
+        optimised_transmission: The result of the optimisation
+    """
+
+    transmissions: list[float] = field(default_factory=list)
+    responses: list[float] = field(default_factory=list)
+    model: SaturatingResponse | None = None
+    fit_error: float = math.nan
+    fell_back: bool = False
+    optimised_transmission: float = 0
+
+    @property
+    def iterations(self) -> int:
+        return len(self.transmissions)
+
+    def refit(self, max_fit_error: float) -> bool:
+        """Fit the model to all readings, returning whether it describes them."""
+        fit = fit_saturating_response(self.transmissions, self.responses)
+        if fit is None:
+            LOGGER.info("Readings cannot be described by the attenuation model")
+            return False
+        self.model, self.fit_error = fit
+        LOGGER.info(f"Fitted {self.model} with error {self.fit_error:.3f}")
+        return self.fit_error <= max_fit_error
+
+
+class _AttenuationModelReadable:
+    """Presents the fitted model to the RunEngine as a readable device, so that it
+    can be emitted in an event document."""
+
+    def __init__(self, fit: AttenuationModelFit):
+        self.name = ATTENUATION_MODEL_STREAM
+        self.parent = None
+        self._fit = fit
+
+    def describe(self) -> dict[str, Any]:
+        source = "mx_bluesky.optimise_attenuation"
+        return {
+            key: {"source": source, "dtype": "number", "shape": []}
+            for key in (
+                "gain",
+                "saturation",
+                "fit_error",
+                "iterations",
+                "fell_back",
+                "optimised_transmission",
+            )
+        } | {
+            key: {"source": source, "dtype": "array", "shape": [self._fit.iterations]}
+            for key in ("transmissions", "responses")
+        }
+
+    def read(self) -> dict[str, Any]:
+        timestamp = time.time()
+        model = self._fit.model
+        values = {
+            "gain": model.gain if model else math.nan,
+            "saturation": model.saturation if model else math.nan,
+            "fit_error": self._fit.fit_error,
+            "iterations": self._fit.iterations,
+            "fell_back": int(self._fit.fell_back),
+            "optimised_transmission": self._fit.optimised_transmission,
+            "transmissions": self._fit.transmissions,
+            "responses": self._fit.responses,
+        }
+        return {
+            key: {"value": value, "timestamp": timestamp}
+            for key, value in values.items()
+        }
+
+
+def _record_attenuation_model(fit: AttenuationModelFit) -> MsgGenerator:
+    yield from bps.create(ATTENUATION_MODEL_STREAM)
+    yield from bps.read(_AttenuationModelReadable(fit))
+    yield from bps.save()
+
+
+def _with_recorded_model(
+    plan: MsgGenerator, fit: AttenuationModelFit
+) -> MsgGenerator[float]:
+    """Run an optimisation in its own run, finishing with an event in the
+    ATTENUATION_MODEL_STREAM whether or not it succeeds."""
+    yield from bpp.set_run_key_wrapper(
+        bpp.run_wrapper(
+            bpp.finalize_wrapper(plan, lambda: _record_attenuation_model(fit))
+        ),
+        ATTENUATION_MODEL_STREAM,
+    )
+    return fit.optimised_transmission
+
+
+def _clamp_model_transmission(
+    transmission: float | None,
+    upper_transmission_limit: float,
+    lower_transmission_limit: float,
+) -> float:
+    if transmission is None or transmission > upper_transmission_limit:
+        return upper_transmission_limit
+    if transmission < lower_transmission_limit:
+        raise AttenuationOptimisationFailedError(
+            f"Model predicts transmission {transmission} below lower threshold {lower_transmission_limit}"
+        )
+    return transmission
+
+
+def model_deadtime_optimisation(
+    composite: OptimizeAttenuationComposite,
+    transmission: float,
+    increment: float,
+    deadtime_threshold: float,
+    max_cycles: int,
+    upper_transmission_limit: float,
+    lower_transmission_limit: float,
+    max_fit_error: float = 0.1,
+) -> MsgGenerator[float]:
+    """Optimises the attenuation for the Xspress3Mini based on the detector deadtime,
+    in as few exposures of the sample as possible.
+
+    The first reading is followed by a step in transmission as in
+    deadtime_optimisation, then a SaturatingResponse is fitted to the readings and
+    used to jump straight to the transmission predicted to be optimal. Like
+    deadtime_optimisation the result is within a factor of the increment of the
+    highest transmission with deadtime below the threshold, but the model aims for
+    the middle of that range. If the model does not describe the readings to within
+    max_fit_error the cycle of deadtime_optimisation is continued instead.
+
+    The fitted model and iterations are emitted in the ATTENUATION_MODEL_STREAM.
+
+    Args:
+        composite: Devices required to optimise attenuation
+        transmission: The initial transmission value to use for the optimising
+        increment: The factor to change the transmission by when not using the model,
+            also the precision of the result
+        deadtime_threshold: The maximum acceptable percentage deadtime
+        max_cycles: The maximum number of iterations before an error is thrown
+        upper_transmission_limit: Maximum allowed transmission, in order to protect
+            sample
+        lower_transmission_limit: Minimum expected transmission. Raise an error if
+            transmission goes lower
+        max_fit_error: The largest error in the model's prediction of a reading, as
+            a fraction of the reading, for the model to be used
+
+    Raises:
+        AttenuationOptimisationFailedError: If the transmission goes below the
+            expected value or the maximum cycles are reached
+
+    Returns:
+        The final transmission value which produces an acceptable deadtime
+    """
+    fit = AttenuationModelFit()
+
+    def threshold_transmission() -> float | None:
+        """The transmission predicted to reach the threshold, or None if that is
+        beyond the upper transmission limit."""
+        highest = fit.model.transmission_for(deadtime_threshold) if fit.model else None
+        if highest is None or highest >= upper_transmission_limit:
+            return None
+        return highest
+
+    def is_optimised(deadtime: float) -> bool:
+        if deadtime > deadtime_threshold:
+            return False
+        if transmission == upper_transmission_limit:
+            return True
+        highest = threshold_transmission()
+        return highest is not None and transmission * increment >= highest
+
+    def optimise():
+        nonlocal transmission
+        direction = Direction.POSITIVE
+        for cycle in range(max_cycles):
+            yield from do_device_optimise_iteration(composite, transmission)
+            deadtime = yield from read_deadtime(composite)
+            fit.transmissions.append(transmission)
+            fit.responses.append(deadtime)
+
+            if fit.fell_back:
+                if is_deadtime_optimised(
+                    deadtime,
+                    deadtime_threshold,
+                    transmission,
+                    upper_transmission_limit,
+                    direction,
+                ):
+                    fit.optimised_transmission = transmission
+                    return transmission
+            elif fit.iterations > 1 and not fit.refit(max_fit_error):
+                LOGGER.warning("Falling back to deadtime optimisation cycle")
+                fit.fell_back = True
+                direction = (
+                    Direction.NEGATIVE
+                    if deadtime > deadtime_threshold
+                    else Direction.POSITIVE
+                )
+            elif is_optimised(deadtime):
+                fit.optimised_transmission = transmission
+                return transmission
+
+            if cycle == max_cycles - 1:
+                raise AttenuationOptimisationFailedError(
+                    f"Unable to optimise attenuation after maximum cycles {max_cycles}"
+                )
+
+            if fit.fell_back:
+                direction = calculate_new_direction(
+                    direction, deadtime, deadtime_threshold
+                )
+                transmission = deadtime_calc_new_transmission(
+                    direction,
+                    transmission,
+                    increment,
+                    upper_transmission_limit,
+                    lower_transmission_limit,
+                )
+            elif fit.model is None:
+                transmission = deadtime_calc_new_transmission(
+                    Direction.NEGATIVE
+                    if deadtime > deadtime_threshold
+                    else Direction.POSITIVE,
+                    transmission,
+                    increment,
+                    upper_transmission_limit,
+                    lower_transmission_limit,
+                )
+            else:
+                highest = threshold_transmission()
+                transmission = _clamp_model_transmission(
+                    highest / math.sqrt(increment) if highest is not None else None,
+                    upper_transmission_limit,
+                    lower_transmission_limit,
+                )
+        raise AttenuationOptimisationFailedError("max_cycles must be at least 1")
+
+    LOGGER.info(
+        f"Using model deadtime optimisation, target deadtime is {deadtime_threshold}"
+    )
+    return (yield from _with_recorded_model(optimise(), fit))
+
+
+def model_total_counts_optimisation(
+    composite: OptimizeAttenuationComposite,
+    transmission: float,
+    low_roi: int,
+    high_roi: int,
+    lower_count_limit: float,
+    upper_count_limit: float,
+    target_count: float,
+    max_cycles: int,
+    upper_transmission_limit: float,
+    lower_transmission_limit: float,
+    max_fit_error: float = 0.1,
+) -> MsgGenerator[float]:
+    """Optimises the attenuation for the Xspress3Mini based on the total counts, in as
+    few exposures of the sample as possible.
+
+    The first reading is followed by a step in transmission proportional to the
+    counts as in total_counts_optimisation, then a SaturatingResponse is fitted to
+    the readings so that the step to the target count allows for the saturation of
+    the detector. If the model does not describe the readings to within
+    max_fit_error the cycle of total_counts_optimisation is continued instead.
+
+    The fitted model and iterations are emitted in the ATTENUATION_MODEL_STREAM.
+
+    Args:
+        composite: Devices required to optimise attenuation
+        transmission: The initial transmission value to use for the optimising
+        low_roi: Lower region of interest at which to include in the counts
+        high_roi: Upper region of interest at which to include in the counts
+        lower_count_limit: The lowest acceptable value for count
+        upper_count_limit: The highest acceptable value for count
+        target_count: The ideal number of counts, which the model aims for
+        max_cycles: The maximum number of iterations before an error is thrown
+        upper_transmission_limit: The maximum allowed value for the transmission
+        lower_transmission_limit: The minimum allowed value for the transmission
+        max_fit_error: The largest error in the model's prediction of a reading, as
+            a fraction of the reading, for the model to be used
+
+    Raises:
+        AttenuationOptimisationFailedError: If the transmission goes below the
+            expected value or the maximum cycles are reached
+
+    Returns:
+        The final transmission value which produces an acceptable total count
+    """
+    fit = AttenuationModelFit()
+
+    def optimise():
+        nonlocal transmission
+        for cycle in range(max_cycles):
+            yield from do_device_optimise_iteration(composite, transmission)
+            total_count = yield from read_total_count(composite, low_roi, high_roi)
+            fit.transmissions.append(transmission)
+            fit.responses.append(total_count)
+
+            if is_counts_within_target(
+                total_count, lower_count_limit, upper_count_limit
+            ):
+                fit.optimised_transmission = transmission
+                return transmission
+            if transmission == upper_transmission_limit and total_count < target_count:
+                LOGGER.warning(
+                    f"Total count {total_count} is below {lower_count_limit} at maximum transmission {upper_transmission_limit}. Using maximum transmission as optimised value."
+                )
+                fit.optimised_transmission = transmission
+                return transmission
+            if (
+                not fit.fell_back
+                and fit.iterations > 1
+                and not fit.refit(max_fit_error)
+            ):
+                LOGGER.warning("Falling back to total counts optimisation cycle")
+                fit.fell_back = True
+
+            if cycle == max_cycles - 1:
+                raise AttenuationOptimisationFailedError(
+                    f"Unable to optimise attenuation after maximum cycles {max_cycles}. Total count is not within limits: {lower_count_limit} <= {total_count} <= {upper_count_limit}"
+                )
+
+            if total_count <= 0:
+                new_transmission = None
+            elif fit.fell_back or fit.model is None:
+                new_transmission = (target_count / total_count) * transmission
+            else:
+                new_transmission = fit.model.transmission_for(target_count)
+            transmission = _clamp_model_transmission(
+                new_transmission, upper_transmission_limit, lower_transmission_limit
+            )
+        raise AttenuationOptimisationFailedError("max_cycles must be at least 1")
+
+    LOGGER.info("Using model total count optimisation")
+    return (yield from _with_recorded_model(optimise(), fit))
+
+
 def optimise_attenuation_plan(
     composite: OptimizeAttenuationComposite,
     collection_time=1,  # Comes from self.parameters.acquisitionTime in fluorescence_spectrum.py
@@ -399,6 +814,8 @@ def optimise_attenuation_plan(
     max_cycles=10,
     increment=2,
     deadtime_threshold=0.002,
+    use_model=False,
+    max_fit_error=0.1,
 ):
     check_parameters(
         target_count,
@@ -421,32 +838,59 @@ def optimise_attenuation_plan(
             f"Starting Xspress3Mini total counts optimisation routine \nOptimisation will be performed across ROI channels {low_roi} - {high_roi}"
         )
 
-        optimised_transmission = yield from total_counts_optimisation(
-            composite,
-            initial_transmission,
-            low_roi,
-            high_roi,
-            lower_count_limit,
-            upper_count_limit,
-            target_count,
-            max_cycles,
-            upper_transmission_limit,
-            lower_transmission_limit,
-        )
+        if use_model:
+            optimised_transmission = yield from model_total_counts_optimisation(
+                composite,
+                initial_transmission,
+                low_roi,
+                high_roi,
+                lower_count_limit,
+                upper_count_limit,
+                target_count,
+                max_cycles,
+                upper_transmission_limit,
+                lower_transmission_limit,
+                max_fit_error,
+            )
+        else:
+            optimised_transmission = yield from total_counts_optimisation(
+                composite,
+                initial_transmission,
+                low_roi,
+                high_roi,
+                lower_count_limit,
+                upper_count_limit,
+                target_count,
+                max_cycles,
+                upper_transmission_limit,
+                lower_transmission_limit,
+            )
 
     elif optimisation_type == "deadtime":
         LOGGER.info(
             f"Starting Xspress3Mini deadtime optimisation routine \nOptimisation will be performed across ROI channels {low_roi} - {high_roi}"
         )
-        optimised_transmission = yield from deadtime_optimisation(
-            composite,
-            initial_transmission,
-            upper_transmission_limit,
-            lower_transmission_limit,
-            increment,
-            deadtime_threshold,
-            max_cycles,
-        )
+        if use_model:
+            optimised_transmission = yield from model_deadtime_optimisation(
+                composite,
+                initial_transmission,
+                increment,
+                deadtime_threshold,
+                max_cycles,
+                upper_transmission_limit,
+                lower_transmission_limit,
+                max_fit_error,
+            )
+        else:
+            optimised_transmission = yield from deadtime_optimisation(
+                composite,
+                initial_transmission,
+                increment,
+                deadtime_threshold,
+                max_cycles,
+                upper_transmission_limit,
+                lower_transmission_limit,
+            )
 
     yield from bps.abs_set(
         composite.attenuator,
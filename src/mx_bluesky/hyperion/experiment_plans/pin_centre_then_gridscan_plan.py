@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 
+from bluesky import plan_stubs as bps
 from dodal.common.beamlines.beamline_utils import get_config_client
 from dodal.devices.oav.oav_parameters import OAVParameters
 
@@ -41,6 +42,10 @@ from mx_bluesky.hyperion.parameters.gridscan import (
     HyperionSpecifiedThreeDGridScan,
     PinTipCentreThenXrayCentre,
 )
+from mx_bluesky.hyperion.utils.wells import (
+    fire_well_regions_event,
+    well_regions_from_pin_tip,
+)
 
 
 def create_parameters_for_grid_detection(
@@ -48,6 +53,7 @@ def create_parameters_for_grid_detection(
 ) -> GridScanWithEdgeDetect:
     params_json = json.loads(pin_centre_parameters.model_dump_json())
     del params_json["tip_offset_um"]
+    del params_json["wells"]
     grid_detect_and_gridscan = GridScanWithEdgeDetect(**params_json)
     LOGGER.info(
         f"Parameters for grid detect and gridscan: {grid_detect_and_gridscan.model_dump_json(indent=2)}"
@@ -87,6 +93,12 @@ def pin_centre_then_gridscan_plan(
             oav_config_file,
         )
 
+        if parameters.wells:
+            centred_x_mm = yield from bps.rd(composite.gonio.x.user_readback)
+            yield from fire_well_regions_event(
+                well_regions_from_pin_tip(parameters.wells, centred_x_mm)
+            )
+
         grid_detect_params = create_parameters_for_grid_detection(parameters)
         oav_params = OAVParameters(get_config_client(), "xrayCentring", oav_config_file)
 
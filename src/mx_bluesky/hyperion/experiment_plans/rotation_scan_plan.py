@@ -50,6 +50,10 @@ from mx_bluesky.common.experiment_plans.oav_snapshot_plan import (
     oav_snapshot_plan,
     setup_beamline_for_oav,
 )
+from mx_bluesky.common.experiment_plans.rotation.helical_utils import (
+    HelicalMotionProfile,
+    calculate_helical_motion_profile,
+)
 from mx_bluesky.common.experiment_plans.rotation.rotation_utils import (
     RotationMotionProfile,
     calculate_motion_profile,
@@ -67,6 +71,9 @@ from mx_bluesky.hyperion.device_setup_plans.setup_zebra import (
 )
 from mx_bluesky.hyperion.parameters.constants import CONST
 
+HELICAL_VELOCITY_GROUP = "helical_velocity"
+HELICAL_ROTATION_GROUP = "helical_rotation"
+
 
 @pydantic.dataclasses.dataclass(config={"arbitrary_types_allowed": True})
 class RotationScanComposite(OavSnapshotComposite):
@@ -99,9 +106,16 @@ def rotation_scan_plan(
     motion_values: RotationMotionProfile,
 ):
     """A stub plan to collect diffraction images from a sample continuously rotating
-    about a fixed axis - for now this axis is limited to omega.
+    about a fixed axis - for now this axis is limited to omega. If the parameters are
+    helical the sample is also translated along the helical vector during the rotation.
     Needs additional setup of the sample environment and a wrapper to clean up."""
 
+    helical_motion = (
+        calculate_helical_motion_profile(params, motion_values)
+        if params.is_helical
+        else None
+    )
+
     @bpp.set_run_key_decorator(CONST.PLAN.ROTATION_MAIN)
     @bpp.run_decorator(
         md={
@@ -125,6 +139,17 @@ def rotation_scan_plan(
             motion_values.start_motion_deg,
             group=CONST.WAIT.ROTATION_READY_FOR_DC,
         )
+        if helical_motion:
+            yield from bps.wait(CONST.WAIT.MOVE_GONIO_TO_START)
+            LOGGER.info(f"moving xyz to beginning, {helical_motion.start_motion_mm=}")
+            for translation_axis, position in zip(
+                _translation_axes(composite.gonio),
+                helical_motion.start_motion_mm,
+                strict=True,
+            ):
+                yield from bps.abs_set(
+                    translation_axis, position, group=CONST.WAIT.ROTATION_READY_FOR_DC
+                )
 
         yield from setup_zebra_for_rotation(
             composite.zebra,
@@ -177,7 +202,12 @@ def rotation_scan_plan(
         )  # See #https://github.com/DiamondLightSource/hyperion/issues/932
 
         LOGGER.info("Executing rotation scan")
-        yield from bps.rel_set(axis, motion_values.distance_to_move_deg, wait=True)
+        if helical_motion:
+            yield from _rotate_with_helical_translation(
+                composite.gonio, motion_values, helical_motion
+            )
+        else:
+            yield from bps.rel_set(axis, motion_values.distance_to_move_deg, wait=True)
 
         yield from standard_read_hardware_during_collection(
             composite.aperture_scatterguard,
@@ -191,6 +221,62 @@ def rotation_scan_plan(
     yield from _rotation_scan_plan(motion_values, composite)
 
 
+def _translation_axes(gonio: Smargon):
+    return gonio.x, gonio.y, gonio.z
+
+
+def _rotate_with_helical_translation(
+    gonio: Smargon,
+    motion_values: RotationMotionProfile,
+    helical_motion: HelicalMotionProfile,
+):
+    """Rotate omega while translating x, y and z at constant speed along the helical
+    vector. The Smargon has no hardware to coordinate the axes, so they are started
+    together and the speeds chosen so that all of them finish together."""
+    moving_axes = [
+        (translation_axis, end_mm, velocity_mm_s)
+        for translation_axis, end_mm, velocity_mm_s in zip(
+            _translation_axes(gonio),
+            helical_motion.end_motion_mm,
+            helical_motion.velocity_mm_s,
+            strict=True,
+        )
+        if velocity_mm_s > 0
+    ]
+    initial_velocities = []
+    for translation_axis, _, _ in moving_axes:
+        initial_velocity = yield from bps.rd(translation_axis.velocity)
+        initial_velocities.append(initial_velocity)
+
+    def _helical_rotation():
+        for translation_axis, _, velocity_mm_s in moving_axes:
+            yield from bps.abs_set(
+                translation_axis.velocity, velocity_mm_s, group=HELICAL_VELOCITY_GROUP
+            )
+        yield from bps.wait(HELICAL_VELOCITY_GROUP)
+        yield from bps.rel_set(
+            gonio.omega,
+            motion_values.distance_to_move_deg,
+            group=HELICAL_ROTATION_GROUP,
+        )
+        for translation_axis, end_mm, _ in moving_axes:
+            yield from bps.abs_set(
+                translation_axis, end_mm, group=HELICAL_ROTATION_GROUP
+            )
+        yield from bps.wait(HELICAL_ROTATION_GROUP)
+
+    def _restore_velocities():
+        for (translation_axis, _, _), velocity in zip(
+            moving_axes, initial_velocities, strict=True
+        ):
+            yield from bps.abs_set(
+                translation_axis.velocity, velocity, group=HELICAL_VELOCITY_GROUP
+            )
+        yield from bps.wait(HELICAL_VELOCITY_GROUP)
+
+    yield from bpp.finalize_wrapper(_helical_rotation(), _restore_velocities())
+
+
 def _cleanup_plan(composite: RotationScanComposite, **kwargs):
     LOGGER.info("Cleaning up after rotation scan")
     max_vel = yield from bps.rd(composite.gonio.omega.max_velocity)
@@ -276,6 +362,7 @@ def rotation_scan_internal(
             "subplan_name": CONST.PLAN.ROTATION_MULTI,
             "full_num_of_images": parameters.num_images,
             "meta_data_run_number": parameters.detector_params.run_number,
+            "mx_bluesky_parameters": parameters.model_dump_json(),
             "activate_callbacks": [
                 "RotationISPyBCallback",
                 "RotationNexusFileCallback",
@@ -1,10 +1,6 @@
 import bluesky.plan_stubs as bps
 import pydantic
 from bluesky.utils import MsgGenerator
-from dodal.beamlines.i03 import BL
-from dodal.common.beamlines.beamline_parameters import (
-    get_beamline_parameters,
-)
 from dodal.devices.aperturescatterguard import ApertureScatterguard, ApertureValue
 from dodal.devices.collimation_table import CollimationTable
 from dodal.devices.cryostream import (
@@ -34,6 +30,7 @@ from mx_bluesky.common.experiment_plans.beamstop_check import (
 from mx_bluesky.common.utils.exceptions import BeamlineCheckFailureError
 from mx_bluesky.common.utils.log import LOGGER
 from mx_bluesky.hyperion.external_interaction.config_server import (
+    get_hyperion_beamline_parameters,
     get_hyperion_feature_settings,
 )
 from mx_bluesky.hyperion.parameters.constants import CONST
@@ -119,7 +116,7 @@ def move_to_udc_default_state(devices: UDCDefaultDevices):
 
     feature_flags = get_hyperion_feature_settings()
     if feature_flags.BEAMSTOP_DIODE_CHECK:
-        beamline_parameters = get_beamline_parameters(BL)
+        beamline_parameters = dict(get_hyperion_beamline_parameters())
         detector_min_z = feature_flags.DETECTOR_DISTANCE_LIMIT_MIN_MM
         detector_max_z = feature_flags.DETECTOR_DISTANCE_LIMIT_MAX_MM
         yield from move_beamstop_in_and_verify_using_diode(
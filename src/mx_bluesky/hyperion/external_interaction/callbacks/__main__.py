@@ -24,6 +24,7 @@ from mx_bluesky.common.external_interaction.alerting import set_alerting_service
 from mx_bluesky.common.external_interaction.alerting.log_based_service import (
     LoggingAlertService,
 )
+from mx_bluesky.common.external_interaction.alerting.pipeline import AlertPipeline
 from mx_bluesky.common.external_interaction.callbacks.common.log_uid_tag_callback import (
     LogUidTaggingCallback,
 )
@@ -47,11 +48,15 @@ from mx_bluesky.common.utils.log import (
     ISPYB_ZOCALO_CALLBACK_LOGGER,
     NEXUS_LOGGER,
     _get_logging_dirs,
+    queue_log_handlers,
     tag_filter,
 )
 from mx_bluesky.hyperion.external_interaction.callbacks.alert_on_container_change import (
     AlertOnContainerChange,
 )
+from mx_bluesky.hyperion.external_interaction.callbacks.edge_scan_callback import (
+    EdgeScanCallback,
+)
 from mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback import (
     RobotLoadISPyBCallback,
 )
@@ -125,6 +130,7 @@ def setup_callbacks() -> list[CallbackBase]:
         RobotLoadISPyBCallback(),
         SampleHandlingCallback(),
         AlertOnContainerChange(),
+        EdgeScanCallback(),
     ]
 
 
@@ -145,7 +151,11 @@ def setup_logging(dev_mode: bool):
                 CONST.GRAYLOG_PORT,
                 debug_logging_path,
             )
-            handlers["graylog_handler"].addFilter(tag_filter)
+            queue_log_handlers(
+                logger,
+                [handlers["graylog_handler"], handlers["info_file_handler"]],
+                [tag_filter],
+            )
     log_info(f"Loggers initialised with dev_mode={dev_mode}")
     nexgen_logger = logging.getLogger("nexgen")
     nexgen_logger.parent = NEXUS_LOGGER
@@ -179,7 +189,9 @@ class HyperionCallbackRunner:
         setup_logging(callback_args.dev_mode)
         log_info("Hyperion callback process started.")
         set_config_client(create_config_client())
-        set_alerting_service(LoggingAlertService(CONST.GRAYLOG_STREAM_ID))
+        set_alerting_service(
+            AlertPipeline([LoggingAlertService(CONST.GRAYLOG_STREAM_ID)])
+        )
 
         self.callbacks = setup_callbacks()
 
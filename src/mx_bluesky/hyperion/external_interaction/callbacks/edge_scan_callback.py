@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+from event_model import Event, EventDescriptor, RunStart, RunStop
+
+from mx_bluesky.common.external_interaction.callbacks.common.plan_reactive_callback import (
+    PlanReactiveCallback,
+)
+from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER as CALLBACK_LOGGER
+from mx_bluesky.hyperion.experiment_plans.edge_scan_plan import EDGE_SCAN_OUTPUT_FILE
+from mx_bluesky.hyperion.parameters.constants import CONST
+
+
+class EdgeScanCallback(PlanReactiveCallback):
+    """Writes the spectrum of an edge scan to the output file given in the start
+    document, along with the f' and f'' found from it and the energies chosen.
+
+    If the scan fails before its analysis, the raw spectrum is written instead so that
+    it can be analysed by hand.
+    """
+
+    def __init__(self):
+        super().__init__(log=CALLBACK_LOGGER)
+        self._output_file: Path | None = None
+        self._descriptor_names: dict[str, str] = {}
+        self._energies: list[float] = []
+        self._counts: list[float] = []
+        self._written = False
+
+    def activity_gated_start(self, doc: RunStart):
+        if self._output_file is None and (
+            output_file := doc.get(EDGE_SCAN_OUTPUT_FILE)
+        ):
+            CALLBACK_LOGGER.info(f"Writing edge scan to {output_file}")
+            self._output_file = Path(output_file)
+            self._energies = []
+            self._counts = []
+            self._written = False
+        return doc
+
+    def activity_gated_descriptor(self, doc: EventDescriptor):
+        self._descriptor_names[doc["uid"]] = doc.get("name", "")
+        return doc
+
+    def activity_gated_event(self, doc: Event):
+        name = self._descriptor_names.get(doc["descriptor"])
+        data = doc["data"]
+        if name == CONST.DESCRIPTORS.EDGE_SCAN_POINT:
+            self._energies.append(data["energy_ev"])
+            self._counts.append(data["counts"])
+        elif name == CONST.DESCRIPTORS.EDGE_SCAN_RESULT and self._output_file:
+            header = "\n".join(
+                [
+                    f"edge_energy_ev {data['edge_energy_ev']}",
+                    f"peak_energy_ev {data['peak_energy_ev']} f' "
+                    f"{data['peak_f_prime']} f'' {data['peak_f_double_prime']}",
+                    f"inflection_energy_ev {data['inflection_energy_ev']} f' "
+                    f"{data['inflection_f_prime']} f'' "
+                    f"{data['inflection_f_double_prime']}",
+                    f"remote_energy_ev {data['remote_energy_ev']}",
+                    "energy_ev counts f_double_prime f_prime",
+                ]
+            )
+            columns = [
+                data["energies_ev"],
+                data["counts"],
+                data["f_double_prime"],
+                data["f_prime"],
+            ]
+            self._write(columns, header)
+        return doc
+
+    def activity_gated_stop(self, doc: RunStop):
+        if self._output_file and not self.active:
+            if not self._written and self._energies:
+                CALLBACK_LOGGER.warning(
+                    f"Edge scan finished without an analysis: {doc.get('reason')}"
+                )
+                self._write(
+                    [self._energies, self._counts], "energy_ev counts (unanalysed)"
+                )
+            self._output_file = None
+        return doc
+
+    def _write(self, columns: list[list[float]], header: str):
+        assert self._output_file
+        self._output_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savetxt(self._output_file, np.column_stack(columns), header=header)
+        self._written = True
@@ -13,8 +13,9 @@ from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
     ExpeyeInteraction,
     RobotActionID,
     create_update_data_from_event_doc,
+    get_expeye_interaction,
 )
-from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER
+from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER, LazyDocFormat
 from mx_bluesky.hyperion.parameters.constants import CONST
 
 if TYPE_CHECKING:
@@ -40,7 +41,7 @@ class RobotLoadISPyBCallback(PlanReactiveCallback):
         self.run_uid: str | None = None
         self.descriptors: dict[str, EventDescriptor] = {}
         self.action_id: RobotActionID | None = None
-        self.expeye = ExpeyeInteraction()
+        self.expeye: ExpeyeInteraction = get_expeye_interaction()
 
     def activity_gated_start(self, doc: RunStart):
         ISPYB_ZOCALO_CALLBACK_LOGGER.debug(
@@ -49,7 +50,7 @@ class RobotLoadISPyBCallback(PlanReactiveCallback):
         subplan = doc.get("subplan_name")
         if subplan == CONST.PLAN.ROBOT_LOAD or subplan == CONST.PLAN.ROBOT_UNLOAD:
             ISPYB_ZOCALO_CALLBACK_LOGGER.debug(
-                f"ISPyB robot load callback received: {doc}"
+                "ISPyB robot load callback received: %s", LazyDocFormat(doc)
             )
             metadata = doc.get("metadata")
             assert isinstance(metadata, dict)
@@ -145,6 +145,13 @@ class RotationISPyBCallback(BaseISPyBCallback):
         )
         motor_positions_um = [position * 1000 for position in motor_positions_mm]
         comment = f"Sample position (µm): ({motor_positions_um[0]:.0f}, {motor_positions_um[1]:.0f}, {motor_positions_um[2]:.0f})"
+        if self.params.is_helical:
+            comment += (
+                f" Helical from ({self.params.x_start_um:.0f}, "
+                f"{self.params.y_start_um:.0f}, {self.params.z_start_um:.0f}) to "
+                f"({self.params.x_end_um:.0f}, {self.params.y_end_um:.0f}, "
+                f"{self.params.z_end_um:.0f}) µm"
+            )
         scan_data_infos[0].data_collection_info.comments = comment
         return scan_data_infos
 
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from mx_bluesky.common.external_interaction.callbacks.common.plan_reactive_callback import (
     PlanReactiveCallback,
 )
@@ -13,9 +15,10 @@ from mx_bluesky.common.external_interaction.nexus.nexus_utils import (
 from mx_bluesky.common.external_interaction.nexus.write_nexus import NexusWriter
 from mx_bluesky.common.parameters.constants import RotationParamConstants
 from mx_bluesky.common.parameters.rotation import (
+    RotationScan,
     SingleRotationScan,
 )
-from mx_bluesky.common.utils.log import NEXUS_LOGGER, format_doc_for_log
+from mx_bluesky.common.utils.log import NEXUS_LOGGER, LazyDocFormat
 from mx_bluesky.hyperion.parameters.constants import CONST
 
 if TYPE_CHECKING:
@@ -43,6 +46,9 @@ class RotationNexusFileCallback(PlanReactiveCallback):
         # used when multiple collections are made in one detector arming event:
         self.full_num_of_images: int | None = None
         self.meta_data_run_number: int | None = None
+        # used when the sweeps are split into wedges, which share one nexus file:
+        self.wedge_writer: NexusWriter | None = None
+        self.wedge_file_written = False
 
     def activity_gated_descriptor(self, doc: EventDescriptor):
         self.descriptors[doc["uid"]] = doc
@@ -51,16 +57,22 @@ class RotationNexusFileCallback(PlanReactiveCallback):
         event_descriptor = self.descriptors.get(doc["descriptor"])
         if event_descriptor is None:
             NEXUS_LOGGER.warning(
-                f"Rotation Nexus handler {self} received event doc {format_doc_for_log(doc)} and "
-                "has no corresponding descriptor record"
+                "Rotation Nexus handler %s received event doc %s and has no "
+                "corresponding descriptor record",
+                self,
+                LazyDocFormat(doc),
             )
             return doc
         if event_descriptor.get("name") == CONST.DESCRIPTORS.HARDWARE_READ_DURING:
             NEXUS_LOGGER.info(
-                f"Nexus handler received event from read hardware {format_doc_for_log(doc)}"
+                "Nexus handler received event from read hardware %s",
+                LazyDocFormat(doc),
             )
             data = doc["data"]
             assert self.writer, "Nexus writer not initialised"
+            if self.writer is self.wedge_writer and self.wedge_file_written:
+                NEXUS_LOGGER.info("Nexus file for wedges already written")
+                return doc
             (
                 self.writer.beam,
                 self.writer.attenuator,
@@ -72,14 +84,25 @@ class RotationNexusFileCallback(PlanReactiveCallback):
             vds_data_type = vds_type_based_on_bit_depth(doc["data"]["eiger_bit_depth"])
             self.writer.create_nexus_file(vds_data_type)
             NEXUS_LOGGER.info(f"Nexus file created at {self.writer.data_filename}")
+            self.wedge_file_written = self.writer is self.wedge_writer
         return doc
 
     def activity_gated_start(self, doc: RunStart):
         if doc.get("subplan_name") == CONST.PLAN.ROTATION_MULTI:
             self.full_num_of_images = doc.get("full_num_of_images")
             self.meta_data_run_number = doc.get("meta_data_run_number")
+            self.wedge_writer = None
+            self.wedge_file_written = False
+            multi_params = doc.get("mx_bluesky_parameters")
+            if isinstance(multi_params, str):
+                parameters = RotationScan.model_validate_json(multi_params)
+                if parameters.wedges:
+                    self.wedge_writer = self._create_wedge_writer(parameters)
         if doc.get("subplan_name") == CONST.PLAN.ROTATION_OUTER:
             self.run_uid = doc.get("uid")
+            if self.wedge_writer:
+                self.writer = self.wedge_writer
+                return
             hyperion_params = doc.get("mx_bluesky_parameters")
             assert isinstance(hyperion_params, str)
             NEXUS_LOGGER.info(
@@ -106,3 +129,32 @@ class RotationNexusFileCallback(PlanReactiveCallback):
                 if RotationParamConstants.OMEGA_FLIP
                 else AxisDirection.POSITIVE,
             )
+
+    def _create_wedge_writer(self, parameters: RotationScan) -> NexusWriter:
+        """Wedges are collected interleaved in one detector arming, so all of their
+        images are described by one nexus file with the omega of each image in the
+        order they were collected."""
+        wedges = list(parameters.single_rotation_scans)
+        first = wedges[0]
+        NEXUS_LOGGER.info(f"Setting up nexus file for {len(wedges)} wedges...")
+        axes = set.intersection(*(set(wedge.scan_points) for wedge in wedges))
+        scan_points = {
+            axis: np.concatenate([wedge.scan_points[axis] for wedge in wedges])
+            for axis in first.scan_points
+            if axis in axes
+        }
+        det_size = first.detector_params.detector_size_constants.det_size_pixels
+        return NexusWriter(
+            first,
+            (parameters.num_images, det_size.width, det_size.height),
+            scan_points,
+            run_number=self.meta_data_run_number,
+            omega_start_deg=first.omega_start_deg,
+            chi_start_deg=first.chi_start_deg or 0,
+            phi_start_deg=first.phi_start_deg or 0,
+            full_num_of_images=parameters.num_images,
+            meta_data_run_number=self.meta_data_run_number,
+            axis_direction=AxisDirection.NEGATIVE
+            if RotationParamConstants.OMEGA_FLIP
+            else AxisDirection.POSITIVE,
+        )
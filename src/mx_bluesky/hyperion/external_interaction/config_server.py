@@ -1,14 +1,222 @@
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from types import MappingProxyType
+from typing import Any
+
 from daq_config_server.models.feature_settings.hyperion_feature_settings import (
     HyperionFeatureSettings,
 )
-from dodal.beamlines.i03 import DAQ_CONFIGURATION_PATH
+from dodal.beamlines.i03 import BL, DAQ_CONFIGURATION_PATH
+from dodal.common.beamlines.beamline_parameters import (
+    BEAMLINE_PARAMETER_PATHS,
+    get_beamline_parameters,
+)
 from dodal.common.beamlines.beamline_utils import get_config_client
 
+from mx_bluesky.common.utils.log import LOGGER
+
 GDA_DOMAIN_PROPERTIES_PATH = DAQ_CONFIGURATION_PATH + "/domain/domain.properties"
+DEFAULT_REFRESH_INTERVAL_S = 60.0
 
 
 def get_hyperion_feature_settings() -> HyperionFeatureSettings:
+    """Get the Hyperion feature settings, from the pinned configuration snapshot if
+    there is one, otherwise from the config server."""
+    if (snapshot := _get_pinned_snapshot()) is not None:
+        return snapshot.feature_settings
+    return _fetch_hyperion_feature_settings()
+
+
+def get_hyperion_beamline_parameters() -> Mapping[str, Any]:
+    """Get the beamline parameters, from the pinned configuration snapshot if there is
+    one, otherwise from the config server."""
+    if (snapshot := _get_pinned_snapshot()) is not None:
+        return snapshot.beamline_parameters
+    return get_beamline_parameters(BL)
+
+
+def _fetch_hyperion_feature_settings(
+    reset_cached_result: bool = False,
+) -> HyperionFeatureSettings:
     return get_config_client().get_file_contents(
         GDA_DOMAIN_PROPERTIES_PATH,
         desired_return_type=HyperionFeatureSettings,
+        reset_cached_result=reset_cached_result,
     )
+
+
+def _fetch_beamline_parameters(reset_cached_result: bool = False) -> dict[str, Any]:
+    return get_config_client().get_file_contents(
+        BEAMLINE_PARAMETER_PATHS[BL], dict, reset_cached_result=reset_cached_result
+    )
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """An immutable set of configuration fetched at a single point in time. The version
+    is incremented each time the fetched configuration differs from the previous
+    snapshot."""
+
+    version: int
+    fetched_at: float
+    feature_settings: HyperionFeatureSettings
+    beamline_parameters: Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class ConfigSnapshotMetrics:
+    hits: int
+    misses: int
+    refreshes: int
+    refresh_failures: int
+    version: int | None
+    staleness_s: float | None
+
+
+class ConfigSnapshotCache:
+    """Caches the configuration used by Hyperion plans as an immutable snapshot, which
+    can be refreshed from the config server in the background so that fetching and
+    parsing configuration is kept off the hot path of each instruction.
+
+    While a snapshot is pinned, get_hyperion_feature_settings and
+    get_hyperion_beamline_parameters return its contents, so that configuration cannot
+    change part way through the collection of a sample.
+    """
+
+    def __init__(
+        self,
+        refresh_interval_s: float = DEFAULT_REFRESH_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._refresh_interval_s = refresh_interval_s
+        self._clock = clock
+        self._snapshot: ConfigSnapshot | None = None
+        self._pinned: ConfigSnapshot | None = None
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._stop_refreshing = Event()
+        self._refresh_thread: Thread | None = None
+
+    def get_pinned(self) -> ConfigSnapshot | None:
+        """Get the pinned snapshot, if there is one."""
+        snapshot = self._pinned
+        if snapshot is not None:
+            with self._lock:
+                self._hits += 1
+        return snapshot
+
+    def current(self) -> ConfigSnapshot:
+        """Get the latest snapshot, fetching one if none has been fetched yet."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None:
+                self._hits += 1
+                return snapshot
+            self._misses += 1
+        return self.refresh()
+
+    def refresh(self) -> ConfigSnapshot:
+        """Fetch the configuration from the config server, bypassing its cache, and
+        replace the current snapshot with it."""
+        feature_settings = _fetch_hyperion_feature_settings(reset_cached_result=True)
+        beamline_parameters = _fetch_beamline_parameters(reset_cached_result=True)
+        with self._lock:
+            previous = self._snapshot
+            unchanged = (
+                previous is not None
+                and previous.feature_settings == feature_settings
+                and previous.beamline_parameters == beamline_parameters
+            )
+            version = 0 if previous is None else previous.version + (not unchanged)
+            if not unchanged:
+                LOGGER.info(f"Configuration snapshot updated to version {version}")
+            self._snapshot = ConfigSnapshot(
+                version,
+                self._clock(),
+                feature_settings,
+                MappingProxyType(beamline_parameters),
+            )
+            self._refreshes += 1
+            return self._snapshot
+
+    @contextmanager
+    def pinned(self) -> Iterator[ConfigSnapshot]:
+        """Pin the current snapshot for the duration of the context."""
+        assert self._pinned is None, "A configuration snapshot is already pinned"
+        self._pinned = self.current()
+        LOGGER.debug(f"Pinned configuration snapshot, {self.metrics()}")
+        try:
+            yield self._pinned
+        finally:
+            self._pinned = None
+
+    def metrics(self) -> ConfigSnapshotMetrics:
+        with self._lock:
+            snapshot = self._snapshot
+            return ConfigSnapshotMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                refreshes=self._refreshes,
+                refresh_failures=self._refresh_failures,
+                version=snapshot.version if snapshot else None,
+                staleness_s=self._clock() - snapshot.fetched_at if snapshot else None,
+            )
+
+    def start_background_refresh(self):
+        assert self._refresh_thread is None, "Background refresh already started"
+        self._stop_refreshing.clear()
+        self._refresh_thread = Thread(
+            target=self._refresh_loop, daemon=True, name="ConfigSnapshotRefresh"
+        )
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self._stop_refreshing.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    def _refresh_loop(self):
+        while not self._stop_refreshing.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                with self._lock:
+                    self._refresh_failures += 1
+                LOGGER.warning(
+                    "Failed to refresh configuration snapshot, keeping previous one",
+                    exc_info=True,
+                )
+            self._stop_refreshing.wait(self._refresh_interval_s)
+
+
+_config_snapshot_cache: ConfigSnapshotCache | None = None
+
+
+def get_config_snapshot_cache() -> ConfigSnapshotCache | None:
+    return _config_snapshot_cache
+
+
+def set_config_snapshot_cache(cache: ConfigSnapshotCache | None):
+    """Set the configuration snapshot cache for this instance, or None to always read
+    configuration directly from the config server."""
+    global _config_snapshot_cache
+    _config_snapshot_cache = cache
+
+
+def pin_config_snapshot():
+    """Context manager that pins the current configuration snapshot, if a snapshot
+    cache has been set."""
+    cache = _config_snapshot_cache
+    return cache.pinned() if cache is not None else nullcontext()
+
+
+def _get_pinned_snapshot() -> ConfigSnapshot | None:
+    cache = _config_snapshot_cache
+    return cache.get_pinned() if cache is not None else None
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from typing import Annotated
+
+from annotated_types import Len
 from dodal.devices.fast_grid_scan import (
     PandAGridScanParams,
     ZebraGridScanParamsThreeD,
 )
+from pydantic import BaseModel, Field
 
 from mx_bluesky.common.parameters.gridscan import (
     GenericGrid,
@@ -90,8 +94,21 @@ class HyperionSpecifiedThreeDGridScan(SpecifiedThreeDGridScan):
 class OddYStepsError(Exception): ...
 
 
+class WellLayout(BaseModel):
+    """The wells of a multi-sample pin, each of which holds a different sample.
+
+    Attributes:
+        well_size_um: The distance between the centres of neighbouring wells
+        sample_ids: The sample id of each well, starting from the well nearest the tip
+    """
+
+    well_size_um: float = Field(gt=0)
+    sample_ids: Annotated[list[int], Len(min_length=1)]
+
+
 class PinTipCentreThenXrayCentre(GenericGridWithHyperionDetectorParams):
     tip_offset_um: float = 0
+    wells: WellLayout | None = None
 
 
 class GridScanWithEdgeDetect(GenericGridWithHyperionDetectorParams):
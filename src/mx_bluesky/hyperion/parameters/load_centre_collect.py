@@ -10,7 +10,10 @@ from mx_bluesky.common.parameters.components import (
 from mx_bluesky.common.parameters.rotation import (
     RotationScan,
 )
-from mx_bluesky.hyperion.blueapi.mixins import WithCentreSelection
+from mx_bluesky.hyperion.blueapi.mixins import (
+    WithCentreSelection,
+    WithHelicalCollection,
+)
 from mx_bluesky.hyperion.parameters.robot_load import (
     RobotLoadThenCentre,
 )
@@ -29,6 +32,7 @@ class LoadCentreCollect(
     WithVisit,
     WithSample,
     WithCentreSelection,
+    WithHelicalCollection,
 ):
     """Experiment parameters to perform the combined robot load,
     pin-tip centre and rotation scan operations."""
@@ -74,11 +78,17 @@ class LoadCentreCollect(
         for rotation in values["multi_rotation_scan"]["rotation_scans"]:
             rotation["sample_id"] = values["sample_id"]
 
+        # Helical collection only affects how the outer plan chooses the rotations
+        child_context = {
+            k: v
+            for k, v in values.items()
+            if k not in WithHelicalCollection.model_fields
+        }
         new_robot_load_then_centre_params = construct_from_values(
-            values, values["robot_load_then_centre"], RobotLoadThenCentre
+            child_context, values["robot_load_then_centre"], RobotLoadThenCentre
         )
         new_multi_rotation_scan_params = construct_from_values(
-            values, values["multi_rotation_scan"], RotationScan
+            child_context, values["multi_rotation_scan"], RotationScan
         )
         values["multi_rotation_scan"] = new_multi_rotation_scan_params
         values["robot_load_then_centre"] = new_robot_load_then_centre_params
@@ -92,6 +102,9 @@ class LoadCentreCollect(
             ), (
                 "Specifying start xyz for sweeps is not supported in combination with centring."
             )
+            assert not scan.x_end_um and not scan.y_end_um and not scan.z_end_um, (
+                "Specifying end xyz for sweeps is not supported in combination with centring."
+            )
         return self
 
     @model_validator(mode="after")
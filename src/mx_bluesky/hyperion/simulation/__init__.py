@@ -0,0 +1,3 @@
+"""Simulation of Hyperion running unattended data collection without a beamline, using
+local stand-ins for the external services it depends on, so that the throughput of a
+sample queue can be estimated before a beamtime."""
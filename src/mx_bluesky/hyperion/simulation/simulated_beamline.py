@@ -0,0 +1,449 @@
+"""A simulated i03 for UDC to run against, made of the real i03 devices connected in
+mock mode. Latencies are injected into their motors and signals, and the hardware the
+plans wait on, such as the robot, detector, fast grid scan and Zocalo, behaves as it
+would on the beamline, taking time on the clock of the latency injector."""
+
+import asyncio
+from collections.abc import Coroutine, Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from bluesky.protocols import Reading
+from bluesky.run_engine import call_in_bluesky_event_loop
+from daq_config_server import ConfigClient
+from dodal.beamlines import i03
+from dodal.devices.aperturescatterguard import ApertureScatterguard, ApertureValue
+from dodal.devices.attenuator.attenuator import BinaryFilterAttenuator
+from dodal.devices.backlight import Backlight
+from dodal.devices.baton import Baton
+from dodal.devices.beamlines.i03.dcm import DCM
+from dodal.devices.cryostream import (
+    CryoStreamGantry,
+    CryoStreamSelection,
+    OxfordCryoStream,
+)
+from dodal.devices.eiger import EigerDetector
+from dodal.devices.fast_grid_scan import ZebraFastGridScanThreeD
+from dodal.devices.focusing_mirror import MirrorVoltages
+from dodal.devices.hutch_shutter import (
+    InterlockedHutchShutter,
+    ShutterDemand,
+    ShutterState,
+)
+from dodal.devices.oav.oav_detector import OAV
+from dodal.devices.oav.pin_image_recognition import PinTipDetection
+from dodal.devices.robot import (
+    BartRobot,
+    BeamlineStatus,
+    PinMounted,
+    SampleLocation,
+)
+from dodal.devices.smargon import Smargon
+from dodal.devices.synchrotron import Synchrotron, SynchrotronMode
+from dodal.devices.undulator import UndulatorInKeV
+from dodal.devices.webcam import Webcam
+from dodal.devices.xbpm_feedback import XBPMFeedback
+from dodal.devices.zocalo import NoResultsFromZocaloError, ZocaloResults
+from dodal.devices.zocalo.zocalo_results import CLEAR_QUEUE_WAIT_S
+from ophyd_async.core import (
+    AsyncStatus,
+    StaticPathProvider,
+    UUIDFilenameProvider,
+    callback_on_mock_put,
+    set_mock_value,
+)
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from mx_bluesky.common.simulation.latency import LatencyInjector, LatencyProfile
+from mx_bluesky.common.utils.log import LOGGER
+from mx_bluesky.hyperion.baton_handler import HYPERION_USER
+from mx_bluesky.hyperion.simulation.stand_ins import (
+    SIMULATED_CONFIG_DIR,
+    ScriptedZocalo,
+)
+
+# Long enough that UDC is never stopped for the beam going away
+MACHINE_USER_COUNTDOWN_S = 7 * 24 * 3600
+DEFAULT_DEVICE_LATENCIES = SIMULATED_CONFIG_DIR / "latency_profile.yaml"
+
+# The images the simulated OAV takes, and where the simulated pin tip is in them
+OAV_IMAGE_SIZE_PX = (1024, 768)
+PIN_TIP_PX = (130, 200)
+PIN_WIDTH_PX = 140
+PIN_LENGTH_PX = 140
+
+CRYOSTREAM_TEMP_K = 100
+CRYOSTREAM_BACK_PRESSURE_BAR = 0.02
+
+
+class UdcLatencyProfile(BaseModel):
+    """The time in seconds taken by the hardware of the beamline during UDC. The time
+    taken by moves is given by the motor velocities of the device latencies, and the
+    time taken to collect images by their exposure time.
+
+    Attributes:
+        robot_load_s: Exchanging the sample on the goniometer for the next one
+        robot_unload_s: Unloading the last sample
+        eiger_arming_s: Arming the detector
+        pin_tip_detection_s: Finding the tip of the pin in each OAV image
+        oav_snapshot_s: Taking each snapshot with the OAV
+        zocalo_processing_s: Waiting for the results of the gridscans after they finish
+        devices: The latencies of the motors and signals of the devices
+    """
+
+    robot_load_s: float = 45
+    robot_unload_s: float = 30
+    eiger_arming_s: float = 2
+    pin_tip_detection_s: float = 0.5
+    oav_snapshot_s: float = 0.5
+    zocalo_processing_s: float = 4
+    devices: LatencyProfile = Field(
+        default_factory=lambda: LatencyProfile.load(DEFAULT_DEVICE_LATENCIES)
+    )
+
+
+@contextmanager
+def simulated_beamline(
+    injector: LatencyInjector,
+    profile: UdcLatencyProfile,
+    zocalo: ScriptedZocalo,
+    config_client: ConfigClient,
+    data_dir: Path,
+) -> Iterator[dict[str, Any]]:
+    """Build and connect every i03 device in mock mode and make them behave as the
+    beamline would, taking time on the clock of the injector. Must be called once the
+    RunEngine the devices will be used from has been created.
+
+    Args:
+        injector: Injects the latencies of the devices in the profile
+        profile: The time taken by the hardware
+        zocalo: Finds the crystals in the gridscans
+        config_client: Where the devices read their configuration from
+        data_dir: Where any files written by the devices are put
+
+    Returns:
+        The devices, by the name of the i03 device factory they were built with
+    """
+    result = i03.devices.build_and_connect(
+        mock=True,
+        fixtures={
+            "config_client": config_client,
+            "path_provider": StaticPathProvider(UUIDFilenameProvider(), data_dir),
+        },
+    )
+    errors = result.build_errors | result.connection_errors
+    if errors:
+        raise ExceptionGroup(
+            f"Unable to build simulated devices {list(errors)}", list(errors.values())
+        )
+    devices: dict[str, Any] = result.devices
+    with ExitStack() as stack:
+        _set_beamline_state(devices)
+        injector.apply(*devices.values())
+        _simulate_robot(devices["robot"], injector, profile)
+        _simulate_fast_grid_scan(devices["zebra_fast_grid_scan"], injector)
+        _simulate_zocalo(devices["zocalo"], injector, profile, zocalo)
+        _simulate_pin_tip_detection(devices["pin_tip_detection"], injector, profile)
+        _simulate_oav(devices["oav"], injector, profile)
+        _simulate_attenuator(devices["attenuator"])
+        _simulate_hutch_shutter(devices["hutch_shutter"])
+        _simulate_aperture_scatterguard(devices["aperture_scatterguard"])
+        stack.enter_context(_simulate_eiger(devices["eiger"], injector, profile))
+        stack.enter_context(_without_hardware_io(devices))
+        LOGGER.info(f"Simulating {len(devices)} devices")
+        yield devices
+
+
+def _set_beamline_state(devices: dict[str, Any]):
+    baton: Baton = devices["baton"]
+    set_mock_value(baton.requested_user, HYPERION_USER)
+    synchrotron: Synchrotron = devices["synchrotron"]
+    set_mock_value(synchrotron.synchrotron_mode, SynchrotronMode.USER)
+    set_mock_value(synchrotron.top_up_start_countdown, -1)
+    set_mock_value(synchrotron.machine_user_countdown, MACHINE_USER_COUNTDOWN_S)
+    dcm: DCM = devices["dcm"]
+    set_mock_value(dcm.energy_in_keV.user_readback, 12.7)
+    set_mock_value(dcm.xtal_1.pitch_in_mrad.user_readback, 1)
+    set_mock_value(dcm.crystal_metadata_d_spacing_a, 3.13475)
+    set_mock_value(dcm.bragg_in_degrees.user_readback, 5)
+    undulator: UndulatorInKeV = devices["undulator"]
+    set_mock_value(undulator.current_gap, 1.11)
+    smargon: Smargon = devices["smargon"]
+    set_mock_value(smargon.stub_offsets.center_at_current_position.disp, 0)
+    set_mock_value(smargon.omega.max_velocity, 131)
+    set_mock_value(devices["s4_slit_gaps"].xgap.user_readback, 0.123)
+    set_mock_value(devices["s4_slit_gaps"].ygap.user_readback, 0.234)
+    backlight: Backlight = devices["backlight"]
+    # The move of the backlight is timed by the latency of its signals instead
+    backlight.TIME_TO_MOVE_S = 0
+    cryostream_gantry: CryoStreamGantry = devices["cryostream_gantry"]
+    set_mock_value(cryostream_gantry.cryostream_selector, CryoStreamSelection.CRYOJET)
+    set_mock_value(cryostream_gantry.cryostream_selected, 1)
+    cryostream: OxfordCryoStream = devices["cryostream"]
+    set_mock_value(cryostream.temp, CRYOSTREAM_TEMP_K)
+    set_mock_value(cryostream.back_pressure, CRYOSTREAM_BACK_PRESSURE_BAR)
+
+
+def _simulate_robot(
+    robot: BartRobot, injector: LatencyInjector, profile: UdcLatencyProfile
+):
+    set_mock_value(robot.barcode, "SIMULATED")
+
+    async def exchange(duration_s: float, location: SampleLocation, sample_id: int):
+        await injector.delay(duration_s)
+        set_mock_value(robot.current_puck, location.puck)
+        set_mock_value(robot.current_pin, location.pin)
+        set_mock_value(robot.sample_id, sample_id)
+        set_mock_value(
+            robot.gonio_pin_sensor,
+            PinMounted.NO_PIN_MOUNTED
+            if location == BartRobot.NO_PIN_LOCATION
+            else PinMounted.PIN_MOUNTED,
+        )
+        set_mock_value(robot.beamline_disabled, BeamlineStatus.ENABLED.value)
+
+    # The robot disables the beamline as soon as it is told to move, and enables it
+    # once the sample is exchanged
+    async def load(*_, **__):
+        set_mock_value(robot.beamline_disabled, BeamlineStatus.DISABLED.value)
+        location = SampleLocation(
+            int(await robot.next_puck.get_value()),
+            int(await robot.next_pin.get_value()),
+        )
+        sample_id = await robot.next_sample_id.get_value()
+        _in_background(exchange(profile.robot_load_s, location, sample_id))
+
+    def unload(*_, **__):
+        set_mock_value(robot.beamline_disabled, BeamlineStatus.DISABLED.value)
+        _in_background(exchange(profile.robot_unload_s, BartRobot.NO_PIN_LOCATION, 0))
+
+    callback_on_mock_put(robot.load, load)
+    callback_on_mock_put(robot.unload, unload)
+
+
+def _simulate_fast_grid_scan(
+    fast_grid_scan: ZebraFastGridScanThreeD, injector: LatencyInjector
+):
+    for valid in [
+        fast_grid_scan.x_scan_valid,
+        fast_grid_scan.y_scan_valid,
+        fast_grid_scan.z_scan_valid,
+    ]:
+        set_mock_value(valid, 1)
+
+    async def scan():
+        images, dwell_time_ms = (
+            await fast_grid_scan.expected_images.get_value(),
+            await fast_grid_scan.dwell_time_ms.get_value(),
+        )
+        await injector.delay(images * dwell_time_ms / 1000)
+        set_mock_value(fast_grid_scan.status, 0)
+
+    def run(*_):
+        set_mock_value(fast_grid_scan.status, 1)
+        _in_background(scan())
+
+    callback_on_mock_put(fast_grid_scan.run_cmd, run)
+
+
+def _simulate_zocalo(
+    zocalo_results: ZocaloResults,
+    injector: LatencyInjector,
+    profile: UdcLatencyProfile,
+    zocalo: ScriptedZocalo,
+):
+    @AsyncStatus.wrap
+    async def stage():
+        await injector.delay(CLEAR_QUEUE_WAIT_S)
+        zocalo.clear_results()
+
+    @AsyncStatus.wrap
+    async def unstage():
+        pass
+
+    @AsyncStatus.wrap
+    async def trigger():
+        await injector.delay(profile.zocalo_processing_s)
+        raw_results = zocalo.take_results()
+        if raw_results is None:
+            raise NoResultsFromZocaloError("No simulated Zocalo results")
+        await zocalo_results._put_results(  # noqa: SLF001
+            sorted(
+                raw_results["results"],
+                key=lambda result: result[zocalo_results.sort_key.value],
+                reverse=True,
+            ),
+            raw_results["recipe_parameters"],
+        )
+
+    zocalo_results.stage = stage
+    zocalo_results.unstage = unstage
+    zocalo_results.trigger = trigger
+
+
+def _simulate_pin_tip_detection(
+    pin_tip_detection: PinTipDetection,
+    injector: LatencyInjector,
+    profile: UdcLatencyProfile,
+):
+    tip_x, tip_y = PIN_TIP_PX
+    shaft = slice(tip_x, tip_x + PIN_LENGTH_PX)
+    top_edge = np.zeros(OAV_IMAGE_SIZE_PX[0], dtype=np.uint32)
+    top_edge[shaft] = tip_y - PIN_WIDTH_PX // 2
+    bottom_edge = np.zeros(OAV_IMAGE_SIZE_PX[0], dtype=np.uint32)
+    bottom_edge[shaft] = tip_y + PIN_WIDTH_PX // 2
+
+    @AsyncStatus.wrap
+    async def trigger():
+        await injector.delay(profile.pin_tip_detection_s)
+        set_mock_value(pin_tip_detection.triggered_top_edge, top_edge)
+        set_mock_value(pin_tip_detection.triggered_bottom_edge, bottom_edge)
+        set_mock_value(pin_tip_detection.triggered_tip, np.array(PIN_TIP_PX))
+
+    pin_tip_detection.trigger = trigger
+
+
+def _simulate_oav(oav: OAV, injector: LatencyInjector, profile: UdcLatencyProfile):
+    width, height = OAV_IMAGE_SIZE_PX
+    set_mock_value(oav.cam.array_size_x, width)
+    set_mock_value(oav.cam.array_size_y, height)
+    set_mock_value(oav.grid_snapshot.x_size, width)
+    set_mock_value(oav.grid_snapshot.y_size, height)
+    set_mock_value(oav.zoom_controller.level, "1.0x")
+    oav.zoom_controller.level.describe = AsyncMock(
+        return_value={"level": {"choices": ["1.0x", "5.0x", "7.5x"]}}
+    )
+
+    for snapshot in [oav.snapshot, oav.grid_snapshot]:
+
+        @AsyncStatus.wrap
+        async def trigger(snapshot=snapshot):
+            await injector.delay(profile.oav_snapshot_s)
+            await snapshot.post_processing(Image.new("RGB", OAV_IMAGE_SIZE_PX))
+
+        snapshot.trigger = trigger
+
+
+def _simulate_attenuator(attenuator: BinaryFilterAttenuator):
+    async def set_transmission(value: float):
+        set_mock_value(attenuator.actual_transmission, value)
+
+    callback_on_mock_put(
+        attenuator._desired_transmission,  # noqa: SLF001
+        set_transmission,
+    )
+
+
+def _simulate_aperture_scatterguard(aperture_scatterguard: ApertureScatterguard):
+    aperture = aperture_scatterguard.aperture
+    positions = aperture_scatterguard._loaded_positions  # noqa: SLF001
+    tolerance_y = aperture_scatterguard._tolerances.aperture_y  # noqa: SLF001
+    in_position = {
+        ApertureValue.LARGE: aperture.large,
+        ApertureValue.MEDIUM: aperture.medium,
+        ApertureValue.SMALL: aperture.small,
+    }
+
+    # The IOC calculates which aperture is in the beam from the height of the assembly
+    def update_apertures_in_position(readings: dict[str, Reading[float]]):
+        (aperture_y,) = [reading["value"] for reading in readings.values()]
+        for value, signal in in_position.items():
+            in_beam = abs(aperture_y - positions[value].aperture_y) <= tolerance_y
+            set_mock_value(signal, float(in_beam))
+
+    # The assembly starts with the small aperture in the beam, rather than parked
+    # under the collimation table
+    start = positions[ApertureValue.SMALL]
+    for motor, position in [
+        (aperture.x, start.aperture_x),
+        (aperture.y, start.aperture_y),
+        (aperture.z, start.aperture_z),
+        (aperture_scatterguard.scatterguard.x, start.scatterguard_x),
+        (aperture_scatterguard.scatterguard.y, start.scatterguard_y),
+    ]:
+        set_mock_value(motor.user_setpoint, position)
+        set_mock_value(motor.user_readback, position)
+
+    async def subscribe():
+        aperture.y.user_readback.subscribe_reading(update_apertures_in_position)
+
+    call_in_bluesky_event_loop(subscribe())
+
+
+def _simulate_hutch_shutter(hutch_shutter: InterlockedHutchShutter):
+    states = {
+        ShutterDemand.OPEN: ShutterState.OPEN,
+        ShutterDemand.CLOSE: ShutterState.CLOSED,
+    }
+
+    def operate(demand: ShutterDemand, *_, **__):
+        if demand in states:
+            set_mock_value(hutch_shutter.status, states[demand])
+
+    set_mock_value(hutch_shutter.status, ShutterState.CLOSED)
+    callback_on_mock_put(hutch_shutter.control, operate)
+
+
+@contextmanager
+def _simulate_eiger(
+    eiger: EigerDetector, injector: LatencyInjector, profile: UdcLatencyProfile
+) -> Iterator[None]:
+    def arm(*_, **__):
+        return AsyncStatus(injector.delay(profile.eiger_arming_s))
+
+    def completed(*_, **__):
+        return AsyncStatus(injector.delay(0))
+
+    with (
+        patch.object(eiger, "stage", side_effect=completed),
+        patch.object(eiger, "unstage", side_effect=completed),
+        patch.object(eiger.do_arm, "set", side_effect=arm),
+        patch.object(eiger, "wait_on_arming_if_started"),
+    ):
+        yield
+
+
+@contextmanager
+def _without_hardware_io(devices: dict[str, Any]) -> Iterator[None]:
+    """Stop devices from talking to hardware outside of EPICS, which is not there."""
+    xbpm_feedback: XBPMFeedback = devices["xbpm_feedback"]
+    webcam: Webcam = devices["webcam"]
+    mirror_voltages: MirrorVoltages = devices["mirror_voltages"]
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch.object(
+                xbpm_feedback, "trigger", side_effect=lambda: AsyncStatus(_done())
+            )
+        )
+        stack.enter_context(patch.object(webcam, "_get_and_write_image"))
+        for voltage in [
+            *mirror_voltages.vertical_voltages.values(),
+            *mirror_voltages.horizontal_voltages.values(),
+        ]:
+            stack.enter_context(
+                patch.object(voltage, "set", MagicMock(side_effect=_completed_set))
+            )
+        yield
+
+
+# Hardware actions carried on after the put that started them has returned, kept here
+# until they finish so that they are not garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _in_background(coroutine: Coroutine[Any, Any, None]):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _done():
+    pass
+
+
+def _completed_set(*_, **__) -> AsyncStatus:
+    return AsyncStatus(_done())
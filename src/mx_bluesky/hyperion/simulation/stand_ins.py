@@ -0,0 +1,392 @@
+"""Local stand-ins for the services Hyperion talks to during UDC, which behave enough
+like the real services for the UDC loop to run against them without a network."""
+
+import itertools
+import json
+import os
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, fields, replace
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Literal, Self, TypeVar
+
+from daq_config_server import ConfigClient
+from daq_config_server.models.feature_settings.hyperion_feature_settings import (
+    HyperionFeatureSettings,
+)
+from dodal.devices.zocalo import XrcResult, ZocaloTrigger
+from pydantic import TypeAdapter
+
+from mx_bluesky.common.external_interaction.alerting import AlertService, Metadata
+from mx_bluesky.common.external_interaction.ispyb.data_model import (
+    DataCollectionGridInfo,
+    DataCollectionGroupInfo,
+    DataCollectionInfo,
+    DataCollectionPositionInfo,
+)
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    BLSample,
+    BLSampleStatus,
+    ExpeyeInteraction,
+    RobotActionID,
+)
+from mx_bluesky.common.utils.log import LOGGER
+
+T = TypeVar("T")
+
+AGAMEMNON_URL_VARIABLE = "AGAMEMNON_URL"
+SIMULATED_CONFIG_DIR = Path(__file__).parent / "config"
+BEAMLINE_PARAMETERS_FILE = "beamlineParameters"
+
+
+class _AgamemnonRequestHandler(BaseHTTPRequestHandler):
+    def __init__(self, agamemnon: "FakeAgamemnon", *args, **kwargs):
+        self._agamemnon = agamemnon
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):  # noqa: N802
+        if not self.path.startswith("/getnextcollect/"):
+            self.send_error(404)
+            return
+        body = json.dumps(self._agamemnon.next_instruction()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        LOGGER.debug(f"Fake agamemnon: {format % args}")
+
+
+class FakeAgamemnon:
+    """Serves a queue of instructions over HTTP in the same way as Agamemnon, so that
+    the real fetching and decoding of instructions is exercised. Once the queue is
+    empty there are no more instructions.
+
+    Whilst in use as a context manager the server is running and Hyperion is pointed
+    at it.
+
+    Args:
+        instructions: The instructions to serve, in the form Agamemnon returns them,
+            e.g. {"collect": {...}} or {"wait": 10}
+    """
+
+    def __init__(self, instructions: Iterable[dict[str, Any]]):
+        self._instructions = deque(instructions)
+        self._lock = Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: Thread | None = None
+        self._previous_url: str | None = None
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        assert self._server, "Fake agamemnon is not running"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def next_instruction(self) -> dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            return self._instructions.popleft() if self._instructions else {}
+
+    def __enter__(self) -> Self:
+        self._server = ThreadingHTTPServer(
+            ("localhost", 0), partial(_AgamemnonRequestHandler, self)
+        )
+        self._thread = Thread(
+            target=self._server.serve_forever, daemon=True, name="FakeAgamemnon"
+        )
+        self._thread.start()
+        self._previous_url = os.environ.get(AGAMEMNON_URL_VARIABLE)
+        os.environ[AGAMEMNON_URL_VARIABLE] = self.url
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._previous_url is None:
+            os.environ.pop(AGAMEMNON_URL_VARIABLE, None)
+        else:
+            os.environ[AGAMEMNON_URL_VARIABLE] = self._previous_url
+        assert self._server and self._thread
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+
+class SimulatedConfigServer(ConfigClient):
+    """A config client which serves the Hyperion feature settings from memory, and
+    any other file by its name from a directory of configuration in the form the
+    config server returns it, rather than from the config server.
+
+    Args:
+        feature_settings: The feature settings to serve
+        beamline_parameters: Beamline parameters to serve in place of those in the
+            directory
+        config_dir: Where the configuration is served from, by default that of a
+            simulated i03
+    """
+
+    def __init__(
+        self,
+        feature_settings: HyperionFeatureSettings | None = None,
+        beamline_parameters: Mapping[str, Any] | None = None,
+        config_dir: Path = SIMULATED_CONFIG_DIR,
+    ):
+        super().__init__("http://localhost")
+        self.feature_settings = feature_settings or HyperionFeatureSettings()
+        self.beamline_parameters = dict(beamline_parameters or {})
+        self.config_dir = config_dir
+        self.requests = 0
+
+    def get_file_contents(  # type: ignore[override]
+        self,
+        file_path: str | Path,
+        desired_return_type: type = str,
+        reset_cached_result: bool = False,
+        force_parser: Callable[[str], Any] | None = None,
+    ) -> Any:
+        self.requests += 1
+        if desired_return_type is HyperionFeatureSettings:
+            return self.feature_settings
+        served_path = self.config_dir / Path(file_path).name
+        if not served_path.is_file():
+            raise FileNotFoundError(
+                f"{file_path} is not served by the simulated config server"
+            )
+        contents = served_path.read_text()
+        if force_parser:
+            return TypeAdapter(desired_return_type).validate_python(
+                force_parser(contents)
+            )
+        if desired_return_type is str:
+            return contents
+        result = json.loads(contents)
+        if served_path.name == BEAMLINE_PARAMETERS_FILE:
+            result |= self.beamline_parameters
+        return TypeAdapter(desired_return_type).validate_python(result)
+
+
+class InMemoryExpeye(ExpeyeInteraction):
+    """Records what would be deposited in ISPyB through Expeye, rather than sending
+    it. Containers are not recorded, so updated samples are returned in container 0."""
+
+    def __init__(self):
+        # The real client reads credentials, which are not needed here
+        self._ids = itertools.count(1)
+        self.robot_actions: dict[RobotActionID, dict[str, Any]] = {}
+        self.sample_statuses: dict[int, BLSampleStatus] = {}
+        self.data_groups: dict[int, DataCollectionGroupInfo] = {}
+        self.data_collections: dict[int, DataCollectionInfo] = {}
+        self.positions: dict[int, DataCollectionPositionInfo] = {}
+        self.grids: dict[int, DataCollectionGridInfo] = {}
+
+    def start_robot_action(
+        self,
+        action_type: Literal["LOAD", "UNLOAD"],
+        proposal_reference: str,
+        visit_number: int,
+        sample_id: int,
+    ) -> RobotActionID:
+        action_id = next(self._ids)
+        self.robot_actions[action_id] = {
+            "actionType": action_type,
+            "proposal": proposal_reference,
+            "visitNumber": visit_number,
+            "sampleId": sample_id,
+        }
+        return action_id
+
+    def update_robot_action(self, action_id: RobotActionID, data: dict[str, Any]):
+        self.robot_actions[action_id].update(data)
+
+    def end_robot_action(self, action_id: RobotActionID, status: str, reason: str):
+        self.robot_actions[action_id].update(
+            {
+                "status": "SUCCESS" if status == "success" else "ERROR",
+                "message": reason,
+            }
+        )
+
+    def update_sample_status(
+        self, bl_sample_id: int, bl_sample_status: BLSampleStatus
+    ) -> BLSample:
+        self.sample_statuses[bl_sample_id] = bl_sample_status
+        return BLSample(
+            container_id=0,
+            bl_sample_id=bl_sample_id,
+            bl_sample_status=str(bl_sample_status),
+        )
+
+    def create_data_group(
+        self, proposal_reference: str, visit_number: int, data: DataCollectionGroupInfo
+    ) -> int:
+        group_id = next(self._ids)
+        self.data_groups[group_id] = data
+        return group_id
+
+    def update_data_group(self, group_id: int, data: DataCollectionGroupInfo):
+        self.data_groups[group_id] = _updated(self.data_groups[group_id], data)
+
+    def create_data_collection(self, group_id: int, data: DataCollectionInfo) -> int:
+        data_collection_id = next(self._ids)
+        self.data_collections[data_collection_id] = replace(data, parent_id=group_id)
+        return data_collection_id
+
+    def update_data_collection(
+        self,
+        data_collection_id: int,
+        data: DataCollectionInfo,
+        append_comment: bool = False,
+    ):
+        current = self.data_collections[data_collection_id]
+        if append_comment and data.comments is not None:
+            data = replace(data, comments=(current.comments or "") + data.comments)
+        self.data_collections[data_collection_id] = _updated(current, data)
+
+    def create_position(
+        self, data_collection_id: int, data: DataCollectionPositionInfo
+    ):
+        self.positions[data_collection_id] = data
+
+    def create_grid(self, data_collection_id: int, data: DataCollectionGridInfo) -> int:
+        self.grids[data_collection_id] = data
+        return next(self._ids)
+
+    def data_collections_in(self, group_id: int) -> dict[int, DataCollectionInfo]:
+        return {
+            data_collection_id: data
+            for data_collection_id, data in self.data_collections.items()
+            if data.parent_id == group_id
+        }
+
+
+def _updated(current: T, update: T) -> T:
+    """As Expeye does, only the fields given in an update are changed."""
+    return replace(
+        current,  # type: ignore[type-var]
+        **{
+            update_field.name: value
+            for update_field in fields(update)  # type: ignore[arg-type]
+            if (value := getattr(update, update_field.name)) is not None
+        },
+    )
+
+
+class ScriptedZocalo(ZocaloTrigger):
+    """Stands in for Zocalo, finding the number of diffracting crystals scripted for
+    each sample in its gridscans rather than processing any data.
+
+    Jobs are started and ended by the Zocalo callbacks as normal. Once every gridscan
+    collection in a group has ended, results are made for the sample of the group,
+    with the strongest crystal in the middle of the grid and any others spread along
+    it, ready to be taken by the Zocalo results device.
+
+    Args:
+        expeye: Where the gridscan collections the jobs are for are recorded
+        hits_by_sample_id: The number of crystals found for each sample
+        default_hits: The number of crystals found for any other sample
+    """
+
+    def __init__(
+        self,
+        expeye: InMemoryExpeye,
+        hits_by_sample_id: Mapping[int, int],
+        default_hits: int = 1,
+    ):
+        super().__init__()
+        self._expeye = expeye
+        self._hits_by_sample_id = dict(hits_by_sample_id)
+        self._default_hits = default_hits
+        self._ended: set[int] = set()
+        self._results: deque[dict[str, Any]] = deque()
+        self.jobs: list[dict[str, Any]] = []
+
+    def hits_for(self, sample_id: int) -> int:
+        return self._hits_by_sample_id.get(sample_id, self._default_hits)
+
+    def _send_to_zocalo(self, parameters: dict):
+        LOGGER.info(f"Simulated zocalo job {parameters}")
+        self.jobs.append(parameters)
+        if parameters["event"] == "end":
+            self._end(parameters["ispyb_dcid"])
+
+    def _end(self, data_collection_id: int):
+        self._ended.add(data_collection_id)
+        if data_collection_id not in self._expeye.grids:
+            return
+        group_id = self._expeye.data_collections[data_collection_id].parent_id
+        assert group_id is not None
+        gridscans = [
+            gridscan_id
+            for gridscan_id in self._expeye.data_collections_in(group_id)
+            if gridscan_id in self._expeye.grids
+        ]
+        if self._ended.issuperset(gridscans):
+            sample_id = self._expeye.data_groups[group_id].sample_id
+            self._results.append(
+                {
+                    "results": self._results_for(sample_id, gridscans),
+                    "recipe_parameters": {"dcid": gridscans[0], "dcgid": group_id},
+                }
+            )
+
+    def _results_for(
+        self, sample_id: int | None, gridscans: list[int]
+    ) -> list[XrcResult]:
+        first_grid = self._expeye.grids[gridscans[0]]
+        last_grid = self._expeye.grids[gridscans[-1]]
+        shape = [first_grid.steps_x, first_grid.steps_y, last_grid.steps_y]
+        hits = self.hits_for(sample_id) if sample_id is not None else 0
+        results: list[XrcResult] = []
+        for crystal in range(hits):
+            centre = [steps // 2 for steps in shape]
+            centre[0] = (centre[0] + crystal) % shape[0]
+            max_count = 10000 // (crystal + 1)
+            results.append(
+                {
+                    "centre_of_mass": [float(voxel) for voxel in centre],
+                    "max_voxel": centre,
+                    "max_count": max_count,
+                    "n_voxels": 1,
+                    "total_count": max_count,
+                    "bounding_box": [centre, [voxel + 1 for voxel in centre]],
+                    "sample_id": sample_id,
+                }
+            )
+        return results
+
+    def take_results(self) -> dict[str, Any] | None:
+        """The earliest results not yet taken, in the form they are received from
+        Zocalo, or None if there are none."""
+        return self._results.popleft() if self._results else None
+
+    def clear_results(self):
+        self._results.clear()
+
+
+@dataclass
+class RecordedAlert:
+    time_s: float
+    summary: str
+    content: str
+
+
+class RecordingAlertService(AlertService):
+    """Records the alerts raised rather than sending them to anyone.
+
+    Args:
+        clock: Gives the time at which each alert is raised
+    """
+
+    def __init__(self, clock: Callable[[], float]):
+        self._clock = clock
+        self.alerts: list[RecordedAlert] = []
+
+    def raise_alert(self, summary: str, content: str, metadata: dict[Metadata, str]):
+        LOGGER.info(f"Simulated alert: {summary}: {content}")
+        self.alerts.append(RecordedAlert(self._clock(), summary, content))
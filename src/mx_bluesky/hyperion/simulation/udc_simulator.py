@@ -0,0 +1,670 @@
+"""Dry run of unattended data collection, from the baton being handed to Hyperion to it
+being released, to estimate the throughput of a sample queue without a beamline.
+
+The real UDC loop in :mod:`mx_bluesky.hyperion.baton_handler` is run on a RunEngine,
+executing each instruction with the real plans as Hyperion does, against a simulated
+i03 made of every i03 device connected in mock mode (see
+:mod:`mx_bluesky.hyperion.simulation.simulated_beamline`). Instructions are fetched
+over HTTP from a fake Agamemnon and decoded as normal, with configuration from a
+simulated config server. The ISPyB and Zocalo callbacks are run in-process, with
+depositions recorded in an in-memory Expeye and the crystals found by Zocalo scripted
+for each sample.
+
+Moves, robot loads, detector arming, gridscans, Zocalo processing and sleeps take the
+time given by a latency profile on a virtual clock, so the result is in simulated time
+and does not depend on the machine it is run on. Time spent running the code in
+between is not counted.
+
+The result is a timeline of each sample collected and the number of samples collected
+per hour, e.g.::
+
+    python -m mx_bluesky.hyperion.simulation.udc_simulator --samples 20
+    python -m mx_bluesky.hyperion.simulation.udc_simulator --config queue.json
+"""
+
+import argparse
+import os
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Self, TypeVar
+
+from blueapi.core import BlueskyContext
+from bluesky import plan_stubs as bps
+from bluesky.callbacks import CallbackBase
+from bluesky.run_engine import RunEngine
+from bluesky.utils import Msg, MsgGenerator
+from dodal.common.beamlines.beamline_utils import (
+    clear_config_client,
+    get_config_client,
+    set_config_client,
+)
+from dodal.common.beamlines.commissioning_mode import set_commissioning_signal
+from event_model import RunStart, RunStop
+from pydantic import BaseModel, Field
+
+from mx_bluesky.common.external_interaction.alerting import (
+    get_alerting_service,
+    set_alerting_service,
+)
+from mx_bluesky.common.external_interaction.callbacks.grid.grid_detect_and_scan.ispyb_callback import (
+    GridDetectAndScanISPyBCallback,
+)
+from mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback import (
+    SampleHandlingCallback,
+)
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    set_expeye_interaction,
+)
+from mx_bluesky.common.simulation.latency import LatencyClock, LatencyInjector
+from mx_bluesky.common.utils.log import LOGGER
+from mx_bluesky.hyperion._plan_runner_params import (
+    RobotUnload,
+    UDCCleanup,
+    UDCDefaultState,
+    Wait,
+)
+from mx_bluesky.hyperion.baton_handler import run_udc_when_requested
+from mx_bluesky.hyperion.blueapi.parameters import LoadCentreCollectParams
+from mx_bluesky.hyperion.external_interaction.callbacks.__main__ import (
+    create_gridscan_callbacks,
+    create_rotation_callbacks,
+)
+from mx_bluesky.hyperion.external_interaction.callbacks.alert_on_container_change import (
+    AlertOnContainerChange,
+)
+from mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback import (
+    RobotLoadISPyBCallback,
+)
+from mx_bluesky.hyperion.external_interaction.callbacks.snapshot_callback import (
+    BeamDrawingCallback,
+)
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    ConfigSnapshotCache,
+    get_config_snapshot_cache,
+    set_config_snapshot_cache,
+)
+from mx_bluesky.hyperion.in_process_runner import InProcessRunner
+from mx_bluesky.hyperion.parameters.constants import CONST
+from mx_bluesky.hyperion.parameters.gridscan import (
+    GenericGridWithHyperionDetectorParams,
+)
+from mx_bluesky.hyperion.simulation.simulated_beamline import (
+    UdcLatencyProfile,
+    simulated_beamline,
+)
+from mx_bluesky.hyperion.simulation.stand_ins import (
+    SIMULATED_CONFIG_DIR,
+    FakeAgamemnon,
+    InMemoryExpeye,
+    RecordedAlert,
+    RecordingAlertService,
+    ScriptedZocalo,
+    SimulatedConfigServer,
+)
+
+T = TypeVar("T")
+
+SIMULATED_BEAMLINE = "i03"
+SAMPLES_PER_PUCK = 16
+ISPYB_CONFIG_VARIABLE = "ISPYB_CONFIG_PATH"
+SIMULATED_ISPYB_CONFIG = SIMULATED_CONFIG_DIR / "ispyb.cfg"
+
+
+class SimulatedSample(BaseModel):
+    """A sample in the simulated queue, and how it will behave.
+
+    Attributes:
+        sample_id: The ISPyB id of the sample
+        container: The puck the sample is in
+        position: The position of the sample in the puck
+        loop_type: The Agamemnon loop type, which gives the wells of a multi-sample pin
+        collections: The number of collections requested for the sample, each of which
+            is centred and collected separately
+        number_of_images: The number of images in each rotation
+        exposure_time_s: The exposure time of each rotation image
+        omega_increment_deg: The rotation of each image
+        wavelength_a: The wavelength to collect at
+        hits: The number of crystals Zocalo will find in the sample
+    """
+
+    sample_id: int
+    container: int = 1
+    position: int = 1
+    loop_type: str | None = None
+    collections: int = 1
+    number_of_images: int = 3600
+    exposure_time_s: float = 0.004
+    omega_increment_deg: float = 0.1
+    wavelength_a: float = 0.976
+    hits: int = 1
+
+
+class SimulationConfig(BaseModel):
+    """A queue of samples to simulate the collection of.
+
+    Attributes:
+        visit: The visit the samples are collected in
+        samples: The samples, in the order Agamemnon gives them
+        profile: The time taken by each step of UDC
+    """
+
+    visit: str = "cm12345-1"
+    samples: list[SimulatedSample] = Field(default_factory=list)
+    profile: UdcLatencyProfile = Field(default_factory=UdcLatencyProfile)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+    @classmethod
+    def with_samples(cls, number_of_samples: int, **kwargs: Any) -> Self:
+        """A queue of identical single-sample pins, filling pucks in order."""
+        return cls(
+            samples=[
+                SimulatedSample(
+                    sample_id=i + 1,
+                    container=i // SAMPLES_PER_PUCK + 1,
+                    position=i % SAMPLES_PER_PUCK + 1,
+                )
+                for i in range(number_of_samples)
+            ],
+            **kwargs,
+        )
+
+
+def agamemnon_instruction(visit: str, sample: SimulatedSample) -> dict[str, Any]:
+    """The instruction Agamemnon would give to collect the sample."""
+    name = f"sample-{sample.sample_id}"
+    root = f"/dls/{SIMULATED_BEAMLINE}/data/simulated/{visit}"
+    collection = {
+        "chi": 0.0,
+        "comment": f"Simulated collection of {name}",
+        "distance": 250.0,
+        "experiment_type": "OSC",
+        "exposure_time": sample.exposure_time_s,
+        "number_of_images": sample.number_of_images,
+        "omega_increment": sample.omega_increment_deg,
+        "omega_start": 0.0,
+        "phi_start": 0.0,
+        "transmission": 0.1,
+        "wavelength": sample.wavelength_a,
+    }
+    return {
+        "collect": {
+            "collection": [collection] * sample.collections,
+            "prefix": f"{root}/auto/{name}/{name}",
+            "jpegs_dir": f"{root}/jpegs/auto/{name}",
+            "xrc_prefix": f"{root}/xraycentring/auto/{name}/{name}",
+            "sample": {
+                "container": sample.container,
+                "id": sample.sample_id,
+                "loopType": sample.loop_type,
+                "name": name,
+                "position": sample.position,
+            },
+            "visit": visit,
+        }
+    }
+
+
+@dataclass
+class SimulatedPhase:
+    name: str
+    start_s: float
+    end_s: float
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+
+@dataclass
+class SampleTimeline:
+    """What happened during one collection of a sample, with times in seconds from
+    the start of the simulation.
+
+    Attributes:
+        sample_id: The sample collected
+        start_s: When the collection started
+        end_s: When the collection finished
+        outcome: "collected" if any rotations were collected, otherwise why not
+        rotations: The number of rotations collected
+        phases: The steps of the collection in the order they happened
+    """
+
+    sample_id: int
+    start_s: float
+    end_s: float = 0.0
+    outcome: str = ""
+    rotations: int = 0
+    phases: list[SimulatedPhase] = field(default_factory=list)
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+
+@dataclass
+class SimulationReport:
+    """The result of a simulation.
+
+    Attributes:
+        timelines: The timeline of each collection, in order
+        udc_phases: The steps of UDC which were not part of any collection
+        alerts: The alerts raised
+        total_s: The time from the baton being acquired to it being released
+        agamemnon_requests: The number of instructions requested from Agamemnon
+        expeye: What was deposited in ISPyB
+        zocalo: The processing jobs started and ended
+    """
+
+    timelines: list[SampleTimeline]
+    udc_phases: list[SimulatedPhase]
+    alerts: list[RecordedAlert]
+    total_s: float
+    agamemnon_requests: int
+    expeye: InMemoryExpeye
+    zocalo: ScriptedZocalo
+
+    @property
+    def samples_collected(self) -> int:
+        return len(
+            {timeline.sample_id for timeline in self.timelines if timeline.rotations}
+        )
+
+    @property
+    def samples_per_hour(self) -> float:
+        return 3600 * self.samples_collected / self.total_s if self.total_s else 0.0
+
+    def time_by_phase(self) -> dict[str, float]:
+        """The total time spent in each named phase, in descending order."""
+        totals: dict[str, float] = {}
+        phases = self.udc_phases + [
+            phase for timeline in self.timelines for phase in timeline.phases
+        ]
+        for phase in phases:
+            totals[phase.name] = totals.get(phase.name, 0.0) + phase.duration_s
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+class _PhaseRecorder(CallbackBase):
+    """Divides the time taken by an instruction into phases, one for each run of the
+    plans executing it named by its subplan. Time spent in a run within another is
+    only counted in the inner run, and time spent in runs without a subplan name or
+    outside the runs of the instruction is counted in the instruction."""
+
+    def __init__(self, clock: LatencyClock):
+        super().__init__()
+        self._clock = clock
+        self._instruction = ""
+        self._runs: dict[str, str] = {}
+        self._enclosing_runs: set[str] = set()
+        self._since_s = 0.0
+        self.phases: list[SimulatedPhase] = []
+        self.rotations = 0
+        self.failure: str | None = None
+
+    def begin(self, instruction: str):
+        self._instruction = instruction
+        self._enclosing_runs = set(self._runs)
+        self._since_s = self._clock.now()
+        self.phases = []
+        self.rotations = 0
+        self.failure = None
+
+    def end(self) -> list[SimulatedPhase]:
+        self._close_phase()
+        return self.phases
+
+    def start(self, doc: RunStart):
+        self._close_phase()
+        self._runs[doc["uid"]] = str(doc.get("subplan_name") or self._instruction)
+
+    def stop(self, doc: RunStop):
+        self._close_phase()
+        name = self._runs.pop(doc["run_start"], "")
+        succeeded = doc["exit_status"] == "success"
+        if name == CONST.PLAN.ROTATION_MAIN and succeeded:
+            self.rotations += 1
+        elif name == self._instruction and not succeeded and self.failure is None:
+            self.failure = doc.get("reason") or doc["exit_status"]
+
+    def _close_phase(self):
+        now_s = self._clock.now()
+        if now_s > self._since_s:
+            name = next(
+                (
+                    name
+                    for uid, name in reversed(self._runs.items())
+                    if uid not in self._enclosing_runs
+                ),
+                self._instruction,
+            )
+            if self.phases and self.phases[-1].name == name:
+                self.phases[-1].end_s = now_s
+            else:
+                self.phases.append(SimulatedPhase(name, self._since_s, now_s))
+        self._since_s = now_s
+
+
+_INSTRUCTION_PHASES = {
+    RobotUnload: "robot_unload",
+    UDCCleanup: "udc_cleanup",
+    UDCDefaultState: "udc_default_state",
+    Wait: "wait",
+}
+
+
+class SimulatedRunner(InProcessRunner):
+    """Executes the instructions decoded by the UDC loop with the real plans, as
+    Hyperion does, and records the time taken by each on the simulation clock.
+
+    The callbacks which would be run in the external callback process are run in this
+    one instead, and data is written under the data directory rather than where
+    Agamemnon asks for it.
+
+    Args:
+        context: The context holding the simulated devices
+        clock: The simulation clock
+        data_dir: Where data is written
+    """
+
+    def __init__(self, context: BlueskyContext, clock: LatencyClock, data_dir: Path):
+        super().__init__(context, True)
+        self._clock = clock
+        self._data_dir = data_dir
+        self.phase_recorder = _PhaseRecorder(clock)
+        self.timelines: list[SampleTimeline] = []
+        self.udc_phases: list[SimulatedPhase] = []
+
+    def check_external_callbacks_are_alive(self) -> MsgGenerator:
+        # The callbacks are subscribed to the RunEngine in this process instead
+        yield from bps.null()
+
+    def decode_and_execute(
+        self, current_visit: str | None, parameter_list: Sequence[BaseModel]
+    ) -> MsgGenerator:
+        for parameters in parameter_list:
+            if isinstance(parameters, LoadCentreCollectParams):
+                parameters = self._relocated(parameters)
+                timeline = SampleTimeline(parameters.sample_id, self._clock.now())
+                self.timelines.append(timeline)
+                self.phase_recorder.begin(CONST.PLAN.LOAD_CENTRE_COLLECT)
+            else:
+                self.phase_recorder.begin(_INSTRUCTION_PHASES[type(parameters)])
+            try:
+                current_visit = yield from super().decode_and_execute(
+                    current_visit, [parameters]
+                )
+            finally:
+                phases = self.phase_recorder.end()
+                if isinstance(parameters, LoadCentreCollectParams):
+                    timeline.phases = phases
+                    timeline.end_s = self._clock.now()
+                    timeline.rotations = self.phase_recorder.rotations
+                    timeline.outcome = (
+                        "collected"
+                        if timeline.rotations
+                        else self.phase_recorder.failure or "no rotations"
+                    )
+                else:
+                    self.udc_phases.extend(phases)
+        return current_visit
+
+    def _relocated(
+        self, parameters: LoadCentreCollectParams
+    ) -> LoadCentreCollectParams:
+        def relocated(directory: str) -> str:
+            return str(self._data_dir / Path(directory).relative_to("/"))
+
+        return parameters.model_copy(
+            update={
+                name: params.model_copy(
+                    update={
+                        "storage_directory": relocated(params.storage_directory),
+                        "snapshot_directory": relocated(params.snapshot_directory),
+                    }
+                )
+                for name, params in [
+                    ("robot_load_then_centre", parameters.robot_load_then_centre),
+                    ("multi_rotation_scan", parameters.multi_rotation_scan),
+                ]
+            }
+        )
+
+
+def _in_process_callbacks(zocalo: ScriptedZocalo) -> list[CallbackBase]:
+    """The callbacks of the external callback process, other than those writing
+    NeXus files, with Zocalo jobs sent to the stand-in."""
+    # The gridscans of UDC are started with the parameters of the grid detection
+    gridscan_ispyb_callback = GridDetectAndScanISPyBCallback(
+        param_type=GenericGridWithHyperionDetectorParams,
+        emit=create_gridscan_callbacks()[1].emit_cb,
+    )
+    _, rotation_ispyb_callback = create_rotation_callbacks()
+    for ispyb_callback in [gridscan_ispyb_callback, rotation_ispyb_callback]:
+        ispyb_callback.emit_cb.zocalo_interactor = zocalo  # type: ignore
+    return [
+        gridscan_ispyb_callback,
+        BeamDrawingCallback(emit=rotation_ispyb_callback),
+        RobotLoadISPyBCallback(),
+        SampleHandlingCallback(),
+        AlertOnContainerChange(),
+    ]
+
+
+@dataclass
+class _SimulatedBeamlineContext(BlueskyContext):
+    """A context whose beamline devices are the simulated ones. These are registered
+    again rather than rebuilt when UDC reloads the beamline, so that their state is kept
+    as it would be in EPICS."""
+
+    simulated_devices: list[Any] = field(default_factory=list)
+
+    def with_device_manager(self, manager, mock: bool = False):  # type: ignore[override]
+        for device in self.simulated_devices:
+            self.register_device(device)
+        return {device.name: device for device in self.simulated_devices}, {}
+
+
+def _get_or_none(getter: Callable[[], T]) -> T | None:
+    try:
+        return getter()
+    except NameError:
+        # The global has never been set
+        return None
+
+
+@contextmanager
+def _simulated_services(
+    config_server: SimulatedConfigServer,
+    alerts: RecordingAlertService,
+    expeye: InMemoryExpeye,
+) -> Iterator[None]:
+    """Point Hyperion's global services at the stand-ins, restoring them afterwards."""
+    previous_config_client = _get_or_none(get_config_client)
+    previous_snapshot_cache = get_config_snapshot_cache()
+    previous_alerting_service = _get_or_none(get_alerting_service)
+    previous_environment = {
+        variable: os.environ.get(variable)
+        for variable in ["BEAMLINE", ISPYB_CONFIG_VARIABLE]
+    }
+    set_config_client(config_server)
+    set_config_snapshot_cache(ConfigSnapshotCache())
+    set_alerting_service(alerts)
+    os.environ["BEAMLINE"] = SIMULATED_BEAMLINE
+    os.environ[ISPYB_CONFIG_VARIABLE] = str(SIMULATED_ISPYB_CONFIG)
+    set_expeye_interaction(expeye)
+    try:
+        yield
+    finally:
+        set_expeye_interaction(None)
+        set_commissioning_signal(None)
+        for variable, value in previous_environment.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+        if previous_alerting_service is not None:
+            set_alerting_service(previous_alerting_service)
+        set_config_snapshot_cache(previous_snapshot_cache)
+        if previous_config_client is None:
+            clear_config_client()
+        else:
+            set_config_client(previous_config_client)
+
+
+@contextmanager
+def _sleeping_on_clock(run_engine: RunEngine, injector: LatencyInjector):
+    """Make the sleeps of every plan run wait on the clock of the injector, including
+    those of the UDC loop itself, so that they are counted in simulated time."""
+
+    async def sleep_on_clock(msg: Msg):
+        await injector.delay(msg.args[0])
+
+    previous_sleep = run_engine._command_registry["sleep"]  # noqa: SLF001
+    run_engine.register_command("sleep", sleep_on_clock)
+    try:
+        yield
+    finally:
+        run_engine.register_command("sleep", previous_sleep)
+
+
+@contextmanager
+def _subscribed(run_engine: RunEngine, callbacks: list[CallbackBase]):
+    tokens = [run_engine.subscribe(callback) for callback in callbacks]
+    try:
+        yield
+    finally:
+        for token in tokens:
+            run_engine.unsubscribe(token)
+
+
+def run_simulation(
+    config: SimulationConfig,
+    run_engine: RunEngine | None = None,
+    data_dir: Path | None = None,
+) -> SimulationReport:
+    """Simulate Hyperion collecting the queue of samples, from being handed the baton
+    until Agamemnon has no more instructions and the baton is released.
+
+    Args:
+        config: The samples to collect and the time taken by each step of UDC
+        run_engine: The RunEngine to run UDC on, a new one is created if not given
+        data_dir: Where the data and snapshots of the collections are written, a
+            temporary directory removed afterwards if not given
+    """
+    injector = LatencyInjector(config.profile.devices)
+    alerts = RecordingAlertService(injector.clock.now)
+    expeye = InMemoryExpeye()
+    zocalo = ScriptedZocalo(
+        expeye, {sample.sample_id: sample.hits for sample in config.samples}
+    )
+    instructions = [
+        agamemnon_instruction(config.visit, sample) for sample in config.samples
+    ]
+    config_server = SimulatedConfigServer()
+    with ExitStack() as stack:
+        if data_dir is None:
+            data_dir = Path(stack.enter_context(TemporaryDirectory()))
+        agamemnon = stack.enter_context(FakeAgamemnon(instructions))
+        stack.enter_context(_simulated_services(config_server, alerts, expeye))
+        context = (
+            _SimulatedBeamlineContext()
+            if run_engine is None
+            else _SimulatedBeamlineContext(run_engine=run_engine)
+        )
+        devices = stack.enter_context(
+            simulated_beamline(
+                injector, config.profile, zocalo, config_server, data_dir
+            )
+        )
+        context.simulated_devices = list(devices.values())
+        for device in context.simulated_devices:
+            context.register_device(device)
+        stack.enter_context(_sleeping_on_clock(context.run_engine, injector))
+        stack.enter_context(
+            _subscribed(context.run_engine, _in_process_callbacks(zocalo))
+        )
+        runner = SimulatedRunner(context, injector.clock, data_dir)
+        stack.enter_context(_subscribed(context.run_engine, [runner.phase_recorder]))
+        LOGGER.info(f"Simulating UDC of {len(config.samples)} samples")
+        run_udc_when_requested(context, runner)
+    return SimulationReport(
+        runner.timelines,
+        runner.udc_phases,
+        alerts.alerts,
+        injector.clock.now(),
+        agamemnon.requests,
+        expeye,
+        zocalo,
+    )
+
+
+def format_report(report: SimulationReport, show_phases: bool = False) -> str:
+    lines = [
+        f"{'sample':>10}{'start s':>10}{'end s':>10}{'duration s':>12}"
+        f"{'rotations':>11}  outcome"
+    ]
+    for timeline in report.timelines:
+        lines.append(
+            f"{timeline.sample_id:>10}{timeline.start_s:>10.1f}{timeline.end_s:>10.1f}"
+            f"{timeline.duration_s:>12.1f}{timeline.rotations:>11}  {timeline.outcome}"
+        )
+        if show_phases:
+            lines.extend(
+                f"{'':>10}{phase.start_s:>10.1f}{phase.end_s:>10.1f}"
+                f"{phase.duration_s:>12.1f}{'':>11}  {phase.name}"
+                for phase in timeline.phases
+            )
+    lines.append("")
+    lines.append(f"{'phase':<40}{'total s':>10}{'share %':>9}")
+    for name, total_s in report.time_by_phase().items():
+        share = 100 * total_s / report.total_s if report.total_s else 0.0
+        lines.append(f"{name:<40}{total_s:>10.1f}{share:>9.1f}")
+    lines.append("")
+    lines.append(
+        f"{report.samples_collected} samples collected in "
+        f"{report.total_s / 3600:.2f} hours, "
+        f"{report.samples_per_hour:.1f} samples per hour"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Estimate the throughput of unattended data collection by "
+        "simulating it without a beamline."
+    )
+    queue = parser.add_mutually_exclusive_group()
+    queue.add_argument(
+        "--config",
+        type=Path,
+        help="JSON file of the sample queue and latency profile to simulate",
+    )
+    queue.add_argument(
+        "--samples",
+        type=int,
+        default=10,
+        help="Number of identical samples to simulate, if no config is given",
+    )
+    parser.add_argument(
+        "--phases",
+        action="store_true",
+        help="Show the timeline of each phase of each sample",
+    )
+    args = parser.parse_args(argv)
+    config = (
+        SimulationConfig.load(args.config)
+        if args.config
+        else SimulationConfig.with_samples(args.samples)
+    )
+    print(format_report(run_simulation(config), args.phases))
+
+
+if __name__ == "__main__":
+    main()
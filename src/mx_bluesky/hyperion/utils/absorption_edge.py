@@ -0,0 +1,200 @@
+"""Analysis of a fluorescence scan across an absorption edge to choose the energies
+of a MAD or SAD experiment.
+
+The fluorescence of the sample is proportional to its absorption and so to f'', the
+imaginary part of the anomalous scattering factor of the absorbing atom. The spectrum
+is normalised to the edge jump, and the real part f' is found from it by the
+Kramers-Kronig relation
+
+    f'(E) = 2 / pi * P integral E' f''(E') / (E^2 - E'^2) dE'
+
+evaluated locally, over the scan extended either side by its end values.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.signal import savgol_filter
+
+from mx_bluesky.common.utils.log import LOGGER
+
+
+class EdgeScanAnalysisError(Exception):
+    """Raised when no absorption edge can be found in a fluorescence scan."""
+
+    pass
+
+
+@dataclass
+class EdgeScanAnalysis:
+    """The anomalous scattering factors from a fluorescence scan and the energies
+    chosen from them.
+
+    Attributes:
+        energies_ev: The energies of the scan, in increasing order
+        counts: The fluorescence counts at each energy
+        f_double_prime: f'' at each energy, in the units of f2_below and f2_above
+        f_prime: f' at each energy, in the same units
+        edge_energy_ev: Where the fluorescence rises most steeply
+        peak_energy_ev: Where f'' is largest, for the most anomalous signal
+        inflection_energy_ev: Where f' is smallest, for the most dispersive signal
+        remote_energy_ev: Above the edge, away from the anomalous signal
+    """
+
+    energies_ev: list[float]
+    counts: list[float]
+    f_double_prime: list[float]
+    f_prime: list[float]
+    edge_energy_ev: float
+    peak_energy_ev: float
+    inflection_energy_ev: float
+    remote_energy_ev: float
+
+    @property
+    def peak_f_prime(self) -> float:
+        return self._at(self.peak_energy_ev, self.f_prime)
+
+    @property
+    def peak_f_double_prime(self) -> float:
+        return self._at(self.peak_energy_ev, self.f_double_prime)
+
+    @property
+    def inflection_f_prime(self) -> float:
+        return self._at(self.inflection_energy_ev, self.f_prime)
+
+    @property
+    def inflection_f_double_prime(self) -> float:
+        return self._at(self.inflection_energy_ev, self.f_double_prime)
+
+    def _at(self, energy_ev: float, values: list[float]) -> float:
+        return values[self.energies_ev.index(energy_ev)]
+
+
+def _smooth(counts: np.ndarray, smoothing_points: int) -> np.ndarray:
+    window = smoothing_points | 1
+    if window < 3 or len(counts) <= window:
+        return counts
+    return savgol_filter(counts, window, 2)
+
+
+def kramers_kronig_f_prime(
+    energies_ev: np.ndarray, f_double_prime: np.ndarray, extension_ev: float
+) -> np.ndarray:
+    """f' at each energy from f'' by the Kramers-Kronig relation.
+
+    f'' is taken as constant at its end values for extension_ev either side of the
+    energies given. The principal value is found by subtracting the value of the
+    integrand numerator at the pole, which is then integrated analytically.
+    """
+    spacing = min(float(np.min(np.diff(energies_ev))), 1.0) / 2
+    low = energies_ev[0] - extension_ev
+    high = energies_ev[-1] + extension_ev
+    grid = np.arange(low, high + spacing / 2, spacing)
+    f2_grid = np.interp(grid, energies_ev, f_double_prime)
+
+    energy = energies_ev[:, np.newaxis]
+    numerator = grid * f2_grid / (energy + grid)
+    numerator_at_pole = (f_double_prime / 2)[:, np.newaxis]
+    separation = energy - grid
+    at_pole = np.abs(separation) < spacing * 1e-6
+    with np.errstate(divide="ignore", invalid="ignore"):
+        integrand = (numerator - numerator_at_pole) / separation
+    # The limit of the integrand at the pole is minus the derivative of the numerator
+    derivative_at_pole = (
+        np.gradient(f_double_prime, energies_ev) / 2
+        + f_double_prime / (4 * energies_ev)
+    )[:, np.newaxis]
+    integrand = np.where(at_pole, -derivative_at_pole, integrand)
+
+    principal_value = np.trapezoid(integrand, grid, axis=1) + numerator_at_pole[
+        :, 0
+    ] * np.log((energies_ev - low) / (high - energies_ev))
+    return 2 / np.pi * principal_value
+
+
+def analyse_edge_scan(
+    energies_ev: Sequence[float],
+    counts: Sequence[float],
+    f2_below: float = 0,
+    f2_above: float = 1,
+    remote_offset_ev: float = 100,
+    pre_edge_margin_ev: float = 10,
+    post_edge_margin_ev: float = 15,
+    smoothing_points: int = 5,
+    extension_ev: float = 1000,
+) -> EdgeScanAnalysis:
+    """Find f'' and f' from a fluorescence scan across an absorption edge and choose
+    the peak, inflection and remote energies from them.
+
+    The counts below and above the edge are each fitted with a straight line, which
+    must be far enough from the edge to miss any white line. f'' is the counts with the
+    pre-edge line subtracted, flattened above the edge and scaled so that it goes from
+    f2_below to f2_above across the edge.
+
+    Args:
+        energies_ev: The energy of each reading
+        counts: The dead-time corrected fluorescence counts of each reading
+        f2_below: f'' below the edge, e.g. from tabulated values for the element.
+            By default f'' and f' are given in units of the edge jump.
+        f2_above: f'' just above the edge
+        remote_offset_ev: How far above the peak to choose the remote energy
+        pre_edge_margin_ev: How far below the edge to fit the pre-edge line
+        post_edge_margin_ev: How far above the edge to fit the post-edge line
+        smoothing_points: The number of readings to smooth the counts over
+        extension_ev: How far either side of the scan to extend f'' for the
+            Kramers-Kronig relation
+
+    Raises:
+        EdgeScanAnalysisError: If the scan does not extend far enough either side of
+            an edge, or there is no rise in fluorescence across it
+    """
+    order = np.argsort(energies_ev)
+    energies = np.asarray(energies_ev, dtype=float)[order]
+    raw_counts = np.asarray(counts, dtype=float)[order]
+    if len(np.unique(energies)) != len(energies) or len(energies) < 5:
+        raise EdgeScanAnalysisError(
+            f"Need at least 5 readings at distinct energies, got {len(energies)}"
+        )
+
+    smoothed = _smooth(raw_counts, smoothing_points)
+    edge_energy = float(energies[np.argmax(np.gradient(smoothed, energies))])
+    pre_edge = energies < edge_energy - pre_edge_margin_ev
+    post_edge = energies > edge_energy + post_edge_margin_ev
+    if np.count_nonzero(pre_edge) < 2 or np.count_nonzero(post_edge) < 2:
+        raise EdgeScanAnalysisError(
+            f"Scan from {energies[0]} to {energies[-1]} eV does not extend far enough "
+            f"either side of the edge at {edge_energy} eV"
+        )
+    pre_line = np.poly1d(np.polyfit(energies[pre_edge], smoothed[pre_edge], 1))
+    post_line = np.poly1d(np.polyfit(energies[post_edge], smoothed[post_edge], 1))
+    jump = post_line(edge_energy) - pre_line(edge_energy)
+    if jump <= 0:
+        raise EdgeScanAnalysisError(
+            f"No rise in fluorescence across the edge at {edge_energy} eV"
+        )
+
+    normalised = (smoothed - pre_line(energies)) / jump
+    above_edge = energies > edge_energy
+    normalised[above_edge] -= (
+        post_line(energies[above_edge]) - pre_line(energies[above_edge]) - jump
+    ) / jump
+    f_double_prime = f2_below + (f2_above - f2_below) * normalised
+    f_prime = kramers_kronig_f_prime(energies, f_double_prime, extension_ev)
+
+    peak_energy = float(energies[np.argmax(f_double_prime)])
+    inflection_energy = float(energies[np.argmin(f_prime)])
+    LOGGER.info(
+        f"Edge at {edge_energy} eV, peak at {peak_energy} eV, inflection at "
+        f"{inflection_energy} eV"
+    )
+    return EdgeScanAnalysis(
+        energies_ev=energies.tolist(),
+        counts=raw_counts.tolist(),
+        f_double_prime=f_double_prime.tolist(),
+        f_prime=f_prime.tolist(),
+        edge_energy_ev=edge_energy,
+        peak_energy_ev=peak_energy,
+        inflection_energy_ev=inflection_energy,
+        remote_energy_ev=peak_energy + remote_offset_ev,
+    )
@@ -9,14 +9,22 @@ from bluesky import plan_stubs as bps
 from bluesky.utils import MsgGenerator
 from dodal.devices.smargon import Smargon
 
+from mx_bluesky.common.experiment_plans.rotation.helical_utils import (
+    HelicalVector,
+    helical_vector_from_xrc_result,
+)
 from mx_bluesky.common.utils import xrc_result as flyscan_result
 from mx_bluesky.common.utils.log import LOGGER
 from mx_bluesky.common.utils.xrc_result import XRayCentreResult
 from mx_bluesky.hyperion.blueapi.mixins import (
+    CrystalScore,
+    HelicalCollection,
     MultiXtalSelection,
+    NonMaxSuppressionSelection,
     TopNByMaxCountForEachSampleSelection,
     TopNByMaxCountSelection,
 )
+from mx_bluesky.hyperion.utils.wells import WellRegion, assign_hits_to_wells
 
 
 def top_n_by_max_count(
@@ -41,6 +49,127 @@ def top_n_by_max_count_for_each_sample(
     ]
 
 
+def _bounding_box_corners(result: XRayCentreResult) -> tuple[np.ndarray, np.ndarray]:
+    corners = np.asarray(result.bounding_box_mm, dtype=float)
+    return corners.min(axis=0), corners.max(axis=0)
+
+
+def bounding_box_volume_mm3(result: XRayCentreResult) -> float:
+    low, high = _bounding_box_corners(result)
+    return float(np.prod(high - low))
+
+
+def bounding_box_iou(a: XRayCentreResult, b: XRayCentreResult) -> float:
+    """The intersection over union of the bounding boxes of two crystals, 0 if they
+    do not overlap and 1 if they are the same."""
+    low_a, high_a = _bounding_box_corners(a)
+    low_b, high_b = _bounding_box_corners(b)
+    overlap = np.clip(np.minimum(high_a, high_b) - np.maximum(low_a, low_b), 0, None)
+    intersection = float(np.prod(overlap))
+    union = bounding_box_volume_mm3(a) + bounding_box_volume_mm3(b) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def crystal_scores(
+    results: Sequence[XRayCentreResult], score: CrystalScore
+) -> np.ndarray:
+    """Scores each crystal by a weighted sum of its max count, total count and
+    bounding box volume, each normalised by the largest amongst the crystals."""
+    terms = np.array(
+        [
+            [result.max_count, result.total_count, bounding_box_volume_mm3(result)]
+            for result in results
+        ],
+        dtype=float,
+    ).reshape(-1, 3)
+    largest = terms.max(axis=0, initial=0)
+    normalised = np.divide(terms, largest, out=np.zeros_like(terms), where=largest > 0)
+    weights = [score.max_count_weight, score.total_count_weight, score.volume_weight]
+    return normalised @ weights
+
+
+def non_max_suppression(
+    unfiltered: Sequence[XRayCentreResult],
+    n: int,
+    max_iou: float = 0,
+    min_separation_um: float = 0,
+    score: CrystalScore = CrystalScore(),
+    for_each_sample: bool = False,
+) -> Sequence[XRayCentreResult]:
+    """
+    Select the best crystals by score, skipping any which overlap a better selected
+    crystal by more than max_iou or whose centre is within min_separation_um of it.
+    Returns the selected crystals in descending order of score.
+    """
+    scores = crystal_scores(unfiltered, score)
+    selected: list[XRayCentreResult] = []
+    selected_per_sample: dict[int | None, int] = defaultdict(int)
+    # Sorting is stable so equally scored crystals keep their order
+    for i in sorted(range(len(unfiltered)), key=lambda i: -scores[i]):
+        candidate = unfiltered[i]
+        sample = candidate.sample_id if for_each_sample else None
+        if selected_per_sample[sample] >= n:
+            continue
+        if any(
+            bounding_box_iou(candidate, better) > max_iou
+            or np.linalg.norm(candidate.centre_of_mass_mm - better.centre_of_mass_mm)
+            * 1000
+            < min_separation_um
+            for better in selected
+        ):
+            continue
+        selected.append(candidate)
+        selected_per_sample[sample] += 1
+    return selected
+
+
+def _travel_distances(points_um: np.ndarray) -> np.ndarray:
+    # The axes move at the same time, so the longest axis move sets the travel time
+    return np.abs(points_um[:, None] - points_um[None]).max(axis=-1)
+
+
+def order_for_minimum_travel(
+    locations_um: Sequence[np.ndarray], start_um: np.ndarray
+) -> list[int]:
+    """
+    Find an order in which to visit locations, starting from start_um, which keeps the
+    goniometer travel short. A nearest neighbour path is improved by 2-opt, reversing
+    sections of the path until no reversal makes it shorter.
+
+    Returns:
+        The indices of the locations in the order to visit them
+    """
+    distances = _travel_distances(np.vstack([start_um, *locations_um]))
+    path = [0]
+    unvisited = list(range(1, len(distances)))
+    while unvisited:
+        nearest = min(unvisited, key=lambda j: distances[path[-1], j])
+        path.append(nearest)
+        unvisited.remove(nearest)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 1):
+            for j in range(i + 1, len(path)):
+                # Reversing path[i:j+1] replaces the edges either side of it
+                before, first, last = path[i - 1], path[i], path[j]
+                change = distances[before, last] - distances[before, first]
+                if j + 1 < len(path):
+                    after = path[j + 1]
+                    change += distances[first, after] - distances[last, after]
+                if change < -1e-9:
+                    path[i : j + 1] = path[i : j + 1][::-1]
+                    improved = True
+    return [i - 1 for i in path[1:]]
+
+
+def path_length_um(locations_um: Sequence[np.ndarray], start_um: np.ndarray) -> float:
+    """The goniometer travel to visit the locations in order starting from start_um."""
+    points = np.vstack([start_um, *locations_um])
+    return float(np.abs(np.diff(points, axis=0)).max(axis=-1, initial=0).sum())
+
+
 def resolve_selection_fn(
     params: MultiXtalSelection,
 ) -> Callable[[Sequence[XRayCentreResult]], Sequence[XRayCentreResult]]:
@@ -49,23 +178,52 @@ def resolve_selection_fn(
             return partial(top_n_by_max_count, n=params.n)
         case TopNByMaxCountForEachSampleSelection():
             return partial(top_n_by_max_count_for_each_sample, n=params.n)
+        case NonMaxSuppressionSelection():
+            return partial(
+                non_max_suppression,
+                n=params.n,
+                max_iou=params.max_iou,
+                min_separation_um=params.min_separation_um,
+                score=params.score,
+                for_each_sample=params.for_each_sample,
+            )
     raise ValueError(f"Invalid selection function {params.name}")
 
 
+def _current_location_um(gonio: Smargon) -> MsgGenerator[np.ndarray]:
+    initial_x_mm = yield from bps.rd(gonio.x.user_readback)
+    initial_y_mm = yield from bps.rd(gonio.y.user_readback)
+    initial_z_mm = yield from bps.rd(gonio.z.user_readback)
+    return np.array([initial_x_mm, initial_y_mm, initial_z_mm]) * 1000
+
+
 def samples_and_locations_to_collect(
     selection_params: MultiXtalSelection,
     gonio: Smargon,
     default_sample_id: int,
     xrc_results: Sequence[flyscan_result.XRayCentreResult] | None,
+    well_regions: Sequence[WellRegion] | None = None,
 ) -> MsgGenerator[list[tuple[int, np.ndarray]]]:
     """
     Determine the sample IDs and positions to collect given the specified selection parameters.
     If no centres are present, return the default sample ID and current position,
     so that a collection can be performed without XRC should this be required.
+    If the wells of a multi-sample pin are given, each centre is attributed to the
+    sample in its well and the selection is made separately for each well.
     """
     if xrc_results:
         selection_func = resolve_selection_fn(selection_params)
-        hits = selection_func(xrc_results)
+        if well_regions:
+            in_wells = assign_hits_to_wells(xrc_results, well_regions)
+            hits = [
+                hit
+                for region in well_regions
+                for hit in selection_func(
+                    [result for result in in_wells if region.contains(result)]
+                )
+            ]
+        else:
+            hits = selection_func(xrc_results)
         hits_to_collect = []
         for hit in hits:
             if hit.sample_id is None:
@@ -81,17 +239,35 @@ def samples_and_locations_to_collect(
         LOGGER.info(
             f"Selected hits {hits_to_collect} using {selection_func}, args={selection_params}"
         )
+        if selection_params.order_for_travel and samples_and_locations:
+            start_um = yield from _current_location_um(gonio)
+            order = order_for_minimum_travel(
+                [location for _, location in samples_and_locations], start_um
+            )
+            samples_and_locations = [samples_and_locations[i] for i in order]
+            LOGGER.info(f"Collecting hits in order {order} to minimise travel")
         return samples_and_locations
     else:
         # If the xray centring hasn't found a result but has not thrown an error it
         # means that we do not need to recentre and can collect where we are
-        initial_x_mm = yield from bps.rd(gonio.x.user_readback)
-        initial_y_mm = yield from bps.rd(gonio.y.user_readback)
-        initial_z_mm = yield from bps.rd(gonio.z.user_readback)
-
-        return [
-            (
-                default_sample_id,
-                np.array([initial_x_mm, initial_y_mm, initial_z_mm]) * 1000,
+        location_um = yield from _current_location_um(gonio)
+        return [(default_sample_id, location_um)]
+
+
+def helical_vector_for_location(
+    helical_params: HelicalCollection,
+    xrc_results: Sequence[XRayCentreResult] | None,
+    location_um: np.ndarray,
+) -> HelicalVector | None:
+    """
+    Determine the helical vector to collect along for a location chosen by
+    samples_and_locations_to_collect, from the bounding box of the crystal centred there.
+    Returns None if the location is not the centre of a crystal, or the crystal is too
+    short to collect helically.
+    """
+    for result in xrc_results or []:
+        if np.allclose(result.centre_of_mass_mm * 1000, location_um):
+            return helical_vector_from_xrc_result(
+                result, helical_params.margin_um, helical_params.min_length_um
             )
-        ]
+    return None
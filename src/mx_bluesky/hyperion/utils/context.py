@@ -2,6 +2,10 @@ from blueapi.core import BlueskyContext
 from dodal.common.beamlines.beamline_utils import get_config_client
 from dodal.utils import get_beamline_based_on_environment_variable
 
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    get_config_snapshot_cache,
+)
+
 
 def setup_context(dev_mode: bool = False) -> BlueskyContext:
     context = BlueskyContext()
@@ -12,6 +16,8 @@ def setup_context(dev_mode: bool = False) -> BlueskyContext:
 def clear_all_device_caches(context: BlueskyContext):
     context.unregister_all_devices()
     get_config_client().reset_cache()
+    if (config_snapshot_cache := get_config_snapshot_cache()) is not None:
+        config_snapshot_cache.refresh()
 
 
 def setup_devices(context: BlueskyContext, dev_mode: bool):
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Sequence
+
+import bluesky.preprocessors as bpp
+from bluesky.callbacks import CallbackBase
+from bluesky.utils import MsgGenerator
+from event_model import RunStart
+
+from mx_bluesky.common.utils.log import LOGGER
+from mx_bluesky.common.utils.xrc_result import XRayCentreResult
+from mx_bluesky.hyperion.parameters.constants import CONST
+from mx_bluesky.hyperion.parameters.gridscan import WellLayout
+
+
+@dataclasses.dataclass
+class WellRegion:
+    """
+    The extent along the goniometer x axis of one well of a multi-sample pin.
+
+    Attributes:
+        well: The index of the well, counting from the pin tip
+        sample_id: The sample id of the sample in the well
+        x_min_mm: The lower bound of the well in goniometer x
+        x_max_mm: The upper bound of the well in goniometer x
+    """
+
+    well: int
+    sample_id: int
+    x_min_mm: float
+    x_max_mm: float
+
+    def contains(self, result: XRayCentreResult) -> bool:
+        return self.x_min_mm <= result.centre_of_mass_mm[0] < self.x_max_mm
+
+
+class WellRegionsEventHandler(CallbackBase):
+    def __init__(self):
+        super().__init__()
+        self.well_regions: list[WellRegion] | None = None
+
+    def start(self, doc: RunStart) -> RunStart | None:
+        if CONST.PLAN.WELL_REGIONS in doc:
+            self.well_regions = [
+                WellRegion(**region_dict)
+                for region_dict in doc[CONST.PLAN.WELL_REGIONS]  # type: ignore
+            ]
+        return doc
+
+
+def well_regions_from_pin_tip(
+    layout: WellLayout, centred_x_mm: float
+) -> list[WellRegion]:
+    """
+    Calculate the regions of the wells of a multi-sample pin which has been pin tip
+    centred. Pin tip centring leaves the beam halfway between the ends of the pin, which
+    is also halfway between the first and last wells. The tip is towards negative x.
+
+    Args:
+        layout: The wells of the pin
+        centred_x_mm: The goniometer x after pin tip centring
+    """
+    well_size_mm = layout.well_size_um / 1000
+    num_wells = len(layout.sample_ids)
+    regions = []
+    for well, sample_id in enumerate(layout.sample_ids):
+        well_centre_mm = centred_x_mm + (well - (num_wells - 1) / 2) * well_size_mm
+        regions.append(
+            WellRegion(
+                well,
+                sample_id,
+                well_centre_mm - well_size_mm / 2,
+                well_centre_mm + well_size_mm / 2,
+            )
+        )
+    return regions
+
+
+def assign_hits_to_wells(
+    results: Sequence[XRayCentreResult], regions: Sequence[WellRegion]
+) -> list[XRayCentreResult]:
+    """Attribute each hit to the sample in the well containing its centre of mass. A
+    hit which is not in any well is given no sample id, so it is not collected."""
+    assigned = []
+    for result in results:
+        well = next((region for region in regions if region.contains(result)), None)
+        if well is None:
+            LOGGER.warning(f"Diffracting centre {result} is not in any well")
+        assigned.append(
+            dataclasses.replace(
+                result, sample_id=well.sample_id if well is not None else None
+            )
+        )
+    return assigned
+
+
+def fire_well_regions_event(regions: Sequence[WellRegion]) -> MsgGenerator:
+    def empty_plan():
+        return iter([])
+
+    LOGGER.info(f"Wells of multi-sample pin are at {regions}")
+    yield from bpp.set_run_key_wrapper(
+        bpp.run_wrapper(
+            empty_plan(),
+            md={
+                CONST.PLAN.WELL_REGIONS: [
+                    dataclasses.asdict(region) for region in regions
+                ]
+            },
+        ),
+        CONST.PLAN.WELL_REGIONS,
+    )
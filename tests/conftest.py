@@ -1660,6 +1660,16 @@ def mock_alert_service():
         yield service
 
 
+@pytest.fixture(autouse=True)
+def clear_expeye_clients():
+    """Expeye clients are shared per config path, so must not leak between tests"""
+    with patch.dict(
+        "mx_bluesky.common.external_interaction.ispyb.exp_eye_store._expeye_clients",
+        clear=True,
+    ):
+        yield
+
+
 @pytest.fixture()
 def patch_beamline_env_variable(monkeypatch):
     monkeypatch.setenv("BEAMLINE", "test")
@@ -63,7 +63,7 @@ def test_alert_to_graylog():
 
 
 @patch(
-    "mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback.ExpeyeInteraction",
+    "mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback.get_expeye_interaction",
     MagicMock(),
 )
 @pytest.mark.requires(external="graylog")
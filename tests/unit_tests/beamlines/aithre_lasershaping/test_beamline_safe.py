@@ -1,13 +1,26 @@
+import threading
+from collections.abc import Callable
+
 import pytest
+from bluesky import Msg
+from bluesky.run_engine import RunEngine
 from bluesky.simulators import RunEngineSimulator, assert_message_and_return_remaining
+from bluesky.utils import RunEngineInterrupted
 from dodal.beamlines import aithre
 from dodal.devices.aithre_lasershaping.goniometer import Goniometer
 from dodal.devices.aithre_lasershaping.laser_robot import LaserRobot
+from ophyd_async.core import get_mock_put, set_mock_value
 
 from mx_bluesky.beamlines.aithre_lasershaping import (
     go_to_zero,
+    monitor_beamline_safe,
     set_beamline_safe_on_robot,
 )
+from mx_bluesky.beamlines.aithre_lasershaping.beamline_safe import (
+    BeamlineSafeState,
+)
+
+AXES = ["x", "y", "z", "sampy", "sampz", "omega"]
 
 
 @pytest.fixture
@@ -15,6 +28,30 @@ def robot() -> LaserRobot:
     return aithre.robot.build(connect_immediately=True, mock=True)
 
 
+def _locate_axes(readbacks: dict[str, float]):
+    def locate(msg: Msg):
+        axes = [msg.obj, *msg.args]
+        return [
+            {"readback": readbacks[axis.name.removeprefix("goniometer-")]}
+            for axis in axes
+        ]
+
+    return locate
+
+
+def test_beamline_safe_reads_all_axes_in_parallel(
+    sim_run_engine: RunEngineSimulator, robot: LaserRobot, aithre_gonio: Goniometer
+):
+    sim_run_engine.add_handler("locate", _locate_axes(dict.fromkeys(AXES, 0.0)))
+
+    msgs = sim_run_engine.simulate_plan(set_beamline_safe_on_robot(robot, aithre_gonio))
+
+    [locate] = [msg for msg in msgs if msg.command == "locate"]
+    assert {axis.name for axis in [locate.obj, *locate.args]} == {
+        f"goniometer-{axis}" for axis in AXES
+    }
+
+
 @pytest.mark.parametrize(
     "set_pv_name, set_value",
     [
@@ -33,11 +70,8 @@ async def test_beamline_safe_reads_unsafe_correctly(
     set_pv_name: str,
     set_value: float,
 ):
-    # Should be replaced by read_handler when https://github.com/bluesky/bluesky/issues/1906 is fixed
-    def locate_pv(_):
-        return {"readback": set_value}
-
-    sim_run_engine.add_handler("locate", locate_pv, "goniometer-" + set_pv_name)
+    readbacks = dict.fromkeys(AXES, 0.0) | {set_pv_name: set_value}
+    sim_run_engine.add_handler("locate", _locate_axes(readbacks))
 
     msgs = sim_run_engine.simulate_plan(set_beamline_safe_on_robot(robot, aithre_gonio))
     assert_message_and_return_remaining(
@@ -50,11 +84,15 @@ async def test_beamline_safe_reads_unsafe_correctly(
     )
 
 
+@pytest.mark.parametrize("near_zero", [0, 0.0004, -0.0004])
 async def test_beamline_safe_reads_safe_correctly(
     sim_run_engine: RunEngineSimulator,
     robot: LaserRobot,
     aithre_gonio: Goniometer,
+    near_zero: float,
 ):
+    sim_run_engine.add_handler("locate", _locate_axes(dict.fromkeys(AXES, near_zero)))
+
     msgs = sim_run_engine.simulate_plan(set_beamline_safe_on_robot(robot, aithre_gonio))
 
     assert_message_and_return_remaining(
@@ -88,3 +126,125 @@ async def test_go_to_zero_gives_expected_result(
             msgs,
             lambda msg: msg.command == "wait" and msg.kwargs["group"] == "move_to_zero",
         )
+
+
+def test_beamline_safe_state_waits_for_every_axis():
+    state = BeamlineSafeState(["a", "b"])
+
+    assert not state.update("a", 0)
+    assert state.safe is None
+    assert state.update("b", 0)
+    assert state.safe
+
+
+def test_beamline_safe_state_has_hysteresis():
+    state = BeamlineSafeState(["a"], tolerance=0.01, hysteresis=0.01)
+
+    assert state.update("a", 0.005) and state.safe
+    # Stays safe within tolerance + hysteresis
+    assert not state.update("a", 0.015)
+    assert not state.update("a", -0.019)
+    assert state.update("a", 0.021) and not state.safe
+    # But must come back within tolerance to be safe again
+    assert not state.update("a", 0.015)
+    assert state.update("a", -0.01) and state.safe
+
+
+class GoniometerDriver:
+    """Moves the mock goniometer readbacks from a separate thread, while the
+    RunEngine runs the monitor."""
+
+    def __init__(self, run_engine: RunEngine, goniometer: Goniometer, robot):
+        self.run_engine = run_engine
+        self.goniometer = goniometer
+        self.put = get_mock_put(robot.set_beamline_safe)
+        self._wait = threading.Event()
+
+    def set_readback(self, axis: str, value: float):
+        readback = getattr(self.goniometer, axis).user_readback
+        self.run_engine.loop.call_soon_threadsafe(set_mock_value, readback, value)
+
+    def wait_for_puts(self, count: int, timeout: float = 5):
+        for _ in range(int(timeout / 0.01)):
+            if self.put.call_count >= count:
+                return
+            self._wait.wait(0.01)
+        raise AssertionError(f"Only {self.put.call_count} puts, expected {count}")
+
+    def run_then_stop(self, steps: Callable[["GoniometerDriver"], None]):
+        def drive():
+            try:
+                steps(self)
+            finally:
+                self.run_engine.stop()
+
+        thread = threading.Thread(target=drive)
+        thread.start()
+        return thread
+
+
+def test_monitor_updates_beamline_safe_as_goniometer_moves(
+    run_engine: RunEngine, robot: LaserRobot, aithre_gonio: Goniometer
+):
+    driver = GoniometerDriver(run_engine, aithre_gonio, robot)
+
+    def steps(driver: GoniometerDriver):
+        driver.wait_for_puts(1)
+        driver.set_readback("omega", 90)
+        driver.wait_for_puts(2)
+        # Not within tolerance, so still not safe
+        driver.set_readback("omega", 0.0008)
+        driver.set_readback("omega", 0.0002)
+        driver.wait_for_puts(3)
+        # Within hysteresis, so still safe
+        driver.set_readback("sampz", 0.0008)
+        driver.set_readback("sampz", 0.002)
+        driver.wait_for_puts(4)
+
+    stops = []
+    run_engine.subscribe(lambda name, doc: stops.append(doc), "stop")
+
+    thread = driver.run_then_stop(steps)
+    with pytest.raises(RunEngineInterrupted):
+        run_engine(monitor_beamline_safe(robot, aithre_gonio))
+    thread.join()
+
+    assert [stop["exit_status"] for stop in stops] == ["success"]
+    assert [c.args[0] for c in driver.put.call_args_list] == [
+        "On",
+        "No",
+        "On",
+        "No",
+        "No",
+    ]
+
+
+def test_monitor_sets_beamline_not_safe_when_stopped(
+    run_engine: RunEngine, robot: LaserRobot, aithre_gonio: Goniometer
+):
+    driver = GoniometerDriver(run_engine, aithre_gonio, robot)
+
+    thread = driver.run_then_stop(lambda driver: driver.wait_for_puts(1))
+    with pytest.raises(RunEngineInterrupted):
+        run_engine(monitor_beamline_safe(robot, aithre_gonio))
+    thread.join()
+
+    assert [c.args[0] for c in driver.put.call_args_list] == ["On", "No"]
+
+
+def test_monitor_starts_unsafe_and_stops_cleanly(
+    run_engine: RunEngine, robot: LaserRobot, aithre_gonio: Goniometer
+):
+    set_mock_value(aithre_gonio.y.user_readback, -3)
+    driver = GoniometerDriver(run_engine, aithre_gonio, robot)
+
+    thread = driver.run_then_stop(lambda driver: driver.wait_for_puts(1))
+    with pytest.raises(RunEngineInterrupted):
+        run_engine(monitor_beamline_safe(robot, aithre_gonio))
+    thread.join()
+
+    assert [c.args[0] for c in driver.put.call_args_list] == ["No", "No"]
+    # Nothing is monitored once stopped
+    set_mock_value(aithre_gonio.y.user_readback, 0)
+    with pytest.raises(AssertionError):
+        driver.wait_for_puts(3, timeout=0.1)
@@ -1,14 +1,42 @@
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from bluesky.callbacks import CallbackBase
+from bluesky.preprocessors import run_wrapper
+from bluesky.run_engine import RunEngine
 from bluesky.simulators import RunEngineSimulator, assert_message_and_return_remaining
 from dodal.devices.aithre_lasershaping.goniometer import Goniometer
+from ophyd_async.core import init_devices
+from ophyd_async.sim import SimMotor
 
 from mx_bluesky.beamlines.aithre_lasershaping import check_omega_performance
+from mx_bluesky.beamlines.aithre_lasershaping.check_goniometer_performance import (
+    GONIOMETER_PERFORMANCE_RUN,
+    MOVE_PERFORMANCE_STREAM,
+    GoniometerPerformanceReport,
+    MovePerformance,
+    analyse_move,
+    characterise_axis,
+    fit_acceleration_model,
+    ideal_position,
+    ideal_profile,
+)
 
 
 def test_goniometer_omega_performance_check(
     sim_run_engine: RunEngineSimulator, aithre_gonio: Goniometer
 ):
     msgs = sim_run_engine.simulate_plan(check_omega_performance(aithre_gonio))
-    assert len(msgs) == 132
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "open_run"
+            and msg.kwargs["subplan_name"] == GONIOMETER_PERFORMANCE_RUN
+        ),
+    )
     msgs = assert_message_and_return_remaining(
         msgs,
         lambda msg: (
@@ -25,3 +53,199 @@ def test_goniometer_omega_performance_check(
             and msg.args[0] == 300
         ),
     )
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "create" and msg.kwargs["name"] == MOVE_PERFORMANCE_STREAM
+        ),
+    )
+    assert len([msg for msg in msgs if msg.command == "save"]) == 60
+    assert msgs[-1].command == "close_run"
+
+
+@pytest.mark.parametrize(
+    "distance, velocity, acceleration_time, expected",
+    [
+        (10, 10, 0.2, (10, 0.2, 1.2)),
+        (1, 10, 0.4, (np.sqrt(25), 0.2, 0.4)),
+        (-10, 5, 0, (5, 0, 2)),
+        (0, 10, 0.2, (10, 0, 0)),
+    ],
+)
+def test_ideal_profile(distance, velocity, acceleration_time, expected):
+    np.testing.assert_allclose(
+        ideal_profile(distance, velocity, acceleration_time), expected
+    )
+
+
+def test_ideal_position_follows_trapezoid():
+    times = np.array([-1, 0, 0.1, 0.2, 0.7, 1.1, 1.2, 5])
+
+    positions = ideal_position(times, 10, 0, 10, 0.2)
+
+    np.testing.assert_allclose(positions, [10, 10, 9.75, 9, 4, 0.25, 0, 0])
+
+
+def _trapezoid_samples(
+    start, target, velocity, acceleration_time, started_at=100.0, rate_hz=100, lag=0.0
+):
+    _, _, move_time = ideal_profile(target - start, velocity, acceleration_time)
+    times = started_at + np.arange(0, move_time + 0.5, 1 / rate_hz)
+    positions = ideal_position(
+        times - started_at - lag, start, target, velocity, acceleration_time
+    )
+    return np.column_stack([times, positions]), started_at + move_time + lag
+
+
+def test_analyse_move_of_ideal_axis():
+    samples, done_at = _trapezoid_samples(0, 20, 10, 0.2)
+
+    move = analyse_move(3, samples, 0, 20, 10, 0.2, 100.0, done_at)
+
+    assert move.move == 3
+    assert move.achieved_velocity_deg_s == pytest.approx(10)
+    assert move.duration_s == pytest.approx(2.2)
+    assert move.ideal_duration_s == pytest.approx(2.2)
+    assert move.max_following_error_deg == pytest.approx(0, abs=1e-9)
+    assert move.overshoot_deg == 0
+    assert move.settle_time_s == pytest.approx(0, abs=0.01)
+    assert move.samples == len(samples)
+
+
+def test_analyse_move_measures_lag_overshoot_and_settling():
+    samples, done_at = _trapezoid_samples(0, -20, 5, 0.5, lag=0.1)
+    settling = samples[:, 0] >= done_at
+    ringing = 0.05 * np.exp(-10 * (samples[settling, 0] - samples[settling, 0][0]))
+    samples[settling, 1] -= ringing * np.cos(
+        40 * (samples[settling, 0] - samples[settling, 0][0])
+    )
+
+    move = analyse_move(0, samples, 0, -20, 5, 0.5, 100.0, done_at, tolerance=0.01)
+
+    assert move.achieved_velocity_deg_s == pytest.approx(5)
+    assert move.duration_s == pytest.approx(4.6)
+    # 0.1 s behind the profile at 5 deg/s
+    assert move.max_following_error_deg == pytest.approx(0.5, rel=0.02)
+    assert move.overshoot_deg == pytest.approx(0.05, rel=0.02)
+    assert 0.1 < move.settle_time_s < 0.4
+
+
+def test_analyse_move_which_never_settles():
+    samples, done_at = _trapezoid_samples(0, 10, 10, 0.2)
+    samples[-1, 1] = 10.5
+
+    move = analyse_move(0, samples, 0, 10, 10, 0.2, 100.0, done_at)
+
+    assert np.isnan(move.settle_time_s)
+
+
+def test_analyse_move_without_samples():
+    move = analyse_move(0, np.empty((0, 2)), 0, 10, 10, 0.2, 100.0, 101.2)
+
+    assert np.isnan(move.achieved_velocity_deg_s)
+    assert np.isnan(move.max_following_error_deg)
+    assert np.isnan(move.settle_time_s)
+    assert move.duration_s == pytest.approx(1.2)
+
+
+def _move(distance, velocity, duration, acceleration_time=0.2):
+    return MovePerformance(
+        0, 0, distance, velocity, acceleration_time, velocity, duration, 0, 0, 0, 0, 0
+    )
+
+
+def test_acceleration_model_is_fitted_to_trapezoidal_moves():
+    acceleration, latency = 50.0, 0.05
+    moves = [
+        _move(d, v, d / v + v / acceleration + latency)
+        for v in (5, 10, 20, 40)
+        for d in (300, 600)
+    ]
+    # Too short to reach velocity, so ignored
+    moves.append(_move(1, 40, 100))
+
+    model = fit_acceleration_model(moves)
+
+    assert model is not None
+    assert model.offset_s == pytest.approx(latency)
+    assert model.slope_s2_per_deg == pytest.approx(1 / acceleration)
+    assert model.r_squared == pytest.approx(1)
+    assert model.moves == 8
+    assert model.acceleration_time_s(10) == pytest.approx(0.25)
+    assert model.acceleration_deg_s2(10) == pytest.approx(40)
+    assert model.duration_s(100, 20) == pytest.approx(5.45)
+
+
+def test_acceleration_model_of_fixed_acceleration_time():
+    moves = [_move(300, v, 300 / v + 0.5) for v in (5, 10, 20)]
+
+    model = fit_acceleration_model(moves)
+
+    assert model is not None
+    assert model.slope_s2_per_deg == pytest.approx(0, abs=1e-9)
+    assert model.acceleration_time_s(40) == pytest.approx(0.5)
+
+
+def test_acceleration_model_needs_more_than_one_velocity():
+    assert fit_acceleration_model([_move(300, 10, 30.3), _move(600, 10, 60.3)]) is None
+
+
+class StreamCollector(CallbackBase):
+    def __init__(self):
+        super().__init__()
+        self.descriptors = set()
+        self.moves: list[dict] = []
+
+    def descriptor(self, doc):  # type: ignore
+        if doc["name"] == MOVE_PERFORMANCE_STREAM:
+            self.descriptors.add(doc["uid"])
+
+    def event(self, doc):  # type: ignore
+        if doc["descriptor"] in self.descriptors:
+            self.moves.append(doc["data"])
+
+
+@pytest.fixture
+async def sim_motor() -> SimMotor:
+    async with init_devices():
+        omega = SimMotor(instant=False, units="deg")
+    await omega.acceleration_time.set(0.2)
+    return omega
+
+
+async def test_characterisation_of_sim_motor_is_reported(
+    run_engine: RunEngine, sim_motor: SimMotor, tmp_path: Path
+):
+    collector = StreamCollector()
+    report = GoniometerPerformanceReport(tmp_path)
+    run_engine.subscribe(collector)
+    run_engine.subscribe(report)
+
+    def plan():
+        yield from characterise_axis(
+            sim_motor,  # type: ignore
+            [10.0, 20.0],
+            [8.0, 0.0],
+            settle_window_s=0.05,
+        )
+
+    run_engine(run_wrapper(plan(), md={"subplan_name": GONIOMETER_PERFORMANCE_RUN}))
+
+    assert len(collector.moves) == 4
+    first = collector.moves[0]
+    assert (first["start_deg"], first["target_deg"]) == (0, 8)
+    assert first["ideal_duration_s"] == pytest.approx(1.0)
+    assert first["duration_s"] == pytest.approx(1.0, abs=0.1)
+    assert first["achieved_velocity_deg_s"] == pytest.approx(10, rel=0.05)
+    assert first["overshoot_deg"] == 0
+    assert first["samples"] >= 8
+    assert collector.moves[3]["commanded_velocity_deg_s"] == 20
+
+    [csv_path] = tmp_path.glob("goniometer_performance_*.csv")
+    with open(csv_path) as f:
+        rows = list(csv.DictReader(f))
+    assert [float(r["target_deg"]) for r in rows] == [8, 0, 8, 0]
+    model = json.loads(csv_path.with_suffix(".json").read_text())
+    # The sim motor always takes acceleration_time to reach velocity
+    assert model["offset_s"] == pytest.approx(0.2, abs=0.1)
+    assert model["slope_s2_per_deg"] == pytest.approx(0, abs=0.005)
@@ -68,7 +68,7 @@ def noop_plan():
     side_effect=lambda *args, **kwargs: noop_plan(),
 )
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction"
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction"
 )
 def test_given_ispyb_callback_attached_when_robot_load_and_snapshots_plan_called_then_ispyb_deposited(
     exp_eye: MagicMock,
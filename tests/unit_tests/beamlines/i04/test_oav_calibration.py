@@ -0,0 +1,113 @@
+import pytest
+
+from mx_bluesky.beamlines.i04.oav_centering_plans.oav_calibration import (
+    OavIntensityCalibration,
+    predict_beam_centre,
+    zoom_magnification,
+)
+
+
+@pytest.mark.parametrize("zoom, magnification", [("1.0x", 1), ("7.5x", 7.5), ("2", 2)])
+def test_zoom_magnification(zoom: str, magnification: float):
+    assert zoom_magnification(zoom) == magnification
+
+
+def test_zoom_magnification_of_unknown_name_raises():
+    with pytest.raises(ValueError, match="Cannot get magnification"):
+        zoom_magnification("wide")
+
+
+def test_calibration_predicts_max_pixel_proportional_to_transmission_until_saturated():
+    calibration = OavIntensityCalibration(max_pixel_per_transmission={"1.0x": 1000})
+
+    assert calibration.predict_max_pixel("1.0x", 0.1) == pytest.approx(100)
+    assert calibration.predict_max_pixel("1.0x", 0.5) == 255
+    assert calibration.transmission_for("1.0x", 100) == pytest.approx(0.1)
+    assert calibration.transmission_for("1.0x", 2000) == 1
+
+
+def test_uncalibrated_zoom_is_scaled_from_the_nearest_calibrated_zoom():
+    calibration = OavIntensityCalibration(
+        max_pixel_per_transmission={"1.0x": 1000, "5.0x": 100}
+    )
+
+    assert calibration.can_predict("7.5x")
+    assert calibration.predict_max_pixel("7.5x", 1) == pytest.approx(
+        100 * (5 / 7.5) ** 2
+    )
+    assert calibration.predict_max_pixel("2.0x", 1) == pytest.approx(1000 / 4)
+
+
+@pytest.mark.parametrize(
+    "calibration, zoom, can_predict",
+    [
+        (OavIntensityCalibration(), "1.0x", False),
+        (
+            OavIntensityCalibration(max_pixel_per_transmission={"wide": 10}),
+            "wide",
+            True,
+        ),
+        (
+            OavIntensityCalibration(max_pixel_per_transmission={"1.0x": 10}),
+            "wide",
+            False,
+        ),
+    ],
+)
+def test_calibration_can_predict(
+    calibration: OavIntensityCalibration, zoom: str, can_predict: bool
+):
+    assert calibration.can_predict(zoom) == can_predict
+
+
+@pytest.mark.parametrize(
+    "transmission, max_pixel, expected",
+    [
+        (0.1, 100, {"1.0x": 1000, "7.5x": 1000}),
+        (0.1, 255, {"1.0x": 1000}),
+        (0.1, 0, {"1.0x": 1000}),
+        (0, 10, {"1.0x": 1000}),
+    ],
+)
+def test_calibration_is_updated_with_readings_which_are_not_saturated(
+    transmission: float, max_pixel: float, expected: dict
+):
+    calibration = OavIntensityCalibration(max_pixel_per_transmission={"1.0x": 1000})
+
+    updated = calibration.with_reading("7.5x", transmission, max_pixel)
+
+    assert updated.max_pixel_per_transmission == pytest.approx(expected)
+    assert calibration.max_pixel_per_transmission == {"1.0x": 1000}
+
+
+def test_calibration_is_saved_and_loaded(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    calibration = OavIntensityCalibration(
+        max_pixel_per_transmission={"1.0x": 1000, "7.5x": 20}
+    )
+
+    calibration.save(path)
+
+    assert OavIntensityCalibration.load(path) == calibration
+
+
+def test_missing_calibration_file_loads_empty_calibration(tmp_path):
+    calibration = OavIntensityCalibration.load(str(tmp_path / "missing.json"))
+
+    assert calibration == OavIntensityCalibration()
+
+
+@pytest.mark.parametrize(
+    "zoom, previous_centre, expected_centre",
+    [
+        ("1.0x", (500, 400), (510, 395)),
+        ("2.0x", (520, 380), (540, 370)),
+        ("7.5x", (450, 410), (525, 372.5)),
+    ],
+)
+def test_beam_centre_moves_with_reference_scaled_by_magnification(
+    zoom: str, previous_centre: tuple[float, float], expected_centre: tuple
+):
+    centre = predict_beam_centre(previous_centre, zoom, (600, 300), (610, 295), "1.0x")
+
+    assert centre == pytest.approx(expected_centre)
@@ -1,3 +1,5 @@
+from dataclasses import dataclass, field
+from functools import partial
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import bluesky.plan_stubs as bps
@@ -20,12 +22,16 @@ from dodal.devices.zebra.zebra_controlled_shutter import (
 )
 from ophyd_async.core import (
     AsyncStatus,
+    callback_on_mock_put,
     completed_status,
     get_mock_put,
     init_devices,
     set_mock_value,
 )
 
+from mx_bluesky.beamlines.i04.oav_centering_plans.oav_calibration import (
+    OavIntensityCalibration,
+)
 from mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging import (
     OAV_PREPARE_BEAMLINE_FOR_SCINT_WAIT,
     FindBeamCentresComposite,
@@ -33,6 +39,7 @@ from mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging import (
     find_and_set_beam_centre_at_current_zoom_and_transmission,
     find_beam_centres,
     optimise_transmission_with_oav,
+    optimise_transmission_with_oav_model,
     take_and_save_oav_image,
     take_oav_image_with_scintillator_in,
 )
@@ -1030,3 +1037,304 @@ def test_find_beam_centre_at_current_zoom_and_transmission_does_not_optimise(
     )
 
     assert mock_optimise.call_count == 0
+
+
+@dataclass
+class SyntheticOav:
+    """Gives the brightest pixel and beam centre in the OAV image of a beam on the
+    scintillator at the transmission and zoom level set on the mock devices.
+
+    The beam is spread over more pixels at higher zoom, and its offset from the
+    optical axis of each zoom level is magnified.
+    """
+
+    devices: FindBeamCentresComposite
+    max_pixel_per_transmission_at_1x: float = 2000
+    beam_offset_at_1x: tuple[float, float] = (10, -5)
+    optical_axes: dict[str, tuple[float, float]] = field(
+        default_factory=lambda: {
+            "1.0x": (500, 400),
+            "2.0x": (510, 390),
+            "3.0x": (490, 405),
+            "7.5x": (520, 380),
+        }
+    )
+    zoom: str = "1.0x"
+    transmission: float = 1
+    roi_box_size: int = 300
+    overlay: dict[str, tuple[float, float]] = field(default_factory=dict)
+    max_pixel_triggers: int = 0
+    roi_box_sizes: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        devices = self.devices
+        # The IOC moves the overlay, around which the ROI is drawn, to the centre of
+        # each zoom level when it is selected
+        for i, zoom in enumerate(self.optical_axes):
+            centring_device = devices.zoom_controller.beam_centres[i]
+            set_mock_value(centring_device.level_name, zoom)
+            set_mock_value(centring_device.x_centre, self.optical_axes[zoom][0])
+            set_mock_value(centring_device.y_centre, self.optical_axes[zoom][1])
+            self.overlay[zoom] = self.optical_axes[zoom]
+            callback_on_mock_put(
+                centring_device.x_centre,
+                partial(self._move_overlay, zoom, 0),
+            )
+            callback_on_mock_put(
+                centring_device.y_centre,
+                partial(self._move_overlay, zoom, 1),
+            )
+        callback_on_mock_put(
+            devices.zoom_controller.level,
+            lambda value, wait=True: setattr(self, "zoom", value),
+        )
+        callback_on_mock_put(
+            devices.beam_centre.roi_box_size,
+            lambda value, wait=True: setattr(self, "roi_box_size", value),
+        )
+
+        @AsyncStatus.wrap
+        async def set_transmission(value):
+            self.transmission = value
+            set_mock_value(devices.attenuator.actual_transmission, value)
+
+        devices.attenuator.set = MagicMock(side_effect=set_transmission)
+        devices.max_pixel.trigger.side_effect = self._trigger_max_pixel  # type: ignore
+        devices.beam_centre.trigger.side_effect = self._trigger_beam_centre  # type: ignore
+
+    def magnification(self, zoom: str) -> float:
+        return float(zoom.removesuffix("x"))
+
+    def max_pixel(self, zoom: str, transmission: float) -> float:
+        return min(
+            self.max_pixel_per_transmission_at_1x
+            * transmission
+            / self.magnification(zoom) ** 2,
+            255,
+        )
+
+    def beam_centre(self, zoom: str) -> tuple[float, float]:
+        axis = self.optical_axes[zoom]
+        m = self.magnification(zoom)
+        return (
+            axis[0] + m * self.beam_offset_at_1x[0],
+            axis[1] + m * self.beam_offset_at_1x[1],
+        )
+
+    def _trigger_max_pixel(self):
+        self.max_pixel_triggers += 1
+        set_mock_value(
+            self.devices.max_pixel.max_pixel_val,
+            self.max_pixel(self.zoom, self.transmission),
+        )
+        return completed_status()
+
+    def _move_overlay(self, zoom: str, axis: int, value: float, wait: bool = True):
+        overlay = list(self.overlay[zoom])
+        overlay[axis] = value
+        self.overlay[zoom] = (overlay[0], overlay[1])
+
+    def _trigger_beam_centre(self):
+        self.roi_box_sizes.append(self.roi_box_size)
+        centre = self.beam_centre(self.zoom)
+        overlay = self.overlay[self.zoom]
+        if max(abs(centre[0] - overlay[0]), abs(centre[1] - overlay[1])) > (
+            self.roi_box_size / 2
+        ):
+            raise ValueError("No contours found in image.")
+        set_mock_value(self.devices.beam_centre.center_x_val, centre[0])
+        set_mock_value(self.devices.beam_centre.center_y_val, centre[1])
+        return completed_status()
+
+
+@pytest.fixture
+def synthetic_oav(find_beam_centre_devices: FindBeamCentresComposite) -> SyntheticOav:
+    return SyntheticOav(find_beam_centre_devices)
+
+
+def _optimise_with_model(
+    run_engine: RunEngine,
+    synthetic_oav: SyntheticOav,
+    calibration: OavIntensityCalibration,
+) -> OavIntensityCalibration:
+    devices = synthetic_oav.devices
+    return run_engine(
+        optimise_transmission_with_oav_model(
+            synthetic_oav.zoom,
+            calibration,
+            max_pixel=devices.max_pixel,
+            attenuator=devices.attenuator,
+            xbpm_feedback=devices.xbpm_feedback,
+        )
+    ).plan_result  # type: ignore
+
+
+@pytest.mark.parametrize("zoom", ["1.0x", "7.5x"])
+def test_optimise_transmission_with_calibrated_model_takes_one_measurement(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav, zoom: str
+):
+    synthetic_oav.zoom = zoom
+    calibration = OavIntensityCalibration(
+        max_pixel_per_transmission={"1.0x": 2000, "7.5x": 2000 / 7.5**2}
+    )
+
+    updated = _optimise_with_model(run_engine, synthetic_oav, calibration)
+
+    assert synthetic_oav.max_pixel_triggers == 1
+    target = 0.75 * synthetic_oav.max_pixel(zoom, 1)
+    assert synthetic_oav.max_pixel(zoom, synthetic_oav.transmission) == pytest.approx(
+        target
+    )
+    assert updated.max_pixel_per_transmission[zoom] == pytest.approx(
+        2000 / synthetic_oav.magnification(zoom) ** 2
+    )
+
+
+def test_optimise_transmission_with_model_corrects_poor_calibration_in_closed_loop(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav
+):
+    # The beam is half as bright as when calibrated, but still saturates at 100%
+    synthetic_oav.max_pixel_per_transmission_at_1x = 1000
+    calibration = OavIntensityCalibration(max_pixel_per_transmission={"1.0x": 2000})
+
+    updated = _optimise_with_model(run_engine, synthetic_oav, calibration)
+
+    assert synthetic_oav.max_pixel_triggers == 2
+    assert synthetic_oav.max_pixel("1.0x", synthetic_oav.transmission) == pytest.approx(
+        0.75 * 255
+    )
+    assert updated.max_pixel_per_transmission["1.0x"] == pytest.approx(1000)
+
+
+@pytest.mark.parametrize(
+    "calibration",
+    [
+        OavIntensityCalibration(),
+        # Predicts transmission which saturates the OAV
+        OavIntensityCalibration(max_pixel_per_transmission={"1.0x": 20}),
+    ],
+)
+def test_optimise_transmission_with_model_searches_when_it_cannot_predict(
+    run_engine: RunEngine,
+    synthetic_oav: SyntheticOav,
+    calibration: OavIntensityCalibration,
+):
+    updated = _optimise_with_model(run_engine, synthetic_oav, calibration)
+
+    assert synthetic_oav.max_pixel_triggers > 2
+    # Learnt from the end of the search, so next time it can be predicted
+    assert updated.max_pixel_per_transmission["1.0x"] == pytest.approx(2000)
+    synthetic_oav.max_pixel_triggers = 0
+    _optimise_with_model(run_engine, synthetic_oav, updated)
+    assert synthetic_oav.max_pixel_triggers == 1
+
+
+@patch(
+    "mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging._prepare_beamline_for_scintillator_images",
+    new=MagicMock(),
+)
+async def test_find_beam_centres_optimises_with_stored_calibration_and_updates_it(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav, tmp_path
+):
+    calibration_file = str(tmp_path / "oav_intensity_calibration.json")
+
+    run_engine(
+        find_beam_centres(
+            intensity_calibration_file=calibration_file,
+            composite=synthetic_oav.devices,
+        )
+    )
+    searched_triggers = synthetic_oav.max_pixel_triggers
+    calibration = OavIntensityCalibration.load(calibration_file)
+    assert set(calibration.max_pixel_per_transmission) == {"1.0x", "7.5x"}
+
+    synthetic_oav.max_pixel_triggers = 0
+    run_engine(
+        find_beam_centres(
+            intensity_calibration_file=calibration_file,
+            composite=synthetic_oav.devices,
+        )
+    )
+
+    assert synthetic_oav.max_pixel_triggers == 2 < searched_triggers
+
+
+@patch(
+    "mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging._prepare_beamline_for_scintillator_images",
+    new=MagicMock(),
+)
+async def test_find_beam_centres_refines_centres_predicted_from_first_zoom(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav
+):
+    # Too far for the default ROI at high zoom without predicting where it moved to
+    synthetic_oav.beam_offset_at_1x = (25, -22)
+    devices = synthetic_oav.devices
+    set_mock_value(devices.beam_centre.roi_box_size, 300)
+
+    run_engine(
+        find_beam_centres(
+            zoom_levels_to_optimise_transmission=(),
+            refine_roi_box_size=40,
+            composite=devices,
+        )
+    )
+
+    for i, zoom in enumerate(synthetic_oav.optical_axes):
+        centring_device = devices.zoom_controller.beam_centres[i]
+        expected_x, expected_y = synthetic_oav.beam_centre(zoom)
+        assert await centring_device.x_centre.get_value() == round(expected_x)
+        assert await centring_device.y_centre.get_value() == round(expected_y)
+    assert synthetic_oav.roi_box_sizes == [300, 40, 40, 40]
+    assert await devices.beam_centre.roi_box_size.get_value() == 300
+
+
+@patch(
+    "mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging._prepare_beamline_for_scintillator_images",
+    new=MagicMock(),
+)
+async def test_find_beam_centres_restores_roi_and_saves_calibration_when_it_fails(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav, tmp_path
+):
+    calibration_file = str(tmp_path / "oav_intensity_calibration.json")
+    devices = synthetic_oav.devices
+    set_mock_value(devices.beam_centre.roi_box_size, 300)
+    trigger_beam_centre = devices.beam_centre.trigger.side_effect  # type: ignore
+
+    def fail_at_3x():
+        if synthetic_oav.zoom == "3.0x":
+            raise ValueError("No contours found in image.")
+        return trigger_beam_centre()
+
+    devices.beam_centre.trigger.side_effect = fail_at_3x  # type: ignore
+
+    with pytest.raises(ValueError, match="No contours"):
+        run_engine(
+            find_beam_centres(
+                intensity_calibration_file=calibration_file,
+                refine_roi_box_size=40,
+                composite=devices,
+            )
+        )
+
+    assert await devices.beam_centre.roi_box_size.get_value() == 300
+    calibration = OavIntensityCalibration.load(calibration_file)
+    assert set(calibration.max_pixel_per_transmission) == {"1.0x"}
+
+
+@patch(
+    "mx_bluesky.beamlines.i04.oav_centering_plans.oav_imaging._prepare_beamline_for_scintillator_images",
+    new=MagicMock(),
+)
+def test_find_beam_centres_without_prediction_fails_when_beam_moved_far_at_high_zoom(
+    run_engine: RunEngine, synthetic_oav: SyntheticOav
+):
+    synthetic_oav.beam_offset_at_1x = (25, -22)
+    set_mock_value(synthetic_oav.devices.beam_centre.roi_box_size, 300)
+
+    with pytest.raises(ValueError, match="No contours"):
+        run_engine(
+            find_beam_centres(
+                zoom_levels_to_optimise_transmission=(),
+                composite=synthetic_oav.devices,
+            )
+        )
@@ -8,7 +8,13 @@ from dodal.devices.motors import SixAxisGonio
 from dodal.devices.positioner import Positioner1D
 from ophyd_async.core import get_mock_put, init_devices
 
-from mx_bluesky.beamlines.i23.serial import one_nd_step, serial_collection
+from mx_bluesky.beamlines.i23.serial import (
+    OMEGA_WEDGES_STREAM,
+    OmegaRotations,
+    OmegaWedge,
+    one_nd_step,
+    serial_collection,
+)
 
 
 @pytest.fixture
@@ -166,3 +172,100 @@ async def test_serial_collection_can_run_in_real_run_engine(
     )
     assert get_mock_put(mock_gonio.x.user_setpoint).call_count == 4 * 4 + 1
     assert get_mock_put(mock_gonio.y.user_setpoint).call_count == 4 * 4 + 1
+
+
+def _sets_of(msgs, name: str) -> list:
+    return [
+        msg.args[0] for msg in msgs if msg.command == "set" and msg.obj.name == name
+    ]
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_omega_velocity_only_set_when_it_changes(
+    bidirectional: bool,
+    sim_run_engine: RunEngineSimulator,
+    mock_detector_motion: Positioner1D,
+    mock_gonio: SixAxisGonio,
+):
+    sim_run_engine.add_read_handler_for(mock_gonio.omega.max_velocity, 90)
+    msgs = sim_run_engine.simulate_plan(
+        serial_collection(
+            4, 5, 0.1, 0.1, 30, 1.0, mock_detector_motion, mock_gonio, bidirectional
+        )
+    )
+
+    omega_moves = _sets_of(msgs, "gonio-omega")
+    velocity_moves = _sets_of(msgs, "gonio-omega-velocity")
+    if bidirectional:
+        # Rewound once before the first point, then one rotation per point
+        assert omega_moves == [0] + [30, 0] * 10
+        assert velocity_moves == [90, 1.0]
+    else:
+        assert omega_moves == [0, 30] * 20
+        assert velocity_moves == [90, 1.0] * 20
+
+
+def test_bidirectional_collection_does_not_move_omega_while_moving_to_point(
+    sim_run_engine: RunEngineSimulator,
+    mock_gonio: SixAxisGonio,
+):
+    rotations = OmegaRotations(30, bidirectional=True)
+    step = {mock_gonio.x: 0.1, mock_gonio.y: 0.1}
+    sim_run_engine.simulate_plan(
+        one_nd_step([], step, MagicMock(), mock_gonio.omega, 30, 1.0, rotations)
+    )
+
+    msgs = sim_run_engine.simulate_plan(
+        one_nd_step([], step, MagicMock(), mock_gonio.omega, 30, 1.0, rotations)
+    )
+
+    msgs = assert_message_and_return_remaining(
+        msgs, lambda msg: msg.command == "set" and msg.obj.name == "gonio-y"
+    )
+    msgs = assert_message_and_return_remaining(msgs, lambda msg: msg.command == "wait")
+    assert _sets_of(msgs, "gonio-omega") == [0]
+    assert _sets_of(msgs, "gonio-omega-velocity") == []
+    assert rotations.wedges == [OmegaWedge(0, 0, 30), OmegaWedge(1, 30, 0)]
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+async def test_serial_collection_emits_start_and_end_of_each_rotation(
+    bidirectional: bool,
+    run_engine: RunEngine,
+    mock_detector_motion: Positioner1D,
+    mock_gonio: SixAxisGonio,
+):
+    docs = []
+    run_engine.subscribe(lambda name, doc: docs.append((name, doc)))
+
+    run_engine(
+        serial_collection(
+            3, 2, 0.1, 0.1, 20, 1.0, mock_detector_motion, mock_gonio, bidirectional
+        )
+    )
+
+    [descriptor] = [
+        doc
+        for name, doc in docs
+        if name == "descriptor" and doc["name"] == OMEGA_WEDGES_STREAM
+    ]
+    wedges = [
+        doc["data"]
+        for name, doc in docs
+        if name == "event" and doc["descriptor"] == descriptor["uid"]
+    ]
+    assert [w["point"] for w in wedges] == list(range(6))
+    if bidirectional:
+        assert [(w["omega_start_deg"], w["omega_end_deg"]) for w in wedges] == [
+            (0, 20),
+            (20, 0),
+        ] * 3
+        assert [w["direction"] for w in wedges] == [1, -1] * 3
+    else:
+        assert all(w["omega_start_deg"] == 0 for w in wedges)
+        assert all(w["direction"] == 1 for w in wedges)
+    omega_puts = [
+        c.args[0] for c in get_mock_put(mock_gonio.omega.user_setpoint).mock_calls
+    ]
+    assert omega_puts[-1] == (0 if bidirectional else 20)
+    assert len(omega_puts) == (7 if bidirectional else 12)
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
 
 import pytest
 from dodal.beamlines import i24
@@ -20,6 +21,18 @@ from dodal.devices.hutch_shutter import (
 from dodal.devices.motors import YZStage
 from ophyd_async.core import callback_on_mock_put, set_mock_value
 
+from mx_bluesky.beamlines.i24.serial.dcid_outbox import DcidOutbox
+
+
+@pytest.fixture(autouse=True)
+def dcid_outbox(tmp_path) -> Iterator[DcidOutbox]:
+    # Keep notifications for any real DCID out of /scratch, and don't send them
+    outbox = DcidOutbox(tmp_path / "dcid_outbox.sqlite")
+    with patch(
+        "mx_bluesky.beamlines.i24.serial.dcid.get_default_outbox", return_value=outbox
+    ):
+        yield outbox
+
 
 @pytest.fixture
 def shutter() -> InterlockedHutchShutter:
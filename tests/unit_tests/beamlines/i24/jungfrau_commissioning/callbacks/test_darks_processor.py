@@ -0,0 +1,105 @@
+import threading
+from pathlib import Path
+
+import bluesky.preprocessors as bpp
+import h5py
+import numpy as np
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.devices.beamlines.i24.commissioning_jungfrau import (
+    CommissioningJungfrauDetector,
+)
+from ophyd_async.core import set_mock_value
+
+from mx_bluesky.beamlines.i24.jungfrau_commissioning.callbacks.darks_processor import (
+    DarksProcessor,
+)
+from mx_bluesky.beamlines.i24.jungfrau_commissioning.experiment_plans.do_darks import (
+    PEDESTAL_DARKS_RUN,
+)
+from mx_bluesky.beamlines.i24.parameters.constants import PlanNameConstants
+from mx_bluesky.common.experiment_plans.inner_plans.read_hardware import (
+    read_hardware_plan,
+)
+
+
+@pytest.fixture
+def darks_file(tmp_path: Path, jungfrau: CommissioningJungfrauDetector) -> Path:
+    set_mock_value(jungfrau.writer.file_path, str(tmp_path))
+    set_mock_value(jungfrau.writer.file_name, "pedestal_darks")
+    path = tmp_path / "pedestal_darks.h5"
+    rng = np.random.default_rng(0)
+    with h5py.File(path, "w") as f:
+        f.create_dataset(
+            "data", data=rng.integers(2000, 2100, (20, 8, 8)).astype(np.uint16)
+        )
+    return path
+
+
+def _darks_plan(jungfrau: CommissioningJungfrauDetector, fail: bool = False):
+    @bpp.run_decorator(md={"subplan_name": PEDESTAL_DARKS_RUN})
+    def plan():
+        yield from read_hardware_plan(
+            [jungfrau.writer.file_path, jungfrau.writer.file_name],
+            PlanNameConstants.DARKS_DEVICE_READ,
+        )
+        if fail:
+            raise RuntimeError("Acquisition failed")
+
+    return plan()
+
+
+def test_darks_are_processed_after_darks_run(
+    run_engine: RunEngine, jungfrau: CommissioningJungfrauDetector, darks_file: Path
+):
+    processor = DarksProcessor((PEDESTAL_DARKS_RUN,))
+    run_engine.subscribe(processor)
+
+    run_engine(_darks_plan(jungfrau))
+
+    [output] = processor.wait(timeout=10)
+    assert output == darks_file.parent / "pedestal_darks_pedestal_001.h5"
+    with h5py.File(output) as f:
+        assert f.attrs["source"] == str(darks_file)
+        assert f["pedestal_adu"].shape == (3, 8, 8)  # type: ignore
+
+
+def test_darks_are_not_processed_after_failed_run(
+    run_engine: RunEngine, jungfrau: CommissioningJungfrauDetector, darks_file: Path
+):
+    processor = DarksProcessor((PEDESTAL_DARKS_RUN,))
+    run_engine.subscribe(processor)
+
+    with pytest.raises(RuntimeError):
+        run_engine(_darks_plan(jungfrau, fail=True))
+
+    assert processor.wait(timeout=10) == []
+
+
+def test_other_runs_are_not_processed(
+    run_engine: RunEngine, jungfrau: CommissioningJungfrauDetector, darks_file: Path
+):
+    processor = DarksProcessor(("SOME OTHER RUN",))
+    run_engine.subscribe(processor)
+
+    run_engine(_darks_plan(jungfrau))
+
+    assert processor.wait(timeout=10) == []
+
+
+def test_darks_processors_share_one_thread(
+    run_engine: RunEngine, jungfrau: CommissioningJungfrauDetector, darks_file: Path
+):
+    for _ in range(3):
+        processor = DarksProcessor((PEDESTAL_DARKS_RUN,))
+        token = run_engine.subscribe(processor)
+        run_engine(_darks_plan(jungfrau))
+        processor.wait(timeout=10)
+        run_engine.unsubscribe(token)
+
+    darks_threads = [
+        thread
+        for thread in threading.enumerate()
+        if thread.name.startswith("darks-processor")
+    ]
+    assert len(darks_threads) == 1
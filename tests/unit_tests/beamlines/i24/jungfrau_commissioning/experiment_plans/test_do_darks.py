@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock, MagicMock, call, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, call, patch
 
 import bluesky.plan_stubs as bps
 import bluesky.preprocessors as bpp
@@ -37,6 +37,8 @@ class CheckMonitor(CallbackBase):
 
     def event(self, doc):
         key, value = next(iter(doc["data"].items()))
+        if key not in self.signals_and_values:
+            return doc
         # don't record a value changing to the same value
         if (
             not len(self.signals_and_values[key])
@@ -207,6 +209,7 @@ def test_do_non_pedestal_darks_triggers_correct_plans(
             gain_mode,
             wait=True,
             log_on_percentage_prefix=f"Jungfrau {gain_mode} gain mode darks triggers received",
+            read_hardware_after_prepare_plan=ANY,
         ),
         call.jungfrau_unstage(),
     ]
@@ -0,0 +1,245 @@
+import json
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+
+from mx_bluesky.beamlines.i24.jungfrau_commissioning.darks_processing import (
+    ADC_MASK,
+    GAIN_STAGE_BITS,
+    PEDESTAL_FILE_FORMAT_VERSION,
+    BadPixelThresholds,
+    PedestalAccumulator,
+    PixelFlag,
+    compute_pedestal_maps,
+    iter_frame_chunks,
+    process_darks,
+)
+
+# A Jungfrau module is 512 x 1024 pixels, these are scaled down to keep tests fast
+PIXEL_SHAPE = (64, 128)
+PEDESTALS_ADU = (3000.0, 13000.0, 14000.0)
+NOISE_ADU = (12.0, 4.0, 2.0)
+
+
+def _encode(gain_stage: np.ndarray, adc: np.ndarray) -> np.ndarray:
+    bits = np.asarray(GAIN_STAGE_BITS, dtype=np.uint16)[gain_stage]
+    return (bits << 14) | (np.clip(np.rint(adc), 0, ADC_MASK).astype(np.uint16))
+
+
+def pedestal_mode_stages(frames: int, loops: int) -> np.ndarray:
+    """Gain stage of each frame of a pedestal mode acquisition, see do_pedestal_darks:
+    frames - 1 in dynamic gain then one forced to G1, repeated loops times, then the
+    same again forcing G2."""
+    loop = [0] * (frames - 1)
+    return np.array((loop + [1]) * loops + (loop + [2]) * loops)
+
+
+def make_darks(
+    stages: np.ndarray,
+    pixel_shape=PIXEL_SHAPE,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Synthetic raw frames with a different pedestal for every pixel and stage.
+
+    Returns:
+        The raw frames and the true pedestal of each stage.
+    """
+    rng = np.random.default_rng(seed)
+    true_pedestals = np.stack(
+        [rng.normal(p, 0.02 * p, pixel_shape) for p in PEDESTALS_ADU]
+    )
+    gain_stage = np.broadcast_to(
+        stages[:, None, None], (len(stages), *pixel_shape)
+    ).copy()
+    adc = (
+        true_pedestals[gain_stage, *np.indices(pixel_shape)]
+        + rng.normal(0, 1, gain_stage.shape) * np.asarray(NOISE_ADU)[gain_stage]
+    )
+    return _encode(gain_stage, adc), true_pedestals
+
+
+def write_darks(path: Path, raw: np.ndarray, chunks=True) -> Path:
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=raw, chunks=chunks)
+    return path
+
+
+def _numpy_stats(raw: np.ndarray):
+    bits = raw >> 14
+    adc = (raw & ADC_MASK).astype(np.float64)
+    means, stds = [], []
+    for stage_bits in GAIN_STAGE_BITS:
+        values = np.ma.masked_array(adc, bits != stage_bits)
+        means.append(values.mean(axis=0).filled(np.nan))
+        stds.append(values.std(axis=0).filled(np.nan))
+    return np.stack(means), np.stack(stds)
+
+
+@pytest.mark.parametrize("chunk_frames", [1, 7, 64, 1000])
+def test_chunked_welford_matches_whole_array_statistics(chunk_frames: int):
+    raw, _ = make_darks(pedestal_mode_stages(10, 4), pixel_shape=(8, 16))
+    accumulator = PedestalAccumulator((8, 16))
+
+    for start in range(0, len(raw), chunk_frames):
+        accumulator.add_frames(raw[start : start + chunk_frames])
+
+    expected_mean, expected_std = _numpy_stats(raw)
+    np.testing.assert_allclose(accumulator.pedestal, expected_mean, rtol=1e-12)
+    np.testing.assert_allclose(accumulator.rms, expected_std, rtol=1e-9, atol=1e-9)
+    assert accumulator.frames == 80
+    assert (accumulator.count.sum(axis=0) == 80).all()
+    np.testing.assert_array_equal(accumulator.count[1], 4)
+
+
+def test_welford_is_stable_for_small_noise_on_large_pedestal():
+    rng = np.random.default_rng(3)
+    adc = 16000 + rng.integers(0, 2, (5000, 2, 2))
+    accumulator = PedestalAccumulator((2, 2))
+
+    for chunk in np.array_split(adc.astype(np.uint16), 50):
+        accumulator.add_frames(chunk)
+
+    np.testing.assert_allclose(accumulator.rms[0], adc.std(axis=0), rtol=1e-10)
+
+
+def test_accumulator_rejects_frames_of_wrong_shape():
+    with pytest.raises(ValueError, match="do not match"):
+        PedestalAccumulator((4, 4)).add_frames(np.zeros((2, 4, 5), dtype=np.uint16))
+
+
+def test_pedestal_maps_recover_pedestals_and_noise_of_each_gain_stage(tmp_path):
+    raw, true_pedestals = make_darks(pedestal_mode_stages(20, 20))
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    maps = compute_pedestal_maps(path, max_chunk_bytes=1024**2)
+
+    # 400 G0 frames for each pixel, but only 20 in G1 and G2
+    for stage, frames in enumerate((760, 20, 20)):
+        standard_error = NOISE_ADU[stage] / np.sqrt(frames)
+        assert np.all(maps.frame_count[stage] == frames)
+        np.testing.assert_allclose(
+            maps.pedestal_adu[stage], true_pedestals[stage], atol=6 * standard_error
+        )
+        assert np.median(maps.rms_adu[stage]) == pytest.approx(
+            NOISE_ADU[stage], rel=0.1
+        )
+    assert maps.frames == 800
+    assert maps.bad_pixel_fraction == 0
+
+
+def test_bad_pixels_are_flagged(tmp_path):
+    stages = pedestal_mode_stages(20, 20)
+    raw, _ = make_darks(stages)
+    rng = np.random.default_rng(5)
+    g0_frames = stages == 0
+    # Very noisy in G0
+    raw[g0_frames, 1, 1] = _encode(
+        np.zeros(g0_frames.sum(), dtype=int), 3000 + rng.normal(0, 200, g0_frames.sum())
+    )
+    # Stuck at a single value
+    raw[:, 2, 2] = _encode(np.zeros(len(stages), dtype=int), np.full(len(stages), 3000))
+    # Never switches out of G0
+    raw[:, 3, 3] = _encode(np.zeros(len(stages), dtype=int), np.full(len(stages), 3000))
+    raw[::2, 3, 3] += 1
+    # Reports a gain which doesn't exist
+    raw[5, 4, 4] = (0b10 << 14) | 3000
+    # Pedestal near zero in G0
+    raw[g0_frames, 5, 5] = _encode(
+        np.zeros(g0_frames.sum(), dtype=int), 20 + rng.normal(0, 10, g0_frames.sum())
+    )
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    mask = compute_pedestal_maps(path).mask
+
+    assert mask[1, 1] == PixelFlag.NOISY_G0
+    assert mask[2, 2] == PixelFlag.NO_NOISE_G0 | PixelFlag.NO_DATA_G1 | (
+        PixelFlag.NO_DATA_G2
+    )
+    assert mask[3, 3] == PixelFlag.NO_DATA_G1 | PixelFlag.NO_DATA_G2
+    assert mask[4, 4] == PixelFlag.INVALID_GAIN
+    assert mask[5, 5] == PixelFlag.PEDESTAL_OUT_OF_RANGE
+    assert np.count_nonzero(mask) == 5
+
+
+def test_only_gain_stages_present_in_darks_need_data(tmp_path):
+    # Standard darks with the gain forced to G1 throughout
+    raw, _ = make_darks(np.ones(50, dtype=int))
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    maps = compute_pedestal_maps(path)
+
+    assert maps.bad_pixel_fraction == 0
+    assert np.isnan(maps.pedestal_adu[0]).all()
+    assert np.all(maps.frame_count[1] == 50)
+
+
+def test_thresholds_can_be_changed(tmp_path):
+    raw, _ = make_darks(np.zeros(30, dtype=int))
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    maps = compute_pedestal_maps(
+        path, thresholds=BadPixelThresholds(pedestal_range_adu=(3000, 16000))
+    )
+
+    out_of_range = maps.mask == PixelFlag.PEDESTAL_OUT_OF_RANGE
+    np.testing.assert_array_equal(out_of_range, maps.pedestal_adu[0] < 3000)
+    assert 0.3 < out_of_range.mean() < 0.7
+
+
+@pytest.mark.parametrize(
+    "max_chunk_bytes, expected_chunks", [(1, 10), (64 * 128 * 16 * 3, 4), (10**9, 1)]
+)
+def test_frames_are_read_in_chunks_bounded_by_memory(
+    tmp_path, max_chunk_bytes: int, expected_chunks: int
+):
+    raw, _ = make_darks(np.zeros(10, dtype=int))
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    with h5py.File(path) as f:
+        chunks = list(iter_frame_chunks(f["data"], max_chunk_bytes))  # type: ignore
+
+    assert len(chunks) == expected_chunks
+    np.testing.assert_array_equal(np.concatenate(chunks), raw)
+
+
+def test_full_size_module_is_processed(tmp_path):
+    raw, true_pedestals = make_darks(np.zeros(3, dtype=int), pixel_shape=(512, 1024))
+    path = write_darks(tmp_path / "darks.h5", raw, chunks=(1, 512, 1024))
+
+    maps = compute_pedestal_maps(path, max_chunk_bytes=16 * 1024**2)
+
+    assert maps.pedestal_adu.shape == (3, 512, 1024)
+    assert maps.mask.shape == (512, 1024)
+    np.testing.assert_allclose(maps.pedestal_adu[0], true_pedestals[0], atol=40)
+
+
+def test_process_darks_writes_new_version_each_time(tmp_path):
+    raw, _ = make_darks(pedestal_mode_stages(20, 20))
+    path = write_darks(tmp_path / "pedestal_darks.h5", raw)
+    output_directory = tmp_path / "processed"
+    output_directory.mkdir()
+
+    first = process_darks(path, output_directory)
+    second = process_darks(path, output_directory)
+
+    assert first.name == "pedestal_darks_pedestal_001.h5"
+    assert second.name == "pedestal_darks_pedestal_002.h5"
+    with h5py.File(second) as f:
+        assert f.attrs["format_version"] == PEDESTAL_FILE_FORMAT_VERSION
+        assert f.attrs["source"] == str(path)
+        assert f.attrs["frames"] == 800
+        assert json.loads(f.attrs["thresholds"])["min_frames"] == 10  # type: ignore
+        assert json.loads(f.attrs["mask_flags"])["INVALID_GAIN"] == 1 << 10  # type: ignore
+        assert f["pedestal_adu"].shape == (3, *PIXEL_SHAPE)  # type: ignore
+        assert f["rms_adu"].dtype == np.float32  # type: ignore
+        assert f["frame_count"][1, 0, 0] == 20  # type: ignore
+        assert f["mask"].shape == PIXEL_SHAPE  # type: ignore
+
+
+def test_process_darks_writes_alongside_darks_by_default(tmp_path):
+    raw, _ = make_darks(np.zeros(20, dtype=int))
+    path = write_darks(tmp_path / "darks.h5", raw)
+
+    assert process_darks(path) == tmp_path / "darks_pedestal_001.h5"
@@ -33,6 +33,8 @@ class CheckMonitor(CallbackBase):
 
     def event(self, doc):
         key, value = next(iter(doc["data"].items()))
+        if key not in self.signals_and_values:
+            return doc
         self.signals_and_values[key].append(value)
         return doc
 
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import cv2 as cv
+import numpy as np
 import pytest
 
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import (
@@ -19,6 +21,40 @@ TEST_LUT = {
     DetectorName.EIGER: TEST_PATH / "lookup/test_det_dist_converter.txt",
 }
 
+FIDUCIAL_TEMPLATE_SIZE = 41
+
+
+def draw_fiducial_mark(
+    shape: tuple[int, int],
+    centre: tuple[float, float],
+    noise: float = 0.0,
+    seed: int = 0,
+) -> np.ndarray:
+    """Draw a synthetic fiducial mark, a ring with two spokes, centred on the given
+    x, y pixel position to sub-pixel precision."""
+    image = np.full(shape, 100, dtype=np.uint8)
+
+    def subpixel(x: float, y: float) -> tuple[int, int]:
+        return round(x * 16), round(y * 16)
+
+    x, y = centre
+    drawing = {"color": 220, "thickness": 2, "lineType": cv.LINE_AA, "shift": 4}
+    cv.circle(image, subpixel(x, y), 8 * 16, **drawing)
+    cv.line(image, subpixel(x, y), subpixel(x + 14, y), **drawing)
+    cv.line(image, subpixel(x, y), subpixel(x, y + 14), **drawing)
+    if noise:
+        noisy = image + np.random.default_rng(seed).normal(0, noise, shape)
+        image = np.clip(noisy, 0, 255).astype(np.uint8)
+    return image
+
+
+@pytest.fixture
+def fiducial_template() -> np.ndarray:
+    centre = (FIDUCIAL_TEMPLATE_SIZE - 1) / 2
+    return draw_fiducial_mark(
+        (FIDUCIAL_TEMPLATE_SIZE, FIDUCIAL_TEMPLATE_SIZE), (centre, centre)
+    )
+
 
 @pytest.fixture
 def dummy_params_with_pp():
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.block_alignment import (
+    BlockAlignment,
+    BlockCheckReport,
+    TemplateMatch,
+    fit_alignment_correction,
+    load_greyscale_image,
+    locate_template,
+)
+
+from .conftest import draw_fiducial_mark
+
+
+@pytest.mark.parametrize(
+    "centre", [(320.0, 240.0), (101.25, 380.5), (550.75, 60.25), (33.5, 27.0)]
+)
+@pytest.mark.parametrize("noise", [0.0, 8.0])
+def test_locate_template_finds_mark_to_sub_pixel_precision(
+    centre: tuple[float, float], noise: float, fiducial_template: np.ndarray
+):
+    image = draw_fiducial_mark((480, 640), centre, noise=noise)
+
+    match = locate_template(image, fiducial_template)
+
+    assert match.x_px == pytest.approx(centre[0], abs=0.3)
+    assert match.y_px == pytest.approx(centre[1], abs=0.3)
+    assert match.score > 0.8
+
+
+def test_locate_template_gives_low_score_when_mark_is_absent(
+    fiducial_template: np.ndarray,
+):
+    image = np.random.default_rng(1).normal(100, 8, (480, 640)).astype(np.uint8)
+
+    assert locate_template(image, fiducial_template).score < 0.5
+
+
+def test_locate_template_rejects_template_larger_than_image(
+    fiducial_template: np.ndarray,
+):
+    with pytest.raises(ValueError, match="larger than image"):
+        locate_template(np.zeros((20, 640)), fiducial_template)
+
+
+def test_load_greyscale_image_converts_colour_images(tmp_path):
+    rgb = np.zeros((4, 6, 3), dtype=np.uint8)
+    rgb[..., 1] = 255
+    path = tmp_path / "image.png"
+    Image.fromarray(rgb).save(path)
+
+    image = load_greyscale_image(path)
+
+    assert image.shape == (4, 6)
+    assert np.all(image == image[0, 0]) and image[0, 0] > 0
+
+
+def _blocks_with_offsets(
+    targets: list[tuple[float, float]],
+    rotation_deg: float,
+    translation: tuple[float, float],
+    scale: float = 1.0,
+) -> list[BlockAlignment]:
+    angle = np.radians(rotation_deg)
+    rotation = scale * np.array(
+        [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    )
+    blocks = []
+    for i, target in enumerate(targets):
+        found = rotation @ np.array(target) + np.array(translation)
+        offset = tuple(found - np.array(target))
+        blocks.append(
+            BlockAlignment(
+                f"{i + 1:02d}", target, target, True, TemplateMatch(0, 0, 1), offset
+            )
+        )
+    return blocks
+
+
+GRID_TARGETS = [(x, y) for x in (0.0, 12.7, 25.4) for y in (0.0, 12.7, 25.4)]
+
+
+@pytest.mark.parametrize(
+    "rotation_deg, translation, scale",
+    [(0.0, (0.01, -0.02), 1.0), (0.1, (0.0, 0.0), 1.0), (-0.05, (0.03, 0.01), 1.001)],
+)
+def test_fit_alignment_correction_recovers_rotation_and_shift(
+    rotation_deg: float, translation: tuple[float, float], scale: float
+):
+    blocks = _blocks_with_offsets(GRID_TARGETS, rotation_deg, translation, scale)
+
+    correction = fit_alignment_correction(blocks)
+
+    assert correction is not None
+    assert correction.rotation_deg == pytest.approx(rotation_deg, abs=1e-6)
+    assert correction.translation_mm == pytest.approx(translation, abs=1e-9)
+    assert correction.scale == pytest.approx((scale, scale), abs=1e-9)
+    assert correction.rms_residual_mm == pytest.approx(0, abs=1e-9)
+    assert correction.num_blocks == 9
+
+
+def test_fit_alignment_correction_ignores_blocks_without_offsets():
+    blocks = _blocks_with_offsets(GRID_TARGETS, 0.1, (0.01, 0.0))
+    blocks[4] = BlockAlignment("05", (12.7, 12.7), (12.7, 12.7), True)
+
+    correction = fit_alignment_correction(blocks)
+
+    assert correction is not None
+    assert correction.num_blocks == 8
+    assert correction.rotation_deg == pytest.approx(0.1, abs=1e-6)
+
+
+def test_fit_alignment_correction_with_collinear_blocks_gives_mean_shift():
+    blocks = _blocks_with_offsets([(0.0, y) for y in (0.0, 3.175, 6.35)], 0, (0, 0))
+    blocks = [
+        BlockAlignment(b.block, b.target_mm, b.reached_mm, True, b.match, offset)
+        for b, offset in zip(
+            blocks, [(0.01, 0.0), (0.02, 0.0), (0.03, 0.0)], strict=True
+        )
+    ]
+
+    correction = fit_alignment_correction(blocks)
+
+    assert correction is not None
+    assert correction.translation_mm == pytest.approx((0.02, 0.0))
+    assert correction.rotation_deg == 0
+    assert correction.rms_residual_mm == pytest.approx(np.sqrt(2 / 3) * 0.01)
+
+
+def test_fit_alignment_correction_without_located_blocks_is_none():
+    blocks = [BlockAlignment("01", (0.0, 0.0), (0.0, 0.0), True)]
+
+    assert fit_alignment_correction(blocks) is None
+
+
+def test_report_format_lists_every_block_and_the_correction():
+    blocks = _blocks_with_offsets(GRID_TARGETS, 0.1, (0.01, 0.0))
+    blocks[1] = BlockAlignment("02", (0.0, 12.7), (0.0, 12.69), False)
+    report = BlockCheckReport(tuple(blocks), aborted=True)
+
+    lines = report.format().splitlines()
+
+    assert len(lines) == 1 + 9 + 3
+    assert lines[2].startswith("02") and "*" in lines[2]
+    assert lines[-3] == "* 1 blocks were not reached"
+    assert lines[-2] == "Block check was aborted"
+    assert lines[-1].startswith("Suggested correction from 8 blocks")
@@ -0,0 +1,177 @@
+import random
+import string
+
+import numpy as np
+import pytest
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.chip_geometry import (
+    ChipGeometry,
+    Traversal,
+)
+from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import ChipType
+from mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_startup_py3v1 import (
+    get_alphanumeric,
+    zippum,
+)
+from mx_bluesky.beamlines.i24.serial.parameters import get_chip_format
+
+STOCK_CHIPS = [ChipType.Oxford, ChipType.OxfordInner, ChipType.Minichip]
+
+
+def _list_alphanumeric(blk_num: int, wnd_num: int) -> list[str]:
+    """The addresses as built from lists before the chip geometry model."""
+    uppercase_list = list(string.ascii_uppercase)[:blk_num]
+    lowercase_list = list(string.ascii_lowercase + string.ascii_uppercase + "0")[
+        :wnd_num
+    ]
+    number_list = [str(x) for x in range(1, blk_num + 1)]
+    block_list = zippum([uppercase_list, "expand", 0], [number_list, "typewriter", 0])
+    window_list = zippum(
+        [lowercase_list, "expand", 0], [lowercase_list, "typewriter", 0]
+    )
+    return [block + "_" + window for block in block_list for window in window_list]
+
+
+def _list_oxford_block_numbers() -> dict[str, str]:
+    """The block numbers of an Oxford chip as built by load_lite_map before the chip
+    geometry model."""
+    btn_names = {}
+    flip = True
+    for x, column in enumerate(range(1, 9)):
+        for y, row in enumerate("ABCDEFGH"):
+            i = x * 8 + y
+            if i % 8 == 0:
+                flip = not flip
+            z = 8 - (y + 1) if flip else y
+            btn_names[f"{row}{column}"] = f"{x * 8 + z + 1:02d}"
+    return btn_names
+
+
+def _random_square_chips(count: int, seed: int = 0) -> list[ChipGeometry]:
+    rng = random.Random(seed)
+    chips = []
+    for _ in range(count):
+        blocks, windows = rng.randint(1, 12), rng.randint(1, 53)
+        chips.append(
+            ChipGeometry(
+                blocks, blocks, windows, windows, 0.125, 0.125, windows * 0.125, 2.0
+            )
+        )
+    return chips
+
+
+@pytest.mark.parametrize("chip_type", STOCK_CHIPS)
+def test_addresses_of_stock_chips_match_list_implementation(chip_type: ChipType):
+    chip = get_chip_format(chip_type)
+    assert get_alphanumeric(chip_type) == _list_alphanumeric(
+        chip.x_blocks, chip.x_num_steps
+    )
+
+
+@pytest.mark.parametrize("geometry", _random_square_chips(20))
+def test_addresses_of_random_chips_match_list_implementation(geometry: ChipGeometry):
+    assert geometry.alphanumeric_addresses().tolist() == _list_alphanumeric(
+        geometry.x_blocks, geometry.x_num_steps
+    )
+
+
+def test_block_numbers_of_oxford_chip_match_list_implementation():
+    geometry = ChipGeometry.from_chip(get_chip_format(ChipType.Oxford))
+    names = geometry.block_names(*geometry.block_indices())
+    numbers = {name: f"{n:02d}" for n, name in enumerate(names.tolist(), start=1)}
+    assert numbers == _list_oxford_block_numbers()
+
+
+@pytest.mark.parametrize("traversal", list(Traversal))
+@pytest.mark.parametrize("geometry", _random_square_chips(5, seed=1))
+def test_block_numbers_invert_block_indices(
+    geometry: ChipGeometry, traversal: Traversal
+):
+    rows, columns = geometry.block_indices(traversal)
+    np.testing.assert_array_equal(
+        geometry.block_numbers(rows, columns, traversal),
+        np.arange(1, geometry.num_blocks + 1),
+    )
+
+
+@pytest.mark.parametrize("geometry", _random_square_chips(5, seed=2))
+def test_indices_invert_addresses(geometry: ChipGeometry):
+    addresses = geometry.alphanumeric_addresses()
+    np.testing.assert_array_equal(
+        geometry.addresses(geometry.indices(addresses)), addresses
+    )
+
+
+@pytest.mark.parametrize(
+    "address", ["A1aa", "A1_a", "A1_aaa", "1_aa", "AB1_aa", "A_aa", "I1_aa", "A9_aa"]
+)
+def test_invalid_address_raises(address: str):
+    geometry = ChipGeometry.from_chip(get_chip_format(ChipType.Oxford))
+    with pytest.raises(ValueError):
+        geometry.indices([address])
+
+
+def test_positions_of_oxford_chip():
+    chip = get_chip_format(ChipType.Oxford)
+    geometry = ChipGeometry.from_chip(chip)
+    x_mm, y_mm = geometry.positions_mm(
+        geometry.indices(["A1_aa", "A1_at", "A2_aa", "B1_ca", "H8_tt"])
+    )
+    np.testing.assert_allclose(x_mm, [0, 2.375, 3.175, 0, 7 * 3.175 + 2.375])
+    np.testing.assert_allclose(y_mm, [0, 0, 0, 3.175 + 0.25, 7 * 3.175 + 2.375])
+
+
+def test_collection_order_visits_windows_of_each_block_in_turn():
+    geometry = ChipGeometry.from_chip(get_chip_format(ChipType.Oxford))
+    order = geometry.collection_order(blocks=[9, 1])
+
+    assert len(order.addresses) == 800
+    assert order.addresses[:2].tolist() == ["H2_aa", "H2_ab"]
+    assert order.addresses[19:21].tolist() == ["H2_at", "H2_bt"]
+    assert order.addresses[400].startswith("A1_aa")
+    assert set(order.block_numbers[:400]) == {9}
+    np.testing.assert_allclose(np.diff(order.x_mm[:20]), 0.125)
+    np.testing.assert_array_equal(
+        order.image_index(["A1_aa", "H2_bt", "H2_aa"]), [400, 20, 0]
+    )
+
+
+def test_image_index_of_uncollected_well_raises():
+    geometry = ChipGeometry.from_chip(get_chip_format(ChipType.Oxford))
+    with pytest.raises(KeyError):
+        geometry.collection_order(blocks=[1]).image_index(["B1_aa"])
+
+
+def test_typewriter_collection_order():
+    geometry = ChipGeometry(1, 1, 3, 2, 1.0, 1.0, 0.0, 0.0)
+    order = geometry.collection_order(window_traversal=Traversal.TYPEWRITER)
+    assert order.addresses.tolist() == [
+        "A1_aa",
+        "A1_ab",
+        "A1_ac",
+        "A1_ba",
+        "A1_bb",
+        "A1_bc",
+    ]
+
+
+def test_collection_order_across_whole_chip_skips_blocks_not_collected():
+    geometry = ChipGeometry(2, 2, 2, 2, 1.0, 1.0, 3.0, 3.0)
+    order = geometry.collection_order(blocks=[1, 2, 4], per_block=False)
+    # Block 3 is B2, as the second block column is numbered from the bottom up
+    assert order.addresses.tolist() == [
+        "A1_aa",
+        "A1_ab",
+        "A2_aa",
+        "A2_ab",
+        "A2_bb",
+        "A2_ba",
+        "A1_bb",
+        "A1_ba",
+        "B1_aa",
+        "B1_ab",
+        "B1_bb",
+        "B1_ba",
+    ]
+    assert order.block_numbers.tolist() == [1, 1, 4, 4, 4, 4, 1, 1, 2, 2, 2, 2]
+    assert order.x_mm.tolist() == [0, 1, 3, 4, 4, 3, 1, 0, 0, 1, 1, 0]
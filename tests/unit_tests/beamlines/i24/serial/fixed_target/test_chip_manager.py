@@ -1,18 +1,33 @@
 import json
+import re
+from collections.abc import Callable
 from pathlib import Path
 from unittest.mock import ANY, MagicMock, call, mock_open, patch
 
+import numpy as np
 import pytest
+from bluesky.simulators import RunEngineSimulator
 from dodal.devices.beamlines.i24.beamstop import Beamstop
 from dodal.devices.beamlines.i24.dual_backlight import DualBacklight
 from dodal.devices.beamlines.i24.pmac import PMAC
 from dodal.devices.motors import YZStage
-from ophyd_async.core import get_mock_put
+from dodal.devices.oav.oav_detector import OAVBeamCentreFile
+from ophyd_async.core import (
+    callback_on_mock_put,
+    completed_status,
+    get_mock_put,
+    set_mock_value,
+)
+from PIL import Image
 
 from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import Fiducials
 from mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1 import (
+    CS_MOVE_POLL_S,
     _is_checker_pattern,
+    block_check,
+    clear_cs_strings,
     cs_maker,
+    cs_maker_from_fiducials,
     cs_reset,
     fiducial,
     initialise_stages,
@@ -21,14 +36,17 @@ from mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1 impo
     moveto_preset,
     pumpprobe_calc,
     read_parameters,
+    scrape_cs_strings,
     scrape_mtr_directions,
     scrape_mtr_fiducials,
     set_pmac_strings_for_cs,
     upload_chip_map_to_geobrick,
+    write_cs_strings,
 )
 from mx_bluesky.beamlines.i24.serial.setup_beamline import Eiger
 
 from ..conftest import fake_generator
+from .conftest import draw_fiducial_mark
 
 chipmap_str = """01status    P3011       1
 02status    P3021       0
@@ -455,6 +473,59 @@ def test_cs_maker_raises_error_for_wrong_direction_in_json(
         run_engine(cs_maker(pmac))
 
 
+@patch("mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.caget")
+@patch(
+    "mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.write_cs_strings"
+)
+@patch(
+    "mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.scrape_mtr_directions"
+)
+@patch(
+    "mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.scrape_mtr_fiducials"
+)
+def test_cs_maker_from_fiducials_rejects_bad_fiducial_and_sets_cs(
+    fake_fid: MagicMock,
+    fake_dir: MagicMock,
+    fake_write_cs: MagicMock,
+    fake_caget: MagicMock,
+    pmac: PMAC,
+    sim_run_engine: RunEngineSimulator,
+):
+    fake_caget.return_value = 0
+    fake_dir.return_value = (1, -1, -1)
+    fake_fid.side_effect = lambda point: {
+        1: (25.4, 0, 0),
+        2: (0, 25.4, 0),
+        3: (25.4, 25.4, 0),
+        4: (12.9, 6.35, 0),
+    }[point]
+    messages = sim_run_engine.simulate_plan(
+        cs_maker_from_fiducials(
+            pmac, extra_fiducials={3: (25.4, 25.4), 4: (12.7, 6.35)}
+        )
+    )
+
+    assert [call.args[0] for call in fake_fid.call_args_list] == [1, 2, 3, 4]
+    pmac_strings = [
+        msg.args[0]
+        for msg in messages
+        if msg.command == "set" and msg.obj is pmac.pmac_string
+    ]
+    assert pmac_strings[:4] == [
+        "&2",
+        "#5->+10000.000X+0.000Y+0.000Z",
+        "#6->+0.000X-10000.000Y+0.000Z",
+        "#7->+0.000X+0.000Y-10000.000Z",
+    ]
+    fake_write_cs.assert_called_once_with(
+        {
+            "cs1": "#5->+10000.000X+0.000Y+0.000Z",
+            "cs2": "#6->+0.000X-10000.000Y+0.000Z",
+            "cs3": "#7->+0.000X+0.000Y-10000.000Z",
+        }
+    )
+
+
 @patch("mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.caput")
 @patch("mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1.caget")
 def test_pumpprobe_calc(fake_caget: MagicMock, fake_caput: MagicMock, run_engine):
@@ -471,3 +542,282 @@ def test_pumpprobe_calc(fake_caget: MagicMock, fake_caput: MagicMock, run_engine
             call(ANY, 8.6),
         ]
     )
+
+
+CHIP_MANAGER = "mx_bluesky.beamlines.i24.serial.fixed_target.i24ssx_chip_manager_py3v1"
+UNIT_CS = {
+    "cs1": "#5->+10000.000X+0.000Y+0.000Z",
+    "cs2": "#6->+0.000X-10000.000Y+0.000Z",
+    "cs3": "#7->+0.000X+0.000Y-10000.000Z",
+}
+# The chip x axis is twice as long on the stage as on the chip
+STRETCHED_CS = UNIT_CS | {"cs1": "#5->+20000.000X+0.000Y+0.000Z"}
+
+
+def parse_cs_move(pmac_string: str) -> tuple[float, float] | None:
+    if match := re.fullmatch(r"&2!x(.+)y(.+)", pmac_string):
+        return float(match[1]), float(match[2])
+    return None
+
+
+def move_stage_on_cs_move(
+    pmac: PMAC, stage_position: Callable[[float, float], tuple[float, float]]
+):
+    """Move the mock stage to stage_position(x, y) for each coordinate system move
+    to x, y on the chip."""
+
+    def cs_move(value: str, *args, **kwargs):
+        if target := parse_cs_move(value):
+            stage_x, stage_y = stage_position(*target)
+            set_mock_value(pmac.x.user_readback, stage_x)
+            set_mock_value(pmac.y.user_readback, stage_y)
+            for motor in (pmac.x, pmac.y, pmac.z):
+                set_mock_value(motor.motor_done_move, 1)
+
+    callback_on_mock_put(pmac.pmac_string, cs_move)
+
+
+@pytest.fixture
+def recorded_cs():
+    with (
+        patch(f"{CHIP_MANAGER}.scrape_cs_strings", return_value=UNIT_CS) as cs,
+        patch(f"{CHIP_MANAGER}.scrape_mtr_directions", return_value=(1, -1, -1)),
+    ):
+        yield cs
+
+
+@pytest.mark.timeout(10)
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+def test_block_check_moves_in_chip_coordinates_and_waits_for_the_stage_to_stop(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    sim_run_engine: RunEngineSimulator,
+):
+    fake_caget.return_value = 0
+    recorded_cs.return_value = STRETCHED_CS
+    stage = {"x": 0.0, "y": 0.0, "z": 0.0, "done": 1}
+    target = {}
+    signals = {pmac.x.user_readback: "x", pmac.y.user_readback: "y"} | {
+        motor.motor_done_move: "done" for motor in (pmac.x, pmac.y, pmac.z)
+    }
+
+    def start_move(msg):
+        if chip_target := parse_cs_move(msg.args[0]):
+            target.update(x=2 * chip_target[0], y=chip_target[1])
+            stage["done"] = 0
+
+    def finish_move(_):
+        stage.update(target, done=1)
+
+    def read(msg):
+        return {msg.obj.name: {"value": stage[signals.get(msg.obj, "z")]}}
+
+    sim_run_engine.add_handler("set", start_move, pmac.pmac_string.name)
+    sim_run_engine.add_handler("sleep", finish_move)
+    sim_run_engine.add_handler("read", read)
+    messages = sim_run_engine.simulate_plan(block_check(pmac, MagicMock()))
+
+    moves = [
+        msg.args[0]
+        for msg in messages
+        if msg.command == "set" and msg.obj is pmac.pmac_string
+    ]
+    assert len(moves) == 64
+    assert moves[1] == "&2!x0.000y3.175"
+    # One poll while moving, then the stage is found stopped at the block start
+    sleeps = [msg for msg in messages if msg.command == "sleep"]
+    assert len(sleeps) == 64
+    assert {msg.args[0] for msg in sleeps} == {CS_MOVE_POLL_S}
+    report = sim_run_engine.return_value
+    assert all(b.in_position for b in report.blocks)
+    assert report.blocks[1].reached_mm == pytest.approx((0.0, 3.175))
+
+
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+def test_block_check_reports_blocks_not_reached(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    oav,
+    run_engine,
+):
+    fake_caget.return_value = 0
+    move_stage_on_cs_move(pmac, lambda x, y: (x, y - 0.01 if y == 24.6 else y))
+
+    report = run_engine(block_check(pmac, oav, move_timeout_s=0)).plan_result
+
+    assert len(report.blocks) == 64
+    assert [b.block for b in report.blocks if not b.in_position] == [
+        "09",
+        "25",
+        "41",
+        "57",
+    ]
+    assert report.blocks[8].reached_mm == pytest.approx((3.175, 24.59))
+    assert report.correction is None
+    assert not report.aborted
+
+
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+def test_block_check_checks_position_in_chip_coordinates(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    oav,
+    run_engine,
+):
+    fake_caget.return_value = 0
+    recorded_cs.return_value = STRETCHED_CS
+    move_stage_on_cs_move(pmac, lambda x, y: (2 * x, y))
+
+    report = run_engine(block_check(pmac, oav, move_timeout_s=0)).plan_result
+
+    assert all(b.in_position for b in report.blocks)
+    assert report.blocks[8].reached_mm == pytest.approx((3.175, 24.6))
+
+
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+def test_block_check_stops_when_aborted(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    oav,
+    run_engine,
+):
+    # Chip type, then GP9 before each block
+    fake_caget.side_effect = [0, 0, 0, 0, 1]
+    move_stage_on_cs_move(pmac, lambda x, y: (x, y))
+
+    report = run_engine(block_check(pmac, oav)).plan_result
+
+    assert len(report.blocks) == 3
+    assert report.aborted
+    fake_caput.assert_called_once_with(ANY, 0)
+
+
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+def test_block_check_without_recorded_coordinate_system_checks_stage_readback(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    oav,
+    run_engine,
+):
+    fake_caget.return_value = 0
+    recorded_cs.return_value = None
+    move_stage_on_cs_move(pmac, lambda x, y: (x, y - 0.01 if y == 24.6 else y))
+
+    report = run_engine(block_check(pmac, oav)).plan_result
+
+    assert len(report.blocks) == 64
+    assert [b.block for b in report.blocks if not b.in_position] == [
+        "09",
+        "25",
+        "41",
+        "57",
+    ]
+    assert report.blocks[8].reached_mm == pytest.approx((3.175, 24.59))
+
+
+def test_cs_strings_written_can_be_scraped(tmp_path: Path):
+    write_cs_strings(STRETCHED_CS, tmp_path)
+    assert scrape_cs_strings(tmp_path) == STRETCHED_CS
+
+
+def test_cs_strings_not_recorded_are_none(tmp_path: Path):
+    assert scrape_cs_strings(tmp_path) is None
+
+
+@patch(f"{CHIP_MANAGER}.set_pmac_strings_for_cs", MagicMock())
+def test_cs_reset_forgets_recorded_coordinate_system(
+    pmac: PMAC, run_engine, tmp_path: Path
+):
+    write_cs_strings(STRETCHED_CS, tmp_path)
+    with patch(
+        f"{CHIP_MANAGER}.clear_cs_strings",
+        side_effect=lambda: clear_cs_strings(tmp_path),
+    ):
+        run_engine(cs_reset(pmac))
+
+    assert scrape_cs_strings(tmp_path) is None
+
+
+@pytest.mark.timeout(10)
+@patch(f"{CHIP_MANAGER}.caput")
+@patch(f"{CHIP_MANAGER}.caget")
+async def test_block_check_locates_fiducials_on_oav_and_suggests_correction(
+    fake_caget: MagicMock,
+    fake_caput: MagicMock,
+    recorded_cs: MagicMock,
+    pmac: PMAC,
+    oav: OAVBeamCentreFile,
+    fiducial_template: np.ndarray,
+    run_engine,
+    tmp_path: Path,
+):
+    fake_caget.return_value = 0
+    move_stage_on_cs_move(pmac, lambda x, y: (x, y))
+    template_path = tmp_path / "template.png"
+    Image.fromarray(fiducial_template).save(template_path)
+    beam_centre = (
+        await oav.beam_centre_i.get_value(),
+        await oav.beam_centre_j.get_value(),
+    )
+    mm_per_pixel = (
+        np.array(
+            [
+                await oav.x_direction.get_value()
+                * await oav.microns_per_pixel_x.get_value(),
+                await oav.y_direction.get_value()
+                * await oav.microns_per_pixel_y.get_value(),
+            ]
+        )
+        / 1000
+    )
+    # The chip is rotated by 0.02 degrees and shifted from where it was aligned
+    angle = np.radians(0.02)
+    rotation = np.array(
+        [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    )
+    shift = np.array([0.01, -0.005])
+
+    def snapshot_at_current_position():
+        target = np.array(
+            parse_cs_move(get_mock_put(pmac.pmac_string).call_args.args[0])
+        )
+        offset_px = (rotation @ target + shift - target) / mm_per_pixel
+        image = draw_fiducial_mark((768, 1024), tuple(beam_centre + offset_px), 5.0)
+        path = tmp_path / f"{target[0]}_{target[1]}.bmp"
+        Image.fromarray(image).save(path)
+        set_mock_value(oav.snapshot.last_saved_path, str(path))
+        return completed_status()
+
+    oav.snapshot.trigger = MagicMock(side_effect=snapshot_at_current_position)
+
+    report = run_engine(
+        block_check(
+            pmac,
+            oav,
+            fiducial_template=str(template_path),
+            snapshot_directory=str(tmp_path),
+        )
+    ).plan_result
+
+    assert oav.snapshot.trigger.call_count == 64
+    assert await oav.snapshot.filename.get_value() == "block_64"
+    assert all(b.offset_mm is not None for b in report.blocks)
+    correction = report.correction
+    assert correction.num_blocks == 64
+    assert correction.rotation_deg == pytest.approx(0.02, abs=0.002)
+    assert correction.translation_mm == pytest.approx(tuple(shift), abs=0.001)
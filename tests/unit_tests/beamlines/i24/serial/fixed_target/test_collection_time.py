@@ -0,0 +1,221 @@
+import numpy as np
+import pytest
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.collection_time import (
+    MEDIUM1_SHUTTER_OPEN_S,
+    CollectionSettings,
+    MotionModel,
+    main,
+    nominal_pump_probe_delay_s,
+    simulate_collection,
+)
+from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import (
+    ChipType,
+    PumpProbeSetting,
+)
+from mx_bluesky.beamlines.i24.serial.parameters import (
+    ChipDescription,
+    FixedTargetParameters,
+    get_chip_format,
+)
+
+# Moves of 1 mm take 1 s, as the axes never reach full speed
+UNIT_MOTION = MotionModel(acceleration_mm_s2=4, max_velocity_mm_s=100, settle_time_s=0)
+
+# Pump probe delays calculated by pumpprobe_calc for an exposure of 0.01 s and a
+# laser dwell of 0.005 s
+PUMPPROBE_CALC_DELAYS_S = {
+    PumpProbeSetting.Repeat1: 0.86,
+    PumpProbeSetting.Repeat2: 1.72,
+    PumpProbeSetting.Repeat3: 2.58,
+    PumpProbeSetting.Repeat5: 4.3,
+    PumpProbeSetting.Repeat10: 8.6,
+    PumpProbeSetting.ShortRepeat1: 0.086,
+    PumpProbeSetting.ShortRepeat2: 0.172,
+    PumpProbeSetting.ShortRepeat3: 0.344,
+    PumpProbeSetting.ShortRepeat4: 0.5375,
+}
+
+
+def _small_chip() -> ChipDescription:
+    """A single block of 3 columns and 2 rows of windows, 1 mm apart."""
+    return get_chip_format(ChipType.Custom, [3, 2, 1.0, 1.0], origin="web")
+
+
+def _oxford_settings(
+    pump_repeat: PumpProbeSetting, blocks=(1,), **kwargs
+) -> CollectionSettings:
+    return CollectionSettings(
+        chip=get_chip_format(ChipType.Oxford),
+        blocks=blocks,
+        exposure_time_s=0.01,
+        pump_repeat=pump_repeat,
+        laser_dwell_s=0.005,
+        **kwargs,
+    )
+
+
+def test_move_times():
+    motion = MotionModel(
+        acceleration_mm_s2=100, max_velocity_mm_s=10, settle_time_s=0.1
+    )
+    np.testing.assert_allclose(
+        motion.move_time_s(np.array([0, 0.25, 4, 0]), np.array([0, 0, -1, 0.25])),
+        # No move, a triangular profile and a trapezoidal one limited by max velocity
+        [0, 0.1 + 0.1, 0.1 + 0.4 + 0.1, 0.1 + 0.1],
+    )
+
+
+def test_default_move_between_oxford_windows_takes_as_long_as_pumpprobe_calc():
+    assert MotionModel().move_time_s(0.125, 0) == pytest.approx(0.014)
+
+
+def test_collection_without_pump_probe():
+    timeline = simulate_collection(
+        CollectionSettings(_small_chip(), (1,), 0.5, num_exposures=2), UNIT_MOTION
+    )
+
+    assert timeline.addresses.tolist() == [
+        "A1_aa",
+        "A1_ab",
+        "A1_ac",
+        "A1_bc",
+        "A1_bb",
+        "A1_ba",
+    ]
+    np.testing.assert_allclose(timeline.probe_start_s, [0, 2, 4, 6, 8, 10])
+    # 5 moves of 1 s and 6 windows of 2 exposures of 0.5 s
+    assert timeline.total_s == pytest.approx(11)
+    assert np.all(np.isnan(timeline.pump_start_s))
+
+
+def test_collection_includes_moves_between_blocks():
+    one_block = simulate_collection(_oxford_settings(PumpProbeSetting.NoPP))
+    two_blocks = simulate_collection(_oxford_settings(PumpProbeSetting.NoPP, (1, 9)))
+
+    # From the last window of block 1, A1_ta, to the first of block 9, H2_aa
+    block_move_s = MotionModel().move_time_s(3.175, 7 * 3.175 - 19 * 0.125)
+    assert two_blocks.total_s == pytest.approx(2 * one_block.total_s + block_move_s)
+
+
+@pytest.mark.parametrize(
+    "pump_repeat, delay_s",
+    [
+        (PumpProbeSetting.Short1, 0.25),
+        (PumpProbeSetting.Medium1, 0.25 + MEDIUM1_SHUTTER_OPEN_S),
+    ],
+)
+def test_windows_probed_after_delay_from_pump(
+    pump_repeat: PumpProbeSetting, delay_s: float
+):
+    no_pump = simulate_collection(
+        CollectionSettings(_small_chip(), (1,), 0.5), UNIT_MOTION
+    )
+    timeline = simulate_collection(
+        CollectionSettings(
+            _small_chip(),
+            (1,),
+            0.5,
+            pump_repeat=pump_repeat,
+            laser_dwell_s=0.1,
+            laser_delay_s=0.25,
+        ),
+        UNIT_MOTION,
+    )
+
+    np.testing.assert_allclose(timeline.pump_probe_delay_s, delay_s)
+    assert timeline.total_s == pytest.approx(no_pump.total_s + 6 * (0.1 + delay_s))
+
+
+def test_pump_in_probe_starts_probe_during_pump():
+    timeline = simulate_collection(
+        CollectionSettings(
+            _small_chip(),
+            (1,),
+            0.5,
+            pump_repeat=PumpProbeSetting.Short2,
+            laser_dwell_s=0.2,
+            pre_pump_exposure_s=0.05,
+        ),
+        UNIT_MOTION,
+    )
+
+    np.testing.assert_allclose(timeline.probe_start_s - timeline.pump_start_s, 0.05)
+    assert timeline.total_s == pytest.approx(5 + 6 * 0.55)
+
+
+def test_checker_pattern_pumps_alternate_windows():
+    timeline = simulate_collection(
+        CollectionSettings(
+            _small_chip(),
+            (1,),
+            0.5,
+            pump_repeat=PumpProbeSetting.Short1,
+            laser_dwell_s=0.1,
+            checker_pattern=True,
+        ),
+        UNIT_MOTION,
+    )
+    pumped = ~np.isnan(timeline.pump_start_s)
+    assert timeline.addresses[pumped].tolist() == ["A1_aa", "A1_ac", "A1_bb"]
+
+
+def test_repeat_pumps_whole_chunk_before_probing():
+    timeline = simulate_collection(_oxford_settings(PumpProbeSetting.Repeat1))
+    first_chunk = slice(0, 40)
+    assert timeline.pump_end_s[first_chunk].max() < timeline.probe_start_s[0]
+    assert timeline.probe_end_s[first_chunk].max() < timeline.pump_start_s[40]
+
+
+@pytest.mark.parametrize(
+    "pump_repeat, expected_delay_s", PUMPPROBE_CALC_DELAYS_S.items()
+)
+def test_nominal_delays_match_pumpprobe_calc(
+    pump_repeat: PumpProbeSetting, expected_delay_s: float
+):
+    assert nominal_pump_probe_delay_s(pump_repeat, 0.01, 0.005, 0.014) == pytest.approx(
+        expected_delay_s
+    )
+
+
+@pytest.mark.parametrize(
+    "pump_repeat, expected_delay_s", PUMPPROBE_CALC_DELAYS_S.items()
+)
+def test_simulated_delays_close_to_pumpprobe_calc(
+    pump_repeat: PumpProbeSetting, expected_delay_s: float
+):
+    timeline = simulate_collection(_oxford_settings(pump_repeat, (1, 2)))
+    # The simulation includes the move back to the start of each chunk
+    assert np.mean(timeline.pump_probe_delay_s) == pytest.approx(
+        expected_delay_s, rel=0.1
+    )
+
+
+def test_nominal_delay_of_setting_without_chunks_raises():
+    with pytest.raises(ValueError):
+        nominal_pump_probe_delay_s(PumpProbeSetting.Short1, 0.01, 0.005, 0.014)
+
+
+def test_settings_from_parameters(dummy_params_without_pp: FixedTargetParameters):
+    settings = CollectionSettings.from_parameters(dummy_params_without_pp)
+    assert settings.blocks == (1,)
+    assert settings.exposure_time_s == 0.01
+
+    dummy_params_without_pp.map_type = 0  # type: ignore
+    assert CollectionSettings.from_parameters(dummy_params_without_pp).blocks == tuple(
+        range(1, 65)
+    )
+
+
+def test_main_prints_estimate(
+    dummy_params_without_pp: FixedTargetParameters, tmp_path, capsys
+):
+    params_file = tmp_path / "parameters.json"
+    params_file.write_text(dummy_params_without_pp.model_dump_json())
+
+    main([str(params_file), "--settle-time", "0.01"])
+
+    # 400 exposures of 0.01 s and 399 moves of 0.02 s
+    assert (
+        "Estimated collection time: 12.0 s for 400 windows" in capsys.readouterr().out
+    )
@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+
+from mx_bluesky.beamlines.i24.serial.fixed_target.cs_solver import (
+    MeasuredFiducial,
+    chip_position_from_stage,
+    fit_chip_coordinate_system,
+    nominal_fiducials,
+    pmac_cs_factors,
+    pmac_cs_strings,
+)
+from mx_bluesky.beamlines.i24.serial.fixed_target.ft_utils import ChipType
+
+NOMINAL = [(25.4, 0.0), (0.0, 25.4), (25.4, 25.4), (12.7, 6.35), (3.175, 19.05)]
+
+
+def _rotation(rot_x: float, rot_y: float, rot_z: float) -> np.ndarray:
+    cx, sx = np.cos(np.radians(rot_x)), np.sin(np.radians(rot_x))
+    cy, sy = np.cos(np.radians(rot_y)), np.sin(np.radians(rot_y))
+    cz, sz = np.cos(np.radians(rot_z)), np.sin(np.radians(rot_z))
+    r_x = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    r_y = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    r_z = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return r_x @ r_y @ r_z
+
+
+def _synthetic_chip(
+    rotation_deg=(0.3, -0.2, 1.5),
+    scale=(1.0012, 1.0009),
+    skew_deg=0.02,
+    noise_mm=0.0,
+    nominal=NOMINAL,
+    seed=0,
+) -> tuple[list[MeasuredFiducial], np.ndarray]:
+    skew = np.radians(skew_deg)
+    # Chip y axis sheared towards chip x by the skew angle
+    shape = np.array(
+        [[scale[0], scale[1] * np.sin(skew)], [0, scale[1] * np.cos(skew)], [0, 0]]
+    )
+    axes = _rotation(*rotation_deg) @ shape
+    rng = np.random.default_rng(seed)
+    fiducials = [
+        MeasuredFiducial(
+            position,
+            tuple(axes @ position + rng.normal(0, noise_mm, 3)),  # type: ignore
+        )
+        for position in nominal
+    ]
+    return fiducials, axes
+
+
+def test_two_fiducials_fit_exactly():
+    fiducials, axes = _synthetic_chip(nominal=nominal_fiducials(ChipType.Oxford))
+    chip_cs = fit_chip_coordinate_system(fiducials)
+
+    np.testing.assert_allclose(chip_cs.matrix[:, :2], axes, atol=1e-12)
+    np.testing.assert_allclose(chip_cs.residuals_mm, 0, atol=1e-12)
+    assert chip_cs.condition_number == pytest.approx(1)
+    assert chip_cs.rejected == ()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_known_transform_recovered_from_noisy_fiducials(seed: int):
+    fiducials, _ = _synthetic_chip(noise_mm=0.002, seed=seed)
+    chip_cs = fit_chip_coordinate_system(fiducials)
+
+    assert chip_cs.scale == pytest.approx((1.0012, 1.0009), abs=2e-4)
+    assert chip_cs.skew_deg == pytest.approx(0.02, abs=0.02)
+    assert chip_cs.rotation_deg[2] == pytest.approx(1.5 - 0.01, abs=0.02)
+    assert chip_cs.rotation_deg[:2] == pytest.approx((0.3, -0.2), abs=0.02)
+    assert chip_cs.rejected == ()
+    assert chip_cs.rms_residual_mm < 0.005
+
+
+def test_normal_is_a_unit_vector_perpendicular_to_chip():
+    fiducials, _ = _synthetic_chip()
+    matrix = fit_chip_coordinate_system(fiducials).matrix
+
+    assert np.linalg.norm(matrix[:, 2]) == pytest.approx(1)
+    assert matrix[:, 2] @ matrix[:, 0] == pytest.approx(0, abs=1e-12)
+    assert matrix[:, 2] @ matrix[:, 1] == pytest.approx(0, abs=1e-12)
+
+
+@pytest.mark.parametrize("bad_fiducial", range(len(NOMINAL)))
+def test_mis_clicked_fiducial_is_rejected(bad_fiducial: int):
+    fiducials, axes = _synthetic_chip(noise_mm=0.002)
+    measured = np.array(fiducials[bad_fiducial].measured_mm) + (0.2, -0.15, 0)
+    fiducials[bad_fiducial] = MeasuredFiducial(
+        fiducials[bad_fiducial].nominal_mm,
+        tuple(measured),  # type: ignore
+    )
+    chip_cs = fit_chip_coordinate_system(fiducials)
+
+    assert chip_cs.rejected == (bad_fiducial,)
+    assert chip_cs.residuals_mm[bad_fiducial] > 0.2
+    np.testing.assert_allclose(chip_cs.matrix[:, :2], axes, atol=5e-4)
+
+
+def test_nothing_rejected_when_within_tolerance():
+    fiducials, _ = _synthetic_chip(noise_mm=0.01)
+    assert (
+        fit_chip_coordinate_system(fiducials, outlier_tolerance_mm=0.1).rejected == ()
+    )
+
+
+def test_collinear_fiducials_raise():
+    fiducials, _ = _synthetic_chip(nominal=[(5.0, 5.0), (10.0, 10.0), (20.0, 20.0)])
+    with pytest.raises(ValueError, match="collinear"):
+        fit_chip_coordinate_system(fiducials)
+
+
+def test_single_fiducial_raises():
+    fiducials, _ = _synthetic_chip(nominal=[(25.4, 0.0)])
+    with pytest.raises(ValueError, match="At least 2"):
+        fit_chip_coordinate_system(fiducials)
+
+
+def test_unrotated_chip_gives_reset_coordinate_system():
+    fiducials, _ = _synthetic_chip(rotation_deg=(0, 0, 0), scale=(1, 1), skew_deg=0)
+    assert pmac_cs_strings(fit_chip_coordinate_system(fiducials)) == {
+        "cs1": "#5->+10000.000X+0.000Y+0.000Z",
+        "cs2": "#6->+0.000X-10000.000Y+0.000Z",
+        "cs3": "#7->+0.000X+0.000Y-10000.000Z",
+    }
+
+
+def test_rotated_chip_gives_rotated_coordinate_system():
+    fiducials, _ = _synthetic_chip(rotation_deg=(0, 0, 1), scale=(1, 1), skew_deg=0)
+    cs_str = pmac_cs_strings(fit_chip_coordinate_system(fiducials), (1, 1, 1), 1000)
+    cos, sin = 1000 * np.cos(np.radians(1)), 1000 * np.sin(np.radians(1))
+    assert cs_str["cs1"] == f"#5->{cos:+1.3f}X{-sin:+1.3f}Y+0.000Z"
+    assert cs_str["cs2"] == f"#6->{sin:+1.3f}X{cos:+1.3f}Y+0.000Z"
+
+
+def test_stage_position_converted_back_to_chip_coordinates():
+    fiducials, axes = _synthetic_chip()
+    cs_str = pmac_cs_strings(fit_chip_coordinate_system(fiducials))
+    chip = np.array([12.7, 6.35, 0.0])
+    stage = np.column_stack([axes, np.cross(axes[:, 0], axes[:, 1])]) @ chip
+    assert chip_position_from_stage(cs_str, tuple(stage)) == pytest.approx(
+        tuple(chip), abs=1e-3
+    )
+
+
+def test_cs_reset_strings_are_read():
+    factors = pmac_cs_factors(
+        {
+            "cs1": "#5->10000X+0Y+0Z",
+            "cs2": "#6->+0X-10000Y+0Z",
+            "cs3": "#7->0X+0Y-10000Z",
+        }
+    )
+    assert np.array_equal(factors, np.diag([10000, -10000, -10000]))
+
+
+def test_unreadable_cs_string_raises():
+    with pytest.raises(ValueError, match="Unable to read"):
+        pmac_cs_factors({"cs1": "#5->X", "cs2": "", "cs3": ""})
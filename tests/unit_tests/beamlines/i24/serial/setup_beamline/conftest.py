@@ -0,0 +1,64 @@
+import pytest
+
+from mx_bluesky.beamlines.i24.serial.setup_beamline import pv
+
+
+class FakePvBackend:
+    """In memory PVs. Writing a PV updates its readback after a number of reads, to
+    mimic the delay before an IOC applies a setting.
+
+    Args:
+        values: Initial values of PVs which can be read.
+        readbacks: Readback of each PV, where it is not the PV with an _RBV suffix.
+        reads_to_converge: Number of reads of a readback before it shows a new value.
+        stuck: PVs whose readback never changes.
+    """
+
+    def __init__(
+        self,
+        values: dict[str, str] | None = None,
+        readbacks: dict[str, str] | None = None,
+        reads_to_converge: int = 0,
+        stuck: set[str] | None = None,
+    ):
+        self.values = dict(values or {})
+        self.puts: list[tuple[str, str]] = []
+        self.reads: dict[str, int] = {}
+        self._readbacks = readbacks or {}
+        self._reads_to_converge = reads_to_converge
+        self.stuck = stuck or set()
+        self._pending: dict[str, tuple[str, int]] = {}
+
+    def readback_of(self, pv_name: str) -> str:
+        return self._readbacks.get(pv_name, f"{pv_name}_RBV")
+
+    def get(self, pv_name: str) -> str:
+        self.reads[pv_name] = self.reads.get(pv_name, 0) + 1
+        if pv_name in self._pending:
+            value, remaining = self._pending[pv_name]
+            if remaining <= 0:
+                self.values[pv_name] = value
+                del self._pending[pv_name]
+            else:
+                self._pending[pv_name] = (value, remaining - 1)
+        if pv_name not in self.values:
+            raise TimeoutError(f"Could not read {pv_name}")
+        return self.values[pv_name]
+
+    def put(self, pv_name: str, value: str) -> None:
+        self.puts.append((pv_name, value))
+        self.values[pv_name] = value
+        if pv_name not in self.stuck:
+            self._pending[self.readback_of(pv_name)] = (value, self._reads_to_converge)
+
+
+@pytest.fixture
+def fake_pv_backend() -> FakePvBackend:
+    return FakePvBackend(
+        values={pv.eiger_seq_id: "7", pv.eiger_bitdepthrbv: "32"},
+        readbacks={
+            pv.eiger_statuspoll: pv.eiger_statuspoll,
+            pv.eiger_od_filename: pv.eiger_od_filename_rbv,
+        },
+        reads_to_converge=2,
+    )
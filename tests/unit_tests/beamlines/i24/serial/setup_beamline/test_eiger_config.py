@@ -0,0 +1,203 @@
+import pytest
+from bluesky.run_engine import RunEngine
+from pydantic import ValidationError
+
+from mx_bluesky.beamlines.i24.serial.setup_beamline import pv
+from mx_bluesky.beamlines.i24.serial.setup_beamline.eiger_config import (
+    EigerConfigError,
+    EigerQuickshotConfig,
+    EigerTriggeredConfig,
+    PvSetting,
+    apply_pv_settings,
+    configure_eiger,
+    values_match,
+)
+
+from .conftest import FakePvBackend
+
+
+def _config(config_type=EigerTriggeredConfig, **kwargs):
+    return config_type(
+        **{
+            "filepath": "/dls/i24/data/foo",
+            "filename": "chip_7",
+            "num_images": 400,
+            "exposure_time_s": 0.01,
+            "detector_distance_mm": 300,
+            "wavelength_a": 0.8,
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "requested, readback, matches",
+    [
+        (0.01, "0.01", True),
+        (0.0099999, "0.01", True),
+        (0.3, "0.3001", False),
+        (400, "400", True),
+        ("External Enable", "External Enable", True),
+        ("Enabled", "enabled", True),
+        ("Enabled", "Disabled", False),
+        ("UInt32", "UInt16", False),
+    ],
+)
+def test_values_match(requested, readback, matches):
+    assert values_match(requested, readback) == matches
+
+
+@pytest.mark.parametrize(
+    "config_type, trigger_mode, num_images, num_triggers",
+    [
+        (EigerQuickshotConfig, "Internal Series", 400, 1),
+        (EigerTriggeredConfig, "External Enable", 1, 400),
+    ],
+)
+def test_trigger_settings_depend_on_mode(
+    config_type, trigger_mode: str, num_images: int, num_triggers: int
+):
+    settings = {s.pv: s.value for s in _config(config_type).detector_settings()}
+
+    assert settings[pv.eiger_triggermode] == trigger_mode
+    assert settings[pv.eiger_numimages] == num_images
+    assert settings[pv.eiger_numtriggers] == num_triggers
+    assert settings[pv.eiger_detdist] == 0.3
+    assert settings[pv.eiger_acquireperiod] == 0.01
+    assert settings[pv.eiger_acquiretime] == pytest.approx(0.01 - 1e-7, abs=1e-12)
+
+
+def test_config_rejects_invalid_values():
+    with pytest.raises(ValidationError):
+        _config(num_images=0)
+    with pytest.raises(ValidationError):
+        _config(exposure_time_s=-0.01)
+
+
+def test_odin_settings_use_bit_depth():
+    settings = {s.pv: s for s in _config().odin_settings(16)}
+
+    assert settings[pv.eiger_od_datatype].value == "UInt16"
+    assert settings[pv.eiger_od_num_capture].value == 400
+    assert settings[pv.eiger_od_filename].readback == pv.eiger_od_filename_rbv
+
+
+def test_apply_writes_only_changed_settings_and_waits_for_readbacks(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    fake_pv_backend.values.update({"A_RBV": "1", "B_RBV": "Off"})
+    settings = [
+        PvSetting("A", 1, "A_RBV"),
+        PvSetting("B", "On", "B_RBV"),
+        PvSetting("C", 2.5, "C_RBV"),
+    ]
+
+    report = run_engine(
+        apply_pv_settings(settings, fake_pv_backend, poll_interval_s=0)
+    ).plan_result
+
+    assert fake_pv_backend.puts == [("B", "On"), ("C", "2.5")]
+    assert report.unchanged == ["A"]
+    assert [(c.pv, c.old, c.new) for c in report.changed] == [
+        ("B", "Off", "On"),
+        ("C", None, "2.5"),
+    ]
+    assert not report.failed
+    # One read before writing, then until the readback converges
+    assert fake_pv_backend.reads["B_RBV"] == 4
+    assert fake_pv_backend.values["C_RBV"] == "2.5"
+
+
+def test_apply_reports_settings_which_do_not_converge(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    fake_pv_backend.stuck = {"B"}
+    fake_pv_backend.values["B_RBV"] = "Off"
+    settings = [
+        PvSetting("A", 1, "A_RBV", timeout_s=1),
+        PvSetting("B", "On", "B_RBV", timeout_s=0.05),
+    ]
+
+    report = run_engine(
+        apply_pv_settings(settings, fake_pv_backend, poll_interval_s=0.01)
+    ).plan_result
+
+    assert [(f.pv, f.requested, f.readback) for f in report.failed] == [
+        ("B", "On", "Off")
+    ]
+    assert "FAILED B: requested On, read back Off" in report.format()
+
+
+def test_settings_without_readback_are_always_written(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    run_engine(apply_pv_settings([PvSetting("TRIGGER", 1, None)] * 2, fake_pv_backend))
+
+    assert fake_pv_backend.puts == [("TRIGGER", "1"), ("TRIGGER", "1")]
+
+
+def test_configure_eiger_applies_every_setting_then_arms(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    config = _config()
+
+    report = run_engine(
+        configure_eiger(config, fake_pv_backend, poll_interval_s=0)
+    ).plan_result
+
+    assert not report.failed
+    assert len(report.changed) == len(config.detector_settings()) + 5
+    for setting in config.detector_settings() + config.odin_settings(32):
+        assert values_match(
+            setting.value, fake_pv_backend.values[setting.readback or setting.pv]
+        )
+    assert fake_pv_backend.puts[-2:] == [
+        (pv.eiger_od_capture, "Capture"),
+        (pv.eiger_acquire, "1"),
+    ]
+
+
+def test_configure_eiger_a_second_time_changes_nothing(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    run_engine(configure_eiger(_config(), fake_pv_backend, poll_interval_s=0))
+    fake_pv_backend.puts.clear()
+
+    report = run_engine(
+        configure_eiger(_config(num_images=800), fake_pv_backend, poll_interval_s=0)
+    ).plan_result
+
+    # Settings without a known readback are always written
+    assert [c.pv for c in report.changed] == [
+        pv.eiger_countmode,
+        pv.eiger_autosum,
+        pv.eiger_numtriggers,
+        pv.eiger_od_num_capture,
+    ]
+    assert len(fake_pv_backend.puts) == 6
+
+
+def test_settings_only_wait_for_known_readbacks():
+    settings = {s.pv: s for s in _config().detector_settings()}
+
+    assert settings[pv.eiger_triggermode].readback == f"{pv.eiger_triggermode}_RBV"
+    assert settings[pv.eiger_statuspoll].readback == pv.eiger_statuspoll
+    assert settings[pv.eiger_countmode].readback is None
+    assert settings[pv.eiger_autosum].readback is None
+
+
+def test_configure_eiger_does_not_arm_if_settings_fail(
+    run_engine: RunEngine, fake_pv_backend: FakePvBackend
+):
+    fake_pv_backend.stuck = {pv.eiger_triggermode}
+    clock = iter(range(100))
+
+    with pytest.raises(EigerConfigError, match=pv.eiger_triggermode) as e:
+        run_engine(
+            configure_eiger(
+                _config(), fake_pv_backend, poll_interval_s=0, clock=lambda: next(clock)
+            )
+        )
+
+    assert [f.pv for f in e.value.report.failed] == [pv.eiger_triggermode]
+    assert (pv.eiger_acquire, "1") not in fake_pv_backend.puts
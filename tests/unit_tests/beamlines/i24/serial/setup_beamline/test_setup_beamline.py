@@ -1,5 +1,3 @@
-from unittest.mock import patch
-
 import pytest
 from dodal.devices.beamlines.i24.aperture import Aperture
 from dodal.devices.beamlines.i24.beam_center import DetectorBeamCenter
@@ -8,14 +6,14 @@ from dodal.devices.beamlines.i24.dual_backlight import DualBacklight
 from dodal.devices.motors import YZStage
 from ophyd_async.core import set_mock_value
 
-from mx_bluesky.beamlines.i24.serial.setup_beamline import setup_beamline
+from mx_bluesky.beamlines.i24.serial.setup_beamline import pv, setup_beamline
 
 from ..conftest import TEST_LUT
+from .conftest import FakePvBackend
 
 
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.bps.sleep")
 async def test_setup_beamline_for_collection_plan(
-    _, aperture: Aperture, backlight: DualBacklight, beamstop: Beamstop, run_engine
+    aperture: Aperture, backlight: DualBacklight, beamstop: Beamstop, run_engine
 ):
     run_engine(
         setup_beamline.setup_beamline_for_collection_plan(aperture, backlight, beamstop)
@@ -75,33 +73,56 @@ async def test_set_detector_beam_center_plan(
     assert await eiger_beam_center.beam_y.get_value() == pytest.approx(1693.33, 1e-2)
 
 
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caput")
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caget")
 def test_eiger_raises_error_if_quickshot_and_no_args_list(
-    fake_caget, fake_caput, run_engine, dcm, detector_stage
+    run_engine, dcm, detector_stage, fake_pv_backend: FakePvBackend
 ):
     with pytest.raises(TypeError):
-        run_engine(setup_beamline.eiger("quickshot", None, dcm, detector_stage))
+        run_engine(
+            setup_beamline.eiger(
+                "quickshot", None, dcm, detector_stage, fake_pv_backend
+            )
+        )
 
 
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caput")
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caget")
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.bps.sleep")
-def test_eiger_quickshot(_, fake_caget, fake_caput, run_engine, dcm, detector_stage):
-    run_engine(
-        setup_beamline.eiger("quickshot", ["", "", "1", "0.1"], dcm, detector_stage)
-    )
-    assert fake_caput.call_count == 30
+def test_eiger_quickshot(
+    run_engine, dcm, detector_stage, fake_pv_backend: FakePvBackend
+):
+    report = run_engine(
+        setup_beamline.eiger(
+            "quickshot", ["", "chip", "1", "0.1"], dcm, detector_stage, fake_pv_backend
+        )
+    ).plan_result
+
+    assert not report.failed
+    assert fake_pv_backend.values[pv.eiger_triggermode] == "Internal Series"
+    assert fake_pv_backend.values[pv.eiger_od_filename_rbv] == "chip_7"
+    assert fake_pv_backend.puts[-1] == (pv.eiger_acquire, "1")
 
 
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caput")
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.caget")
-@patch("mx_bluesky.beamlines.i24.serial.setup_beamline.setup_beamline.bps.sleep")
-def test_eiger_triggered(_, fake_caget, fake_caput, run_engine, dcm, detector_stage):
+def test_eiger_triggered(
+    run_engine, dcm, detector_stage, fake_pv_backend: FakePvBackend
+):
     set_mock_value(detector_stage.z.user_readback, 300)
     set_mock_value(dcm.wavelength_in_a.user_readback, 1)
     run_engine(
-        setup_beamline.eiger("triggered", ["", "", "10", "0.1"], dcm, detector_stage)
+        setup_beamline.eiger(
+            "triggered", ["", "chip", "10", "0.1"], dcm, detector_stage, fake_pv_backend
+        )
     )
-    assert fake_caget.call_count == 2
-    assert fake_caput.call_count == 30
+
+    assert fake_pv_backend.values[pv.eiger_triggermode] == "External Enable"
+    assert fake_pv_backend.values[f"{pv.eiger_numtriggers}_RBV"] == "10"
+    assert fake_pv_backend.values[f"{pv.eiger_detdist}_RBV"] == "0.3"
+    assert fake_pv_backend.values[f"{pv.eiger_wavelength}_RBV"] == "1.0"
+
+
+def test_eiger_return_to_normal(
+    run_engine, dcm, detector_stage, fake_pv_backend: FakePvBackend
+):
+    run_engine(
+        setup_beamline.eiger(
+            "return-to-normal", None, dcm, detector_stage, fake_pv_backend
+        )
+    )
+
+    assert fake_pv_backend.puts == [(pv.eiger_manualtrigger, "No")]
@@ -1,5 +1,6 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import pytest
 from dodal.devices.beamlines.i24.beam_center import DetectorBeamCenter
 from dodal.devices.beamlines.i24.dcm import DCM
 from dodal.devices.beamlines.i24.focus_mirrors import FocusMirrorsMode
@@ -10,6 +11,7 @@ from mx_bluesky.beamlines.i24.serial.dcid import (
     get_resolution,
     read_beam_info_from_hardware,
 )
+from mx_bluesky.beamlines.i24.serial.dcid_outbox import DcidOutbox, MessageStatus
 from mx_bluesky.beamlines.i24.serial.parameters import (
     BeamSettings,
     DetectorName,
@@ -53,12 +55,16 @@ def test_get_resolution():
 @patch("mx_bluesky.beamlines.i24.serial.dcid.SSX_LOGGER")
 @patch("mx_bluesky.beamlines.i24.serial.dcid.json")
 def test_generate_dcid_for_eiger(
-    fake_json, fake_log, patch_resolution, dummy_params_ex, run_engine
+    fake_json, fake_log, patch_resolution, dummy_params_ex, run_engine, tmp_path
 ):
+    # The body is stored in the outbox, so must be serialisable
+    patch_resolution.return_value = 1.5
+    fake_auth = MagicMock(return_value={})
     test_dcid = DCID(
         server="fake_server",
         emit_errors=False,
         expt_params=dummy_params_ex,
+        outbox=DcidOutbox(tmp_path / "outbox.sqlite", headers=fake_auth),
     )
 
     assert isinstance(test_dcid.detector, Eiger)
@@ -68,10 +74,8 @@ def test_generate_dcid_for_eiger(
         wavelength_in_a=0.6, beam_size_in_um=(7, 7), beam_center_in_mm=(100, 100)
     )
 
-    with (
-        patch("mx_bluesky.beamlines.i24.serial.dcid.requests") as patch_request,
-        patch("mx_bluesky.beamlines.i24.serial.dcid.get_auth_header") as fake_auth,
-    ):
+    with patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.requests") as patch_request:
+        patch_request.post.return_value.json.return_value = {"dataCollectionId": 12}
         test_dcid.generate_dcid(beam_settings, "", "protein.nxs", 10)
         patch_resolution.assert_called_once_with(
             test_dcid.detector,
@@ -81,6 +85,7 @@ def test_generate_dcid_for_eiger(
         fake_auth.assert_called_once()
         fake_json.dumps.assert_called_once()
         patch_request.post.assert_called_once()
+        assert test_dcid.dcid == 12
 
         expt_type = patch_request.post.call_args.kwargs["json"]["group"][
             "experimentType"
@@ -101,3 +106,96 @@ def test_generate_dcid_for_eiger(
             )
             == 1
         )  # no pump probe
+
+
+def _dcid_with_outbox(params, tmp_path) -> DCID:
+    return DCID(
+        server="fake_server",
+        emit_errors=False,
+        expt_params=params,
+        outbox=DcidOutbox(tmp_path / "outbox.sqlite", backoff_s=60),
+    )
+
+
+@patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.subprocess")
+def test_dcid_notifications_are_queued_until_dcid_is_created(
+    fake_subprocess, dummy_params_ex, tmp_path
+):
+    test_dcid = _dcid_with_outbox(dummy_params_ex, tmp_path)
+    beam_settings = BeamSettings(
+        wavelength_in_a=0.6, beam_size_in_um=(7, 7), beam_center_in_mm=(100, 100)
+    )
+
+    with patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.requests") as fake_requests:
+        fake_requests.post.side_effect = ConnectionError("Server down")
+        test_dcid.generate_dcid(beam_settings, "", "protein.nxs", 10)
+        test_dcid.notify_start()
+        test_dcid.collection_complete(aborted=True)
+        test_dcid.notify_end()
+
+        assert test_dcid.error
+        assert test_dcid.dcid is None
+        fake_requests.post.assert_called_once()
+        fake_requests.patch.assert_not_called()
+        fake_subprocess.Popen.assert_not_called()
+        queued = test_dcid.outbox.unsent()
+        assert [m.kind for m in queued] == [
+            "create",
+            "run_script",
+            "update",
+            "run_script",
+        ]
+
+        fake_requests.post.side_effect = None
+        fake_requests.post.return_value.json.return_value = {"dataCollectionId": 7}
+        test_dcid.outbox.replay()
+        assert test_dcid.outbox.deliver_due() == 4
+
+    assert test_dcid.dcid == 7
+    assert not test_dcid.outbox.unsent()
+    assert fake_requests.patch.call_args.args == ("fake_server/dc/7",)
+    assert fake_requests.patch.call_args.kwargs["json"]["runStatus"] == (
+        "DataCollection Cancelled"
+    )
+    assert [c.args[0][1] for c in fake_subprocess.Popen.call_args_list] == ["7", "7"]
+
+
+def test_dcid_without_generated_dcid_queues_nothing(dummy_params_ex, tmp_path):
+    test_dcid = _dcid_with_outbox(dummy_params_ex, tmp_path)
+
+    test_dcid.notify_start()
+    test_dcid.collection_complete()
+    test_dcid.notify_end()
+
+    assert not test_dcid.error
+    assert test_dcid.outbox.messages([MessageStatus.PENDING]) == []
+
+
+@patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.subprocess")
+def test_dcid_which_fails_with_emit_errors_is_never_created_later(
+    fake_subprocess, dummy_params_ex, tmp_path
+):
+    test_dcid = DCID(
+        server="fake_server",
+        emit_errors=True,
+        expt_params=dummy_params_ex,
+        outbox=DcidOutbox(tmp_path / "outbox.sqlite"),
+    )
+    beam_settings = BeamSettings(
+        wavelength_in_a=0.6, beam_size_in_um=(7, 7), beam_center_in_mm=(100, 100)
+    )
+
+    with patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.requests") as fake_requests:
+        fake_requests.post.side_effect = ConnectionError("Server down")
+        with pytest.raises(ConnectionError):
+            test_dcid.generate_dcid(beam_settings, "", "protein.nxs", 10)
+        test_dcid.notify_end()
+
+        fake_requests.post.side_effect = None
+        test_dcid.outbox.replay()
+        assert test_dcid.outbox.deliver_due() == 0
+
+    assert test_dcid.error
+    fake_requests.post.assert_called_once()
+    fake_subprocess.Popen.assert_not_called()
+    assert [m.status for m in test_dcid.outbox.messages()] == [MessageStatus.ABANDONED]
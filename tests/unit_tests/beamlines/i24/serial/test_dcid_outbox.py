@@ -0,0 +1,383 @@
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mx_bluesky.beamlines.i24.serial.dcid_outbox import (
+    DcidOutbox,
+    MessageKind,
+    MessageStatus,
+    OutboxError,
+    main,
+)
+
+
+class FlakyDcServer:
+    """A stand in for the ssx-dcserver which fails some of the requests it gets.
+
+    Attributes:
+        fail_every: Every nth request fails with a 503, or none if 0.
+        fail_with: Status code to fail every request with, if set.
+        received: The successful requests, as (method, path, body).
+    """
+
+    def __init__(self):
+        self.fail_every = 0
+        self.fail_with: int | None = None
+        self.received: list[tuple[str, str, dict]] = []
+        self.lock = threading.Lock()
+        self._requests = count(1)
+        self._dcids = count(1000)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        dc_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, code: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"null")
+                with dc_server.lock:
+                    n = next(dc_server._requests)
+                    if dc_server.fail_with is not None:
+                        return self._reply(dc_server.fail_with, {"detail": "No"})
+                    if dc_server.fail_every and n % dc_server.fail_every == 0:
+                        return self._reply(503, {"detail": "Unavailable"})
+                    dc_server.received.append((self.command, self.path, body))
+                    if self.command == "POST":
+                        return self._reply(
+                            201, {"dataCollectionId": next(dc_server._dcids)}
+                        )
+                    return self._reply(200, {})
+
+            def do_POST(self):  # noqa: N802
+                self._handle()
+
+            def do_PATCH(self):  # noqa: N802
+                self._handle()
+
+        return Handler
+
+    def start(self):
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def dc_server() -> Iterator[FlakyDcServer]:
+    server = FlakyDcServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def outbox(tmp_path, clock: FakeClock) -> DcidOutbox:
+    return DcidOutbox(
+        tmp_path / "outbox.sqlite",
+        timeout=2,
+        backoff_s=1,
+        max_backoff_s=8,
+        max_attempts=10,
+        clock=clock,
+    )
+
+
+def _queue_collection(outbox: DcidOutbox, collection: str, url: str):
+    outbox.enqueue(collection, MessageKind.CREATE, url, {"collection": collection})
+    outbox.enqueue(collection, MessageKind.UPDATE, url, {"comments": "started"})
+    outbox.enqueue(collection, MessageKind.UPDATE, url, {"runStatus": "Successful"})
+
+
+def _deliver_until_empty(outbox: DcidOutbox, clock: FakeClock, max_passes=50):
+    for _ in range(max_passes):
+        outbox.deliver_due()
+        if not outbox.unsent():
+            return
+        clock.now += 1
+    raise AssertionError(f"Messages were not delivered: {outbox.unsent()}")
+
+
+def test_messages_are_delivered_in_order_through_intermittent_failures(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    dc_server.fail_every = 2
+    collections = ["chip_1", "chip_2", "chip_3"]
+    for collection in collections:
+        _queue_collection(outbox, collection, dc_server.url)
+
+    _deliver_until_empty(outbox, clock)
+
+    assert len(dc_server.received) == 9
+    for collection in collections:
+        dcid = outbox.dcid_for(collection)
+        assert dcid is not None
+        received = [
+            r for r in dc_server.received if r[2].get("collection") == collection
+        ]
+        received += [r for r in dc_server.received if r[1] == f"/dc/{dcid}"]
+        assert [(method, body) for method, _, body in received] == [
+            ("POST", {"collection": collection}),
+            ("PATCH", {"comments": "started"}),
+            ("PATCH", {"runStatus": "Successful"}),
+        ]
+        # Nothing for the collection was sent before its DCID was created
+        first = dc_server.received.index(received[0])
+        assert (
+            dc_server.received.index(received[2])
+            > dc_server.received.index(received[1])
+            > first
+        )
+    assert any(m.attempts > 1 for m in outbox.messages())
+
+
+def test_failed_sends_back_off_exponentially(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    dc_server.fail_with = 503
+    message_id = outbox.enqueue("chip", MessageKind.CREATE, dc_server.url, {})
+    start = clock.now
+
+    delays = []
+    for _ in range(6):
+        clock.now = outbox.messages()[0].next_attempt_at
+        assert outbox.deliver_due() == 0
+        # Not yet due again
+        assert outbox.deliver_due() == 0
+        delays.append(outbox.messages()[0].next_attempt_at - clock.now)
+
+    assert delays == [1, 2, 4, 8, 8, 8]
+    [message] = outbox.messages()
+    assert message.id == message_id
+    assert message.attempts == 6
+    assert message.status == MessageStatus.PENDING
+    assert "503" in (message.last_error or "")
+    assert clock.now > start
+
+
+def test_later_messages_wait_for_earlier_ones_in_the_same_collection(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    _queue_collection(outbox, "chip_1", dc_server.url)
+    dc_server.fail_with = 503
+    outbox.deliver_due()
+    dc_server.fail_with = None
+    _queue_collection(outbox, "chip_2", dc_server.url)
+
+    # The new collection is unaffected by the one which is backing off
+    assert outbox.deliver_due() == 3
+    assert outbox.dcid_for("chip_1") is None
+    assert [m.collection for m in outbox.unsent()] == ["chip_1"] * 3
+
+    clock.now += 1
+    assert outbox.deliver_due() == 3
+    assert not outbox.unsent()
+
+
+def test_send_leaves_message_queued_behind_earlier_ones(
+    outbox: DcidOutbox, dc_server: FlakyDcServer
+):
+    dc_server.fail_with = 503
+    with pytest.raises(Exception, match="503"):
+        outbox.send("chip", MessageKind.CREATE, dc_server.url, {})
+    dc_server.fail_with = None
+
+    assert outbox.send("chip", MessageKind.UPDATE, dc_server.url, {}) is None
+    assert dc_server.received == []
+    assert [m.status for m in outbox.messages()] == ["pending", "pending"]
+
+
+def test_message_being_sent_cannot_be_taken_by_the_worker(
+    outbox: DcidOutbox, dc_server: FlakyDcServer
+):
+    deliver = outbox._deliver  # noqa: SLF001
+    sent_by_worker = []
+
+    def deliver_while_worker_runs(message, timeout):
+        sent_by_worker.append(outbox.deliver_due())
+        return deliver(message, timeout)
+
+    with patch.object(outbox, "_deliver", side_effect=deliver_while_worker_runs):
+        assert outbox.send("chip", MessageKind.CREATE, dc_server.url, {}) == 1000
+
+    assert sent_by_worker == [0]
+    assert len(dc_server.received) == 1
+
+
+def test_message_abandoned_on_failure_is_never_sent(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    dc_server.fail_with = 503
+    with pytest.raises(Exception, match="503"):
+        outbox.send(
+            "chip", MessageKind.CREATE, dc_server.url, {}, abandon_on_failure=True
+        )
+    dc_server.fail_with = None
+
+    [message] = outbox.messages()
+    assert message.status == MessageStatus.ABANDONED
+    assert not outbox.has_collection("chip")
+    with pytest.raises(OutboxError):
+        outbox.enqueue("chip", MessageKind.UPDATE, dc_server.url, {})
+    clock.now += 100
+    assert outbox.replay() == 0
+    assert outbox.deliver_due() == 0
+    assert dc_server.received == []
+
+
+def test_rejected_message_fails_and_blocks_collection_until_replayed(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    _queue_collection(outbox, "chip", dc_server.url)
+    dc_server.fail_with = 422
+
+    assert outbox.deliver_due() == 0
+    assert [m.status for m in outbox.messages()] == ["failed", "pending", "pending"]
+    clock.now += 100
+    assert outbox.deliver_due() == 0
+
+    dc_server.fail_with = None
+    assert outbox.replay() == 3
+    assert outbox.deliver_due() == 3
+    assert outbox.dcid_for("chip") == 1000
+
+
+def test_messages_give_up_after_max_attempts(
+    outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    dc_server.fail_with = 500
+    outbox.enqueue("chip", MessageKind.CREATE, dc_server.url, {})
+
+    for _ in range(outbox.max_attempts):
+        outbox.deliver_due()
+        clock.now += outbox.max_backoff_s
+
+    [message] = outbox.messages()
+    assert message.status == MessageStatus.FAILED
+    assert message.attempts == outbox.max_attempts
+
+
+def test_messages_survive_restart(
+    tmp_path, outbox: DcidOutbox, clock: FakeClock, dc_server: FlakyDcServer
+):
+    _queue_collection(outbox, "chip", dc_server.url)
+    # The process exits while sending the first message
+    with closing(sqlite3.connect(outbox.path)) as connection, connection:
+        connection.execute("UPDATE messages SET status = 'sending' WHERE id = 1")
+
+    restarted = DcidOutbox(outbox.path, clock=clock)
+    assert restarted.deliver_due() == 0
+    clock.now += 301
+    assert restarted.deliver_due() == 3
+    assert len(dc_server.received) == 3
+
+
+def test_update_cannot_be_queued_before_dcid_requested(
+    outbox: DcidOutbox, dc_server: FlakyDcServer
+):
+    with pytest.raises(OutboxError, match="before its DCID"):
+        outbox.enqueue("chip", MessageKind.UPDATE, dc_server.url, {})
+
+
+@patch("mx_bluesky.beamlines.i24.serial.dcid_outbox.subprocess")
+def test_run_script_message_runs_script_with_dcid(
+    fake_subprocess: MagicMock, outbox: DcidOutbox, dc_server: FlakyDcServer
+):
+    outbox.enqueue("chip", MessageKind.CREATE, dc_server.url, {})
+    outbox.enqueue("chip", MessageKind.RUN_SCRIPT, "/path/to/notify.sh")
+
+    assert outbox.deliver_due() == 2
+
+    fake_subprocess.Popen.assert_called_once_with(["/path/to/notify.sh", "1000"])
+
+
+def test_missing_script_is_not_retried(outbox: DcidOutbox, dc_server: FlakyDcServer):
+    outbox.enqueue("chip", MessageKind.CREATE, dc_server.url, {})
+    outbox.enqueue("chip", MessageKind.RUN_SCRIPT, "/not/a/real/script.sh")
+
+    assert outbox.deliver_due() == 1
+
+    assert outbox.unsent()[0].status == MessageStatus.FAILED
+
+
+def test_background_worker_delivers_through_intermittent_failures(
+    tmp_path, dc_server: FlakyDcServer
+):
+    dc_server.fail_every = 3
+    outbox = DcidOutbox(tmp_path / "outbox.sqlite", backoff_s=0.01, max_backoff_s=0.05)
+    outbox.start()
+    try:
+        for collection in ("chip_1", "chip_2"):
+            _queue_collection(outbox, collection, dc_server.url)
+        done = threading.Event()
+        for _ in range(500):
+            if not outbox.unsent():
+                break
+            done.wait(0.01)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert not outbox.running
+    assert not outbox.unsent()
+    assert len(dc_server.received) == 6
+
+
+def test_cli_lists_and_replays_messages(
+    outbox: DcidOutbox, dc_server: FlakyDcServer, capsys
+):
+    dc_server.fail_with = 400
+    _queue_collection(outbox, "chip_7", dc_server.url)
+    outbox.deliver_due()
+
+    assert main(["--db", str(outbox.path), "list"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    assert "chip_7" in lines[1] and "failed" in lines[1] and "400" in lines[1]
+
+    assert main(["--db", str(outbox.path), "show", "1"]) == 0
+    assert '"collection": "chip_7"' in capsys.readouterr().out
+
+    dc_server.fail_with = None
+    assert main(["--db", str(outbox.path), "replay", "--send"]) == 0
+    out = capsys.readouterr().out
+    assert "Replayed 3 messages" in out and "Sent 3 messages" in out
+    assert not outbox.unsent()
+
+    assert main(["--db", str(outbox.path), "list"]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1
@@ -8,6 +8,7 @@ from dodal.devices.beamlines.i24.dual_backlight import BacklightPositions
 
 from mx_bluesky.beamlines.i24.serial.parameters.utils import EmptyMapError
 from mx_bluesky.beamlines.i24.web_gui_plans.general_plans import (
+    gui_estimate_chip_collection_time,
     gui_gonio_move_on_click,
     gui_move_backlight,
     gui_move_detector,
@@ -101,6 +102,21 @@ def test_gui_run_chip_collection_raises_error_for_empty_map(
         )
 
 
+@patch("mx_bluesky.beamlines.i24.web_gui_plans.general_plans.SSX_LOGGER")
+def test_gui_estimate_chip_collection_time_scales_with_blocks(mock_logger, run_engine):
+    def estimate(chip_map: list[int | float]) -> float:
+        return run_engine(
+            gui_estimate_chip_collection_time(
+                0.01, 1, "Oxford", "Lite", chip_map, False, "NoPP", 0.0, 0.0, 0.0
+            )
+        ).plan_result
+
+    one_block_s = estimate([1])
+    assert 400 * 0.01 < one_block_s < 400 * 0.03
+    assert estimate([1, 2, 3]) > 3 * one_block_s
+    mock_logger.info.assert_called_with(ANY)
+
+
 @patch("mx_bluesky.beamlines.i24.web_gui_plans.general_plans._move_on_mouse_click_plan")
 def test_gui_stage_move_on_click(fake_move_plan, oav, pmac, run_engine):
     run_engine(gui_stage_move_on_click((200, 200), oav, pmac))
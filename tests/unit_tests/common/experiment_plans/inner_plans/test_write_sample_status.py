@@ -39,7 +39,7 @@ def test_depositing_sample_error_with_sample_or_beamline_exception(
     with (
         patch(
             "mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback"
-            ".ExpeyeInteraction",
+            ".get_expeye_interaction",
             return_value=mock_expeye,
         ),
         pytest.raises(expected_raised_exception),
@@ -56,7 +56,7 @@ def test_depositing_sample_loaded(
     mock_expeye = MagicMock()
     with patch(
         "mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback"
-        ".ExpeyeInteraction",
+        ".get_expeye_interaction",
         return_value=mock_expeye,
     ):
         run_engine(deposit_loaded_sample(TEST_SAMPLE_ID))
@@ -1,4 +1,6 @@
+import asyncio
 import types
+from dataclasses import fields
 from functools import partial
 from unittest.mock import ANY, MagicMock, call, patch
 
@@ -22,7 +24,7 @@ from dodal.devices.synchrotron import SynchrotronMode
 from dodal.devices.zocalo import ZocaloStartInfo
 from ophyd.sim import NullStatus
 from ophyd.status import Status
-from ophyd_async.core import completed_status, set_mock_value
+from ophyd_async.core import callback_on_mock_put, completed_status, set_mock_value
 
 from mx_bluesky.common.experiment_plans.common_flyscan_xray_centre_plan import (
     BeamlineSpecificFGSFeatures,
@@ -49,6 +51,8 @@ from mx_bluesky.common.external_interaction.ispyb.ispyb_store import (
 )
 from mx_bluesky.common.parameters.constants import DocDescriptorNames
 from mx_bluesky.common.parameters.gridscan import SpecifiedThreeDGridScan
+from mx_bluesky.common.simulation.benchmark import PlanBenchmark
+from mx_bluesky.common.simulation.latency import LatencyInjector
 from mx_bluesky.common.utils.exceptions import (
     WarningError,
 )
@@ -365,6 +369,60 @@ class TestFlyscanXrayCentrePlan:
             [call.disarm(), call.run_end(100), call.run_end(200)]
         )
 
+    @pytest.mark.latency_benchmark
+    @pytest.mark.timeout(60)
+    def test_common_flyscan_xray_centre_benchmark(
+        self,
+        run_engine: RunEngine,
+        fake_fgs_composite: FlyScanEssentialDevices,
+        test_three_d_grid_params: SpecifiedThreeDGridScan,
+        beamline_specific: BeamlineSpecificFGSFeatures,
+        latency_injector: LatencyInjector,
+        plan_benchmark: PlanBenchmark,
+    ):
+        fgs = beamline_specific.fgs_motors
+        scan_time_s = (
+            test_three_d_grid_params.num_images
+            * test_three_d_grid_params.exposure_time_s
+        )
+
+        async def _run_motion_program():
+            set_mock_value(fgs.status, 1)
+            await latency_injector.delay(scan_time_s)
+            set_mock_value(fgs.status, 0)
+
+        background_tasks = set()
+
+        def _start_motion_program(_):
+            task = asyncio.create_task(_run_motion_program())
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+        callback_on_mock_put(fgs.run_cmd, _start_motion_program)
+        fake_fgs_composite.eiger.filewriters_finished = NullStatus()  # type: ignore
+        fake_fgs_composite.eiger.odin.check_and_wait_for_odin_state = MagicMock(
+            return_value=True
+        )
+        fake_fgs_composite.eiger.odin.file_writer.num_captured.sim_put(1200)  # type: ignore
+        fake_fgs_composite.eiger.stage = MagicMock(
+            return_value=Status(None, None, 0, True, True)
+        )
+        latency_injector.apply(
+            *(
+                getattr(fake_fgs_composite, field.name)
+                for field in fields(fake_fgs_composite)
+            ),
+            fgs,
+        )
+
+        plan_benchmark.run(
+            "common_flyscan_xray_centre",
+            run_engine,
+            common_flyscan_xray_centre(
+                fake_fgs_composite, test_three_d_grid_params, beamline_specific
+            ),
+        )
+
     @patch(
         "mx_bluesky.common.experiment_plans.common_flyscan_xray_centre_plan.bps.wait",
         autospec=True,
@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from mx_bluesky.common.experiment_plans.rotation.helical_utils import (
+    calculate_helical_motion_profile,
+    helical_vector_from_xrc_result,
+)
+from mx_bluesky.common.experiment_plans.rotation.rotation_utils import (
+    calculate_motion_profile,
+)
+from mx_bluesky.common.parameters.components import IspybExperimentType
+from mx_bluesky.common.parameters.rotation import RotationScan, SingleRotationScan
+from mx_bluesky.common.utils.xrc_result import XRayCentreResult
+
+HELICAL_VECTOR = {
+    "x_start_um": 100.0,
+    "y_start_um": 200.0,
+    "z_start_um": 300.0,
+    "x_end_um": 160.0,
+    "y_end_um": 200.0,
+    "z_end_um": 330.0,
+}
+
+
+def _xrc_result(centre_mm, low_mm, high_mm) -> XRayCentreResult:
+    return XRayCentreResult(
+        centre_of_mass_mm=np.array(centre_mm),
+        bounding_box_mm=(np.array(low_mm), np.array(high_mm)),
+        max_count=10,
+        total_count=100,
+        sample_id=1,
+    )
+
+
+@pytest.mark.parametrize(
+    "low_mm, high_mm, expected_start_um, expected_end_um",
+    [
+        # needle along x
+        ([0.0, 0.18, 0.28], [0.4, 0.22, 0.32], [10, 200, 300], [390, 200, 300]),
+        # needle along y
+        ([0.08, 0.0, 0.28], [0.12, 0.3, 0.32], [100, 10, 300], [100, 290, 300]),
+        # needle along z, corners given in any order
+        ([0.12, 0.22, 0.5], [0.08, 0.18, 0.2], [100, 200, 210], [100, 200, 490]),
+    ],
+)
+def test_helical_vector_follows_longest_edge_of_bounding_box_through_centre(
+    low_mm, high_mm, expected_start_um, expected_end_um
+):
+    result = _xrc_result([0.1, 0.2, 0.3], low_mm, high_mm)
+
+    vector = helical_vector_from_xrc_result(result, margin_um=10, min_length_um=50)
+
+    assert vector is not None
+    np.testing.assert_allclose(vector.start_um, expected_start_um)
+    np.testing.assert_allclose(vector.end_um, expected_end_um)
+
+
+def test_helical_vector_length():
+    result = _xrc_result([0.1, 0.2, 0.3], [0.0, 0.18, 0.28], [0.4, 0.22, 0.32])
+
+    vector = helical_vector_from_xrc_result(result, margin_um=50, min_length_um=50)
+
+    assert vector is not None
+    assert vector.length_um == pytest.approx(300)
+
+
+@pytest.mark.parametrize(
+    "margin_um, min_length_um, is_helical",
+    [(0, 40, True), (0, 41, False), (15, 10, True), (15, 11, False)],
+)
+def test_short_crystals_are_not_collected_helically(
+    margin_um: float, min_length_um: float, is_helical: bool
+):
+    result = _xrc_result([0.1, 0.2, 0.3], [0.08, 0.19, 0.29], [0.12, 0.21, 0.31])
+
+    vector = helical_vector_from_xrc_result(result, margin_um, min_length_um)
+
+    assert (vector is not None) == is_helical
+
+
+@pytest.fixture
+def helical_rotation_params(test_rotation_params: RotationScan) -> SingleRotationScan:
+    params = next(test_rotation_params.single_rotation_scans)
+    return SingleRotationScan(**(params.model_dump() | HELICAL_VECTOR))
+
+
+def test_rotation_with_start_and_end_is_helical(
+    helical_rotation_params: SingleRotationScan,
+):
+    assert helical_rotation_params.is_helical
+    assert helical_rotation_params.ispyb_experiment_type == IspybExperimentType.HELICAL
+
+
+def test_rotation_without_end_is_not_helical(test_rotation_params: RotationScan):
+    params = next(test_rotation_params.single_rotation_scans)
+
+    assert not params.is_helical
+    assert params.ispyb_experiment_type == IspybExperimentType.ROTATION
+    assert set(params.scan_points.keys()) == {"omega"}
+
+
+def test_helical_rotation_keeps_specific_experiment_type(
+    test_rotation_params: RotationScan,
+):
+    params = next(test_rotation_params.single_rotation_scans).model_dump()
+    params["ispyb_experiment_type"] = IspybExperimentType.MAD
+
+    helical_params = SingleRotationScan(**(params | HELICAL_VECTOR))
+
+    assert helical_params.ispyb_experiment_type == IspybExperimentType.MAD
+
+
+def test_helical_end_without_start_is_rejected(test_rotation_params: RotationScan):
+    params = next(test_rotation_params.single_rotation_scans).model_dump()
+    params |= {"x_start_um": None, "x_end_um": 1.0, "y_end_um": 2.0, "z_end_um": 3.0}
+
+    with pytest.raises(ValidationError, match="needs all of the start and end xyz"):
+        SingleRotationScan(**params)
+
+
+def test_helical_scan_points_translate_the_sample_at_each_image(
+    helical_rotation_params: SingleRotationScan,
+):
+    points = helical_rotation_params.scan_points
+    num_images = helical_rotation_params.num_images
+
+    for axis in ("omega", "sam_x", "sam_y", "sam_z"):
+        assert len(points[axis]) == num_images
+    assert points["sam_x"][0] == pytest.approx(100)
+    assert points["sam_z"][0] == pytest.approx(300)
+    # The final image starts one image before the end of the vector
+    assert points["sam_x"][-1] == pytest.approx(160 - 60 / num_images)
+    assert points["sam_z"][-1] == pytest.approx(330 - 30 / num_images)
+    np.testing.assert_allclose(points["sam_y"], 200)
+    sam_x_per_deg = np.diff(points["sam_x"]) / np.diff(points["omega"])
+    np.testing.assert_allclose(
+        sam_x_per_deg, 60 / helical_rotation_params.scan_width_deg
+    )
+
+
+def test_helical_motion_is_extrapolated_over_omega_acceleration_and_shutter_opening(
+    helical_rotation_params: SingleRotationScan,
+):
+    motion_values = calculate_motion_profile(helical_rotation_params, 0.2, 120)
+
+    helical_motion = calculate_helical_motion_profile(
+        helical_rotation_params, motion_values
+    )
+
+    mm_per_deg = np.array([0.06, 0, 0.03]) / motion_values.scan_width_deg
+    lead_in_deg = (
+        motion_values.acceleration_offset_deg + motion_values.shutter_opening_deg
+    )
+    np.testing.assert_allclose(
+        helical_motion.start_motion_mm,
+        np.array([0.1, 0.2, 0.3]) - mm_per_deg * lead_in_deg,
+    )
+    np.testing.assert_allclose(
+        helical_motion.end_motion_mm,
+        np.array([0.16, 0.2, 0.33])
+        + mm_per_deg * motion_values.acceleration_offset_deg,
+    )
+    # Translates at the same rate as omega across the scan
+    travel_time_s = (
+        helical_motion.end_motion_mm - helical_motion.start_motion_mm
+    ) / np.where(helical_motion.velocity_mm_s, helical_motion.velocity_mm_s, 1)
+    omega_time_s = (
+        abs(motion_values.distance_to_move_deg) / motion_values.speed_for_rotation_deg_s
+    )
+    np.testing.assert_allclose(travel_time_s, [omega_time_s, 0, omega_time_s])
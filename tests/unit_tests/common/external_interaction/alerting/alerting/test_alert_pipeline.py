@@ -0,0 +1,341 @@
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from mx_bluesky.common.external_interaction.alerting import Metadata
+from mx_bluesky.common.external_interaction.alerting._service import ExtraMetadata
+from mx_bluesky.common.external_interaction.alerting.file_based_service import (
+    FileAlertService,
+)
+from mx_bluesky.common.external_interaction.alerting.pipeline import (
+    AlertPipeline,
+    TokenBucket,
+    start_daemon_timer,
+)
+from mx_bluesky.common.external_interaction.alerting.webhook_service import (
+    WebhookAlertService,
+)
+
+METADATA = {Metadata.VISIT: "cm14451-2", Metadata.CONTAINER: "5"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeTimer:
+    def __init__(self, due: float, function: Callable[[], None]):
+        self.due = due
+        self.function = function
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeTimers:
+    """Starts timers which fire when the fake clock is advanced past them."""
+
+    def __init__(self, clock: FakeClock):
+        self._clock = clock
+        self.started: list[FakeTimer] = []
+
+    def __call__(self, delay_s: float, function: Callable[[], None]) -> FakeTimer:
+        timer = FakeTimer(self._clock.now + delay_s, function)
+        self.started.append(timer)
+        return timer
+
+    @property
+    def pending(self) -> list[FakeTimer]:
+        return [timer for timer in self.started if not timer.cancelled]
+
+    def advance(self, seconds: float):
+        end = self._clock.now + seconds
+        while due := [timer for timer in self.pending if timer.due <= end]:
+            timer = min(due, key=lambda timer: timer.due)
+            timer.cancelled = True
+            self._clock.now = timer.due
+            timer.function()
+        self._clock.now = end
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def timers(clock: FakeClock) -> FakeTimers:
+    return FakeTimers(clock)
+
+
+@pytest.fixture
+def sink() -> MagicMock:
+    return MagicMock()
+
+
+@pytest.fixture
+def pipeline(clock: FakeClock, timers: FakeTimers, sink: MagicMock) -> AlertPipeline:
+    return AlertPipeline(
+        [sink],
+        deduplication_window_s=60,
+        burst_size=3,
+        alerts_per_hour=60,
+        clock=clock,
+        start_timer=timers,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fixup_beamline():
+    with patch.dict(os.environ, {"BEAMLINE": "i03"}):
+        yield
+
+
+def test_first_alert_forwarded_to_all_sinks(clock: FakeClock):
+    sinks = [MagicMock(), MagicMock()]
+    pipeline = AlertPipeline(sinks, clock=clock)
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    for sink in sinks:
+        sink.raise_alert.assert_called_once_with("Summary", "Content", METADATA)
+
+
+def test_duplicate_alerts_within_window_are_suppressed(
+    pipeline: AlertPipeline, sink: MagicMock, clock: FakeClock
+):
+    for _ in range(10):
+        clock.now += 1
+        pipeline.raise_alert("Summary", "Content", METADATA)
+    sink.raise_alert.assert_called_once_with("Summary", "Content", METADATA)
+
+
+def test_alerts_with_different_content_are_not_deduplicated(
+    pipeline: AlertPipeline, sink: MagicMock
+):
+    pipeline.raise_alert("Summary", "Content 1", METADATA)
+    pipeline.raise_alert("Summary", "Content 2", METADATA)
+    pipeline.raise_alert("Summary", "Content 1", METADATA)
+    assert sink.raise_alert.mock_calls == [
+        call("Summary", "Content 1", METADATA),
+        call("Summary", "Content 2", METADATA),
+    ]
+
+
+def test_alerts_with_different_key_metadata_are_not_deduplicated(
+    pipeline: AlertPipeline, sink: MagicMock
+):
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    pipeline.raise_alert("Summary", "Content", METADATA | {Metadata.CONTAINER: "6"})
+    assert sink.raise_alert.call_count == 2
+
+
+def test_alerts_differing_only_in_other_metadata_are_deduplicated(
+    pipeline: AlertPipeline, sink: MagicMock
+):
+    pipeline.raise_alert("Summary", "Content", METADATA | {Metadata.SAMPLE_ID: "1"})
+    pipeline.raise_alert("Summary", "Content", METADATA | {Metadata.SAMPLE_ID: "2"})
+    sink.raise_alert.assert_called_once()
+
+
+def test_digest_sent_by_timer_when_window_expires(
+    pipeline: AlertPipeline, sink: MagicMock, clock: FakeClock, timers: FakeTimers
+):
+    for _ in range(4):
+        clock.now += 10
+        pipeline.raise_alert("Summary", "Content", METADATA)
+    timers.advance(29)
+    sink.raise_alert.assert_called_once()
+
+    timers.advance(1)
+    assert sink.raise_alert.mock_calls == [
+        call("Summary", "Content", METADATA),
+        call("Summary", "3 identical alerts suppressed in the last 60s", METADATA),
+    ]
+    assert not timers.pending
+
+
+def test_digest_timer_started_for_earliest_window(
+    pipeline: AlertPipeline, sink: MagicMock, clock: FakeClock, timers: FakeTimers
+):
+    for summary in ("First", "Second"):
+        pipeline.raise_alert(summary, "Content", METADATA)
+        clock.now += 20
+        pipeline.raise_alert(summary, "Content", METADATA)
+    timers.advance(20)
+    assert [c.args[0] for c in sink.raise_alert.mock_calls] == [
+        "First",
+        "Second",
+        "First",
+    ]
+    timers.advance(20)
+    assert [c.args[0] for c in sink.raise_alert.mock_calls][3:] == ["Second"]
+
+
+def test_no_timer_started_if_nothing_suppressed(
+    pipeline: AlertPipeline, timers: FakeTimers
+):
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    pipeline.raise_alert("Other summary", "Content", METADATA)
+    assert not timers.started
+
+
+def test_close_cancels_digest_timer(
+    pipeline: AlertPipeline, sink: MagicMock, timers: FakeTimers
+):
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    pipeline.close()
+    timers.advance(120)
+    sink.raise_alert.assert_called_once()
+
+
+def test_daemon_timer_calls_function_after_delay():
+    function = MagicMock()
+    timer = start_daemon_timer(60, function)
+    assert timer.daemon and timer.is_alive()
+    timer.cancel()
+    timer.join()
+    function.assert_not_called()
+
+
+def test_no_digest_sent_if_nothing_suppressed(
+    pipeline: AlertPipeline, sink: MagicMock, clock: FakeClock
+):
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    clock.now += 61
+    pipeline.flush_digests()
+    sink.raise_alert.assert_called_once()
+
+
+def test_alert_forwarded_again_after_window_expires(
+    pipeline: AlertPipeline, sink: MagicMock, clock: FakeClock
+):
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    clock.now += 61
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    assert sink.raise_alert.mock_calls == [call("Summary", "Content", METADATA)] * 2
+
+
+def test_first_alert_of_each_kind_is_never_rate_limited(
+    pipeline: AlertPipeline, sink: MagicMock
+):
+    for i in range(10):
+        pipeline.raise_alert(f"Summary {i}", "Content", METADATA)
+    assert sink.raise_alert.call_count == 10
+
+
+def test_recurring_alerts_are_rate_limited_and_reported_in_digest(
+    pipeline: AlertPipeline, sink: MagicMock, timers: FakeTimers
+):
+    for i in range(3):
+        pipeline.raise_alert(f"Summary {i}", "Content", METADATA)
+    timers.advance(61)
+    # About one alert has been allowed since the burst was used up
+    for i in range(3):
+        pipeline.raise_alert(f"Summary {i}", "Content", METADATA)
+    assert [c.args[0] for c in sink.raise_alert.mock_calls][3:] == ["Summary 0"]
+
+    timers.advance(60)
+    assert [c.args[:2] for c in sink.raise_alert.mock_calls[4:]] == [
+        ("Summary 1", "1 identical alerts suppressed in the last 60s"),
+        ("Summary 2", "1 identical alerts suppressed in the last 60s"),
+    ]
+
+
+def test_alerts_not_recurring_once_forgotten(clock: FakeClock, sink: MagicMock):
+    pipeline = AlertPipeline(
+        [sink],
+        deduplication_window_s=60,
+        burst_size=1,
+        alerts_per_hour=1,
+        recurrence_memory_s=600,
+        clock=clock,
+    )
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    clock.now += 601
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    assert sink.raise_alert.call_count == 2
+
+
+def test_error_alerts_pass_through_pipeline(pipeline: AlertPipeline, sink: MagicMock):
+    pipeline.raise_error_alert("Content", METADATA)
+    pipeline.raise_error_alert("Content", METADATA)
+    sink.raise_alert.assert_called_once_with(
+        "UDC encountered an error on i03", "Content", METADATA
+    )
+
+
+def test_distinct_error_alerts_are_all_sent(pipeline: AlertPipeline, sink: MagicMock):
+    pipeline.raise_error_alert("Robot load failed", {})
+    pipeline.raise_error_alert(
+        "UDC was stopped because hyperion-supervisor was unable to connect to "
+        "hyperion-blueapi.",
+        {},
+    )
+    assert [c.args[1] for c in sink.raise_alert.mock_calls] == [
+        "Robot load failed",
+        "UDC was stopped because hyperion-supervisor was unable to connect to "
+        "hyperion-blueapi.",
+    ]
+
+
+def test_failing_sink_does_not_prevent_other_sinks(clock: FakeClock):
+    failing_sink = MagicMock()
+    failing_sink.raise_alert.side_effect = RuntimeError("Sink down")
+    sink = MagicMock()
+    pipeline = AlertPipeline([failing_sink, sink], clock=clock)
+    pipeline.raise_alert("Summary", "Content", METADATA)
+    sink.raise_alert.assert_called_once()
+
+
+def test_token_bucket_refills_over_time(clock: FakeClock):
+    bucket = TokenBucket(2, 0.5, clock)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now += 1
+    assert not bucket.try_acquire()
+    clock.now += 1
+    assert bucket.try_acquire()
+    clock.now += 100
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_file_alert_service_appends_json_lines(tmp_path: Path):
+    path = tmp_path / "alerts.jsonl"
+    service = FileAlertService(path)
+    service.raise_alert("Summary 1", "Content 1", METADATA)
+    service.raise_alert("Summary 2", "Content 2", {})
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2
+    assert records[0][ExtraMetadata.ALERT_SUMMARY] == "Summary 1"
+    assert records[0][ExtraMetadata.ALERT_CONTENT] == "Content 1"
+    assert records[0][Metadata.VISIT] == "cm14451-2"
+    assert records[1][ExtraMetadata.ALERT_SUMMARY] == "Summary 2"
+
+
+@patch("mx_bluesky.common.external_interaction.alerting.webhook_service.requests")
+def test_webhook_alert_service_posts_json(mock_requests: MagicMock):
+    service = WebhookAlertService("http://localhost:9999/alerts")
+    service.raise_alert("Summary", "Content", METADATA)
+    mock_requests.post.assert_called_once_with(
+        "http://localhost:9999/alerts",
+        json={
+            ExtraMetadata.ALERT_SUMMARY: "Summary",
+            ExtraMetadata.ALERT_CONTENT: "Content",
+        }
+        | METADATA,
+        timeout=5.0,
+    )
+    mock_requests.post.return_value.raise_for_status.assert_called_once()
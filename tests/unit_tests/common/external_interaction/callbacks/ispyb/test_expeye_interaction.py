@@ -1,3 +1,6 @@
+import os
+import shutil
+from pathlib import Path
 from typing import Any
 from unittest.mock import ANY, patch
 
@@ -11,6 +14,8 @@ from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
     ExpeyeInteraction,
     _get_base_url_and_token,
     create_update_data_from_event_doc,
+    get_expeye_interaction,
+    set_expeye_interaction,
 )
 from mx_bluesky.common.utils.exceptions import ISPyBDepositionNotMadeError
 
@@ -165,6 +170,55 @@ def test_update_sample_status(
     )
 
 
+@pytest.fixture
+def copied_ispyb_config(tmp_path: Path):
+    config_path = tmp_path / "ispyb.cfg"
+    shutil.copy("tests/test_data/test_config.cfg", config_path)
+    with patch.dict(os.environ, {"ISPYB_CONFIG_PATH": str(config_path)}):
+        yield config_path
+
+
+def test_get_expeye_interaction_only_reads_config_once(copied_ispyb_config: Path):
+    with patch(
+        "mx_bluesky.common.external_interaction.ispyb.exp_eye_store._get_base_url_and_token",
+        wraps=_get_base_url_and_token,
+    ) as mock_read_config:
+        first = get_expeye_interaction()
+        second = get_expeye_interaction()
+
+    assert first is second
+    mock_read_config.assert_called_once()
+
+
+@patch("mx_bluesky.common.external_interaction.ispyb.exp_eye_store.patch")
+def test_get_expeye_interaction_reloads_credentials_when_config_changes(
+    mock_patch, copied_ispyb_config: Path
+):
+    expeye = get_expeye_interaction()
+    copied_ispyb_config.write_text(
+        copied_ispyb_config.read_text().replace("notatoken", "anewertoken")
+    )
+
+    assert get_expeye_interaction() is expeye
+    expeye.end_robot_action(3, "success", "")
+    assert mock_patch.call_args.kwargs["auth"].token == "anewertoken"
+
+
+def test_set_expeye_interaction_is_returned_for_the_config(copied_ispyb_config: Path):
+    expeye = ExpeyeInteraction("http://elsewhere", "atoken")
+    set_expeye_interaction(expeye)
+
+    assert get_expeye_interaction() is expeye
+
+
+def test_set_expeye_interaction_to_none_removes_it(copied_ispyb_config: Path):
+    expeye = ExpeyeInteraction("http://elsewhere", "atoken")
+    set_expeye_interaction(expeye, str(copied_ispyb_config))
+    set_expeye_interaction(None, str(copied_ispyb_config))
+
+    assert get_expeye_interaction() is not expeye
+
+
 def event_with_data(data: dict[str, Any]):
     return Event(
         {
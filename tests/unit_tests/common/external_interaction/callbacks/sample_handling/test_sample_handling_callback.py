@@ -24,7 +24,7 @@ TEST_CONTAINER = 8
 def mock_expeye_cls():
     with patch(
         "mx_bluesky.common.external_interaction.callbacks.sample_handling.sample_handling_callback"
-        ".ExpeyeInteraction"
+        ".get_expeye_interaction"
     ) as mock_expeye:
         yield mock_expeye
 
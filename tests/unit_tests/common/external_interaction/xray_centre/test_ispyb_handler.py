@@ -10,7 +10,10 @@ from mx_bluesky.common.external_interaction.ispyb.ispyb_store import (
     IspybIds,
     StoreInIspyb,
 )
-from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER
+from mx_bluesky.common.utils.log import (
+    ISPYB_ZOCALO_CALLBACK_LOGGER,
+    flush_queued_log_handlers,
+)
 from mx_bluesky.hyperion.external_interaction.callbacks.__main__ import setup_logging
 from mx_bluesky.hyperion.parameters.gridscan import (
     GenericGridWithHyperionDetectorParams,
@@ -122,17 +125,11 @@ class TestXrayCentreIspybHandler:
         )
 
     @pytest.mark.skip_log_setup
+    @patch.object(GELFTCPHandler, "emit")
     def test_given_ispyb_callback_started_writing_to_ispyb_when_messages_logged_then_they_contain_dcgid(
-        self, test_event_data
+        self, gelf_emit: MagicMock, test_event_data
     ):
         setup_logging(True)
-        gelf_handler: MagicMock = next(
-            filter(
-                lambda h: isinstance(h, GELFTCPHandler),
-                ISPYB_ZOCALO_CALLBACK_LOGGER.handlers,  # type: ignore
-            )
-        )
-        gelf_handler.emit = MagicMock()
 
         ispyb_handler = GridDetectAndScanISPyBCallback(
             param_type=GenericGridWithHyperionDetectorParams
@@ -154,21 +151,16 @@ class TestXrayCentreIspybHandler:
         )
 
         ISPYB_ZOCALO_CALLBACK_LOGGER.info("test")
-        latest_record = gelf_handler.emit.call_args.args[-1]
+        flush_queued_log_handlers()
+        latest_record = gelf_emit.call_args.args[-1]
         assert latest_record.dc_group_id == DCG_ID
 
     @pytest.mark.skip_log_setup
+    @patch.object(GELFTCPHandler, "emit")
     def test_given_ispyb_callback_finished_writing_to_ispyb_when_messages_logged_then_they_do_not_contain_dcgid(
-        self, test_event_data
+        self, gelf_emit: MagicMock, test_event_data
     ):
         setup_logging(True)
-        gelf_handler: MagicMock = next(
-            filter(
-                lambda h: isinstance(h, GELFTCPHandler),
-                ISPYB_ZOCALO_CALLBACK_LOGGER.handlers,  # type: ignore
-            )
-        )
-        gelf_handler.emit = MagicMock()
 
         ispyb_handler = GridDetectAndScanISPyBCallback(
             param_type=GenericGridWithHyperionDetectorParams
@@ -193,7 +185,8 @@ class TestXrayCentreIspybHandler:
         )
 
         ISPYB_ZOCALO_CALLBACK_LOGGER.info("test")
-        latest_record = gelf_handler.emit.call_args.args[-1]
+        flush_queued_log_handlers()
+        latest_record = gelf_emit.call_args.args[-1]
         assert not hasattr(latest_record, "dc_group_id")
 
     @patch(
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from mx_bluesky.common.parameters.components import IspybExperimentType
+from mx_bluesky.common.parameters.rotation import RotationScan
+
+from ....conftest import raw_params_from_file
+
+
+@pytest.fixture
+def raw_rotation_params(tmp_path) -> dict:
+    return raw_params_from_file(
+        "tests/test_data/parameter_json_files/good_test_one_multi_rotation_scan_parameters.json",
+        tmp_path,
+    )
+
+
+def _wedged_params(raw_rotation_params: dict, **wedges) -> RotationScan:
+    return RotationScan(**raw_rotation_params, wedges=wedges)
+
+
+def test_without_wedges_sweeps_are_the_rotation_scans(raw_rotation_params: dict):
+    params = RotationScan(**raw_rotation_params)
+
+    assert params.sweeps == params.rotation_scans
+    assert params.ispyb_experiment_type == IspybExperimentType.ROTATION
+
+
+def test_inverse_beam_wedges_are_interleaved_with_their_friedel_mates(
+    raw_rotation_params: dict,
+):
+    params = _wedged_params(raw_rotation_params, wedge_width_deg=30)
+
+    # The sweep is 180 degrees in the negative direction from 0
+    assert [sweep.omega_start_deg for sweep in params.sweeps] == [
+        0,
+        180,
+        -30,
+        150,
+        -60,
+        120,
+        -90,
+        90,
+        -120,
+        60,
+        -150,
+        30,
+    ]
+    assert all(sweep.scan_width_deg == 30 for sweep in params.sweeps)
+    assert [sweep.nexus_vds_start_img for sweep in params.sweeps] == list(
+        range(0, 3600, 300)
+    )
+    assert params.num_images == 3600
+    assert params.detector_params.num_images_per_trigger == 300
+    assert params.detector_params.num_triggers == 12
+    assert params.ispyb_experiment_type == IspybExperimentType.SAD_INVERSE_BEAM
+
+
+def test_wedges_without_inverse_beam_cover_the_sweep_in_order(
+    raw_rotation_params: dict,
+):
+    raw_rotation_params["rotation_scans"][0]["rotation_direction"] = "Positive"
+
+    params = _wedged_params(raw_rotation_params, wedge_width_deg=45, inverse_beam=False)
+
+    assert [sweep.omega_start_deg for sweep in params.sweeps] == [0, 45, 90, 135]
+    assert params.ispyb_experiment_type == IspybExperimentType.ROTATION
+
+
+def test_wedges_of_each_sweep_are_collected_in_turn(raw_rotation_params: dict):
+    first_sweep = raw_rotation_params["rotation_scans"][0]
+    raw_rotation_params["rotation_scans"].append(
+        first_sweep | {"omega_start_deg": 90, "scan_width_deg": 60}
+    )
+
+    params = _wedged_params(raw_rotation_params, wedge_width_deg=60)
+
+    assert [sweep.omega_start_deg for sweep in params.sweeps] == [
+        0,
+        180,
+        -60,
+        120,
+        -120,
+        60,
+        90,
+        270,
+    ]
+
+
+def test_only_first_wedge_takes_snapshots(raw_rotation_params: dict):
+    params = _wedged_params(raw_rotation_params, wedge_width_deg=90)
+
+    take_snapshots = [scan.take_snapshots for scan in params.single_rotation_scans]
+
+    assert take_snapshots == [True, False, False, False]
+
+
+def test_helical_sweep_is_divided_between_wedges(raw_rotation_params: dict):
+    raw_rotation_params["rotation_scans"][0] |= {
+        "x_end_um": 61.0,
+        "y_end_um": 2.0,
+        "z_end_um": 33.0,
+    }
+
+    params = _wedged_params(raw_rotation_params, wedge_width_deg=60)
+
+    x_segments = [(sweep.x_start_um, sweep.x_end_um) for sweep in params.sweeps]
+    np.testing.assert_allclose(
+        x_segments, [(1, 21), (1, 21), (21, 41), (21, 41), (41, 61), (41, 61)]
+    )
+    assert all(scan.is_helical for scan in params.single_rotation_scans)
+
+
+def test_wedge_width_must_divide_the_sweep(raw_rotation_params: dict):
+    with pytest.raises(ValidationError, match="does not divide scan width"):
+        _wedged_params(raw_rotation_params, wedge_width_deg=50)
+
+
+def test_wedged_sweeps_must_share_chi_and_phi(raw_rotation_params: dict):
+    first_sweep = raw_rotation_params["rotation_scans"][0]
+    raw_rotation_params["rotation_scans"].append(first_sweep | {"chi_start_deg": 0})
+
+    with pytest.raises(ValidationError, match="must share chi and phi"):
+        _wedged_params(raw_rotation_params, wedge_width_deg=30)
@@ -0,0 +1,211 @@
+import json
+
+import bluesky.plan_stubs as bps
+import bluesky.preprocessors as bpp
+import pytest
+from bluesky.run_engine import RunEngine
+from bluesky.simulators import RunEngineSimulator
+from ophyd_async.core import soft_signal_rw
+
+from mx_bluesky.common.preprocessors.phase_profiler import (
+    PHASE_TIMINGS_KEY,
+    PHASE_TIMINGS_STREAM,
+    TOTAL_DURATION_KEY,
+    TOTAL_WAIT_KEY,
+    PhaseProfiler,
+    phase_profiler_wrapper,
+)
+from mx_bluesky.common.utils.phase_report import (
+    BETWEEN_PHASES,
+    aggregate_phase_timings,
+    load_phase_timings,
+    main,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def _sub_plan(run_key: str, group: str):
+    @bpp.set_run_key_decorator(run_key)
+    @bpp.run_decorator()
+    def _inner():
+        yield from bps.null()
+        yield from bps.wait(group)
+
+    return _inner()
+
+
+def _sample_plan():
+    yield from _sub_plan("robot_load", "robot")
+    yield from bps.wait("between")
+    yield from _sub_plan("rotation_scan", "rotation")
+    yield from _sub_plan("rotation_scan", "rotation")
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def timed_sim_run_engine(sim_run_engine: RunEngineSimulator, clock: FakeClock):
+    for group, seconds in [("robot", 30), ("between", 2), ("rotation", 10)]:
+        sim_run_engine.add_wait_handler(
+            lambda _, seconds=seconds: clock.advance(seconds), group
+        )
+    return sim_run_engine
+
+
+def test_each_run_is_profiled_as_a_phase(
+    timed_sim_run_engine: RunEngineSimulator, clock: FakeClock
+):
+    profiler = PhaseProfiler(clock)
+    timed_sim_run_engine.simulate_plan(profiler.profile(_sample_plan()))
+
+    assert [(phase.name, phase.parent) for phase in profiler.phases] == [
+        ("total", None),
+        ("robot_load", 0),
+        ("rotation_scan", 0),
+        ("rotation_scan", 0),
+    ]
+    assert [
+        (phase.start_s, phase.end_s, phase.waits_s) for phase in profiler.phases
+    ] == [
+        (0, 52, {"between": 2}),
+        (0, 30, {"robot": 30}),
+        (32, 42, {"rotation": 10}),
+        (42, 52, {"rotation": 10}),
+    ]
+
+
+def test_nested_runs_are_attributed_to_innermost_phase(
+    sim_run_engine: RunEngineSimulator, clock: FakeClock
+):
+    sim_run_engine.add_wait_handler(lambda _: clock.advance(5), "inner")
+
+    @bpp.set_run_key_decorator("outer")
+    @bpp.run_decorator()
+    def outer():
+        yield from _sub_plan("inner", "inner")
+
+    profiler = PhaseProfiler(clock)
+    sim_run_engine.simulate_plan(profiler.profile(outer()))
+
+    assert [(phase.name, phase.parent) for phase in profiler.phases] == [
+        ("total", None),
+        ("outer", 0),
+        ("inner", 1),
+    ]
+    assert profiler.phases[1].waits_s == {}
+    assert profiler.phases[2].waits_s == {"inner": 5}
+
+
+def test_waits_on_generated_groups_are_labelled_by_device(
+    sim_run_engine: RunEngineSimulator, clock: FakeClock
+):
+    signal = soft_signal_rw(float, name="zocalo")
+    sim_run_engine.add_wait_handler(lambda _: clock.advance(3))
+    profiler = PhaseProfiler(clock)
+    sim_run_engine.simulate_plan(profiler.profile(bps.abs_set(signal, 1, wait=True)))
+
+    assert profiler.phases[0].waits_s == {"zocalo": 3}
+
+
+def test_summary_event_emitted_after_plan(
+    timed_sim_run_engine: RunEngineSimulator, clock: FakeClock
+):
+    profiler = PhaseProfiler(clock)
+    messages = timed_sim_run_engine.simulate_plan(profiler.profile(_sample_plan()))
+
+    assert [msg.command for msg in messages[-3:]] == ["create", "read", "save"]
+    assert messages[-3].kwargs["name"] == PHASE_TIMINGS_STREAM
+    reading = messages[-2].obj.read()
+    assert reading[TOTAL_DURATION_KEY]["value"] == 52
+    assert reading[TOTAL_WAIT_KEY]["value"] == 52
+    assert len(json.loads(reading[PHASE_TIMINGS_KEY]["value"])) == 4
+
+
+def test_summary_emitted_and_incomplete_phase_recorded_when_plan_fails(
+    sim_run_engine: RunEngineSimulator, clock: FakeClock
+):
+    def failing_plan():
+        yield from bps.open_run()
+        yield from bps.null()
+        raise ValueError("Failed")
+
+    profiler = PhaseProfiler(clock)
+    with pytest.raises(ValueError):
+        sim_run_engine.simulate_plan(
+            profiler.profile(bpp.set_run_key_wrapper(failing_plan(), "failing"))
+        )
+
+    assert profiler.phases[0].end_s == 0
+    assert profiler.phases[1].end_s is None
+    assert "failing incomplete" in profiler.summary()
+
+
+def test_summary_logged(
+    timed_sim_run_engine: RunEngineSimulator, clock: FakeClock, caplog
+):
+    caplog.set_level("INFO")
+    timed_sim_run_engine.simulate_plan(
+        phase_profiler_wrapper(_sample_plan(), "sample 1", clock)
+    )
+
+    assert (
+        "Phase timings for sample 1: total 52.0s (waiting 2.0s), robot_load 30.0s "
+        "(waiting 30.0s), rotation_scan 10.0s (waiting 10.0s), rotation_scan 10.0s "
+        "(waiting 10.0s)"
+    ) in caplog.messages
+
+
+def test_self_time_of_phases_excludes_nested_phases():
+    phases = [
+        {"name": "total", "parent": None, "start_s": 0, "end_s": 100, "waits_s": {}},
+        {"name": "centre", "parent": 0, "start_s": 0, "end_s": 60, "waits_s": {}},
+        {"name": "gridscan", "parent": 1, "start_s": 10, "end_s": 50, "waits_s": {}},
+        {"name": "rotation", "parent": 0, "start_s": 70, "end_s": 90, "waits_s": {}},
+    ]
+    stats = {s.name: s for s in aggregate_phase_timings([phases, phases])}
+
+    assert stats[BETWEEN_PHASES].self_s == 40
+    assert stats["centre"].self_s == 40
+    assert stats["centre"].total_s == 120
+    assert stats["gridscan"].self_s == 80
+    assert stats["rotation"].count == 2
+    assert sum(s.self_s for s in stats.values()) == 200
+
+
+def test_phase_report_aggregates_recorded_documents(
+    run_engine: RunEngine, tmp_path, capsys
+):
+    @bpp.run_decorator()
+    def profiled_sample():
+        yield from phase_profiler_wrapper(_sample_plan())
+
+    documents_file = tmp_path / "documents.jsonl"
+    with open(documents_file, "w") as f:
+        run_engine.subscribe(lambda name, doc: f.write(json.dumps([name, doc]) + "\n"))
+        for _ in range(3):
+            run_engine(profiled_sample())
+
+    with open(documents_file) as f:
+        samples = load_phase_timings(f)
+    assert len(samples) == 3
+
+    main([str(documents_file)])
+    report = capsys.readouterr().out
+    assert report.startswith("3 profiled plans")
+    rows = {line.split()[0]: line.split() for line in report.splitlines()[2:]}
+    assert rows["robot_load"][1] == "3"
+    assert rows["rotation_scan"][1] == "6"
+    assert rows["(between"][2] == "3"
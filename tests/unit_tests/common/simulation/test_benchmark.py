@@ -0,0 +1,106 @@
+import bluesky.plan_stubs as bps
+import pytest
+from bluesky.run_engine import RunEngine
+
+from mx_bluesky.common.simulation.benchmark import (
+    BenchmarkBaseline,
+    BenchmarkResult,
+    PlanBenchmark,
+    PlanRegressionError,
+)
+from mx_bluesky.common.simulation.latency import LatencyInjector, LatencyProfile
+
+
+def _plan_delayed_by(injector: LatencyInjector, delay_s: float):
+    def _delay():
+        yield from bps.wait_for([lambda: injector.delay(delay_s)])
+
+    return _delay()
+
+
+@pytest.fixture
+def injector() -> LatencyInjector:
+    return LatencyInjector(LatencyProfile())
+
+
+@pytest.mark.parametrize(
+    "baseline_s, regressed",
+    [(None, False), (10, False), (9.5, False), (9, True)],
+)
+def test_result_regresses_when_slower_than_threshold(baseline_s, regressed):
+    result = BenchmarkResult("plan", 10, baseline_s, 0.1)
+
+    assert result.regressed == regressed
+
+
+def test_result_describes_change_from_baseline():
+    assert str(BenchmarkResult("plan", 11, 10, 0.1)) == (
+        "plan: 11.00s against a baseline of 10.00s (+10.0%)"
+    )
+    assert str(BenchmarkResult("plan", 11, None, 0.1)) == "plan: 11.00s, no baseline"
+
+
+def test_baseline_is_empty_if_not_stored(tmp_path):
+    assert BenchmarkBaseline.load(tmp_path / "baseline.json") == BenchmarkBaseline()
+
+
+def test_baseline_is_updated_with_results_and_stored(tmp_path):
+    path = tmp_path / "baseline.json"
+    BenchmarkBaseline(threshold=0.2, durations_s={"a": 1, "b": 2}).save(path)
+
+    BenchmarkBaseline.load(path).updated_with(
+        [BenchmarkResult("b", 3.004, 2, 0.2), BenchmarkResult("c", 4, None, 0.2)]
+    ).save(path)
+
+    assert BenchmarkBaseline.load(path) == BenchmarkBaseline(
+        threshold=0.2, durations_s={"a": 1, "b": 3, "c": 4}
+    )
+
+
+@pytest.mark.timeout(5)
+def test_plan_duration_is_given_in_simulated_time(
+    run_engine: RunEngine, injector: LatencyInjector
+):
+    benchmark = PlanBenchmark(injector, BenchmarkBaseline(durations_s={"plan": 10}))
+
+    result = benchmark.run("plan", run_engine, _plan_delayed_by(injector, 10))
+
+    assert result.duration_s == 10
+    assert result.baseline_s == 10
+    assert benchmark.results == [result]
+
+
+@pytest.mark.timeout(5)
+def test_plan_sleeps_are_counted_in_simulated_time(
+    run_engine: RunEngine, injector: LatencyInjector
+):
+    benchmark = PlanBenchmark(injector, BenchmarkBaseline())
+
+    def plan():
+        yield from bps.sleep(60)
+        yield from _plan_delayed_by(injector, 10)
+
+    assert benchmark.run("plan", run_engine, plan()).duration_s == 70
+
+
+@pytest.mark.timeout(5)
+def test_plan_slower_than_baseline_fails(
+    run_engine: RunEngine, injector: LatencyInjector
+):
+    benchmark = PlanBenchmark(injector, BenchmarkBaseline(durations_s={"plan": 5}))
+
+    with pytest.raises(PlanRegressionError, match="plan: .* baseline of 5.00s"):
+        benchmark.run("plan", run_engine, _plan_delayed_by(injector, 10))
+
+
+@pytest.mark.timeout(5)
+def test_plan_slower_than_baseline_is_only_recorded_if_not_checking(
+    run_engine: RunEngine, injector: LatencyInjector
+):
+    benchmark = PlanBenchmark(
+        injector, BenchmarkBaseline(durations_s={"plan": 5}), check=False
+    )
+
+    result = benchmark.run("plan", run_engine, _plan_delayed_by(injector, 10))
+
+    assert result.regressed
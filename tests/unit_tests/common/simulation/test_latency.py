@@ -0,0 +1,213 @@
+import asyncio
+
+import bluesky.plan_stubs as bps
+import pytest
+from bluesky.run_engine import RunEngine
+from ophyd_async.core import callback_on_mock_put, init_devices
+from ophyd_async.epics.motor import Motor
+
+from mx_bluesky.common.simulation.latency import (
+    LatencyInjector,
+    LatencyProfile,
+    MotorLatency,
+    SignalLatency,
+    VirtualClock,
+    distance_travelled,
+    travel_time_s,
+)
+
+
+@pytest.fixture
+async def motor() -> Motor:
+    async with init_devices(mock=True):
+        motor = Motor("")
+    return motor
+
+
+def _injector(**kwargs) -> LatencyInjector:
+    return LatencyInjector(LatencyProfile(**kwargs))
+
+
+@pytest.mark.parametrize(
+    "distance, velocity, acceleration_time_s, expected_s",
+    [
+        (10, 2, 1, 6),
+        (-10, 2, 1, 6),
+        (1, 2, 1, 2 * 0.5**0.5),
+        (10, 2, 0, 5),
+        (0, 2, 1, 0),
+    ],
+)
+def test_travel_time_follows_trapezoidal_profile(
+    distance, velocity, acceleration_time_s, expected_s
+):
+    assert travel_time_s(distance, velocity, acceleration_time_s) == pytest.approx(
+        expected_s
+    )
+
+
+@pytest.mark.parametrize("distance", [10, -10, 1, -1])
+def test_distance_travelled_is_symmetric_and_ends_at_the_distance(distance):
+    total_s = travel_time_s(distance, 2, 1)
+
+    assert distance_travelled(0, distance, 2, 1) == 0
+    assert distance_travelled(total_s / 2, distance, 2, 1) == pytest.approx(
+        distance / 2
+    )
+    assert distance_travelled(total_s, distance, 2, 1) == distance
+    positions = [
+        distance_travelled(total_s * i / 20, distance, 2, 1) for i in range(21)
+    ]
+    assert positions == sorted(positions, reverse=distance < 0)
+
+
+def test_profile_is_loaded_from_yaml_and_first_match_used(tmp_path):
+    path = tmp_path / "profile.yaml"
+    path.write_text(
+        """
+motors:
+  gonio-omega:
+    velocity: 100
+  gonio-*:
+    velocity: 2
+    acceleration_time_s: 0.1
+signals:
+  eiger-*:
+    set_latency_s: 0.5
+"""
+    )
+
+    profile = LatencyProfile.load(path)
+
+    assert profile.for_motor("gonio-omega") == MotorLatency(velocity=100)
+    assert profile.for_motor("gonio-x") == MotorLatency(
+        velocity=2, acceleration_time_s=0.1
+    )
+    assert profile.for_motor("detector_motion-z") is None
+    assert profile.for_signal("eiger-cam-acquire") == SignalLatency(set_latency_s=0.5)
+
+
+async def test_motor_moves_at_its_velocity_updating_its_readback(motor: Motor):
+    injector = _injector(
+        motors={
+            "motor": MotorLatency(
+                velocity=10, acceleration_time_s=0.1, readback_rate_hz=20
+            )
+        }
+    )
+    readbacks = []
+    motor.user_readback.subscribe_reading(
+        lambda reading: readbacks.append(reading["motor"]["value"])
+    )
+
+    assert injector.apply(motor) == ["motor"]
+    await motor.set(5)
+
+    assert await motor.velocity.get_value() == 10
+    assert await motor.user_readback.get_value() == 5
+    assert await motor.motor_done_move.get_value() == 1
+    assert injector.clock.now() == pytest.approx(0.6)
+    # The initial reading, one every 0.05s and the final position
+    assert len(readbacks) == 14
+    assert readbacks == sorted(readbacks)
+
+
+async def test_motor_keeps_velocity_set_on_it_if_none_given(motor: Motor):
+    injector = _injector(motors={"motor": MotorLatency(acceleration_time_s=0)})
+    await motor.velocity.set(50)
+
+    injector.apply(motor)
+    await motor.set(5)
+
+    assert injector.clock.now() == pytest.approx(0.1)
+
+
+async def test_motor_settles_after_arriving(motor: Motor):
+    injector = _injector(
+        motors={
+            "motor": MotorLatency(velocity=1, acceleration_time_s=0, settle_time_s=2)
+        }
+    )
+    injector.apply(motor)
+    await motor.set(3)
+
+    assert injector.clock.now() == pytest.approx(5)
+
+
+async def test_signal_puts_are_delayed_keeping_existing_behaviour(motor: Motor):
+    injector = _injector(signals={"motor-velocity": SignalLatency(set_latency_s=2)})
+    callback_on_mock_put(motor.velocity, lambda value: value * 2)
+
+    assert injector.apply(motor) == ["motor-velocity"]
+    await motor.velocity.set(3)
+
+    assert await motor.velocity.get_value() == 6
+    assert injector.clock.now() == 2
+
+
+async def test_concurrent_delays_are_not_counted_twice():
+    injector = _injector()
+
+    await asyncio.gather(injector.delay(2), injector.delay(1))
+
+    assert injector.clock.now() == 2
+
+
+async def test_consecutive_delays_are_added():
+    injector = _injector()
+
+    await injector.delay(2)
+    await injector.delay(1)
+
+    assert injector.clock.now() == 3
+
+
+async def test_real_time_outside_delays_is_not_counted():
+    injector = _injector()
+
+    await injector.delay(1)
+    await asyncio.sleep(0.05)
+
+    assert injector.clock.now() == 1
+
+
+async def test_virtual_clock_wakes_sleepers_in_order_of_simulated_time():
+    clock = VirtualClock()
+    woken = []
+
+    async def sleep(name: str, duration_s: float):
+        await clock.sleep(duration_s)
+        woken.append((name, clock.now()))
+
+    await asyncio.gather(sleep("b", 2), sleep("a", 1), sleep("c", 2))
+
+    assert woken == [("a", 1), ("b", 2), ("c", 2)]
+
+
+async def test_cancelled_sleep_does_not_hold_up_the_clock():
+    clock = VirtualClock()
+    cancelled = asyncio.create_task(clock.sleep(10))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await clock.sleep(1)
+
+    assert clock.now() == 1
+
+
+def test_moves_waited_on_together_overlap_in_a_plan(run_engine: RunEngine):
+    injector = _injector(motors={"*": MotorLatency(velocity=1, acceleration_time_s=0)})
+
+    with init_devices(mock=True):
+        x, y = Motor(""), Motor("")
+    injector.apply(x, y)
+    run_engine(bps.mv(x, 2, y, 3))
+    assert injector.clock.now() == pytest.approx(3)
+
+    run_engine(bps.mv(x, 3))
+    run_engine(bps.mv(y, 5))
+    assert injector.clock.now() == pytest.approx(6)
+
+
+def test_apply_ignores_anything_not_an_ophyd_async_device():
+    assert _injector(motors={"*": MotorLatency()}).apply(None, object()) == []
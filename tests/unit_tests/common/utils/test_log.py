@@ -1,14 +1,18 @@
+import logging
 import os
+import time
 from logging import FileHandler
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 from bluesky import plan_stubs as bps
 from bluesky import preprocessors as bpp
 from dodal.log import (
     ERROR_LOG_BUFFER_LINES,
+    GELFTCPHandler,
     set_up_all_logging_handlers,
 )
 from dodal.log import LOGGER as DODAL_LOGGER
@@ -42,6 +46,7 @@ def clear_and_mock_loggers():
         graylog_emit.reset_mock()
         filehandler_emit.reset_mock()
         yield filehandler_emit, graylog_emit
+        log.stop_queued_log_handlers()
     clear_log_handlers([*log.ALL_LOGGERS, DODAL_LOGGER])
 
 
@@ -267,3 +272,176 @@ def test_setup_hyperion_blueapi_logging_configures_debug_and_file_handlers(
     mock_debug_setup.assert_called_once_with(
         DODAL_LOGGER, tmp_path, "hyperion-test.log", ERROR_LOG_BUFFER_LINES
     )
+
+
+def test_summarise_doc_truncates_sequences_and_strings():
+    doc = {
+        "data": {"counts": np.arange(100), "list": list(range(3))},
+        "name": "x" * 300,
+    }
+    summary = log.summarise_doc_for_log(doc, max_items=5, max_string_length=10)
+    assert summary["data"]["counts"] == [0, 1, 2, 3, 4, "... (95 more)"]
+    assert summary["data"]["list"] == [0, 1, 2]
+    assert summary["name"] == "xxxxxxxxxx... (300 characters)"
+
+
+def test_summarise_doc_replaces_deeply_nested_mappings_with_keys():
+    doc = {"a": {"b": {"c": 1, "d": 2}}}
+    assert log.summarise_doc_for_log(doc, max_depth=2) == {
+        "a": {"b": "<dict with keys ['c', 'd']>"}
+    }
+
+
+def test_format_doc_for_log_gives_full_doc_unless_summarised():
+    doc = {"data": list(range(20))}
+    assert '"... (10 more)"' not in log.format_doc_for_log(doc)
+    assert '"... (10 more)"' in log.format_doc_for_log(doc, summarise=True)
+
+
+@patch("mx_bluesky.common.utils.log.format_doc_for_log", return_value="formatted")
+def test_lazy_doc_format_only_formats_emitted_messages_and_only_once(
+    mock_format: MagicMock,
+):
+    logger = logging.getLogger("lazy doc test")
+    logger.setLevel(logging.INFO)
+    handler = logging.Handler()
+    handler.emit = MagicMock()  # type: ignore
+    logger.addHandler(handler)
+    doc = {"uid": "abc"}
+
+    logger.debug("Document %s", log.LazyDocFormat(doc))
+    mock_format.assert_not_called()
+
+    lazy_doc = log.LazyDocFormat(doc)
+    logger.info("Document %s", lazy_doc)
+    assert handler.emit.call_args.args[0].getMessage() == "Document formatted"  # type: ignore
+    assert str(lazy_doc) == "formatted"
+    mock_format.assert_called_once_with(doc, True)
+    logger.removeHandler(handler)
+
+
+def test_queue_log_handlers_emits_from_background_thread_with_tags_at_log_time():
+    logger = logging.getLogger("queue handler test")
+    logger.setLevel(logging.DEBUG)
+    emitted: list[logging.LogRecord] = []
+    info_handler = logging.Handler(logging.INFO)
+    info_handler.emit = emitted.append  # type: ignore
+    logger.addHandler(info_handler)
+    tag = log.ExperimentMetadataTagFilter()
+
+    queued_handlers = log.queue_log_handlers(logger, [info_handler], [tag])
+    assert logger.handlers == [queued_handlers]
+    tag.dc_group_id = "1"
+    logger.debug("not emitted")
+    logger.info("Document %s", log.LazyDocFormat({"uid": "abc"}))
+    tag.dc_group_id = "2"
+    log.flush_queued_log_handlers()
+
+    [record] = emitted
+    assert record.dc_group_id == "1"  # type: ignore
+    assert '"uid": "abc"' in record.getMessage()
+    queued_handlers.close()
+    logger.handlers.clear()
+
+
+def test_closing_queued_log_handlers_emits_queued_messages_and_closes_handlers():
+    logger = logging.getLogger("queue handler close test")
+    handler = MagicMock(spec=logging.Handler, level=logging.INFO)
+    queued_handlers = log.queue_log_handlers(logger, [handler])
+    logger.warning("queued")
+    queued_handlers.close()
+    assert handler.handle.call_args.args[0].getMessage() == "queued"
+    handler.close.assert_called_once()
+    logger.handlers.clear()
+
+
+@pytest.mark.skip_log_setup
+def test_default_logging_setup_with_queue_handlers_sends_to_graylog_and_file(
+    clear_and_mock_loggers,
+):
+    mock_filehandler_emit, mock_gelf_tcp_handler_emit = clear_and_mock_loggers
+    log.do_default_logging_setup(
+        "hyperion.log", TEST_GRAYLOG_PORT, dev_mode=True, queue_handlers=True
+    )
+    log.set_dcgid_tag(100)
+    log.LOGGER.info("test MX_Bluesky")
+    log.set_dcgid_tag(None)
+    log.flush_queued_log_handlers()
+
+    for emit in [mock_filehandler_emit, mock_gelf_tcp_handler_emit]:
+        [record] = [
+            c.args[0] for c in emit.mock_calls if c.args[0].msg == "test MX_Bluesky"
+        ]
+        assert record.dc_group_id == 100
+
+
+@pytest.mark.skip_log_setup
+def test_exception_logged_through_queue_handlers_reaches_graylog_with_traceback(
+    clear_and_mock_loggers,
+):
+    mock_filehandler_emit, mock_gelf_tcp_handler_emit = clear_and_mock_loggers
+    log.do_default_logging_setup(
+        "hyperion.log", TEST_GRAYLOG_PORT, dev_mode=True, queue_handlers=True
+    )
+    try:
+        raise ValueError("Bad sample")
+    except ValueError:
+        log.LOGGER.exception("Collection failed")
+    log.flush_queued_log_handlers()
+
+    [record] = [
+        c.args[0]
+        for c in mock_gelf_tcp_handler_emit.mock_calls
+        if c.args[0].msg == "Collection failed"
+    ]
+    assert record.exc_info[0] is ValueError
+    gelf = GELFTCPHandler("localhost", TEST_GRAYLOG_PORT)._make_gelf_dict(record)  # noqa: SLF001
+    assert gelf["short_message"] == "Collection failed"
+    assert "ValueError: Bad sample" in gelf["full_message"]
+
+
+@pytest.mark.latency_benchmark
+@pytest.mark.timeout(60)
+def test_time_per_event_document_with_debug_logging_on_and_off(
+    capsys: pytest.CaptureFixture,
+):
+    """Compares eagerly formatting event documents into log messages against passing
+    them lazily, with and without a debug handler emitting the messages."""
+    logger = logging.getLogger("event document benchmark")
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = lambda record: record.getMessage()  # type: ignore
+    logger.addHandler(handler)
+    event = {
+        "descriptor": "abc",
+        "seq_num": 1,
+        "data": {f"device-signal_{i}": float(i) for i in range(50)}
+        | {"xspress3mini-mca": list(range(4096))},
+        "timestamps": {f"device-signal_{i}": time.time() for i in range(50)},
+    }
+    repeats = 200
+
+    def _time_per_event_us(log_event) -> float:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            log_event()
+        return (time.perf_counter() - start) / repeats * 1e6
+
+    times_us = {}
+    for level in (logging.DEBUG, logging.INFO):
+        logger.setLevel(level)
+        times_us[level, "eager"] = _time_per_event_us(
+            lambda: logger.debug(f"Event {log.format_doc_for_log(event)}")
+        )
+        times_us[level, "lazy"] = _time_per_event_us(
+            lambda: logger.debug("Event %s", log.LazyDocFormat(event))
+        )
+    logger.removeHandler(handler)
+
+    with capsys.disabled():
+        for (level, style), time_us in times_us.items():
+            print(
+                f"\n{style} event logging, debug "
+                f"{'on' if level == logging.DEBUG else 'off'}: {time_us:.1f} us/event"
+            )
+    assert times_us[logging.INFO, "lazy"] < times_us[logging.INFO, "eager"]
+    assert times_us[logging.DEBUG, "lazy"] < times_us[logging.DEBUG, "eager"]
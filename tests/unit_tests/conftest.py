@@ -103,6 +103,10 @@ from mx_bluesky.common.parameters.gridscan import GenericGrid, SpecifiedThreeDGr
 from mx_bluesky.hyperion.experiment_plans.rotation_scan_plan import (
     RotationScanComposite,
 )
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    get_config_snapshot_cache,
+    set_config_snapshot_cache,
+)
 from mx_bluesky.hyperion.parameters.device_composites import (
     HyperionGridDetectThenXRayCentreComposite,
 )
@@ -639,6 +643,14 @@ def patch_get_hyperion_feature_settings():
         yield
 
 
+@pytest.fixture(autouse=True)
+def reset_config_snapshot_cache():
+    yield
+    if (cache := get_config_snapshot_cache()) is not None:
+        cache.stop_background_refresh()
+        set_config_snapshot_cache(None)
+
+
 @pytest.fixture(autouse=True)
 def patch_config_paths(monkeypatch):
     monkeypatch.setattr(
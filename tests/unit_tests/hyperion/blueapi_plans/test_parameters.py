@@ -1,6 +1,7 @@
 from pathlib import Path
 
 import pytest
+from pydantic import ValidationError
 
 from mx_bluesky.common.parameters.components import PARAMETER_VERSION, get_param_version
 from mx_bluesky.common.parameters.constants import GridscanParamConstants
@@ -13,7 +14,10 @@ from mx_bluesky.hyperion.blueapi.parameters import (
     pin_type_to_tip_offset_and_grid_width,
 )
 from mx_bluesky.hyperion.parameters.constants import HyperionConstants
-from mx_bluesky.hyperion.parameters.gridscan import PinTipCentreThenXrayCentre
+from mx_bluesky.hyperion.parameters.gridscan import (
+    PinTipCentreThenXrayCentre,
+    WellLayout,
+)
 from mx_bluesky.hyperion.parameters.load_centre_collect import LoadCentreCollect
 
 from ....conftest import TEST_SAMPLE_ID, TEST_VISIT, raw_params_from_file
@@ -63,6 +67,49 @@ def test_map_external_to_internal_multisample_pin(tmp_path):
     assert actual_internal.multi_rotation_scan.snapshot_omegas_deg is None
 
 
+def test_map_external_to_internal_multisample_pin_with_well_sample_ids(tmp_path):
+    raw_params = raw_params_from_file(
+        "tests/test_data/parameter_json_files/external_load_centre_collect_params_multipin.json",
+        tmp_path,
+    )
+    raw_params["robot_load_then_centre"]["pin_type"]["well_sample_ids"] = [
+        11,
+        12,
+        13,
+        14,
+        15,
+        16,
+    ]
+    external_params = LoadCentreCollectParams(**raw_params)
+    actual_internal = load_centre_collect_to_internal(external_params)
+
+    wells = (
+        actual_internal.robot_load_then_centre.pin_centre_then_xray_centre_params.wells
+    )
+    assert wells == WellLayout(well_size_um=80, sample_ids=[11, 12, 13, 14, 15, 16])
+
+
+def test_multisample_pin_without_well_sample_ids_has_no_wells(tmp_path):
+    raw_params = raw_params_from_file(
+        "tests/test_data/parameter_json_files/external_load_centre_collect_params_multipin.json",
+        tmp_path,
+    )
+    external_params = LoadCentreCollectParams(**raw_params)
+    actual_internal = load_centre_collect_to_internal(external_params)
+
+    assert (
+        actual_internal.robot_load_then_centre.pin_centre_then_xray_centre_params.wells
+        is None
+    )
+
+
+def test_multisample_pin_needs_a_sample_id_for_each_well():
+    with pytest.raises(ValidationError, match="Expected a sample id for each of 3"):
+        MultiSamplePinTypeParam(
+            wells=3, well_size_um=100, tip_to_first_well_um=0, well_sample_ids=[1, 2]
+        )
+
+
 def test_pin_type_to_tip_offset_and_grid_width_raises_value_error_on_unrecognised_type():
     with pytest.raises(ValueError):
         pin_type_to_tip_offset_and_grid_width(None)  # type: ignore
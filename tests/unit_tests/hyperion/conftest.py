@@ -4,10 +4,14 @@ from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from importlib import resources
 from pathlib import Path
 from typing import Any
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 from dodal.beamlines import i03
+from dodal.devices.beamlines.i03.dcm import DCM
+from dodal.devices.beamlines.i03.undulator_dcm import UndulatorDCM
+from ophyd_async.core import AsyncStatus, completed_status, set_mock_value
 
 from mx_bluesky.common.external_interaction.ispyb.data_model import (
     DataCollectionGroupInfo,
@@ -17,6 +21,7 @@ from mx_bluesky.common.parameters.rotation import (
 )
 from mx_bluesky.hyperion._plan_runner_params import Wait
 from mx_bluesky.hyperion.blueapi.parameters import LoadCentreCollectParams
+from mx_bluesky.hyperion.experiment_plans.edge_scan_plan import EdgeScanComposite
 from mx_bluesky.hyperion.parameters.gridscan import (
     GridScanWithEdgeDetect,
     HyperionSpecifiedThreeDGridScan,
@@ -177,3 +182,67 @@ def launch_test_in_runner_event_loop(
 @pytest.fixture()
 def use_beamline_i03(monkeypatch, patch_beamline_env_variable):
     monkeypatch.setenv("BEAMLINE", "i03")
+
+
+SELENIUM_K_EDGE_EV = 12658
+
+
+def fluorescence_spectrum(
+    energies: np.ndarray,
+    edge_energy: float = SELENIUM_K_EDGE_EV,
+    white_line: float = 1.5,
+    background: float = 1000,
+    jump: float = 5000,
+) -> np.ndarray:
+    step = 0.5 + np.arctan((energies - edge_energy) / 1.5) / np.pi
+    peak = white_line / (1 + ((energies - edge_energy - 2) / 2) ** 2)
+    return background + 0.5 * (energies - edge_energy) + jump * (step + peak)
+
+
+EDGE_SCAN_ROI = (200, 210)
+
+
+@pytest.fixture
+def edge_scan_composite(undulator_dcm: UndulatorDCM, dcm: DCM) -> EdgeScanComposite:
+    return EdgeScanComposite(
+        undulator_dcm=undulator_dcm,
+        dcm=dcm,
+        sample_shutter=i03.sample_shutter.build(connect_immediately=True, mock=True),
+        xspress3mini=i03.xspress3mini.build(connect_immediately=True, mock=True),
+    )
+
+
+@pytest.fixture
+def sample_fluorescence(edge_scan_composite: EdgeScanComposite):
+    """Make each exposure of the Xspress3Mini give the counts of a selenium spectrum
+    at the current energy, spread over the ROI, and make the undulator move the DCM."""
+    dcm_energy = edge_scan_composite.dcm.energy_in_keV
+
+    def _set_undulator_energy(energy_kev: float):
+        set_mock_value(dcm_energy.user_readback, energy_kev)
+        return completed_status()
+
+    async def _expose():
+        energy_ev = await dcm_energy.user_readback.get_value() * 1000
+        counts = fluorescence_spectrum(np.array([energy_ev]))[0]
+        mca = np.zeros(4096)
+        mca[EDGE_SCAN_ROI[0] : EDGE_SCAN_ROI[1]] = counts / (
+            EDGE_SCAN_ROI[1] - EDGE_SCAN_ROI[0]
+        )
+        set_mock_value(edge_scan_composite.xspress3mini.dt_corrected_latest_mca[1], mca)
+
+    shutter_set = MagicMock(side_effect=lambda _: completed_status())
+    with (
+        patch.object(
+            edge_scan_composite.undulator_dcm,
+            "set",
+            MagicMock(side_effect=_set_undulator_energy),
+        ),
+        patch.object(
+            edge_scan_composite.xspress3mini,
+            "stage",
+            MagicMock(side_effect=lambda: AsyncStatus(_expose())),
+        ),
+        patch.object(edge_scan_composite.sample_shutter, "set", shutter_set),
+    ):
+        yield shutter_set
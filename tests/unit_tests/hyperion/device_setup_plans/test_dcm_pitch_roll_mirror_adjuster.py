@@ -19,49 +19,27 @@ from mx_bluesky.hyperion.device_setup_plans.dcm_pitch_roll_mirror_adjuster impor
 )
 
 
-def test_when_bare_mirror_stripe_selected_then_expected_voltages_set_and_waited(
-    sim_run_engine: RunEngineSimulator,
+def test_when_bare_mirror_stripe_selected_then_expected_voltages_set(
     mirror_voltages: MirrorVoltages,
 ):
-    messages = sim_run_engine.simulate_plan(
-        dcm_pitch_roll_mirror_adjuster._apply_and_wait_for_voltages_to_settle(
-            MirrorStripe.BARE, mirror_voltages
-        )
+    actions = dcm_pitch_roll_mirror_adjuster._mirror_voltage_actions(
+        MirrorStripe.BARE, mirror_voltages
     )
 
-    for channel, expected_voltage in zip(
-        mirror_voltages.horizontal_voltages.values(),
-        [1, 107, 15, 139, 41, 165, 11, 6, 166, -65, 0, -38, 179, 128],
-        strict=True,
-    ):
-        messages = assert_message_and_return_remaining(
-            messages,
-            lambda msg: (
-                msg.command == "set"
-                and msg.obj == channel
-                and msg.args[0] == expected_voltage
-            ),
-        )
-        messages = assert_message_and_return_remaining(
-            messages, lambda msg: msg.command == "wait"
-        )
-
-    for channel, expected_voltage in zip(
-        mirror_voltages.vertical_voltages.values(),
-        [140, 100, 70, 30, 30, -65, 24, 15],
-        strict=True,
-    ):
-        messages = assert_message_and_return_remaining(
-            messages,
-            lambda msg: (
-                msg.command == "set"
-                and msg.obj == channel
-                and msg.args[0] == expected_voltage
-            ),
-        )
-        messages = assert_message_and_return_remaining(
-            messages, lambda msg: msg.command == "wait"
-        )
+    assert [(action.device, action.value) for action in actions] == [
+        *zip(
+            mirror_voltages.horizontal_voltages.values(),
+            [1, 107, 15, 139, 41, 165, 11, 6, 166, -65, 0, -38, 179, 128],
+            strict=True,
+        ),
+        *zip(
+            mirror_voltages.vertical_voltages.values(),
+            [140, 100, 70, 30, 30, -65, 24, 15],
+            strict=True,
+        ),
+    ]
+    assert actions[0].name == "hfm_voltage_0"
+    assert actions[-1].name == "vfm_voltage_7"
 
 
 @pytest.mark.parametrize(
@@ -145,81 +123,70 @@ def test_adjust_dcm_pitch_roll_vfm_from_lut(
         adjust_dcm_pitch_roll_vfm_from_lut(undulator_dcm, vfm, mirror_voltages, 7.5)
     )
     # target bragg angle 15.288352 deg
-    messages = assert_message_and_return_remaining(
-        messages,
-        lambda msg: (
-            msg.command == "set"
-            and msg.obj.name == "dcm-xtal_1-pitch_in_mrad"
-            and abs(msg.args[0] - -0.78229639) < 1e-5
-            and msg.kwargs["group"] == "DCM_GROUP"
-        ),
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: (
-            msg.command == "set"
-            and msg.obj.name == "dcm-xtal_1-roll_in_mrad"
-            and abs(msg.args[0] - -0.2799) < 1e-5
-            and msg.kwargs["group"] == "DCM_GROUP"
-        ),
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: (
-            msg.command == "set"
-            and msg.obj.name == "vfm-stripe"
-            and msg.args == (MirrorStripe.RHODIUM,)
-        ),
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: msg.command == "wait",
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: msg.command == "trigger" and msg.obj.name == "vfm-apply_stripe",
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: (
-            msg.command == "set"
-            and msg.obj is vfm.x_mm
-            and msg.args == (10.0,)
-            and msg.kwargs["timeout"] == YAW_LAT_TIMEOUT_S
-        ),
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:], lambda msg: msg.command == "wait"
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:],
-        lambda msg: (
-            msg.command == "set"
-            and msg.obj is vfm.yaw_mrad
-            and msg.args == (0.0,)
-            and msg.kwargs["timeout"] == YAW_LAT_TIMEOUT_S
-        ),
-    )
-    messages = assert_message_and_return_remaining(
-        messages[1:], lambda msg: msg.command == "wait"
-    )
+    sets = {
+        msg.kwargs["group"]: msg
+        for msg in messages
+        if msg.command in ("set", "trigger")
+    }
+    pitch = sets["ENERGY_CHANGE_dcm_pitch"]
+    assert pitch.obj.name == "dcm-xtal_1-pitch_in_mrad"
+    assert abs(pitch.args[0] - -0.78229639) < 1e-5
+    roll = sets["ENERGY_CHANGE_dcm_roll"]
+    assert roll.obj.name == "dcm-xtal_1-roll_in_mrad"
+    assert abs(roll.args[0] - -0.2799) < 1e-5
+    assert sets["ENERGY_CHANGE_mirror_stripe"].args == (MirrorStripe.RHODIUM,)
+    assert sets["ENERGY_CHANGE_mirror_apply_stripe"].obj is vfm.apply_stripe
+    lat = sets["ENERGY_CHANGE_mirror_lat"]
+    assert lat.obj is vfm.x_mm
+    assert lat.args == (10.0,)
+    assert lat.kwargs["timeout"] == YAW_LAT_TIMEOUT_S
+    yaw = sets["ENERGY_CHANGE_mirror_yaw"]
+    assert yaw.obj is vfm.yaw_mrad
+    assert yaw.args == (0.0,)
+    assert yaw.kwargs["timeout"] == YAW_LAT_TIMEOUT_S
     for channel, expected_voltage in enumerate(
         [11, 117, 25, 149, 51, 145, -9, -14, 146, -10, 55, 17, 144, 93]
     ):
+        voltage = sets[f"ENERGY_CHANGE_hfm_voltage_{channel}"]
+        assert voltage.obj.name == f"mirror_voltages-horizontal_voltages-{channel}"
+        assert voltage.args == (expected_voltage,)
+    for channel, expected_voltage in enumerate([124, 114, 34, 49, 19, -116, 4, -46]):
+        voltage = sets[f"ENERGY_CHANGE_vfm_voltage_{channel}"]
+        assert voltage.obj.name == f"mirror_voltages-vertical_voltages-{channel}"
+        assert voltage.args == (expected_voltage,)
+
+    waited_groups = {msg.kwargs["group"] for msg in messages if msg.command == "wait"}
+    assert waited_groups == sets.keys()
+
+
+def test_adjust_dcm_pitch_roll_vfm_from_lut_moves_mirror_onto_stripe_in_order(
+    use_beamline_i03,
+    undulator_dcm: UndulatorDCM,
+    vfm: FocusingMirrorWithStripes,
+    mirror_voltages: MirrorVoltages,
+    sim_run_engine: RunEngineSimulator,
+):
+    sim_run_engine.add_handler_for_callback_subscribes()
+
+    messages = sim_run_engine.simulate_plan(
+        adjust_dcm_pitch_roll_vfm_from_lut(undulator_dcm, vfm, mirror_voltages, 7.5)
+    )
+    for group in ["mirror_stripe", "mirror_apply_stripe", "mirror_lat"]:
         messages = assert_message_and_return_remaining(
-            messages[1:],
-            lambda msg: (
-                msg.command == "set"
-                and msg.obj.name == f"mirror_voltages-horizontal_voltages-{channel}"
-                and msg.args == (expected_voltage,)
+            messages,
+            lambda msg, group=group: (
+                msg.kwargs.get("group") == f"ENERGY_CHANGE_{group}"
+                and msg.command in ("set", "trigger")
             ),
         )
-    for channel, expected_voltage in enumerate([124, 114, 34, 49, 19, -116, 4, -46]):
         messages = assert_message_and_return_remaining(
-            messages[1:],
-            lambda msg: (
-                msg.command == "set"
-                and msg.obj.name == f"mirror_voltages-vertical_voltages-{channel}"
-                and msg.args == (expected_voltage,)
+            messages,
+            lambda msg, group=group: (
+                msg.command == "wait"
+                and msg.kwargs["group"] == f"ENERGY_CHANGE_{group}"
             ),
         )
+    assert_message_and_return_remaining(
+        messages,
+        lambda msg: msg.command == "set" and msg.obj is vfm.yaw_mrad,
+    )
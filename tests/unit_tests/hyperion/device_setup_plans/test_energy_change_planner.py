@@ -0,0 +1,188 @@
+import random
+from collections import defaultdict
+from fnmatch import fnmatchcase
+from unittest.mock import MagicMock
+
+import pytest
+from bluesky.simulators import RunEngineSimulator
+from bluesky.utils import Msg
+from dodal.devices.beamlines.i03.undulator_dcm import UndulatorDCM
+from dodal.devices.focusing_mirror import (
+    FocusingMirrorWithStripes,
+    MirrorStripe,
+    MirrorVoltages,
+)
+
+from mx_bluesky.hyperion.device_setup_plans.dcm_pitch_roll_mirror_adjuster import (
+    ENERGY_CHANGE_CONSTRAINTS,
+    adjust_dcm_pitch_roll_vfm_from_lut,
+)
+from mx_bluesky.hyperion.device_setup_plans.energy_change_planner import (
+    ENERGY_CHANGE_GROUP_PREFIX,
+    Action,
+    Constraint,
+    MutuallyExclusive,
+    Precedes,
+    execute_schedule,
+    schedule_actions,
+)
+
+
+def _action(name: str, duration: float = 1.0) -> Action:
+    return Action(name, MagicMock(name=name), 1, duration)
+
+
+def _schedule_by_name(actions, constraints):
+    return {
+        scheduled.action.name: scheduled
+        for scheduled in schedule_actions(actions, constraints)
+    }
+
+
+def test_unconstrained_actions_all_start_immediately():
+    schedule = _schedule_by_name([_action("a"), _action("b"), _action("c")], [])
+    assert all(s.start_s == 0 and s.wait_for == () for s in schedule.values())
+
+
+def test_precedes_delays_start_until_predecessor_complete():
+    schedule = _schedule_by_name(
+        [_action("b", 2), _action("a", 3)], [Precedes("a", "b")]
+    )
+    assert schedule["b"].start_s == 3
+    assert schedule["b"].wait_for == ("a",)
+
+
+def test_mutually_exclusive_actions_run_one_after_another():
+    schedule = _schedule_by_name(
+        [_action("x_1", 2), _action("x_2", 2), _action("y", 5)],
+        [MutuallyExclusive(("x_*",))],
+    )
+    assert schedule["x_1"].start_s == 0
+    assert schedule["x_2"].start_s == 2
+    assert schedule["x_2"].wait_for == ("x_1",)
+    assert schedule["y"].start_s == 0
+
+
+def test_actions_returned_in_start_order():
+    schedule = schedule_actions(
+        [_action("c"), _action("b"), _action("a")],
+        [Precedes("a", "b"), Precedes("b", "c")],
+    )
+    assert [s.action.name for s in schedule] == ["a", "b", "c"]
+
+
+def test_cyclic_constraints_raise():
+    with pytest.raises(ValueError, match="cannot be satisfied"):
+        schedule_actions(
+            [_action("a"), _action("b")], [Precedes("a", "b"), Precedes("b", "a")]
+        )
+
+
+def test_duplicate_action_names_raise():
+    with pytest.raises(ValueError, match="unique"):
+        schedule_actions([_action("a"), _action("a")], [])
+
+
+def test_constraints_on_absent_actions_are_ignored():
+    schedule = _schedule_by_name([_action("a")], ENERGY_CHANGE_CONSTRAINTS)
+    assert schedule["a"].start_s == 0
+
+
+def test_execute_schedule_waits_only_for_required_groups(
+    sim_run_engine: RunEngineSimulator,
+):
+    a, b, c = _action("a"), _action("b"), Action("c", MagicMock(name="c"))
+    messages = sim_run_engine.simulate_plan(
+        execute_schedule(schedule_actions([a, b, c], [Precedes("a", "b")]))
+    )
+    assert [(msg.command, msg.kwargs.get("group")) for msg in messages] == [
+        ("set", "ENERGY_CHANGE_a"),
+        ("trigger", "ENERGY_CHANGE_c"),
+        ("wait", "ENERGY_CHANGE_a"),
+        ("set", "ENERGY_CHANGE_b"),
+        ("wait", "ENERGY_CHANGE_c"),
+        ("wait", "ENERGY_CHANGE_b"),
+    ]
+
+
+def _simulate_timeline(
+    messages: list[Msg], durations: dict[str, float]
+) -> dict[str, tuple[float, float]]:
+    """Replay the messages of a plan against a simulated clock, in which each set or
+    trigger completes after the given duration and a wait blocks the plan until
+    everything in the group is complete. Returns the interval of each action."""
+    now = 0.0
+    intervals: dict[str, tuple[float, float]] = {}
+    group_ends: dict[str, list[float]] = defaultdict(list)
+    for msg in messages:
+        group = msg.kwargs.get("group")
+        if msg.command in ("set", "trigger"):
+            name = group.removeprefix(f"{ENERGY_CHANGE_GROUP_PREFIX}_")
+            intervals[name] = (now, now + durations[name])
+            group_ends[group].append(now + durations[name])
+        elif msg.command == "wait":
+            now = max(now, *group_ends[group])
+    return intervals
+
+
+def _matching(intervals: dict[str, tuple[float, float]], *patterns: str):
+    return [
+        (interval, name)
+        for name, interval in intervals.items()
+        if any(fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+
+
+def _assert_constraints_honoured(
+    intervals: dict[str, tuple[float, float]], constraints: tuple[Constraint, ...]
+):
+    for constraint in constraints:
+        if isinstance(constraint, Precedes):
+            for before, before_name in _matching(intervals, constraint.before):
+                for after, after_name in _matching(intervals, constraint.after):
+                    assert after[0] >= before[1], (
+                        f"{after_name} started before {before_name} finished"
+                    )
+        else:
+            exclusive = sorted(_matching(intervals, *constraint.patterns))
+            for (first, first_name), (second, second_name) in zip(
+                exclusive, exclusive[1:], strict=False
+            ):
+                assert second[0] >= first[1], (
+                    f"{first_name} and {second_name} were in progress together"
+                )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_simulated_energy_change_honours_constraints_and_is_faster_than_sequential(
+    use_beamline_i03,
+    undulator_dcm: UndulatorDCM,
+    vfm: FocusingMirrorWithStripes,
+    mirror_voltages: MirrorVoltages,
+    sim_run_engine: RunEngineSimulator,
+    seed: int,
+):
+    sim_run_engine.add_handler_for_callback_subscribes()
+    sim_run_engine.add_read_handler_for(vfm.stripe, MirrorStripe.BARE)
+    messages = sim_run_engine.simulate_plan(
+        adjust_dcm_pitch_roll_vfm_from_lut(undulator_dcm, vfm, mirror_voltages, 7.5)
+    )
+    action_names = [
+        msg.kwargs["group"].removeprefix(f"{ENERGY_CHANGE_GROUP_PREFIX}_")
+        for msg in messages
+        if msg.command in ("set", "trigger")
+    ]
+    assert len(action_names) == 28
+
+    # Actual durations differ from the estimates used to build the schedule
+    rng = random.Random(seed)
+    durations = {name: rng.uniform(0.1, 20) for name in action_names}
+    intervals = _simulate_timeline(messages, durations)
+
+    _assert_constraints_honoured(intervals, ENERGY_CHANGE_CONSTRAINTS)
+    achieved_s = max(end for _, end in intervals.values())
+    sequential_s = sum(durations.values())
+    assert achieved_s < sequential_s, (
+        f"Simulated energy change took {achieved_s:.1f}s, "
+        f"{sequential_s:.1f}s if performed sequentially"
+    )
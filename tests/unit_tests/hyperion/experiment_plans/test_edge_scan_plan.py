@@ -0,0 +1,121 @@
+from unittest.mock import ANY, MagicMock, call
+
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.devices.zebra.zebra_controlled_shutter import ZebraShutterState
+
+from mx_bluesky.hyperion.experiment_plans.edge_scan_plan import (
+    EdgeScanComposite,
+    edge_scan_energies,
+    edge_scan_plan,
+)
+from mx_bluesky.hyperion.parameters.constants import CONST
+from mx_bluesky.hyperion.utils.absorption_edge import EdgeScanAnalysisError
+
+from ..conftest import EDGE_SCAN_ROI, SELENIUM_K_EDGE_EV
+
+
+def test_edge_scan_energies_span_the_edge_in_steps():
+    energies = edge_scan_energies(12658, 10, 20, 0.5)
+    assert energies[0] == 12648
+    assert energies[-1] == 12678
+    assert len(energies) == 61
+
+
+def test_edge_scan_energies_must_be_positive():
+    with pytest.raises(ValueError):
+        edge_scan_energies(12658, 10, 20, 0)
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.parametrize("move_undulator", [True, False])
+def test_edge_scan_chooses_energies_from_the_spectrum(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+    move_undulator: bool,
+):
+    result = run_engine(
+        edge_scan_plan(
+            edge_scan_composite,
+            SELENIUM_K_EDGE_EV,
+            step_ev=1,
+            low_roi=EDGE_SCAN_ROI[0],
+            high_roi=EDGE_SCAN_ROI[1],
+            move_undulator=move_undulator,
+        )
+    )
+    analysis = result.plan_result
+    assert len(analysis.energies_ev) == 81
+    assert analysis.inflection_energy_ev == pytest.approx(SELENIUM_K_EDGE_EV, abs=1)
+    assert analysis.peak_energy_ev == pytest.approx(SELENIUM_K_EDGE_EV + 2, abs=1)
+    assert edge_scan_composite.undulator_dcm.set.called == move_undulator  # type: ignore
+
+
+@pytest.mark.timeout(10)
+def test_edge_scan_only_opens_shutter_for_each_exposure(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+):
+    steps = MagicMock()
+    steps.attach_mock(edge_scan_composite.undulator_dcm.set, "move")
+    steps.attach_mock(sample_fluorescence, "shutter")
+    steps.attach_mock(edge_scan_composite.xspress3mini.stage, "expose")
+
+    run_engine(edge_scan_plan(edge_scan_composite, SELENIUM_K_EDGE_EV, step_ev=2))
+
+    # Closed again as the plan finishes
+    assert steps.mock_calls == [
+        call.move(ANY),
+        call.shutter(ZebraShutterState.OPEN),
+        call.expose(),
+        call.shutter(ZebraShutterState.CLOSE),
+    ] * 41 + [call.shutter(ZebraShutterState.CLOSE)]
+
+
+@pytest.mark.timeout(10)
+def test_edge_scan_emits_each_point_and_the_result(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+):
+    descriptors: dict[str, str] = {}
+    events: dict[str, list[dict]] = {}
+
+    def _collect(name, doc):
+        if name == "descriptor":
+            descriptors[doc["uid"]] = doc["name"]
+        elif name == "event":
+            events.setdefault(descriptors[doc["descriptor"]], []).append(doc["data"])
+
+    run_engine.subscribe(_collect)
+    run_engine(
+        edge_scan_plan(
+            edge_scan_composite,
+            SELENIUM_K_EDGE_EV,
+            step_ev=2,
+            low_roi=EDGE_SCAN_ROI[0],
+            high_roi=EDGE_SCAN_ROI[1],
+        )
+    )
+    points = events[CONST.DESCRIPTORS.EDGE_SCAN_POINT]
+    [result] = events[CONST.DESCRIPTORS.EDGE_SCAN_RESULT]
+    assert [point["energy_ev"] for point in points] == result["energies_ev"]
+    assert [point["counts"] for point in points] == pytest.approx(result["counts"])
+    assert result["remote_energy_ev"] == result["peak_energy_ev"] + 100
+
+
+@pytest.mark.timeout(10)
+def test_edge_scan_closes_shutter_when_no_edge_is_found(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+):
+    with pytest.raises(EdgeScanAnalysisError):
+        run_engine(
+            edge_scan_plan(
+                edge_scan_composite, SELENIUM_K_EDGE_EV + 500, step_ev=2, low_roi=0
+            )
+        )
+    assert sample_fluorescence.call_args.args[0] == ZebraShutterState.CLOSE
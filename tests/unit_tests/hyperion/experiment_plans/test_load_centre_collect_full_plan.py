@@ -19,16 +19,19 @@ from dodal.devices.zebra.zebra import RotationDirection
 from ophyd_async.core import completed_status, set_mock_value
 from pydantic import ValidationError
 
+from mx_bluesky.common.parameters.components import IspybExperimentType
 from mx_bluesky.common.parameters.gridscan import SpecifiedThreeDGridScan
 from mx_bluesky.common.parameters.rotation import (
     RotationScan,
     RotationScanPerSweep,
 )
+from mx_bluesky.common.preprocessors.phase_profiler import PHASE_TIMINGS_STREAM
 from mx_bluesky.common.utils.exceptions import (
     CrystalNotFoundError,
     WarningError,
 )
 from mx_bluesky.hyperion.blueapi.mixins import (
+    HelicalCollection,
     TopNByMaxCountForEachSampleSelection,
 )
 from mx_bluesky.hyperion.experiment_plans.load_centre_collect_full_plan import (
@@ -781,6 +784,67 @@ def test_load_centre_collect_full_sorts_collections_by_distance_from_pin_tip(
     assert actual_ids == expected_sample_ids
 
 
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.robot_load_then_centre_plan.pin_centre_then_gridscan_plan",
+    new=MagicMock(
+        return_value=iter(
+            [
+                Msg(
+                    "open_run",
+                    xray_centre_results=[
+                        dataclasses.asdict(r)
+                        for r in [
+                            FLYSCAN_RESULT_POS_2,
+                            FLYSCAN_RESULT_POS_3,
+                            FLYSCAN_RESULT_POS_1,
+                            FLYSCAN_RESULT_POS_5,
+                            FLYSCAN_RESULT_POS_4,
+                        ]
+                    ],
+                    run=CONST.PLAN.FLYSCAN_RESULTS,
+                ),
+                Msg("close_run"),
+            ]
+        )
+    ),
+)
+def test_load_centre_collect_full_orders_collections_for_travel_when_requested(
+    mock_multi_rotation_scan: MagicMock,
+    sim_run_engine: RunEngineSimulator,
+    load_centre_collect_with_top_n_params: LoadCentreCollect,
+    oav_parameters_for_rotation: OAVParameters,
+    composite: LoadCentreCollectComposite,
+):
+    load_centre_collect_with_top_n_params.select_centres.order_for_travel = True
+    sim_run_engine.add_handler_for_callback_subscribes()
+    sim_fire_event_on_open_run(sim_run_engine, CONST.PLAN.FLYSCAN_RESULTS)
+    gonio = composite.gonio
+    for axis, value_mm in ((gonio.x, 0.06), (gonio.y, 0.02), (gonio.z, 0.03)):
+        sim_run_engine.add_read_handler_for(axis.user_readback, value_mm)
+    sim_run_engine.simulate_plan(
+        load_centre_collect_full(
+            composite,
+            load_centre_collect_with_top_n_params,
+            oav_parameters_for_rotation,
+        )
+    )
+
+    params: RotationScan = mock_multi_rotation_scan.mock_calls[0].args[1]
+    # Starting beyond the furthest crystal from the pin tip
+    assert [scan.x_start_um for scan in params.single_rotation_scans] == [
+        50.0,
+        50.0,
+        40.0,
+        40.0,
+        30.0,
+        30.0,
+        20.0,
+        20.0,
+        10.0,
+        10.0,
+    ]
+
+
 def _rotation_at(
     chi: float,
     position: dict,
@@ -1019,6 +1083,100 @@ def test_load_centre_collect_full_plan_omits_collection_if_no_sample_id_is_assig
     assert [rs.sample_id for rs in parameters.rotation_scans] == [1, 1]
 
 
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.robot_load_then_centre_plan.pin_centre_then_gridscan_plan",
+    new=MagicMock(
+        side_effect=lambda *args, **kwargs: iter(
+            [
+                Msg(
+                    "open_run",
+                    xray_centre_results=[
+                        dataclasses.asdict(r)
+                        for r in [
+                            dataclasses.replace(
+                                FLYSCAN_RESULT_HIGH,
+                                bounding_box_mm=(
+                                    np.array([0.09, 0.19, 0.2]),
+                                    np.array([0.11, 0.21, 0.4]),
+                                ),
+                            ),
+                            FLYSCAN_RESULT_MED,
+                        ]
+                    ],
+                    run=CONST.PLAN.FLYSCAN_RESULTS,
+                ),
+                Msg("close_run"),
+            ]
+        )
+    ),
+)
+def test_load_centre_collect_full_plan_collects_long_crystals_helically(
+    mock_multi_rotation_scan: MagicMock,
+    sim_run_engine: RunEngineSimulator,
+    composite: LoadCentreCollectComposite,
+    load_centre_collect_with_top_n_for_each_sample: LoadCentreCollect,
+    oav_parameters_for_rotation: OAVParameters,
+):
+    load_centre_collect_with_top_n_for_each_sample.helical = HelicalCollection(
+        margin_um=10, min_length_um=50
+    )
+    sim_run_engine.add_handler_for_callback_subscribes()
+    sim_fire_event_on_open_run(sim_run_engine, CONST.PLAN.FLYSCAN_RESULTS)
+    sim_run_engine.simulate_plan(
+        load_centre_collect_full(
+            composite,
+            load_centre_collect_with_top_n_for_each_sample,
+            oav_parameters_for_rotation,
+        )
+    )
+
+    parameters: RotationScan = mock_multi_rotation_scan.mock_calls[0].args[1]
+    scans = list(parameters.single_rotation_scans)
+    assert [
+        (
+            scan.x_start_um,
+            scan.y_start_um,
+            scan.z_start_um,
+            scan.x_end_um,
+            scan.y_end_um,
+            scan.z_end_um,
+        )
+        for scan in scans
+    ] == pytest.approx(
+        [
+            (100.0, 200.0, 210.0, 100.0, 200.0, 390.0),
+            (100.0, 200.0, 210.0, 100.0, 200.0, 390.0),
+            (400.0, 500.0, 600.0, None, None, None),
+            (400.0, 500.0, 600.0, None, None, None),
+        ]
+    )
+    assert [scan.ispyb_experiment_type for scan in scans] == [
+        IspybExperimentType.HELICAL,
+        IspybExperimentType.HELICAL,
+        IspybExperimentType.ROTATION,
+        IspybExperimentType.ROTATION,
+    ]
+
+
+def test_params_with_end_xyz_is_rejected(tmp_path):
+    params = raw_params_from_file(
+        GOOD_TEST_LOAD_CENTRE_COLLECT_MULTI_ROTATION, tmp_path
+    )
+    params["multi_rotation_scan"]["rotation_scans"][1] |= {
+        "x_start_um": 0.0,
+        "y_start_um": 0.0,
+        "z_start_um": 0.0,
+        "x_end_um": 1.0,
+        "y_end_um": 2.0,
+        "z_end_um": 3.0,
+    }
+    with pytest.raises(
+        ValidationError,
+        match="Specifying end xyz for sweeps is not supported in combination with centring.",
+    ):
+        LoadCentreCollect(**params)
+
+
 def _compare_rotation_scans(
     expected_rotation_scans: Sequence[dict],
     actual_rotation_scans: Sequence[RotationScanPerSweep],
@@ -1155,3 +1313,32 @@ def test_load_centre_collect_full_activates_beam_drawing_callback(
     msgs = assert_message_and_return_remaining(
         msgs, lambda msg: msg.command == "robot_load_then_xray_centre"
     )
+
+
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.load_centre_collect_full_plan.rotation_scan_internal",
+    MagicMock(return_value=iter([])),
+)
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.load_centre_collect_full_plan.robot_load_then_xray_centre",
+    MagicMock(return_value=iter([Msg(command="robot_load_then_xray_centre")])),
+)
+def test_load_centre_collect_full_emits_phase_timings_before_run_closes(
+    sim_run_engine: RunEngineSimulator,
+    composite: LoadCentreCollectComposite,
+    load_centre_collect_params: LoadCentreCollect,
+    oav_parameters_for_rotation: OAVParameters,
+):
+    msgs = sim_run_engine.simulate_plan(
+        load_centre_collect_full(
+            composite, load_centre_collect_params, oav_parameters_for_rotation
+        )
+    )
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "create" and msg.kwargs["name"] == PHASE_TIMINGS_STREAM
+        ),
+    )
+    msgs = assert_message_and_return_remaining(msgs, lambda msg: msg.command == "save")
+    assert [msg.command for msg in msgs[1:]] == ["close_run"]
@@ -1,7 +1,9 @@
 import asyncio
+from dataclasses import dataclass, field
 from typing import Literal
 from unittest.mock import MagicMock, patch
 
+import bluesky.plan_stubs as bps
 import numpy as np
 import pytest
 from bluesky.run_engine import RunEngine
@@ -14,12 +16,16 @@ from mx_bluesky.hyperion.experiment_plans.optimise_attenuation_plan import (
     AttenuationOptimisationFailedError,
     Direction,
     OptimizeAttenuationComposite,
+    SaturatingResponse,
     calculate_new_direction,
     check_parameters,
     deadtime_calc_new_transmission,
     deadtime_optimisation,
+    fit_saturating_response,
     is_counts_within_target,
     is_deadtime_optimised,
+    model_deadtime_optimisation,
+    model_total_counts_optimisation,
     total_counts_optimisation,
 )
 
@@ -227,12 +233,18 @@ def test_is_counts_within_target_is_false(
 def test_total_count_exception_raised_after_max_cycles_reached(
     run_engine: RunEngine, fake_composite_mocked_sets: OptimizeAttenuationComposite
 ):
-    optimise_attenuation_plan.is_counts_within_target = MagicMock(return_value=False)
     set_mock_value(
         fake_composite_mocked_sets.xspress3mini.dt_corrected_latest_mca[1],
         np.array([1, 1, 1, 1, 1, 1]),
     )
-    with pytest.raises(AttenuationOptimisationFailedError):
+    with (
+        patch.object(
+            optimise_attenuation_plan,
+            "is_counts_within_target",
+            MagicMock(return_value=False),
+        ),
+        pytest.raises(AttenuationOptimisationFailedError),
+    ):
         run_engine(
             total_counts_optimisation(
                 fake_composite_mocked_sets, 1, 0, 10, 0, 5, 2, 1, 0, 0
@@ -371,3 +383,275 @@ def test_optimisation_attenuation_plan_runs_correct_functions(
     fake_composite.attenuator.set.assert_called_once()
     mock_check_parameters.assert_called_once()
     fake_composite.xspress3mini.acquire_time.set.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "transmissions", [[0.01, 0.02], [0.001, 0.01, 0.1], [0.5, 0.05, 0.005, 0.0005]]
+)
+def test_saturating_response_fit_recovers_model(transmissions: list[float]):
+    model = SaturatingResponse(gain=2e5, saturation=5)
+    responses = [model.predict(t) for t in transmissions]
+
+    fit = fit_saturating_response(transmissions, responses)
+
+    assert fit is not None
+    fitted, fit_error = fit
+    assert fitted.gain == pytest.approx(2e5)
+    assert fitted.saturation == pytest.approx(5)
+    assert fit_error == pytest.approx(0, abs=1e-9)
+    assert fitted.transmission_for(model.predict(0.03)) == pytest.approx(0.03)
+
+
+def test_saturating_response_cannot_exceed_saturation():
+    model = SaturatingResponse(gain=100, saturation=2)
+
+    assert model.transmission_for(49) == pytest.approx(49 / 2)
+    assert model.transmission_for(50) is None
+
+
+@pytest.mark.parametrize(
+    "transmissions, responses",
+    [
+        ([0.1, 0.1], [10, 20]),
+        ([0.1, 0.2], [0, 20]),
+        ([0.1, 0.2], [20, 10]),
+    ],
+)
+def test_saturating_response_fit_rejects_readings_it_cannot_describe(
+    transmissions: list[float], responses: list[float]
+):
+    assert fit_saturating_response(transmissions, responses) is None
+
+
+@dataclass
+class SimulatedXspress3:
+    """Sets the readings of the mock Xspress3Mini as a detector with non-paralysable
+    deadtime would give them, recording the transmission of each exposure."""
+
+    composite: OptimizeAttenuationComposite
+    counts_per_transmission: float
+    deadtime_per_count: float
+    noise: float = 0
+    rng: np.random.Generator = field(default_factory=lambda: np.random.default_rng(0))
+    transmissions: list[float] = field(default_factory=list)
+
+    def deadtime(self, transmission: float) -> float:
+        rate = self.counts_per_transmission * transmission * self.deadtime_per_count
+        return rate / (1 + rate)
+
+    def total_count(self, transmission: float) -> float:
+        return (
+            self.counts_per_transmission
+            * transmission
+            * (1 - self.deadtime(transmission))
+        )
+
+    def expose(self, composite: OptimizeAttenuationComposite, transmission: float):
+        self.transmissions.append(transmission)
+        noise = 1 + self.noise * self.rng.standard_normal()
+        total_time = 1e6
+        channel = self.composite.xspress3mini.channels[1]
+        set_mock_value(channel.total_time, total_time)
+        # read_deadtime takes the reset ticks to count the deadtime
+        set_mock_value(
+            channel.reset_ticks, total_time * self.deadtime(transmission) * noise
+        )
+        set_mock_value(
+            self.composite.xspress3mini.dt_corrected_latest_mca[1],
+            np.full(10, self.total_count(transmission) * noise / 10),
+        )
+        yield from bps.null()
+
+    @property
+    def dose(self) -> float:
+        return sum(self.transmissions)
+
+
+@pytest.fixture
+def attenuation_model_docs(run_engine: RunEngine) -> list[dict]:
+    docs = []
+
+    def collect(name, doc):
+        if name == "event" and "gain" in doc["data"]:
+            docs.append(doc["data"])
+
+    run_engine.subscribe(collect)
+    return docs
+
+
+def _optimise_deadtime(
+    run_engine: RunEngine, detector: SimulatedXspress3, use_model: bool
+) -> float:
+    optimise = model_deadtime_optimisation if use_model else deadtime_optimisation
+    with patch.object(
+        optimise_attenuation_plan, "do_device_optimise_iteration", detector.expose
+    ):
+        return run_engine(
+            optimise(
+                detector.composite,
+                transmission=1e-3,
+                increment=2,
+                deadtime_threshold=0.1,
+                max_cycles=20,
+                upper_transmission_limit=1,
+                lower_transmission_limit=1e-6,
+            )
+        ).plan_result  # type: ignore
+
+
+def _optimise_total_counts(
+    run_engine: RunEngine, detector: SimulatedXspress3, use_model: bool
+) -> float:
+    optimise = (
+        model_total_counts_optimisation if use_model else total_counts_optimisation
+    )
+    with patch.object(
+        optimise_attenuation_plan, "do_device_optimise_iteration", detector.expose
+    ):
+        return run_engine(
+            optimise(
+                detector.composite,
+                transmission=0.1,
+                low_roi=0,
+                high_roi=10,
+                lower_count_limit=18000,
+                upper_count_limit=22000,
+                target_count=20000,
+                max_cycles=20,
+                upper_transmission_limit=1,
+                lower_transmission_limit=1e-6,
+            )
+        ).plan_result  # type: ignore
+
+
+COUNTS_PER_TRANSMISSION = np.logspace(4.5, 7, 12)
+
+
+def test_model_deadtime_optimisation_takes_fewer_exposures_and_less_dose(
+    run_engine: RunEngine,
+    fake_composite: OptimizeAttenuationComposite,
+    attenuation_model_docs: list[dict],
+):
+    exposures = {True: 0, False: 0}
+    dose = {True: 0.0, False: 0.0}
+    for counts_per_transmission in COUNTS_PER_TRANSMISSION:
+        for use_model in (True, False):
+            detector = SimulatedXspress3(fake_composite, counts_per_transmission, 1e-6)
+            transmission = _optimise_deadtime(run_engine, detector, use_model)
+            if use_model:
+                # Within the increment of the highest transmission below threshold
+                assert detector.deadtime(transmission) <= 0.1
+                assert transmission == 1 or detector.deadtime(transmission * 2) > 0.1
+            exposures[use_model] += len(detector.transmissions)
+            dose[use_model] += detector.dose
+
+    assert exposures[True] < 0.6 * exposures[False]
+    assert dose[True] < dose[False]
+    assert not any(doc["fell_back"] for doc in attenuation_model_docs)
+    assert len(attenuation_model_docs) == len(COUNTS_PER_TRANSMISSION)
+
+
+def test_model_total_counts_optimisation_takes_fewer_exposures_and_less_dose(
+    run_engine: RunEngine, fake_composite: OptimizeAttenuationComposite
+):
+    exposures = {True: 0, False: 0}
+    dose = {True: 0.0, False: 0.0}
+    for counts_per_transmission in COUNTS_PER_TRANSMISSION:
+        for use_model in (True, False):
+            detector = SimulatedXspress3(fake_composite, counts_per_transmission, 1e-5)
+            transmission = _optimise_total_counts(run_engine, detector, use_model)
+            assert 18000 <= detector.total_count(transmission) <= 22000
+            exposures[use_model] += len(detector.transmissions)
+            dose[use_model] += detector.dose
+
+    assert exposures[True] < exposures[False]
+    assert dose[True] < dose[False]
+
+
+def test_model_fit_and_iterations_are_emitted(
+    run_engine: RunEngine,
+    fake_composite: OptimizeAttenuationComposite,
+    attenuation_model_docs: list[dict],
+):
+    detector = SimulatedXspress3(fake_composite, 1e6, 1e-5)
+
+    transmission = _optimise_total_counts(run_engine, detector, use_model=True)
+
+    [doc] = attenuation_model_docs
+    assert doc["gain"] == pytest.approx(1e6)
+    assert doc["saturation"] == pytest.approx(10)
+    assert doc["fit_error"] == pytest.approx(0, abs=1e-9)
+    assert doc["iterations"] == len(detector.transmissions) == 3
+    assert doc["optimised_transmission"] == transmission
+    np.testing.assert_allclose(doc["transmissions"], detector.transmissions)
+    assert not doc["fell_back"]
+
+
+def test_model_optimisation_falls_back_to_cycle_when_fit_is_poor(
+    run_engine: RunEngine,
+    fake_composite: OptimizeAttenuationComposite,
+    attenuation_model_docs: list[dict],
+):
+    detector = SimulatedXspress3(fake_composite, 1e6, 1e-6, noise=0.3)
+
+    transmission = _optimise_deadtime(run_engine, detector, use_model=True)
+
+    [doc] = attenuation_model_docs
+    assert doc["fell_back"]
+    assert doc["fit_error"] > 0.1
+    assert doc["optimised_transmission"] == transmission
+
+
+def test_model_optimisation_raises_after_max_cycles_and_still_emits_model(
+    run_engine: RunEngine,
+    fake_composite: OptimizeAttenuationComposite,
+    attenuation_model_docs: list[dict],
+):
+    detector = SimulatedXspress3(fake_composite, 1e6, 1e-5)
+
+    with patch.object(
+        optimise_attenuation_plan, "do_device_optimise_iteration", detector.expose
+    ):
+        with pytest.raises(AttenuationOptimisationFailedError):
+            run_engine(
+                model_total_counts_optimisation(
+                    fake_composite, 0.1, 0, 10, 18000, 22000, 20000, 2, 1, 1e-6
+                )
+            )
+
+    assert attenuation_model_docs[0]["iterations"] == 2
+
+
+@pytest.mark.parametrize("optimisation_type", ["total_counts", "deadtime"])
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.optimise_attenuation_plan.model_total_counts_optimisation",
+    autospec=True,
+)
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.optimise_attenuation_plan.model_deadtime_optimisation",
+    autospec=True,
+)
+def test_optimisation_attenuation_plan_uses_model_when_requested(
+    mock_model_deadtime_optimisation: MagicMock,
+    mock_model_total_counts_optimisation: MagicMock,
+    optimisation_type: str,
+    run_engine: RunEngine,
+    fake_composite: OptimizeAttenuationComposite,
+):
+    fake_composite.attenuator.set = MagicMock(side_effect=lambda _: completed_status())
+    fake_composite.xspress3mini.acquire_time.set = MagicMock(
+        side_effect=lambda _: completed_status()
+    )
+
+    run_engine(
+        optimise_attenuation_plan.optimise_attenuation_plan(
+            fake_composite, optimisation_type=optimisation_type, use_model=True
+        )
+    )
+
+    if optimisation_type == "total_counts":
+        mock_model_total_counts_optimisation.assert_called_once()
+        mock_model_deadtime_optimisation.assert_not_called()
+    else:
+        mock_model_deadtime_optimisation.assert_called_once()
+        mock_model_total_counts_optimisation.assert_not_called()
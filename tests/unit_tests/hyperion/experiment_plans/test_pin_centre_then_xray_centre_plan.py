@@ -1,6 +1,7 @@
 import dataclasses
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 from bluesky import plan_stubs as bps
 from bluesky import preprocessors as bpp
@@ -12,11 +13,13 @@ from dodal.devices.backlight import InOut
 from dodal.devices.eiger import EigerDetector
 from dodal.devices.smargon import CombinedMove
 from dodal.devices.xbpm_feedback import Pause
-from ophyd_async.core import get_mock_put
+from dodal.devices.zocalo.zocalo_results import _NO_SAMPLE_ID
+from ophyd_async.core import get_mock_put, set_mock_value
 
 from mx_bluesky.common.experiment_plans.inner_plans.do_fgs import ZOCALO_STAGE_GROUP
 from mx_bluesky.common.parameters.constants import OavConstants, PlanNameConstants
 from mx_bluesky.common.parameters.gridscan import SpecifiedThreeDGridScan
+from mx_bluesky.common.utils.xrc_result import XRayCentreEventHandler
 from mx_bluesky.hyperion.blueapi.mixins import TopNByMaxCountSelection
 from mx_bluesky.hyperion.experiment_plans.pin_centre_then_gridscan_plan import (
     create_parameters_for_grid_detection,
@@ -31,11 +34,14 @@ from mx_bluesky.hyperion.parameters.device_composites import (
 )
 from mx_bluesky.hyperion.parameters.gridscan import (
     PinTipCentreThenXrayCentre,
+    WellLayout,
 )
+from mx_bluesky.hyperion.utils.centre_selection import samples_and_locations_to_collect
+from mx_bluesky.hyperion.utils.wells import WellRegionsEventHandler
 from tests.unit_tests.beamlines.i24.serial.conftest import fake_generator
 
 from ...conftest import raw_params_from_file
-from .conftest import FLYSCAN_RESULT_MED
+from .conftest import FLYSCAN_RESULT_MED, mock_zocalo_trigger
 
 
 def pin_tip_centre_then_gridscan_plan_wrapper(
@@ -456,3 +462,74 @@ def test_pin_tip_centre_then_xray_centre_moves_to_xtal(
     get_mock_put(gonio.x.user_setpoint).assert_any_call(0.4)
     get_mock_put(gonio.y.user_setpoint).assert_any_call(0.5)
     get_mock_put(gonio.z.user_setpoint).assert_any_call(0.6)
+
+
+def _zocalo_result_at_x_voxel(x_voxel: float, max_count: int) -> dict:
+    return {
+        "centre_of_mass": [x_voxel, 5, 5],
+        "max_voxel": [round(x_voxel), 5, 5],
+        "max_count": max_count,
+        "n_voxels": 3,
+        "total_count": 10 * max_count,
+        "bounding_box": [[round(x_voxel) - 1, 4, 4], [round(x_voxel) + 2, 6, 6]],
+        "sample_id": _NO_SAMPLE_ID,
+    }
+
+
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.pin_centre_then_gridscan_plan.pin_tip_centre_plan",
+    autospec=True,
+)
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.pin_centre_then_gridscan_plan.detect_grid_and_do_gridscan",
+    autospec=True,
+)
+def test_hits_on_multi_sample_pin_are_selected_and_collected_for_each_well(
+    mock_detect_and_do_gridscan: MagicMock,
+    mock_pin_tip_centre: MagicMock,
+    pin_centre_then_xray_centre_params_with_patched_create_params: PinTipCentreThenXrayCentre,
+    hyperion_grid_detect_xrc_devices: HyperionGridDetectThenXRayCentreComposite,
+    test_config_files,
+    run_engine: RunEngine,
+):
+    composite = hyperion_grid_detect_xrc_devices
+    params = pin_centre_then_xray_centre_params_with_patched_create_params
+    # Grid boxes are 0.1 mm along x from 0, so the wells span boxes 1 to 19
+    params.wells = WellLayout(well_size_um=600, sample_ids=[11, 12, 13])
+    set_mock_value(composite.gonio.x.user_readback, 1.0)
+    mock_zocalo_trigger(
+        composite.zocalo,
+        [
+            _zocalo_result_at_x_voxel(30, 10000),
+            _zocalo_result_at_x_voxel(4, 100),
+            _zocalo_result_at_x_voxel(6, 500),
+            _zocalo_result_at_x_voxel(10, 300),
+            _zocalo_result_at_x_voxel(15, 50),
+        ],
+    )
+    xrc_handler = XRayCentreEventHandler()
+    well_regions_handler = WellRegionsEventHandler()
+    selected = []
+
+    def plan():
+        yield from pin_centre_then_gridscan_plan(
+            composite, params, test_config_files["oav_config_json"]
+        )
+        selected.extend(
+            (
+                yield from samples_and_locations_to_collect(
+                    TopNByMaxCountSelection(n=1),
+                    composite.gonio,
+                    params.sample_id,
+                    xrc_handler.xray_centre_results,
+                    well_regions_handler.well_regions,
+                )
+            )
+        )
+
+    run_engine(bpp.subs_wrapper(plan(), [xrc_handler, well_regions_handler]))
+
+    assert [sample_id for sample_id, _ in selected] == [11, 12, 13]
+    np.testing.assert_allclose(
+        [location[0] for _, location in selected], [550, 950, 1450]
+    )
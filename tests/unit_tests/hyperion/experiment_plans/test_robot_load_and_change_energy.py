@@ -101,7 +101,7 @@ def run_simulating_smargon_wait(
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction"
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction"
 )
 @patch(
     "mx_bluesky.hyperion.experiment_plans.robot_load_and_change_energy.set_energy_plan",
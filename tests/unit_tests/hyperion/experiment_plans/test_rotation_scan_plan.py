@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import glob
 import json
+import os
 import shutil
 from collections.abc import Callable, Sequence
+from dataclasses import fields
 from itertools import dropwhile, takewhile
 from math import ceil
 from typing import Any
@@ -31,6 +34,9 @@ from ophyd_async.core import get_mock_put, set_mock_value
 from mx_bluesky.common.experiment_plans.oav_snapshot_plan import (
     OAV_SNAPSHOT_GROUP,
 )
+from mx_bluesky.common.experiment_plans.rotation.helical_utils import (
+    calculate_helical_motion_profile,
+)
 from mx_bluesky.common.external_interaction.callbacks.common.zocalo_callback import (
     ZocaloCallback,
 )
@@ -43,11 +49,15 @@ from mx_bluesky.common.parameters.constants import DocDescriptorNames
 from mx_bluesky.common.parameters.rotation import (
     RotationScan,
     SingleRotationScan,
+    WedgeSchedule,
 )
+from mx_bluesky.common.simulation.benchmark import PlanBenchmark
+from mx_bluesky.common.simulation.latency import LatencyInjector
 from mx_bluesky.common.utils.exceptions import (
     ISPyBDepositionNotMadeError,
 )
 from mx_bluesky.hyperion.experiment_plans.rotation_scan_plan import (
+    HELICAL_ROTATION_GROUP,
     RotationMotionProfile,
     RotationScanComposite,
     calculate_motion_profile,
@@ -282,6 +292,31 @@ def test_rotation_scan(
     composite.eiger.unstage.assert_called()  # type: ignore
 
 
+@pytest.mark.latency_benchmark
+@pytest.mark.timeout(60)
+def test_rotation_scan_internal_benchmark(
+    run_engine: RunEngine,
+    test_rotation_params: RotationScan,
+    fake_create_rotation_devices: RotationScanComposite,
+    oav_parameters_for_rotation: OAVParameters,
+    latency_injector: LatencyInjector,
+    plan_benchmark: PlanBenchmark,
+):
+    composite = fake_create_rotation_devices
+    latency_injector.apply(
+        *(getattr(composite, field.name) for field in fields(composite))
+    )
+
+    with patch("bluesky.preprocessors.__read_and_stash_a_motor", fake_read):
+        plan_benchmark.run(
+            "rotation_scan_internal",
+            run_engine,
+            rotation_scan_internal(
+                composite, test_rotation_params, oav_parameters_for_rotation
+            ),
+        )
+
+
 def test_rotation_plan_runs(
     setup_and_run_rotation_plan_for_tests_standard: dict[str, Any],
 ) -> None:
@@ -364,6 +399,143 @@ async def test_rotation_plan_smargon_doesnt_move_xyz_if_not_given_in_params(
         get_mock_put(motor.user_setpoint).assert_not_called()  # type: ignore
 
 
+@pytest.fixture
+def helical_rotation_params(test_rotation_params: RotationScan) -> SingleRotationScan:
+    params = next(test_rotation_params.single_rotation_scans)
+    return SingleRotationScan(
+        **(params.model_dump() | {"x_end_um": 61.0, "y_end_um": 2.0, "z_end_um": 33.0})
+    )
+
+
+async def test_helical_rotation_plan_translates_smargon_during_rotation(
+    run_engine: RunEngine,
+    helical_rotation_params: SingleRotationScan,
+    fake_create_rotation_devices: RotationScanComposite,
+    motion_values: RotationMotionProfile,
+):
+    smargon = fake_create_rotation_devices.gonio
+    initial_velocity = await smargon.x.velocity.get_value()
+    helical_motion = calculate_helical_motion_profile(
+        helical_rotation_params, motion_values
+    )
+
+    setup_and_run_rotation_plan_for_tests(
+        run_engine,
+        helical_rotation_params,
+        fake_create_rotation_devices,
+        motion_values,
+    )
+
+    for i, motor in enumerate([smargon.x, smargon.z]):
+        positions = [
+            c.args[0]
+            for c in get_mock_put(motor.user_setpoint).call_args_list  # type: ignore
+        ]
+        assert positions == pytest.approx(
+            [helical_motion.start_motion_mm[i * 2], helical_motion.end_motion_mm[i * 2]]
+        )
+        velocities = [
+            c.args[0]
+            for c in get_mock_put(motor.velocity).call_args_list  # type: ignore
+        ]
+        assert velocities == pytest.approx(
+            [helical_motion.velocity_mm_s[i * 2], initial_velocity]
+        )
+    # y is not on the helical vector so only moves to the start
+    assert [
+        c.args[0]
+        for c in get_mock_put(smargon.y.user_setpoint).call_args_list  # type: ignore
+    ] == pytest.approx([0.002])
+    get_mock_put(smargon.y.velocity).assert_not_called()  # type: ignore
+
+
+def test_helical_rotation_plan_starts_translation_with_rotation_and_restores_velocity(
+    sim_run_engine_for_rotation: RunEngineSimulator,
+    helical_rotation_params: SingleRotationScan,
+    fake_create_rotation_devices: RotationScanComposite,
+    motion_values: RotationMotionProfile,
+):
+    smargon = fake_create_rotation_devices.gonio
+    for motor, velocity in [(smargon.x, 2.5), (smargon.z, 1.5)]:
+        sim_run_engine_for_rotation.add_handler(
+            "locate",
+            lambda _, velocity=velocity: {"readback": velocity, "setpoint": velocity},
+            motor.velocity.name,
+        )
+    helical_motion = calculate_helical_motion_profile(
+        helical_rotation_params, motion_values
+    )
+
+    msgs = sim_run_engine_for_rotation.simulate_plan(
+        rotation_scan_plan(
+            fake_create_rotation_devices, helical_rotation_params, motion_values
+        )
+    )
+
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "wait"
+            and msg.kwargs["group"] == CONST.WAIT.MOVE_GONIO_TO_START
+        ),
+    )
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "set"
+            and msg.obj is smargon.x
+            and msg.args[0] == helical_motion.start_motion_mm[0]
+            and msg.kwargs["group"] == CONST.WAIT.ROTATION_READY_FOR_DC
+        ),
+    )
+    for motor, velocity in [
+        (smargon.x, helical_motion.velocity_mm_s[0]),
+        (smargon.z, helical_motion.velocity_mm_s[2]),
+    ]:
+        msgs = assert_message_and_return_remaining(
+            msgs,
+            lambda msg, motor=motor, velocity=velocity: (
+                msg.command == "set"
+                and msg.obj is motor.velocity
+                and msg.args[0] == velocity
+            ),
+        )
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "set"
+            and msg.obj is smargon.omega
+            and msg.kwargs["group"] == HELICAL_ROTATION_GROUP
+        ),
+    )
+    for i, motor in [(0, smargon.x), (2, smargon.z)]:
+        msgs = assert_message_and_return_remaining(
+            msgs,
+            lambda msg, i=i, motor=motor: (
+                msg.command == "set"
+                and msg.obj is motor
+                and msg.args[0] == helical_motion.end_motion_mm[i]
+                and msg.kwargs["group"] == HELICAL_ROTATION_GROUP
+            ),
+        )
+    msgs = assert_message_and_return_remaining(
+        msgs,
+        lambda msg: (
+            msg.command == "wait" and msg.kwargs["group"] == HELICAL_ROTATION_GROUP
+        ),
+    )
+    for motor, velocity in [(smargon.x, 2.5), (smargon.z, 1.5)]:
+        msgs = assert_message_and_return_remaining(
+            msgs,
+            lambda msg, motor=motor, velocity=velocity: (
+                msg.command == "set"
+                and msg.obj is motor.velocity
+                and msg.args[0] == velocity
+            ),
+        )
+    assert not [msg for msg in msgs if msg.obj is smargon.y]
+
+
 @patch(
     "mx_bluesky.hyperion.experiment_plans.rotation_scan_plan._cleanup_plan",
     autospec=True,
@@ -1463,6 +1635,53 @@ def test_full_multi_rotation_plan_nexus_files_written_correctly(
             assert tuple(omega_vec) == (-1.0 if test_omega_flip else 1.0, 0, 0)
 
 
+@pytest.mark.timeout(3)
+@patch(
+    "mx_bluesky.hyperion.experiment_plans.rotation_scan_plan.check_topup_and_wait_if_necessary",
+    autospec=True,
+)
+def test_inverse_beam_wedges_are_written_to_one_nexus_file_in_collection_order(
+    _,
+    run_engine: RunEngine,
+    test_rotation_params: RotationScan,
+    fake_create_rotation_devices: RotationScanComposite,
+    oav_parameters_for_rotation: OAVParameters,
+    tmpdir,
+):
+    params = test_rotation_params
+    params.file_name = "wedge_test"
+    params.storage_directory = f"{tmpdir}"
+    params.rotation_scans[0].scan_width_deg = 30
+    params.wedges = WedgeSchedule(wedge_width_deg=10)
+    run_number = params.detector_params.run_number
+    wedges = list(params.single_rotation_scans)
+
+    _run_multi_rotation_plan(
+        run_engine,
+        params,
+        fake_create_rotation_devices,
+        [RotationNexusFileCallback()],
+        oav_parameters_for_rotation,
+    )
+
+    assert [os.path.basename(f) for f in glob.glob(f"{tmpdir}/*.nxs")] == [
+        f"wedge_test_{run_number}.nxs"
+    ]
+    with h5py.File(f"{tmpdir}/wedge_test_{run_number}.nxs", "r") as written_nexus_file:
+        assert isinstance(data := written_nexus_file["entry/data/data"], h5py.Dataset)
+        assert data.shape[0] == params.num_images == 600
+        assert isinstance(
+            omega := written_nexus_file["/entry/sample/sample_omega/omega"],
+            h5py.Dataset,
+        )
+        expected_omega = np.concatenate(
+            [wedge.scan_points["omega"] for wedge in wedges]
+        )
+        np.testing.assert_allclose(omega[:], expected_omega)
+        # Each wedge and its inverse, 10 degrees at a time in the negative direction
+        np.testing.assert_allclose(omega[::100], [0, 180, -10, 170, -20, 160])
+
+
 @patch(
     "mx_bluesky.hyperion.experiment_plans.rotation_scan_plan.check_topup_and_wait_if_necessary",
     autospec=True,
@@ -1,4 +1,5 @@
 from contextlib import nullcontext
+from dataclasses import fields
 from unittest.mock import ANY, MagicMock, patch
 
 import pytest
@@ -32,6 +33,8 @@ from dodal.devices.zebra.zebra_controlled_shutter import ZebraShutterState
 from ophyd_async.core import Device, Signal, init_devices, set_mock_value
 from ophyd_async.epics.motor import Motor
 
+from mx_bluesky.common.simulation.benchmark import PlanBenchmark
+from mx_bluesky.common.simulation.latency import LatencyInjector
 from mx_bluesky.hyperion.experiment_plans.udc_default_state import (
     CryoStreamError,
     UDCDefaultDevices,
@@ -167,6 +170,30 @@ def test_udc_default_state_runs_in_real_run_engine(
     run_engine(move_to_udc_default_state(default_devices))
 
 
+@pytest.mark.latency_benchmark
+@pytest.mark.timeout(60)
+def test_move_to_udc_default_state_benchmark(
+    run_engine: RunEngine,
+    default_devices: UDCDefaultDevices,
+    latency_injector: LatencyInjector,
+    plan_benchmark: PlanBenchmark,
+):
+    set_mock_value(default_devices.cryostream.temp, 100)
+    set_mock_value(default_devices.cryostream.back_pressure, 0.01)
+    default_devices.scintillator._aperture_scatterguard().selected_aperture.get_value = MagicMock(
+        return_value=ApertureValue.PARKED
+    )
+    latency_injector.apply(
+        *(getattr(default_devices, field.name) for field in fields(default_devices))
+    )
+
+    plan_benchmark.run(
+        "move_to_udc_default_state",
+        run_engine,
+        move_to_udc_default_state(default_devices),
+    )
+
+
 @patch(
     "mx_bluesky.hyperion.experiment_plans.udc_default_state._unload_sample_if_present",
     MagicMock(return_value=iter([Msg("robot_unload")])),
@@ -342,7 +369,7 @@ def test_udc_default_state_unloads_if_sample_present(
         default_devices.robot.gonio_pin_sensor, PinMounted.PIN_MOUNTED
     )
     with patch(
-        "mx_bluesky.hyperion.experiment_plans.udc_default_state.get_beamline_parameters",
+        "mx_bluesky.hyperion.experiment_plans.udc_default_state.get_hyperion_beamline_parameters",
         return_value=beamline_parameters,
     ):
         msgs = sim_run_engine.simulate_plan(move_to_udc_default_state(default_devices))
@@ -373,7 +400,7 @@ def test_udc_default_state_no_unload_if_no_sample_present(
         default_devices.robot.gonio_pin_sensor, PinMounted.NO_PIN_MOUNTED
     )
     with patch(
-        "mx_bluesky.hyperion.experiment_plans.udc_default_state.get_beamline_parameters",
+        "mx_bluesky.hyperion.experiment_plans.udc_default_state.get_hyperion_beamline_parameters",
         return_value=beamline_parameters,
     ):
         msgs = sim_run_engine.simulate_plan(move_to_udc_default_state(default_devices))
@@ -1,3 +1,6 @@
+import os
+import shutil
+from pathlib import Path
 from unittest.mock import MagicMock, Mock, patch
 
 import bluesky.plan_stubs as bps
@@ -9,7 +12,10 @@ from dodal.devices.robot import BartRobot
 from dodal.devices.webcam import Webcam
 from ophyd_async.core import set_mock_value
 
-from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import BLSampleStatus
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    BLSampleStatus,
+    _get_base_url_and_token,
+)
 from mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback import (
     RobotLoadISPyBCallback,
 )
@@ -56,7 +62,7 @@ update_doc_data = {
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_given_start_doc_with_expected_data_then_data_put_in_ispyb(
@@ -80,7 +86,7 @@ def test_given_start_doc_with_expected_data_then_data_put_in_ispyb(
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_given_failing_plan_then_exception_detail(
@@ -148,7 +154,7 @@ def robot_unload_plan(robot: BartRobot, oav: OAV, webcam: Webcam):
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_given_plan_reads_robot_then_data_put_in_ispyb(
@@ -177,7 +183,7 @@ def test_given_plan_reads_robot_then_data_put_in_ispyb(
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_robot_load_complete_triggers_bl_sample_status_loaded(
@@ -197,7 +203,7 @@ def test_robot_load_complete_triggers_bl_sample_status_loaded(
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_robot_load_fails_triggers_bl_sample_status_error(
@@ -218,7 +224,7 @@ def test_robot_load_fails_triggers_bl_sample_status_error(
 
 
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_robot_unload_event_without_sample_id_and_visit_is_ignored(
@@ -243,7 +249,7 @@ def test_robot_unload_event_without_sample_id_and_visit_is_ignored(
 # condition was encountered during testing although it's not clear how
 # the system arrived in this state.
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_robot_unload_event_where_sample_id_is_zero_is_ignored(
@@ -268,7 +274,7 @@ def test_robot_unload_event_where_sample_id_is_zero_is_ignored(
 
 # When udc default state unloads the robot.
 @patch(
-    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.ExpeyeInteraction",
+    "mx_bluesky.hyperion.external_interaction.callbacks.robot_actions.ispyb_callback.get_expeye_interaction",
     autospec=True,
 )
 def test_robot_unload_event_where_visit_is_undefined_is_ignored(
@@ -289,3 +295,47 @@ def test_robot_unload_event_where_visit_is_undefined_is_ignored(
     expeye.update_robot_action.assert_not_called()
     expeye.end_robot_action.assert_not_called()
     expeye.update_sample_status.assert_not_called()
+
+
+@patch("mx_bluesky.common.external_interaction.ispyb.exp_eye_store.patch")
+@patch("mx_bluesky.common.external_interaction.ispyb.exp_eye_store.post")
+def test_repeated_robot_loads_read_config_once_and_make_minimal_requests(
+    mock_post: MagicMock,
+    mock_patch: MagicMock,
+    run_engine: RunEngine,
+    robot: BartRobot,
+    oav: OAV,
+    webcam: Webcam,
+    tmp_path: Path,
+):
+    n_loads = 3
+    config_path = tmp_path / "ispyb.cfg"
+    shutil.copy("tests/test_data/test_config.cfg", config_path)
+    mock_post.return_value.json.return_value = {"robotActionId": ACTION_ID}
+    with (
+        patch.dict(os.environ, {"ISPYB_CONFIG_PATH": str(config_path)}),
+        patch(
+            "mx_bluesky.common.external_interaction.ispyb.exp_eye_store._get_base_url_and_token",
+            wraps=_get_base_url_and_token,
+        ) as mock_read_config,
+    ):
+        callbacks = []
+        for _ in range(n_loads):
+            # A new callback for each load, as when the callbacks are restarted
+            callback = RobotLoadISPyBCallback()
+            token = run_engine.subscribe(callback)
+            run_engine(successful_robot_load_plan(robot, oav, webcam))
+            run_engine.unsubscribe(token)
+            callbacks.append(callback)
+
+    mock_read_config.assert_called_once()
+    assert all(callback.expeye is callbacks[0].expeye for callback in callbacks)
+    # One POST to start the action
+    assert mock_post.call_count == n_loads
+    # PATCHes to update the action, end it and set the sample status, in that order
+    assert mock_patch.call_count == 3 * n_loads
+    assert [c.args[0] for c in mock_patch.call_args_list[:3]] == [
+        f"http://blah/robot-actions/{ACTION_ID}",
+        f"http://blah/robot-actions/{ACTION_ID}",
+        f"http://blah/samples/{SAMPLE_ID}",
+    ]
@@ -127,6 +127,44 @@ def test_hardware_read_events(
     }
 
 
+@patch(
+    "mx_bluesky.common.external_interaction.callbacks.common.ispyb_mapping.get_current_time_string",
+    new=MagicMock(return_value=EXPECTED_START_TIME),
+)
+def test_helical_vector_is_recorded(
+    mock_ispyb_conn, test_rotation_start_outer_document, test_event_data
+):
+    params = json.loads(test_rotation_start_outer_document["mx_bluesky_parameters"])
+    params |= {
+        "x_start_um": 100.0,
+        "y_start_um": 200.0,
+        "z_start_um": 300.0,
+        "x_end_um": 160.4,
+        "y_end_um": 200.0,
+        "z_end_um": 330.0,
+    }
+    test_rotation_start_outer_document["mx_bluesky_parameters"] = json.dumps(params)
+    callback = RotationISPyBCallback()
+    callback.activity_gated_start(test_rotation_start_outer_document)  # pyright: ignore
+    callback.activity_gated_start(
+        test_event_data.test_rotation_start_main_document  # pyright: ignore
+    )
+    callback.activity_gated_descriptor(
+        test_event_data.test_descriptor_document_pre_data_collection
+    )
+    callback.activity_gated_event(
+        test_event_data.test_event_document_pre_data_collection
+    )
+
+    create_dcg_request = mock_ispyb_conn.calls_for(DCGS_RE)[0].request
+    assert json.loads(create_dcg_request.body)["experimentType"] == "Helical"
+    append_comments_req = list(mock_ispyb_conn.dc_calls_for(DC_COMMENT_RE))[0]
+    assert append_comments_req.body == {
+        "comments": " Sample position (µm): (158, 24, 3) Helical from (100, 200, 300)"
+        " to (160, 200, 330) µm"
+    }
+
+
 @patch(
     "mx_bluesky.common.external_interaction.callbacks.common.ispyb_mapping.get_current_time_string",
     new=MagicMock(return_value=EXPECTED_START_TIME),
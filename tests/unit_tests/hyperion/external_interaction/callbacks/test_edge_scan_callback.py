@@ -0,0 +1,76 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from bluesky.run_engine import RunEngine
+
+from mx_bluesky.hyperion.experiment_plans.edge_scan_plan import (
+    EdgeScanComposite,
+    edge_scan_plan,
+)
+from mx_bluesky.hyperion.external_interaction.callbacks.edge_scan_callback import (
+    EdgeScanCallback,
+)
+from mx_bluesky.hyperion.utils.absorption_edge import EdgeScanAnalysisError
+
+from ...conftest import EDGE_SCAN_ROI, SELENIUM_K_EDGE_EV
+
+
+@pytest.mark.timeout(10)
+def test_edge_scan_callback_writes_spectrum_and_chosen_energies(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+    tmp_path: Path,
+):
+    output_file = tmp_path / "edge" / "scan.txt"
+    run_engine.subscribe(EdgeScanCallback())
+    analysis = run_engine(
+        edge_scan_plan(
+            edge_scan_composite,
+            SELENIUM_K_EDGE_EV,
+            step_ev=2,
+            low_roi=EDGE_SCAN_ROI[0],
+            high_roi=EDGE_SCAN_ROI[1],
+            output_file=str(output_file),
+        )
+    ).plan_result
+
+    header = [line for line in output_file.read_text().splitlines() if line[0] == "#"]
+    assert header[1].startswith(f"# peak_energy_ev {analysis.peak_energy_ev} f' ")
+    assert f"remote_energy_ev {analysis.remote_energy_ev}" in header[3]
+    data = np.loadtxt(output_file)
+    assert data[:, 0].tolist() == analysis.energies_ev
+    assert data[:, 3].tolist() == pytest.approx(analysis.f_prime)
+
+
+@pytest.mark.timeout(10)
+def test_edge_scan_callback_writes_raw_spectrum_if_analysis_fails(
+    run_engine: RunEngine,
+    edge_scan_composite: EdgeScanComposite,
+    sample_fluorescence: MagicMock,
+    tmp_path: Path,
+):
+    output_file = tmp_path / "scan.txt"
+    run_engine.subscribe(EdgeScanCallback())
+    with pytest.raises(EdgeScanAnalysisError):
+        run_engine(
+            edge_scan_plan(
+                edge_scan_composite,
+                SELENIUM_K_EDGE_EV + 500,
+                step_ev=2,
+                output_file=str(output_file),
+            )
+        )
+    assert "unanalysed" in output_file.read_text()
+    assert np.loadtxt(output_file).shape == (41, 2)
+
+
+def test_edge_scan_callback_ignores_scans_without_an_output_file(
+    run_engine: RunEngine, tmp_path: Path
+):
+    callback = EdgeScanCallback()
+    callback.start({"uid": "1", "activate_callbacks": ["EdgeScanCallback"]})  # type: ignore
+    callback.stop({"run_start": "1"})  # type: ignore
+    assert not list(tmp_path.iterdir())
@@ -14,6 +14,7 @@ from dodal.log import LOGGER as DODAL_LOGGER
 from mx_bluesky.common.external_interaction.alerting.log_based_service import (
     LoggingAlertService,
 )
+from mx_bluesky.common.external_interaction.alerting.pipeline import AlertPipeline
 from mx_bluesky.common.utils.log import ISPYB_ZOCALO_CALLBACK_LOGGER, NEXUS_LOGGER
 from mx_bluesky.hyperion.external_interaction.callbacks.__main__ import (
     PING_TIMEOUT_S,
@@ -69,7 +70,9 @@ def test_main_function(
     setup_callbacks.assert_called()
     setup_alerting.assert_called_once()
     mock_run_watchdog.assert_called_once()
-    assert isinstance(setup_alerting.mock_calls[0].args[0], LoggingAlertService)
+    alert_service = setup_alerting.mock_calls[0].args[0]
+    assert isinstance(alert_service, AlertPipeline)
+    assert isinstance(alert_service.sinks[0], LoggingAlertService)
 
 
 @patch(
@@ -82,7 +85,7 @@ def test_no_config_server_url_raises_exception():
 
 
 def test_setup_callbacks():
-    current_number_of_callbacks = 8
+    current_number_of_callbacks = 9
     cbs = setup_callbacks()
     assert len(cbs) == current_number_of_callbacks
     assert len(set(cbs)) == current_number_of_callbacks
@@ -98,12 +101,13 @@ def test_setup_logging(parse_callback_cli_args):
     assert len(ISPYB_ZOCALO_CALLBACK_LOGGER.handlers) == 0
     assert len(NEXUS_LOGGER.handlers) == 0
     setup_logging(parse_callback_cli_args())
-    assert len(ISPYB_ZOCALO_CALLBACK_LOGGER.handlers) == 4
-    assert len(NEXUS_LOGGER.handlers) == 4
+    # The graylog and info file handlers are behind a single queue handler
+    assert len(ISPYB_ZOCALO_CALLBACK_LOGGER.handlers) == 3
+    assert len(NEXUS_LOGGER.handlers) == 3
     assert DODAL_LOGGER.parent == ISPYB_ZOCALO_CALLBACK_LOGGER
     setup_logging(parse_callback_cli_args())
-    assert len(ISPYB_ZOCALO_CALLBACK_LOGGER.handlers) == 4
-    assert len(NEXUS_LOGGER.handlers) == 4
+    assert len(ISPYB_ZOCALO_CALLBACK_LOGGER.handlers) == 3
+    assert len(NEXUS_LOGGER.handlers) == 3
 
 
 @patch("mx_bluesky.hyperion.external_interaction.callbacks.__main__.sleep")
@@ -0,0 +1,224 @@
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from daq_config_server.models.feature_settings.hyperion_feature_settings import (
+    HyperionFeatureSettings,
+)
+from dodal.beamlines.i03 import BL
+from dodal.common.beamlines.beamline_parameters import BEAMLINE_PARAMETER_PATHS
+
+from mx_bluesky.hyperion.external_interaction import config_server
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    ConfigSnapshotCache,
+    get_hyperion_beamline_parameters,
+    get_hyperion_feature_settings,
+    pin_config_snapshot,
+    set_config_snapshot_cache,
+)
+
+
+class FakeConfigServer:
+    """Serves config files from memory, counting the requests made for each file."""
+
+    def __init__(self, files: dict[str, Any]):
+        self.files = files
+        self.requests: Counter[str] = Counter()
+        self.fail = False
+
+    def get_file_contents(
+        self,
+        file_path: str | Path,
+        desired_return_type: type = str,
+        reset_cached_result: bool = False,
+    ):
+        self.requests[str(file_path)] += 1
+        if self.fail:
+            raise ConnectionError("Config server unavailable")
+        return self.files[str(file_path)]
+
+
+def feature_settings_path() -> str:
+    # Patched by an autouse fixture so must be looked up at test time
+    return config_server.GDA_DOMAIN_PROPERTIES_PATH
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_config_server():
+    server = FakeConfigServer(
+        {
+            feature_settings_path(): HyperionFeatureSettings(USE_GPU_RESULTS=True),
+            BEAMLINE_PARAMETER_PATHS[BL]: {"miniap_x_LARGE_APERTURE": 2.389},
+        }
+    )
+    with patch(
+        "mx_bluesky.hyperion.external_interaction.config_server.get_config_client",
+        return_value=server,
+    ):
+        yield server
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def snapshot_cache(fake_config_server: FakeConfigServer, clock: FakeClock):
+    cache = ConfigSnapshotCache(refresh_interval_s=0.01, clock=clock)
+    set_config_snapshot_cache(cache)
+    yield cache
+    cache.stop_background_refresh()
+    set_config_snapshot_cache(None)
+
+
+def test_without_snapshot_cache_feature_settings_read_from_config_server(
+    fake_config_server: FakeConfigServer,
+):
+    assert get_hyperion_feature_settings().USE_GPU_RESULTS
+    assert get_hyperion_feature_settings().USE_GPU_RESULTS
+    assert fake_config_server.requests[feature_settings_path()] == 2
+
+
+def test_without_pinned_snapshot_feature_settings_read_from_config_server(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    snapshot_cache.refresh()
+    fake_config_server.files[feature_settings_path()] = HyperionFeatureSettings(
+        USE_GPU_RESULTS=False
+    )
+    assert not get_hyperion_feature_settings().USE_GPU_RESULTS
+
+
+def test_pinned_snapshot_served_without_requests_to_config_server(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    snapshot_cache.refresh()
+    fake_config_server.requests.clear()
+    with pin_config_snapshot():
+        for _ in range(10):
+            assert get_hyperion_feature_settings().USE_GPU_RESULTS
+            assert (
+                get_hyperion_beamline_parameters()["miniap_x_LARGE_APERTURE"] == 2.389
+            )
+
+    assert sum(fake_config_server.requests.values()) == 0
+    metrics = snapshot_cache.metrics()
+    assert metrics.hits == 21
+    assert metrics.misses == 0
+
+
+def test_first_pin_fetches_snapshot_and_counts_miss(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    with pin_config_snapshot() as snapshot:
+        assert snapshot.version == 0
+    assert fake_config_server.requests[feature_settings_path()] == 1
+    assert snapshot_cache.metrics().misses == 1
+
+
+def test_configuration_does_not_change_while_pinned(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    with pin_config_snapshot():
+        fake_config_server.files[feature_settings_path()] = HyperionFeatureSettings(
+            USE_GPU_RESULTS=False
+        )
+        snapshot_cache.refresh()
+        assert get_hyperion_feature_settings().USE_GPU_RESULTS
+
+    with pin_config_snapshot():
+        assert not get_hyperion_feature_settings().USE_GPU_RESULTS
+
+
+def test_version_only_incremented_when_configuration_changes(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    assert snapshot_cache.refresh().version == 0
+    assert snapshot_cache.refresh().version == 0
+    fake_config_server.files[BEAMLINE_PARAMETER_PATHS[BL]] = {"new_param": 1}
+    assert snapshot_cache.refresh().version == 1
+    assert snapshot_cache.refresh().version == 1
+
+
+def test_snapshot_beamline_parameters_are_immutable(
+    snapshot_cache: ConfigSnapshotCache,
+):
+    snapshot = snapshot_cache.refresh()
+    with pytest.raises(TypeError):
+        snapshot.beamline_parameters["miniap_x_LARGE_APERTURE"] = 0  # type: ignore
+
+
+def test_metrics_report_staleness(snapshot_cache: ConfigSnapshotCache, clock):
+    assert snapshot_cache.metrics().staleness_s is None
+    clock.now = 10
+    snapshot_cache.refresh()
+    clock.now = 25
+    metrics = snapshot_cache.metrics()
+    assert metrics.staleness_s == 15
+    assert metrics.refreshes == 1
+    assert metrics.version == 0
+
+
+def test_pins_cannot_be_nested(snapshot_cache: ConfigSnapshotCache):
+    with pin_config_snapshot(), pytest.raises(AssertionError):
+        with pin_config_snapshot():
+            pass
+
+
+def _wait_for_refreshes(cache: ConfigSnapshotCache, n: int):
+    refreshed = threading.Event()
+    original_refresh = cache.refresh
+
+    def counting_refresh():
+        try:
+            return original_refresh()
+        finally:
+            if cache.metrics().refreshes + cache.metrics().refresh_failures >= n:
+                refreshed.set()
+
+    cache.refresh = counting_refresh  # type: ignore
+    return refreshed
+
+
+def test_background_refresh_picks_up_changes(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    snapshot_cache.refresh()
+    fake_config_server.files[feature_settings_path()] = HyperionFeatureSettings(
+        USE_GPU_RESULTS=False
+    )
+    refreshed = _wait_for_refreshes(snapshot_cache, 2)
+    snapshot_cache.start_background_refresh()
+    assert refreshed.wait(0.5)
+    snapshot_cache.stop_background_refresh()
+
+    with pin_config_snapshot() as snapshot:
+        assert snapshot.version == 1
+        assert not get_hyperion_feature_settings().USE_GPU_RESULTS
+
+
+def test_background_refresh_failure_keeps_previous_snapshot(
+    snapshot_cache: ConfigSnapshotCache, fake_config_server: FakeConfigServer
+):
+    snapshot_cache.refresh()
+    fake_config_server.fail = True
+    refreshed = _wait_for_refreshes(snapshot_cache, 3)
+    snapshot_cache.start_background_refresh()
+    assert refreshed.wait(0.5)
+    snapshot_cache.stop_background_refresh()
+
+    assert snapshot_cache.metrics().refresh_failures >= 2
+    with pin_config_snapshot():
+        assert get_hyperion_feature_settings().USE_GPU_RESULTS
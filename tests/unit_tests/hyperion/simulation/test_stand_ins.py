@@ -0,0 +1,238 @@
+import json
+import os
+
+import pytest
+import requests
+from daq_config_server.models.feature_settings.hyperion_feature_settings import (
+    HyperionFeatureSettings,
+)
+from dodal.common.beamlines.beamline_utils import set_config_client
+
+from mx_bluesky.common.external_interaction.ispyb.data_model import (
+    DataCollectionGridInfo,
+    DataCollectionGroupInfo,
+    DataCollectionInfo,
+    Orientation,
+)
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    BLSampleStatus,
+)
+from mx_bluesky.hyperion._plan_runner_params import Wait
+from mx_bluesky.hyperion.blueapi.parameters import LoadCentreCollectParams
+from mx_bluesky.hyperion.external_interaction.agamemnon import (
+    create_parameters_from_agamemnon,
+)
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    get_hyperion_feature_settings,
+)
+from mx_bluesky.hyperion.simulation.stand_ins import (
+    AGAMEMNON_URL_VARIABLE,
+    SIMULATED_CONFIG_DIR,
+    FakeAgamemnon,
+    InMemoryExpeye,
+    RecordingAlertService,
+    ScriptedZocalo,
+    SimulatedConfigServer,
+)
+
+
+@pytest.fixture
+def config_server():
+    server = SimulatedConfigServer(
+        HyperionFeatureSettings(XRC_USE_ROI_MODE=False), {"sg_x_SMALL_APERTURE": 1.5}
+    )
+    set_config_client(server)
+    return server
+
+
+def test_fake_agamemnon_serves_instructions_in_order_then_nothing(config_server):
+    with open("tests/test_data/agamemnon/example_native.json") as f:
+        collect = json.load(f)
+
+    with FakeAgamemnon([{"wait": 5}, collect]) as agamemnon:
+        assert os.environ[AGAMEMNON_URL_VARIABLE] == agamemnon.url
+        [wait] = create_parameters_from_agamemnon()
+        collections = create_parameters_from_agamemnon()
+        assert create_parameters_from_agamemnon() == []
+
+    assert wait == Wait(duration_s=5)
+    assert len(collections) == 2
+    assert all(isinstance(p, LoadCentreCollectParams) for p in collections)
+    assert collections[0].sample_id == 6501159  # type: ignore
+    assert not collections[0].robot_load_then_centre.use_roi_mode  # type: ignore
+    assert agamemnon.requests == 3
+
+
+def test_fake_agamemnon_restores_url_on_exit():
+    previous_url = os.environ.get(AGAMEMNON_URL_VARIABLE)
+
+    with FakeAgamemnon([]):
+        pass
+
+    assert os.environ.get(AGAMEMNON_URL_VARIABLE) == previous_url
+
+
+def test_fake_agamemnon_rejects_unknown_requests():
+    with FakeAgamemnon([{"wait": 5}]) as agamemnon:
+        response = requests.get(agamemnon.url + "unknown")
+
+    assert response.status_code == 404
+    assert agamemnon.requests == 0
+
+
+def test_simulated_config_server_serves_settings_and_simulated_files(config_server):
+    beamline_parameters = config_server.get_file_contents(
+        "/dls_sw/i03/software/daq_configuration/domain/beamlineParameters", dict
+    )
+
+    assert not get_hyperion_feature_settings().XRC_USE_ROI_MODE
+    assert beamline_parameters["sg_x_SMALL_APERTURE"] == 1.5
+    assert beamline_parameters["miniap_z_SMALL_APERTURE"] == 15.8
+    assert (
+        config_server.get_file_contents(
+            "/dls_sw/i03/software/gda_versions/display.configuration"
+        )
+        == (SIMULATED_CONFIG_DIR / "display.configuration").read_text()
+    )
+    with pytest.raises(FileNotFoundError):
+        config_server.get_file_contents("/dls_sw/i03/unknown.json", dict)
+
+
+def test_in_memory_expeye_records_depositions():
+    expeye = InMemoryExpeye()
+
+    action_id = expeye.start_robot_action("LOAD", "cm12345", 1, 10)
+    expeye.update_robot_action(action_id, {"dewarLocation": 4})
+    expeye.end_robot_action(action_id, "fail", "Pin not found")
+    expeye.update_sample_status(10, BLSampleStatus.ERROR_SAMPLE)
+    group_id = expeye.create_data_group(
+        "cm12345", 1, DataCollectionGroupInfo("cm12345-1", "SAD", 10)
+    )
+    dc_id = expeye.create_data_collection(group_id, DataCollectionInfo(n_images=10))
+
+    assert expeye.robot_actions[action_id] == {
+        "actionType": "LOAD",
+        "proposal": "cm12345",
+        "visitNumber": 1,
+        "sampleId": 10,
+        "dewarLocation": 4,
+        "status": "ERROR",
+        "message": "Pin not found",
+    }
+    assert expeye.sample_statuses == {10: BLSampleStatus.ERROR_SAMPLE}
+    assert expeye.data_collections[dc_id].parent_id == group_id
+    assert len({action_id, group_id, dc_id}) == 3
+
+
+def test_in_memory_expeye_only_updates_fields_given():
+    expeye = InMemoryExpeye()
+    group_id = expeye.create_data_group(
+        "cm12345", 1, DataCollectionGroupInfo("cm12345-1", "SAD", 10)
+    )
+    dc_id = expeye.create_data_collection(
+        group_id, DataCollectionInfo(n_images=10, comments="Centred.")
+    )
+
+    expeye.update_data_group(
+        group_id, DataCollectionGroupInfo("cm12345-1", "OSC", None)
+    )
+    expeye.update_data_collection(
+        dc_id, DataCollectionInfo(comments=" Collected."), append_comment=True
+    )
+    expeye.update_data_collection(dc_id, DataCollectionInfo(end_time="now"))
+
+    assert expeye.data_groups[group_id].experiment_type == "OSC"
+    assert expeye.data_groups[group_id].sample_id == 10
+    assert expeye.data_collections[dc_id].comments == "Centred. Collected."
+    assert expeye.data_collections[dc_id].n_images == 10
+    assert expeye.data_collections[dc_id].end_time == "now"
+    assert expeye.data_collections_in(group_id) == {
+        dc_id: expeye.data_collections[dc_id]
+    }
+
+
+def _gridscans(expeye: InMemoryExpeye, sample_id: int) -> list[int]:
+    group_id = expeye.create_data_group(
+        "cm12345", 1, DataCollectionGroupInfo("cm12345-1", "Mesh3D", sample_id)
+    )
+    gridscan_ids = []
+    for steps_y in (10, 8):
+        dc_id = expeye.create_data_collection(group_id, DataCollectionInfo())
+        expeye.create_grid(
+            dc_id,
+            DataCollectionGridInfo(
+                0.02, 0.02, 20, steps_y, 1.25, 1.25, 0, 0, Orientation.HORIZONTAL, True
+            ),
+        )
+        gridscan_ids.append(dc_id)
+    return gridscan_ids
+
+
+def test_scripted_zocalo_gives_hits_for_each_sample():
+    zocalo = ScriptedZocalo(InMemoryExpeye(), {1: 0, 2: 3}, default_hits=1)
+
+    assert [zocalo.hits_for(sample_id) for sample_id in (1, 2, 3)] == [0, 3, 1]
+
+
+def test_scripted_zocalo_finds_crystals_once_every_gridscan_has_ended():
+    expeye = InMemoryExpeye()
+    zocalo = ScriptedZocalo(expeye, {2: 3})
+    first, second = _gridscans(expeye, 2)
+
+    zocalo.run_end(first)
+    assert zocalo.take_results() is None
+    zocalo.run_end(second)
+    results = zocalo.take_results()
+
+    assert zocalo.jobs == [
+        {"event": "end", "ispyb_dcid": first},
+        {"event": "end", "ispyb_dcid": second},
+    ]
+    assert results is not None
+    assert results["recipe_parameters"] == {
+        "dcid": first,
+        "dcgid": expeye.data_collections[first].parent_id,
+    }
+    crystals = results["results"]
+    assert [crystal["max_voxel"] for crystal in crystals] == [
+        [10, 5, 4],
+        [11, 5, 4],
+        [12, 5, 4],
+    ]
+    assert [crystal["max_count"] for crystal in crystals] == [10000, 5000, 3333]
+    assert {crystal["sample_id"] for crystal in crystals} == {2}
+    assert zocalo.take_results() is None
+
+
+def test_scripted_zocalo_finds_nothing_in_sample_without_crystals():
+    expeye = InMemoryExpeye()
+    zocalo = ScriptedZocalo(expeye, {1: 0})
+    for gridscan_id in _gridscans(expeye, 1):
+        zocalo.run_end(gridscan_id)
+
+    results = zocalo.take_results()
+
+    assert results is not None
+    assert results["results"] == []
+
+
+def test_scripted_zocalo_clears_results_not_taken():
+    expeye = InMemoryExpeye()
+    zocalo = ScriptedZocalo(expeye, {})
+    for gridscan_id in _gridscans(expeye, 1):
+        zocalo.run_end(gridscan_id)
+
+    zocalo.clear_results()
+
+    assert zocalo.take_results() is None
+
+
+def test_recording_alert_service_records_alerts_with_time():
+    service = RecordingAlertService(lambda: 12.5)
+
+    service.raise_alert("Robot fault", "The robot faulted", {})
+
+    [alert] = service.alerts
+    assert alert.time_s == 12.5
+    assert alert.summary == "Robot fault"
+    assert alert.content == "The robot faulted"
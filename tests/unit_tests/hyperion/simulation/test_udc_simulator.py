@@ -0,0 +1,254 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.common.beamlines.beamline_parameters import BEAMLINE_PARAMETER_PATHS
+
+from mx_bluesky.common.external_interaction.ispyb.exp_eye_store import (
+    BLSampleStatus,
+)
+from mx_bluesky.common.parameters.constants import DetectorParamConstants
+from mx_bluesky.hyperion.external_interaction.alerting.constants import Subjects
+from mx_bluesky.hyperion.external_interaction.config_server import (
+    get_config_snapshot_cache,
+)
+from mx_bluesky.hyperion.parameters.constants import CONST
+from mx_bluesky.hyperion.simulation.simulated_beamline import UdcLatencyProfile
+from mx_bluesky.hyperion.simulation.stand_ins import (
+    AGAMEMNON_URL_VARIABLE,
+    SIMULATED_CONFIG_DIR,
+    InMemoryExpeye,
+    ScriptedZocalo,
+)
+from mx_bluesky.hyperion.simulation.udc_simulator import (
+    ISPYB_CONFIG_VARIABLE,
+    SampleTimeline,
+    SimulatedPhase,
+    SimulatedSample,
+    SimulationConfig,
+    SimulationReport,
+    format_report,
+    main,
+    run_simulation,
+)
+
+QUEUE = [
+    SimulatedSample(sample_id=1, position=1),
+    SimulatedSample(sample_id=2, position=2, hits=0),
+    SimulatedSample(sample_id=3, position=3, collections=2, hits=2),
+]
+
+
+@pytest.fixture(autouse=True)
+def simulated_i03_config_paths(monkeypatch):
+    """Have i03 read its configuration from the simulated config server rather than
+    the test files the unit tests otherwise point it at."""
+    for name, path in [
+        ("BEAMLINE_PARAMETERS_PATH", SIMULATED_CONFIG_DIR / "beamlineParameters"),
+        ("DISPLAY_CONFIG", SIMULATED_CONFIG_DIR / "display.configuration"),
+        ("ZOOM_PARAMS_FILE", SIMULATED_CONFIG_DIR / "jCameraManZoomLevels.xml"),
+        ("DAQ_CONFIGURATION_PATH", SIMULATED_CONFIG_DIR),
+    ]:
+        monkeypatch.setattr(f"dodal.beamlines.i03.{name}", str(path))
+    monkeypatch.setattr(
+        DetectorParamConstants,
+        "BEAM_XY_LUT_PATH",
+        str(SIMULATED_CONFIG_DIR / "DetDistToBeamXYConverter.txt"),
+    )
+    monkeypatch.setitem(
+        BEAMLINE_PARAMETER_PATHS,
+        "i03",
+        str(SIMULATED_CONFIG_DIR / "beamlineParameters"),
+    )
+
+
+@pytest.fixture
+def report(run_engine: RunEngine, tmp_path) -> SimulationReport:
+    return run_simulation(SimulationConfig(samples=QUEUE), run_engine, tmp_path)
+
+
+@pytest.mark.timeout(120)
+def test_queue_is_collected_by_the_udc_plans_in_simulated_time(
+    report: SimulationReport,
+):
+    collected, no_diffraction, first_of_two, second_of_two = report.timelines
+
+    assert [timeline.sample_id for timeline in report.timelines] == [1, 2, 3, 3]
+    assert collected.outcome == "collected"
+    assert collected.rotations == 1
+    assert "CrystalNotFoundError" in no_diffraction.outcome
+    assert no_diffraction.rotations == 0
+    assert first_of_two.outcome == second_of_two.outcome == "collected"
+    assert report.samples_collected == 2
+    for timeline in report.timelines:
+        assert timeline.phases[0].start_s == timeline.start_s
+        assert timeline.phases[-1].end_s == timeline.end_s
+        assert all(phase.duration_s > 0 for phase in timeline.phases)
+    for earlier, later in zip(report.timelines, report.timelines[1:], strict=False):
+        assert later.start_s == earlier.end_s
+    # The sample is only loaded and centred for its first collection
+    assert {CONST.PLAN.ROBOT_LOAD, CONST.PLAN.GRID_DETECT_AND_DO_GRIDSCAN}.issubset(
+        phase.name for phase in first_of_two.phases
+    )
+    assert [phase.name for phase in second_of_two.phases] == [
+        CONST.PLAN.LOAD_CENTRE_COLLECT,
+        CONST.PLAN.ROTATION_OUTER,
+        CONST.PLAN.ROTATION_MAIN,
+        CONST.PLAN.ROTATION_MULTI,
+    ]
+    robot_load_s = report.time_by_phase()[CONST.PLAN.ROBOT_LOAD]
+    assert robot_load_s == pytest.approx(3 * UdcLatencyProfile().robot_load_s, rel=0.1)
+    assert [phase.name for phase in report.udc_phases] == [
+        "udc_default_state",
+        "robot_unload",
+    ]
+    assert report.udc_phases[-1].end_s == report.total_s
+    # Each sample, then the empty queue
+    assert report.agamemnon_requests == 4
+
+
+@pytest.mark.timeout(120)
+def test_depositions_and_processing_go_to_the_stand_ins(report: SimulationReport):
+    expeye = report.expeye
+
+    assert expeye.sample_statuses == {
+        1: BLSampleStatus.LOADED,
+        2: BLSampleStatus.ERROR_SAMPLE,
+        3: BLSampleStatus.LOADED,
+    }
+    assert [
+        (action["actionType"], action["sampleId"], action["status"])
+        for action in expeye.robot_actions.values()
+    ] == [
+        ("LOAD", 1, "SUCCESS"),
+        ("LOAD", 2, "SUCCESS"),
+        ("LOAD", 3, "SUCCESS"),
+        ("UNLOAD", 3, "SUCCESS"),
+    ]
+    assert [
+        (group.experiment_type, group.sample_id)
+        for group in expeye.data_groups.values()
+    ] == [("Mesh3D", 1), ("OSC", 1), ("Mesh3D", 2), ("Mesh3D", 3), ("OSC", 3)]
+    gridscans = [
+        dc_id
+        for dc_id, dc in expeye.data_collections.items()
+        if dc.parent_id is not None
+        and expeye.data_groups[dc.parent_id].experiment_type == "Mesh3D"
+    ]
+    assert set(gridscans) == set(expeye.grids)
+    rotations = [
+        dc_id for dc_id in expeye.data_collections if dc_id not in expeye.grids
+    ]
+    assert [expeye.data_collections[dc_id].n_images for dc_id in rotations] == [
+        3600
+    ] * 3
+    # Every collection is processed, each sample's gridscans together
+    assert [
+        job["ispyb_dcid"] for job in report.zocalo.jobs if job["event"] == "start"
+    ] == [job["ispyb_dcid"] for job in report.zocalo.jobs if job["event"] == "end"]
+    assert {job["ispyb_dcid"] for job in report.zocalo.jobs} == set(
+        expeye.data_collections
+    )
+
+
+@pytest.mark.timeout(120)
+def test_udc_alerts_are_recorded_with_simulated_time(report: SimulationReport):
+    assert [alert.summary for alert in report.alerts] == [
+        Subjects.UDC_STARTED,
+        "UDC moved on to puck 1 on i03",
+        Subjects.UDC_COMPLETED,
+        Subjects.UDC_BATON_RELEASED,
+    ]
+    assert report.alerts[0].time_s == 0
+    assert report.alerts[-2].time_s == report.timelines[-1].end_s
+    assert report.alerts[-1].time_s == report.total_s
+
+
+@pytest.mark.timeout(120)
+def test_services_are_restored_after_simulation(run_engine: RunEngine, tmp_path):
+    previous_environment = {
+        variable: os.environ.get(variable)
+        for variable in ["BEAMLINE", AGAMEMNON_URL_VARIABLE, ISPYB_CONFIG_VARIABLE]
+    }
+    subscriptions = dict(run_engine.dispatcher.cb_registry.callbacks)
+
+    run_simulation(
+        SimulationConfig(samples=[SimulatedSample(sample_id=1)]), run_engine, tmp_path
+    )
+
+    assert {
+        variable: os.environ.get(variable) for variable in previous_environment
+    } == previous_environment
+    assert get_config_snapshot_cache() is None
+    assert dict(run_engine.dispatcher.cb_registry.callbacks) == subscriptions
+    assert run_engine._command_registry["sleep"] == run_engine._sleep  # noqa: SLF001
+
+
+def _report() -> SimulationReport:
+    expeye = InMemoryExpeye()
+    return SimulationReport(
+        timelines=[
+            SampleTimeline(
+                sample_id=7,
+                start_s=10,
+                end_s=100,
+                outcome="collected",
+                rotations=1,
+                phases=[
+                    SimulatedPhase(CONST.PLAN.ROBOT_LOAD, 10, 55),
+                    SimulatedPhase(CONST.PLAN.ROTATION_MAIN, 55, 100),
+                ],
+            )
+        ],
+        udc_phases=[SimulatedPhase("udc_default_state", 0, 10)],
+        alerts=[],
+        total_s=120,
+        agamemnon_requests=2,
+        expeye=expeye,
+        zocalo=ScriptedZocalo(expeye, {}),
+    )
+
+
+def test_report_shows_timeline_and_samples_per_hour():
+    formatted = format_report(_report(), show_phases=True)
+
+    assert formatted.splitlines()[1].split() == ["7", "10.0", "100.0", "90.0", "1"] + [
+        "collected"
+    ]
+    assert "robot_load" in formatted.splitlines()[2]
+    assert formatted.endswith(
+        "1 samples collected in 0.03 hours, 30.0 samples per hour"
+    )
+
+
+def test_config_is_loaded_from_file(tmp_path):
+    config = SimulationConfig.with_samples(
+        20, profile=UdcLatencyProfile(robot_load_s=30)
+    )
+    path = tmp_path / "queue.json"
+    path.write_text(config.model_dump_json())
+
+    loaded = SimulationConfig.load(path)
+
+    assert loaded == config
+    assert loaded.profile.robot_load_s == 30
+    assert loaded.samples[16].container == 2
+    assert loaded.samples[16].position == 1
+
+
+def test_main_simulates_the_queue_in_the_config_and_prints_report(tmp_path, capsys):
+    path = tmp_path / "queue.json"
+    path.write_text(SimulationConfig.with_samples(2).model_dump_json())
+
+    with patch(
+        "mx_bluesky.hyperion.simulation.udc_simulator.run_simulation",
+        return_value=_report(),
+    ) as simulation:
+        main(["--config", str(path)])
+
+    assert [sample.sample_id for sample in simulation.call_args[0][0].samples] == [
+        1,
+        2,
+    ]
+    assert "1 samples collected" in capsys.readouterr().out
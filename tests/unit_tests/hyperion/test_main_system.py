@@ -17,6 +17,7 @@ from ophyd_async.core import set_mock_value
 from mx_bluesky.common.external_interaction.alerting.log_based_service import (
     LoggingAlertService,
 )
+from mx_bluesky.common.external_interaction.alerting.pipeline import AlertPipeline
 from mx_bluesky.common.utils.context import (
     find_device_in_context,
 )
@@ -103,7 +104,11 @@ def test_initialise_configures_logging(
     initialise_globals(args)
 
     mock_logging_setup.assert_called_once_with(
-        CONST.LOG_FILE_NAME, CONST.GRAYLOG_PORT, dev_mode=True, process_name="hyperion"
+        CONST.LOG_FILE_NAME,
+        CONST.GRAYLOG_PORT,
+        dev_mode=True,
+        process_name="hyperion",
+        queue_handlers=True,
     )
 
 
@@ -117,7 +122,9 @@ def test_initialise_configures_alerting(
     initialise_globals(args)
 
     mock_alerting_setup.assert_called_once()
-    assert isinstance(mock_alerting_setup.mock_calls[0].args[0], LoggingAlertService)
+    alert_service = mock_alerting_setup.mock_calls[0].args[0]
+    assert isinstance(alert_service, AlertPipeline)
+    assert isinstance(alert_service.sinks[0], LoggingAlertService)
 
 
 @patch("sys.argv", new=["hyperion", "--mode", "udc"])
@@ -131,7 +138,11 @@ def test_hyperion_in_udc_mode_starts_logging(
     main()
 
     mock_do_default_logging_setup.assert_called_once_with(
-        CONST.LOG_FILE_NAME, CONST.GRAYLOG_PORT, dev_mode=False, process_name="hyperion"
+        CONST.LOG_FILE_NAME,
+        CONST.GRAYLOG_PORT,
+        dev_mode=False,
+        process_name="hyperion",
+        queue_handlers=True,
     )
 
 
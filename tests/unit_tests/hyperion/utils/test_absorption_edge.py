@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from mx_bluesky.hyperion.utils.absorption_edge import (
+    EdgeScanAnalysisError,
+    analyse_edge_scan,
+    kramers_kronig_f_prime,
+)
+
+from ..conftest import SELENIUM_K_EDGE_EV, fluorescence_spectrum
+
+
+@pytest.fixture
+def energies() -> np.ndarray:
+    return np.arange(SELENIUM_K_EDGE_EV - 30, SELENIUM_K_EDGE_EV + 50.1, 0.5)
+
+
+def test_analysis_finds_inflection_at_edge_and_peak_at_white_line(
+    energies: np.ndarray,
+):
+    analysis = analyse_edge_scan(energies, fluorescence_spectrum(energies))
+    assert analysis.inflection_energy_ev == pytest.approx(SELENIUM_K_EDGE_EV, abs=1)
+    assert analysis.peak_energy_ev == pytest.approx(SELENIUM_K_EDGE_EV + 2, abs=1)
+    assert analysis.remote_energy_ev == analysis.peak_energy_ev + 100
+
+
+def test_f_double_prime_is_scaled_to_the_edge_jump(energies: np.ndarray):
+    analysis = analyse_edge_scan(
+        energies,
+        fluorescence_spectrum(energies, white_line=0),
+        f2_below=0.5,
+        f2_above=4,
+    )
+    assert analysis.f_double_prime[0] == pytest.approx(0.5, abs=0.1)
+    assert analysis.f_double_prime[-1] == pytest.approx(4, abs=0.1)
+
+
+def test_f_prime_has_its_minimum_at_the_inflection(energies: np.ndarray):
+    analysis = analyse_edge_scan(energies, fluorescence_spectrum(energies))
+    assert analysis.inflection_f_prime == min(analysis.f_prime)
+    assert analysis.inflection_f_prime < analysis.peak_f_prime
+    assert analysis.peak_f_double_prime == max(analysis.f_double_prime)
+
+
+def test_analysis_sorts_readings_by_energy(energies: np.ndarray):
+    counts = fluorescence_spectrum(energies)
+    analysis = analyse_edge_scan(energies[::-1], counts[::-1])
+    assert analysis.energies_ev == energies.tolist()
+    assert analysis.counts == counts.tolist()
+
+
+def test_kramers_kronig_of_a_step_has_its_minimum_at_the_step():
+    energies = np.arange(9000, 9100, 0.5)
+    step = (energies >= 9050).astype(float)
+    f_prime = kramers_kronig_f_prime(energies, step, 1000)
+    assert energies[np.argmin(f_prime)] == pytest.approx(9050, abs=1)
+
+
+def test_too_few_readings_raises():
+    with pytest.raises(EdgeScanAnalysisError, match="at least 5"):
+        analyse_edge_scan([1, 2, 3], [1, 2, 3])
+
+
+def test_scan_which_does_not_extend_past_the_edge_raises(energies: np.ndarray):
+    below_edge = energies[energies < SELENIUM_K_EDGE_EV + 5]
+    with pytest.raises(EdgeScanAnalysisError, match="far enough"):
+        analyse_edge_scan(below_edge, fluorescence_spectrum(below_edge))
+
+
+def test_scan_without_a_rise_raises(energies: np.ndarray):
+    with pytest.raises(EdgeScanAnalysisError, match="No rise"):
+        analyse_edge_scan(energies, fluorescence_spectrum(energies, jump=-5000))
@@ -0,0 +1,312 @@
+import itertools
+import time
+
+import numpy as np
+import pytest
+from bluesky.simulators import RunEngineSimulator
+from dodal.devices.smargon import Smargon
+from pydantic import ValidationError
+
+from mx_bluesky.common.utils.xrc_result import XRayCentreResult
+from mx_bluesky.hyperion.blueapi.mixins import (
+    CrystalScore,
+    NonMaxSuppressionSelection,
+    TopNByMaxCountSelection,
+    WithCentreSelection,
+)
+from mx_bluesky.hyperion.utils.centre_selection import (
+    bounding_box_iou,
+    crystal_scores,
+    non_max_suppression,
+    order_for_minimum_travel,
+    path_length_um,
+    samples_and_locations_to_collect,
+    top_n_by_max_count,
+)
+
+SEEDS = range(20)
+
+
+def _result(
+    low_mm, high_mm, max_count=10, total_count=100, sample_id=1
+) -> XRayCentreResult:
+    low_mm, high_mm = np.array(low_mm, dtype=float), np.array(high_mm, dtype=float)
+    return XRayCentreResult(
+        centre_of_mass_mm=(low_mm + high_mm) / 2,
+        bounding_box_mm=(low_mm, high_mm),
+        max_count=max_count,
+        total_count=total_count,
+        sample_id=sample_id,
+    )
+
+
+def _synthetic_hits(
+    rng: np.random.Generator, num_crystals: int, num_sample_ids: int = 1
+) -> list[XRayCentreResult]:
+    """Crystals scattered across a 1 mm cube, each of which may be split into several
+    overlapping or adjacent hits as happens when zocalo finds the same crystal twice."""
+    hits = []
+    for _ in range(num_crystals):
+        centre = rng.uniform(0, 1, 3)
+        size = rng.uniform(0.01, 0.1, 3)
+        sample_id = int(rng.integers(num_sample_ids))
+        for _ in range(rng.integers(1, 4)):
+            offset = rng.uniform(-0.5, 0.5, 3) * size
+            hits.append(
+                _result(
+                    centre + offset - size / 2,
+                    centre + offset + size / 2,
+                    max_count=int(rng.integers(1, 1000)),
+                    total_count=int(rng.integers(1, 10000)),
+                    sample_id=sample_id,
+                )
+            )
+    return hits
+
+
+@pytest.mark.parametrize(
+    "low_b, high_b, expected_iou",
+    [
+        ([0, 0, 0], [2, 2, 2], 1),
+        ([1, 0, 0], [3, 2, 2], 1 / 3),
+        # adjacent boxes do not overlap
+        ([2, 0, 0], [4, 2, 2], 0),
+        ([5, 5, 5], [6, 6, 6], 0),
+        # corners given in any order
+        ([2, 2, 2], [1, 1, 1], 1 / 8),
+    ],
+)
+def test_bounding_box_iou(low_b, high_b, expected_iou):
+    a = _result([0, 0, 0], [2, 2, 2])
+    b = _result(low_b, high_b)
+
+    assert bounding_box_iou(a, b) == pytest.approx(expected_iou)
+    assert bounding_box_iou(b, a) == pytest.approx(expected_iou)
+
+
+def test_crystal_scores_are_weighted_sum_of_normalised_terms():
+    small_bright = _result([0, 0, 0], [1, 1, 1], max_count=100, total_count=200)
+    large_dim = _result([0, 0, 0], [2, 2, 2], max_count=50, total_count=400)
+
+    scores = crystal_scores(
+        [small_bright, large_dim],
+        CrystalScore(max_count_weight=1, total_count_weight=2, volume_weight=4),
+    )
+
+    np.testing.assert_allclose(scores, [1 + 1 + 0.5, 0.5 + 2 + 4])
+
+
+def test_non_max_suppression_with_default_score_is_top_n_when_nothing_overlaps():
+    hits = [
+        _result([i, 0, 0], [i + 1, 1, 1], max_count=count)
+        for i, count in enumerate([5, 50, 20, 10])
+    ]
+
+    assert non_max_suppression(hits, 3) == top_n_by_max_count(hits, 3)
+
+
+def test_overlapping_hits_from_the_same_crystal_are_suppressed():
+    best = _result([0, 0, 0], [2, 2, 2], max_count=100)
+    overlapping = _result([1, 1, 1], [3, 3, 3], max_count=90)
+    adjacent = _result([2, 0, 0], [4, 2, 2], max_count=80)
+    separate = _result([10, 10, 10], [12, 12, 12], max_count=10)
+    hits = [separate, adjacent, overlapping, best]
+
+    assert non_max_suppression(hits, 3) == [best, adjacent, separate]
+    assert non_max_suppression(hits, 3, max_iou=0.1) == [best, overlapping, adjacent]
+    assert non_max_suppression(hits, 3, min_separation_um=2500) == [best, separate]
+
+
+def test_non_max_suppression_for_each_sample():
+    hits = [
+        _result([i, 0, 0], [i + 1, 1, 1], max_count=10 * i, sample_id=i % 2)
+        for i in range(6)
+    ]
+
+    selected = non_max_suppression(hits, 2, for_each_sample=True)
+
+    assert [hit.max_count for hit in selected] == [50, 40, 30, 20]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_non_max_suppression_properties(seed: int):
+    rng = np.random.default_rng(seed)
+    hits = _synthetic_hits(rng, 15, num_sample_ids=3)
+    n = int(rng.integers(1, 10))
+    max_iou = float(rng.choice([0, 0.2, 0.5]))
+    min_separation_um = float(rng.choice([0, 50, 200]))
+    score = CrystalScore(
+        max_count_weight=rng.uniform(0, 1),
+        total_count_weight=rng.uniform(0, 1),
+        volume_weight=rng.uniform(0, 1),
+    )
+    for_each_sample = bool(rng.integers(2))
+
+    selected = non_max_suppression(
+        hits, n, max_iou, min_separation_um, score, for_each_sample
+    )
+
+    def _too_close(a, b):
+        return (
+            bounding_box_iou(a, b) > max_iou
+            or np.linalg.norm(a.centre_of_mass_mm - b.centre_of_mass_mm) * 1000
+            < min_separation_um
+        )
+
+    assert all(any(hit is s for hit in hits) for s in selected)
+    for sample_id in {hit.sample_id for hit in hits} if for_each_sample else {None}:
+        in_sample = [s for s in selected if sample_id in (None, s.sample_id)]
+        assert len(in_sample) <= n
+    # No two selected crystals are too close together
+    for a, b in itertools.combinations(selected, 2):
+        assert not _too_close(a, b)
+    # In descending order of score
+    all_scores = dict(zip(map(id, hits), crystal_scores(hits, score), strict=True))
+    selected_scores = [all_scores[id(s)] for s in selected]
+    assert selected_scores == sorted(selected_scores, reverse=True)
+    # Anything left out which there was room for, or which beats a selected crystal,
+    # was too close to a better one
+    for hit in hits:
+        if any(hit is s for s in selected):
+            continue
+        group_scores = [
+            all_scores[id(s)]
+            for s in selected
+            if not for_each_sample or s.sample_id == hit.sample_id
+        ]
+        if len(group_scores) < n or all_scores[id(hit)] > min(group_scores):
+            assert any(
+                _too_close(hit, s) and all_scores[id(s)] >= all_scores[id(hit)]
+                for s in selected
+            )
+
+
+def _nearest_neighbour_length(locations, start) -> float:
+    remaining = list(locations)
+    position, length = start, 0.0
+    while remaining:
+        distances = [np.abs(loc - position).max() for loc in remaining]
+        position = remaining.pop(int(np.argmin(distances)))
+        length += min(distances)
+    return length
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_travel_ordering_properties(seed: int):
+    rng = np.random.default_rng(seed)
+    locations = list(rng.uniform(0, 1000, (int(rng.integers(0, 12)), 3)))
+    start = rng.uniform(0, 1000, 3)
+
+    order = order_for_minimum_travel(locations, start)
+
+    assert sorted(order) == list(range(len(locations)))
+    ordered = [locations[i] for i in order]
+    length = path_length_um(ordered, start)
+    assert length <= _nearest_neighbour_length(locations, start) + 1e-6
+    # 2-opt optimal: no reversal of a section of the path makes it shorter
+    for i, j in itertools.combinations(range(len(ordered) + 1), 2):
+        reversed_section = ordered[:i] + ordered[i:j][::-1] + ordered[j:]
+        assert length <= path_length_um(reversed_section, start) + 1e-6
+
+
+@pytest.mark.parametrize("num_locations", range(1, 8))
+def test_travel_ordering_of_few_locations_is_optimal(num_locations: int):
+    rng = np.random.default_rng(num_locations)
+    locations = list(rng.uniform(0, 1000, (num_locations, 3)))
+    start = np.zeros(3)
+
+    order = order_for_minimum_travel(locations, start)
+
+    shortest = min(
+        path_length_um([locations[i] for i in permutation], start)
+        for permutation in itertools.permutations(range(num_locations))
+    )
+    # 2-opt is not guaranteed to be optimal but is for these
+    assert path_length_um([locations[i] for i in order], start) == pytest.approx(
+        shortest
+    )
+
+
+def test_benchmark_selection_and_ordering_of_synthetic_hit_lists():
+    ranked_lengths, ordered_lengths = [], []
+    start = np.zeros(3)
+    began = time.perf_counter()
+    for seed in SEEDS:
+        hits = _synthetic_hits(np.random.default_rng(seed), 40)
+        selected = non_max_suppression(hits, 30, min_separation_um=20)
+        locations = [hit.centre_of_mass_mm * 1000 for hit in selected]
+        order = order_for_minimum_travel(locations, start)
+        ranked_lengths.append(path_length_um(locations, start))
+        ordered_lengths.append(path_length_um([locations[i] for i in order], start))
+    elapsed_s = time.perf_counter() - began
+
+    # Ordering for travel at least halves the travel of collecting in ranking order
+    assert np.mean(ordered_lengths) < 0.5 * np.mean(ranked_lengths)
+    assert elapsed_s < 5
+
+
+def test_non_max_suppression_is_selectable_by_name():
+    params = WithCentreSelection(
+        select_centres={  # type: ignore
+            "name": "NonMaxSuppression",
+            "n": 3,
+            "max_iou": 0.2,
+            "order_for_travel": True,
+        }
+    )
+
+    assert params.select_centres == NonMaxSuppressionSelection(
+        n=3, max_iou=0.2, order_for_travel=True
+    )
+
+
+def test_non_max_suppression_iou_must_be_a_fraction():
+    with pytest.raises(ValidationError):
+        NonMaxSuppressionSelection(n=3, max_iou=1.5)
+
+
+def _hits_along_x(*x_mm: float) -> list[XRayCentreResult]:
+    return [
+        _result([x - 0.005, 0, 0], [x + 0.005, 0.01, 0.01], max_count=int(100 - x * 10))
+        for x in x_mm
+    ]
+
+
+def _simulate_selection(
+    sim_run_engine: RunEngineSimulator, smargon: Smargon, selection, hits
+) -> list[float]:
+    for axis, value in zip((smargon.x, smargon.y, smargon.z), (0.9, 0, 0), strict=True):
+        sim_run_engine.add_read_handler_for(axis.user_readback, value)
+    msgs = []
+
+    def _plan():
+        result = yield from samples_and_locations_to_collect(
+            selection, smargon, 1, hits
+        )
+        msgs.append(result)
+
+    sim_run_engine.simulate_plan(_plan())
+    return [round(location[0] / 1000, 3) for _, location in msgs[0]]
+
+
+def test_selected_centres_are_collected_in_order_of_travel_from_current_position(
+    sim_run_engine: RunEngineSimulator, smargon: Smargon
+):
+    hits = _hits_along_x(0.0, 0.2, 0.4, 0.6, 0.8)
+    ranked = TopNByMaxCountSelection(n=5)
+    ordered = TopNByMaxCountSelection(n=5, order_for_travel=True)
+
+    assert _simulate_selection(sim_run_engine, smargon, ranked, hits) == [
+        0.0,
+        0.2,
+        0.4,
+        0.6,
+        0.8,
+    ]
+    assert _simulate_selection(sim_run_engine, smargon, ordered, hits) == [
+        0.8,
+        0.6,
+        0.4,
+        0.2,
+        0.0,
+    ]
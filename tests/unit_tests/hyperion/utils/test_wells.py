@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from bluesky import preprocessors as bpp
+from bluesky.run_engine import RunEngine
+
+from mx_bluesky.common.utils.xrc_result import XRayCentreResult
+from mx_bluesky.hyperion.parameters.gridscan import WellLayout
+from mx_bluesky.hyperion.utils.wells import (
+    WellRegion,
+    WellRegionsEventHandler,
+    assign_hits_to_wells,
+    fire_well_regions_event,
+    well_regions_from_pin_tip,
+)
+
+LAYOUT = WellLayout(well_size_um=250, sample_ids=[11, 12, 13, 14])
+
+
+def _hit_at_x(x_mm: float, sample_id: int | None = 1) -> XRayCentreResult:
+    return XRayCentreResult(
+        centre_of_mass_mm=np.array([x_mm, 0.2, 0.3]),
+        bounding_box_mm=(
+            np.array([x_mm - 0.01, 0.19, 0.29]),
+            np.array([x_mm + 0.01, 0.21, 0.31]),
+        ),
+        max_count=10,
+        total_count=100,
+        sample_id=sample_id,
+    )
+
+
+def test_wells_are_centred_either_side_of_the_pin_tip_centred_position():
+    regions = well_regions_from_pin_tip(LAYOUT, 1.0)
+
+    assert [region.sample_id for region in regions] == [11, 12, 13, 14]
+    assert [region.well for region in regions] == [0, 1, 2, 3]
+    np.testing.assert_allclose(
+        [(region.x_min_mm, region.x_max_mm) for region in regions],
+        [(0.5, 0.75), (0.75, 1.0), (1.0, 1.25), (1.25, 1.5)],
+    )
+
+
+def test_single_well_is_centred_on_the_pin_tip_centred_position():
+    layout = WellLayout(well_size_um=400, sample_ids=[11])
+
+    [region] = well_regions_from_pin_tip(layout, -2.0)
+
+    assert (region.x_min_mm, region.x_max_mm) == pytest.approx((-2.2, -1.8))
+
+
+@pytest.mark.parametrize(
+    "x_mm, expected_sample_id",
+    [
+        (0.6, 11),
+        (0.75, 12),
+        (0.99, 12),
+        (1.3, 14),
+        # beyond the tip and the last well
+        (0.45, None),
+        (1.5, None),
+    ],
+)
+def test_hits_are_assigned_the_sample_id_of_their_well(
+    x_mm: float, expected_sample_id: int | None
+):
+    regions = well_regions_from_pin_tip(LAYOUT, 1.0)
+
+    [assigned] = assign_hits_to_wells([_hit_at_x(x_mm)], regions)
+
+    assert assigned.sample_id == expected_sample_id
+    np.testing.assert_array_equal(assigned.centre_of_mass_mm, [x_mm, 0.2, 0.3])
+
+
+def test_assigning_hits_to_wells_does_not_change_the_original_hits():
+    hit = _hit_at_x(0.6, sample_id=None)
+
+    assign_hits_to_wells([hit], well_regions_from_pin_tip(LAYOUT, 1.0))
+
+    assert hit.sample_id is None
+
+
+def test_well_regions_are_received_by_event_handler(run_engine: RunEngine):
+    regions = well_regions_from_pin_tip(LAYOUT, 1.0)
+    handler = WellRegionsEventHandler()
+
+    run_engine(bpp.subs_wrapper(fire_well_regions_event(regions), handler))
+
+    assert handler.well_regions == regions
+    assert isinstance(handler.well_regions[0], WellRegion)  # type: ignore